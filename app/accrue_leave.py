@@ -0,0 +1,45 @@
+#!/usr/bin/env python3
+"""
+Post monthly leave accruals up to a month, catching up any months missed since the last run.
+
+Usage: python -m app.accrue_leave [--through YYYY-MM] [--tenant ID]
+"""
+
+import argparse
+import logging
+import sys
+from calendar import monthrange
+from datetime import datetime, date
+
+from app.database import init_db, SessionLocal, tenant_names, use_tenant
+from app.services.container import get_accrual_service
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def month_end(value: str) -> date:
+    month = datetime.strptime(value, "%Y-%m")
+    return date(month.year, month.month, monthrange(month.year, month.month)[1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Post monthly leave accruals")
+    parser.add_argument("--through", type=month_end, default=None,
+                        help="Last month to accrue, as YYYY-MM (defaults to the current month)")
+    parser.add_argument("--tenant", help="Only run for this tenant's shard (default: every tenant)")
+    args = parser.parse_args()
+
+    try:
+        for tenant in tenant_names(args.tenant):
+            with use_tenant(tenant):
+                init_db()
+                with SessionLocal() as db:
+                    get_accrual_service().run(db, through=args.through)
+    except Exception as e:
+        logger.error(f"Error posting leave accruals: {e}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,15 +1,14 @@
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, HTTPException, Query, Request, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from sqlalchemy.orm import Session
-from app.database import get_db
-from app.services.auth_service import AuthService
+from app.database import get_db, check_tenant, TenantError
+from app.services.container import get_auth_service, get_user_service
 from app.models.user import User, UserRole
-from app.services.user_service import UserService
-from typing import Optional
+from typing import List, Optional
 
 security = HTTPBearer()
-auth_service = AuthService()
-user_service = UserService()
+auth_service = get_auth_service()
+user_service = get_user_service()
 
 
 async def get_current_user(
@@ -89,4 +88,26 @@ def get_any_authenticated_user(current_user: User = Depends(get_current_user)) -
     return current_user
 
 
-
+def get_requested_fields(
+    fields: Optional[str] = Query(None, description="Comma-separated fields to return (default: all)")
+) -> Optional[List[str]]:
+    """Sparse fieldset of a list endpoint, e.g. ``?fields=id,start_date,end_date,status``"""
+    if fields is None:
+        return None
+    return [field.strip() for field in fields.split(",") if field.strip()]
+
+
+def resolve_request_tenant(request: Request) -> Optional[str]:
+    """Tenant of a request: the access token's claim, else the X-Tenant-ID header (login, public endpoints)
+    or the ``tenant`` query parameter (calendar feed URLs, whose clients cannot send headers).
+
+    Raises TenantError for unknown tenants or a header contradicting the token.
+    """
+    header = request.headers.get("x-tenant-id") or request.query_params.get("tenant")
+    scheme, _, token = request.headers.get("authorization", "").partition(" ")
+    token_data = auth_service.verify_token(token) if scheme.lower() == "bearer" and token else None
+    if token_data is not None and token_data.tenant is not None:
+        if header is not None and header != token_data.tenant:
+            raise TenantError("X-Tenant-ID does not match the access token")
+        return check_tenant(token_data.tenant)
+    return check_tenant(header) if header is not None else None
@@ -0,0 +1,29 @@
+import json
+from typing import Any
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+try:
+    import orjson
+except ImportError:  # orjson is listed in requirements.txt; fall back to the stdlib encoder
+    orjson = None
+
+
+class FastJSONResponse(JSONResponse):
+    """JSON response for plain rows (dicts of primitives, dates and enums).
+
+    List endpoints return this directly so FastAPI skips building a Pydantic
+    model per row; the ``response_model`` on the route stays as the documented
+    contract only.
+    """
+
+    def render(self, content: Any) -> bytes:
+        if orjson is not None:
+            return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
+        return json.dumps(
+            jsonable_encoder(content),
+            ensure_ascii=False,
+            separators=(",", ":"),
+        ).encode("utf-8")
+
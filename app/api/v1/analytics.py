@@ -0,0 +1,77 @@
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy.orm import Session
+from typing import List, Optional
+from datetime import datetime
+import logging
+
+from app.database import get_read_db
+from app.api.deps import get_hr_or_super_admin, get_super_admin
+from app.models.user import User
+from app.schemas.analytics import (
+    AbsenceRateResponse, LeaveTypeUtilizationResponse, ApproverStatsResponse, RollupRebuildResponse
+)
+from app.services.analytics_service import MAX_REBUILD_WORKERS, MAX_REBUILD_CHUNK_SIZE
+from app.services.container import get_analytics_service
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(prefix="/analytics", tags=["Analytics"])
+analytics_service = get_analytics_service()
+
+
+@router.get("/absence-rates", response_model=List[AbsenceRateResponse])
+def get_absence_rates(
+    year: Optional[int] = None,
+    department: Optional[str] = None,
+    current_user: User = Depends(get_hr_or_super_admin),
+    db: Session = Depends(get_read_db)
+):
+    """Absence rate per department and month (HR and Super Admin only)"""
+    try:
+        return analytics_service.get_absence_rates(db, year or datetime.utcnow().year, department)
+    except Exception as e:
+        logger.error(f"Error computing absence rates: {e}")
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Internal server error")
+
+
+@router.get("/leave-type-utilization", response_model=List[LeaveTypeUtilizationResponse])
+def get_leave_type_utilization(
+    year: Optional[int] = None,
+    current_user: User = Depends(get_hr_or_super_admin),
+    db: Session = Depends(get_read_db)
+):
+    """Requests and approved days per leave type against allocations (HR and Super Admin only)"""
+    try:
+        return analytics_service.get_leave_type_utilization(db, year or datetime.utcnow().year)
+    except Exception as e:
+        logger.error(f"Error computing leave type utilization: {e}")
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Internal server error")
+
+
+@router.get("/top-approvers", response_model=List[ApproverStatsResponse])
+def get_top_approvers(
+    year: Optional[int] = None,
+    limit: int = 10,
+    current_user: User = Depends(get_hr_or_super_admin),
+    db: Session = Depends(get_read_db)
+):
+    """Approvers ranked by number of leave decisions (HR and Super Admin only)"""
+    try:
+        return analytics_service.get_top_approvers(db, year or datetime.utcnow().year, min(max(limit, 1), 100))
+    except Exception as e:
+        logger.error(f"Error computing top approvers: {e}")
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Internal server error")
+
+
+@router.post("/rebuild", response_model=RollupRebuildResponse)
+def rebuild_rollups(
+    chunk_size: int = Query(5000, ge=1, le=MAX_REBUILD_CHUNK_SIZE),
+    workers: int = Query(min(4, MAX_REBUILD_WORKERS), ge=1, le=MAX_REBUILD_WORKERS),
+    current_user: User = Depends(get_super_admin)
+):
+    """Recompute the analytics rollups from leave requests (Super Admin only)"""
+    try:
+        return analytics_service.rebuild(chunk_size=chunk_size, workers=workers)
+    except Exception as e:
+        logger.error(f"Error rebuilding analytics rollups: {e}")
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Internal server error")
@@ -2,8 +2,7 @@ from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import HTTPBearer
 from sqlalchemy.orm import Session
 from app.database import get_db
-from app.services.auth_service import AuthService
-from app.services.user_service import UserService
+from app.services.container import get_auth_service, get_user_service
 from app.schemas.auth import LoginResponse
 from app.schemas.user import UserLogin, UserPasswordSetup, UserPasswordReset, UserPasswordChange
 from app.models.user import User
@@ -13,8 +12,8 @@ import logging
 logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/auth", tags=["Authentication"])
-auth_service = AuthService()
-user_service = UserService()
+auth_service = get_auth_service()
+user_service = get_user_service()
 
 
 @router.post("/login", response_model=LoginResponse)
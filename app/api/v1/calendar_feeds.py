@@ -0,0 +1,87 @@
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
+from sqlalchemy.orm import Session
+from typing import List, Optional
+import logging
+
+from app.options import option
+from app.database import get_db, get_read_db
+from app.api.deps import get_any_authenticated_user
+from app.api.responses import FastJSONResponse
+from app.models.user import User
+from app.schemas.calendar_feed import CalendarFeedResponse
+from app.services.container import get_calendar_feed_service
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(prefix="/calendar-feeds", tags=["Calendar Feeds"])
+calendar_feed_service = get_calendar_feed_service()
+FEED_MAX_AGE_SECONDS = option("feed_max_age_seconds", 300)
+
+
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Whether an If-None-Match header names this ETag (weak comparison, as for GET)"""
+    if not if_none_match:
+        return False
+    candidates = [candidate.strip() for candidate in if_none_match.split(",")]
+    return "*" in candidates or any((candidate[2:] if candidate.startswith("W/") else candidate) == etag
+                                    for candidate in candidates)
+
+
+# Feeds read the primary: calendar clients never carry the read-your-writes cookie, and a body rendered
+# from a lagging replica right after an eviction would stay in feed_cache for its whole TTL
+def _feed_response(request: Request, db: Session, scope: str, subject: str, sig: Optional[str]) -> Response:
+    # Unsigned or forged URLs look like missing feeds
+    if not calendar_feed_service.verify(scope, subject, sig):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Calendar feed not found")
+    try:
+        feed = calendar_feed_service.get_feed(db, scope, subject)
+    except Exception as e:
+        logger.error(f"Error building {scope} calendar feed {subject}: {e}")
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Internal server error")
+    if feed is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Calendar feed not found")
+
+    headers = {"ETag": feed["etag"], "Cache-Control": f"private, max-age={FEED_MAX_AGE_SECONDS}"}
+    if _etag_matches(request.headers.get("if-none-match"), feed["etag"]):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return Response(feed["body"], media_type="text/calendar; charset=utf-8", headers=headers)
+
+
+@router.get("", response_model=List[CalendarFeedResponse])
+def get_calendar_feeds(
+    request: Request,
+    department: Optional[str] = None,
+    current_user: User = Depends(get_any_authenticated_user),
+    db: Session = Depends(get_read_db)
+):
+    """Signed iCalendar URLs of the current user's feeds (own leave, department, and company for HR/Super Admin)"""
+    try:
+        root = str(request.url_for("get_calendar_feeds"))
+        links = calendar_feed_service.get_feed_links(db, current_user, department)
+        return FastJSONResponse([{"scope": link["scope"], "name": link["name"], "url": root + link["path"]}
+                                 for link in links])
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail=str(e))
+    except Exception as e:
+        logger.error(f"Error listing calendar feeds of user {current_user.id}: {e}")
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Internal server error")
+
+
+@router.get("/employees/{employee_id}.ics", response_class=Response)
+def get_employee_feed(request: Request, employee_id: int, sig: Optional[str] = None,
+                      db: Session = Depends(get_db)):
+    """One employee's approved leave and holidays; authorized by the URL signature"""
+    return _feed_response(request, db, "employee", str(employee_id), sig)
+
+
+@router.get("/departments/{department}.ics", response_class=Response)
+def get_department_feed(request: Request, department: str, sig: Optional[str] = None,
+                        db: Session = Depends(get_db)):
+    """A department's approved leave and holidays; authorized by the URL signature"""
+    return _feed_response(request, db, "department", department, sig)
+
+
+@router.get("/company.ics", response_class=Response)
+def get_company_feed(request: Request, sig: Optional[str] = None, db: Session = Depends(get_db)):
+    """Everyone's approved leave and the company holidays; authorized by the URL signature"""
+    return _feed_response(request, db, "company", "all", sig)
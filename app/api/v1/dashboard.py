@@ -0,0 +1,45 @@
+from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy.orm import Session
+import logging
+
+from app.database import get_read_db
+from app.api.deps import get_any_authenticated_user, get_hr_or_super_admin
+from app.api.responses import FastJSONResponse
+from app.models.user import User
+from app.schemas.dashboard import EmployeeDashboardResponse, HrDashboardResponse
+from app.services.container import get_dashboard_service
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(prefix="/dashboard", tags=["Dashboard"])
+dashboard_service = get_dashboard_service()
+
+
+@router.get("/employee", response_model=EmployeeDashboardResponse)
+def get_employee_dashboard(
+    current_user: User = Depends(get_any_authenticated_user),
+    db: Session = Depends(get_read_db)
+):
+    """Own profile, this year's balances, recent requests, upcoming holidays and leave types in one call"""
+    try:
+        return FastJSONResponse(dashboard_service.get_employee_dashboard(db, current_user))
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    except Exception as e:
+        logger.error(f"Error building employee dashboard for user {current_user.id}: {e}")
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Internal server error")
+
+
+@router.get("/hr", response_model=HrDashboardResponse)
+def get_hr_dashboard(
+    current_user: User = Depends(get_hr_or_super_admin),
+    db: Session = Depends(get_read_db)
+):
+    """Pending request count, oldest pending requests and who is out today (HR and Super Admin only)"""
+    try:
+        return FastJSONResponse(dashboard_service.get_hr_dashboard(db, current_user))
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    except Exception as e:
+        logger.error(f"Error building HR dashboard for user {current_user.id}: {e}")
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Internal server error")
@@ -0,0 +1,157 @@
+from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy.orm import Session
+from typing import List, Optional
+from datetime import date
+import logging
+
+from app.database import get_db, get_read_db
+from app.api.deps import get_any_authenticated_user, get_hr_or_super_admin
+from app.api.responses import FastJSONResponse
+from app.models.user import User
+from app.schemas.holiday_calendar import (
+    HolidayCalendarCreate, HolidayCalendarUpdate, HolidayCalendarResponse, HolidayCalendarAssignmentItem,
+    CalendarYearResponse
+)
+from app.services.container import get_holiday_calendar_service, get_employee_service
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(prefix="/holiday-calendars", tags=["Holiday Calendars"])
+holiday_calendar_service = get_holiday_calendar_service()
+employee_service = get_employee_service()
+
+
+@router.post("", response_model=HolidayCalendarResponse, status_code=status.HTTP_201_CREATED)
+def create_calendar(
+    calendar_data: HolidayCalendarCreate,
+    current_user: User = Depends(get_hr_or_super_admin),
+    db: Session = Depends(get_db)
+):
+    """Create a holiday calendar and assign departments or locations to it (HR and Super Admin only)"""
+    try:
+        calendar = holiday_calendar_service.create_calendar(db, calendar_data, current_user)
+        return FastJSONResponse(holiday_calendar_service.calendar_response(db, calendar),
+                                status_code=status.HTTP_201_CREATED)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    except Exception as e:
+        logger.error(f"Error creating holiday calendar: {e}")
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Internal server error")
+
+
+@router.get("", response_model=List[HolidayCalendarResponse])
+def get_calendars(
+    current_user: User = Depends(get_any_authenticated_user),
+    db: Session = Depends(get_read_db)
+):
+    """All holiday calendars with their assignments"""
+    return FastJSONResponse([holiday_calendar_service.calendar_response(db, calendar)
+                             for calendar in holiday_calendar_service.get_calendars(db)])
+
+
+@router.get("/mine", response_model=CalendarYearResponse)
+def get_my_calendar_year(
+    year: Optional[int] = None,
+    current_user: User = Depends(get_any_authenticated_user),
+    db: Session = Depends(get_read_db)
+):
+    """Working days and holidays of the current user's calendar in a year (default this year)"""
+    try:
+        employee = employee_service.get_employee_by_user_id(db, current_user.id)
+        calendar_id = holiday_calendar_service.calendar_id_for(db, employee)
+        return FastJSONResponse(holiday_calendar_service.year_response(db, calendar_id, year or date.today().year))
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    except Exception as e:
+        logger.error(f"Error getting holiday calendar of user {current_user.id}: {e}")
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Internal server error")
+
+
+@router.get("/{calendar_id}", response_model=HolidayCalendarResponse)
+def get_calendar(
+    calendar_id: int,
+    current_user: User = Depends(get_any_authenticated_user),
+    db: Session = Depends(get_read_db)
+):
+    calendar = holiday_calendar_service.get_calendar(db, calendar_id)
+    if calendar is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Holiday calendar not found")
+    return FastJSONResponse(holiday_calendar_service.calendar_response(db, calendar))
+
+
+@router.get("/{calendar_id}/days", response_model=CalendarYearResponse)
+def get_calendar_year(
+    calendar_id: int,
+    year: Optional[int] = None,
+    current_user: User = Depends(get_any_authenticated_user),
+    db: Session = Depends(get_read_db)
+):
+    """Working days and holidays of a calendar in a year (default this year), recurring holidays included"""
+    if holiday_calendar_service.get_calendar(db, calendar_id) is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Holiday calendar not found")
+    try:
+        return FastJSONResponse(holiday_calendar_service.year_response(db, calendar_id, year or date.today().year))
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    except Exception as e:
+        logger.error(f"Error getting holiday calendar {calendar_id}: {e}")
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Internal server error")
+
+
+@router.put("/{calendar_id}", response_model=HolidayCalendarResponse)
+def update_calendar(
+    calendar_id: int,
+    calendar_data: HolidayCalendarUpdate,
+    current_user: User = Depends(get_hr_or_super_admin),
+    db: Session = Depends(get_db)
+):
+    """Rename a calendar or change its weekend, company holidays or default flag (HR and Super Admin only)"""
+    try:
+        calendar = holiday_calendar_service.update_calendar(db, calendar_id, calendar_data, current_user)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    except Exception as e:
+        logger.error(f"Error updating holiday calendar {calendar_id}: {e}")
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Internal server error")
+    if calendar is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Holiday calendar not found")
+    return FastJSONResponse(holiday_calendar_service.calendar_response(db, calendar))
+
+
+@router.put("/{calendar_id}/assignments", response_model=HolidayCalendarResponse)
+def set_calendar_assignments(
+    calendar_id: int,
+    assignments: List[HolidayCalendarAssignmentItem],
+    current_user: User = Depends(get_hr_or_super_admin),
+    db: Session = Depends(get_db)
+):
+    """Replace the departments and locations that follow a calendar (HR and Super Admin only)"""
+    try:
+        calendar = holiday_calendar_service.set_assignments(db, calendar_id, assignments, current_user)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    except Exception as e:
+        logger.error(f"Error assigning holiday calendar {calendar_id}: {e}")
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Internal server error")
+    if calendar is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Holiday calendar not found")
+    return FastJSONResponse(holiday_calendar_service.calendar_response(db, calendar))
+
+
+@router.delete("/{calendar_id}", status_code=status.HTTP_204_NO_CONTENT)
+def delete_calendar(
+    calendar_id: int,
+    current_user: User = Depends(get_hr_or_super_admin),
+    db: Session = Depends(get_db)
+):
+    """Delete a calendar and its own holidays; its employees fall back to the default (HR and Super Admin only)"""
+    try:
+        deleted = holiday_calendar_service.delete_calendar(db, calendar_id, current_user)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    except Exception as e:
+        logger.error(f"Error deleting holiday calendar {calendar_id}: {e}")
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Internal server error")
+    if not deleted:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Holiday calendar not found")
+    return None
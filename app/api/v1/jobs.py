@@ -0,0 +1,100 @@
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi.responses import FileResponse
+from sqlalchemy.orm import Session
+from typing import List, Optional
+import os
+import logging
+
+from app.database import get_db, get_read_db
+from app.api.deps import get_hr_or_super_admin
+from app.api.responses import FastJSONResponse
+from app.models.user import User
+from app.background_jobs import validate_payload
+from app.schemas.jobs import JobCreate, JobResponse, JobResultResponse
+from app.services.container import get_job_queue_service
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(prefix="/jobs", tags=["Jobs"])
+job_queue_service = get_job_queue_service()
+
+
+@router.post("", response_model=JobResponse, status_code=status.HTTP_202_ACCEPTED)
+def enqueue_job(
+    job_data: JobCreate,
+    current_user: User = Depends(get_hr_or_super_admin),
+    db: Session = Depends(get_db)
+):
+    """Queue heavy work (year rollover, exports, bulk onboarding, rebuilds) and return at once"""
+    try:
+        payload = validate_payload(job_data.kind, job_data.payload)
+        job = job_queue_service.enqueue(db, job_data.kind, payload, current_user)
+        return FastJSONResponse(job_queue_service.get_job_row(db, job.id), status_code=status.HTTP_202_ACCEPTED)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    except Exception as e:
+        db.rollback()
+        logger.error(f"Error queueing {job_data.kind} job: {e}")
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Internal server error")
+
+
+@router.get("", response_model=List[JobResponse])
+def get_jobs(
+    kind: Optional[str] = None,
+    job_status: Optional[str] = Query(None, alias="status"),
+    limit: int = Query(50, ge=1, le=500),
+    current_user: User = Depends(get_hr_or_super_admin),
+    db: Session = Depends(get_read_db)
+):
+    """Most recent jobs, newest first"""
+    try:
+        return FastJSONResponse(job_queue_service.get_job_rows(db, kind, job_status, limit))
+    except Exception as e:
+        logger.error(f"Error getting jobs: {e}")
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Internal server error")
+
+
+@router.get("/{job_id}", response_model=JobResponse)
+def get_job(
+    job_id: int,
+    current_user: User = Depends(get_hr_or_super_admin),
+    db: Session = Depends(get_db)
+):
+    """Status and progress of a job (read from the primary, which workers update)"""
+    row = job_queue_service.get_job_row(db, job_id)
+    if not row:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Job not found")
+    return FastJSONResponse(row)
+
+
+@router.get("/{job_id}/result", response_model=JobResultResponse)
+def get_job_result(
+    job_id: int,
+    current_user: User = Depends(get_hr_or_super_admin),
+    db: Session = Depends(get_db)
+):
+    """Result (or error) of a finished job; 409 while it is still queued or running"""
+    try:
+        result = job_queue_service.get_result(db, job_id)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e))
+    if result is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Job not found")
+    return FastJSONResponse(result)
+
+
+@router.get("/{job_id}/download")
+def download_job_file(
+    job_id: int,
+    current_user: User = Depends(get_hr_or_super_admin),
+    db: Session = Depends(get_db)
+):
+    """File produced by a finished job, such as a leave request export"""
+    try:
+        result = job_queue_service.get_result(db, job_id)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e))
+    path = ((result or {}).get("result") or {}).get("file")
+    if not path or not os.path.isfile(path):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Job produced no file")
+    return FileResponse(path, filename=os.path.basename(path))
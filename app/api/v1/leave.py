@@ -1,22 +1,31 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, status
 from sqlalchemy.orm import Session
 from typing import List, Optional
-from app.database import get_db
-from app.api.deps import get_current_user, get_hr_or_super_admin, get_super_admin
+from datetime import datetime, date
+from app.database import get_db, get_read_db
+from app.api.deps import (
+    get_current_user, get_employee_user, get_hr_or_super_admin, get_super_admin, get_requested_fields
+)
+from app.api.responses import FastJSONResponse
 from app.models.user import User, UserRole
+from app.models.leave_request import LeaveRequest, LeaveStatus
 from app.schemas.leave import (
     LeaveTypeCreate, LeaveTypeUpdate, LeaveTypeResponse,
     LeaveRequestCreate, LeaveRequestUpdate, LeaveRequestResponse,
-    LeaveBalanceResponse, LeaveAuditResponse, HolidayBase, HolidayCreate, HolidayResponse
+    LeaveBalanceResponse, LeaveAuditResponse, HolidayBase, HolidayCreate, HolidayResponse,
+    LeaveLedgerResponse, LeaveBulkDecisionRequest, LeaveBulkDecisionResponse,
+    LeaveRequestValidationRequest, LeaveRequestValidationResponse, LeaveQuoteResponse, LeaveDurationType
 )
-from app.services.leave_service import LeaveService
-from app.services.employee_service import EmployeeService
+from app.schemas.accrual import LeaveAccrualRuleUpdate, LeaveAccrualRuleResponse, AccrualRunResponse
+from app.services.container import get_leave_service, get_employee_service, get_ledger_service, get_accrual_service
 from app.schemas.leave import LeaveTypeResponse
-from app.models import LeaveType
+from app.models import Holiday
 
 router = APIRouter()
-leave_service = LeaveService()
-employee_service = EmployeeService()
+leave_service = get_leave_service()
+employee_service = get_employee_service()
+ledger_service = get_ledger_service()
+accrual_service = get_accrual_service()
 
 # Leave Type Management (HR and Super Admin only)
 @router.post("/leave-types", response_model=LeaveTypeResponse, status_code=status.HTTP_201_CREATED)
@@ -36,15 +45,14 @@ def create_leave_type(
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Internal server error")
 
 @router.get("/leave-types", response_model=List[LeaveTypeResponse])
-def get_leave_types(db: Session = Depends(get_db)):
-    leave_types = db.query(LeaveType).all()
-    return [LeaveTypeResponse.from_orm(lt) for lt in leave_types]
+def get_leave_types(db: Session = Depends(get_read_db)):
+    return leave_service.get_leave_type_rows(db)
 
 
 @router.get("/leave-types/{leave_type_id}", response_model=LeaveTypeResponse)
 def get_leave_type(
     leave_type_id: int,
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     """Get a specific leave type by ID (public endpoint)"""
     leave_type = leave_service.get_leave_type_by_id(db, leave_type_id)
@@ -69,6 +77,52 @@ def update_leave_type(
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Internal server error")
+
+# Monthly accruals (HR and Super Admin only)
+@router.put("/leave-types/{leave_type_id}/accrual", response_model=LeaveAccrualRuleResponse)
+def set_leave_type_accrual(
+    leave_type_id: int,
+    rule_data: LeaveAccrualRuleUpdate,
+    current_user: User = Depends(get_hr_or_super_admin),
+    db: Session = Depends(get_db)
+):
+    """Make a leave type accrue monthly instead of being allocated up front"""
+    try:
+        rule = accrual_service.set_rule(db, leave_type_id, rule_data)
+    except Exception as e:
+        db.rollback()
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Internal server error")
+    if not rule:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Leave type not found")
+    return rule
+
+@router.delete("/leave-types/{leave_type_id}/accrual", status_code=status.HTTP_204_NO_CONTENT)
+def delete_leave_type_accrual(
+    leave_type_id: int,
+    current_user: User = Depends(get_hr_or_super_admin),
+    db: Session = Depends(get_db)
+):
+    """Stop monthly accruals for a leave type; days already accrued are kept"""
+    try:
+        deleted = accrual_service.delete_rule(db, leave_type_id)
+    except Exception as e:
+        db.rollback()
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Internal server error")
+    if not deleted:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Leave type does not accrue")
+    return None
+
+@router.post("/accruals/run", response_model=AccrualRunResponse)
+def run_accruals(
+    current_user: User = Depends(get_hr_or_super_admin),
+    db: Session = Depends(get_db)
+):
+    """Post accruals up to the current month, catching up missed months (safe to repeat)"""
+    try:
+        return accrual_service.run(db)
+    except Exception as e:
+        db.rollback()
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Internal server error")
 # Leave Request Management
 @router.post("/leave-requests", response_model=LeaveRequestResponse, status_code=status.HTTP_201_CREATED)
 def create_leave_request(
@@ -88,19 +142,20 @@ def create_leave_request(
 @router.get("/leave-requests", response_model=List[LeaveRequestResponse])
 def get_leave_requests(
     employee_id: int = None,
+    fields: Optional[List[str]] = Depends(get_requested_fields),
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     """Get leave requests with role-based access control"""
     try:
-        if employee_id:
-            return leave_service.get_leave_requests_by_employee(db, employee_id, current_user)
-        else:
-            # HR and Super Admin can see all requests
-            if current_user.role in [UserRole.HR, UserRole.SUPER_ADMIN]:
-                return db.query(LeaveRequest).all()
-            else:
-                raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Insufficient permissions")
+        # HR and Super Admin can see all requests
+        if not employee_id and current_user.role not in [UserRole.HR, UserRole.SUPER_ADMIN]:
+            raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Insufficient permissions")
+        
+        rows = leave_service.get_leave_request_rows(db, current_user, employee_id=employee_id, fields=fields)
+        return FastJSONResponse(rows)
+    except HTTPException:
+        raise
     except ValueError as e:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
     except Exception as e:
@@ -108,12 +163,84 @@ def get_leave_requests(
 
 @router.get("/leave-requests/pending", response_model=List[LeaveRequestResponse])
 def get_pending_leave_requests(
+    fields: Optional[List[str]] = Depends(get_requested_fields),
     current_user: User = Depends(get_hr_or_super_admin),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     """Get all pending leave requests (HR and Super Admin only)"""
     try:
-        return leave_service.get_pending_leave_requests(db, current_user)
+        rows = leave_service.get_leave_request_rows(db, current_user, status=LeaveStatus.PENDING, fields=fields)
+        return FastJSONResponse(rows)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Internal server error")
+
+@router.post("/leave-requests/bulk-decision", response_model=LeaveBulkDecisionResponse)
+def bulk_decide_leave_requests(
+    decision_data: LeaveBulkDecisionRequest,
+    background_tasks: BackgroundTasks,
+    current_user: User = Depends(get_hr_or_super_admin),
+    db: Session = Depends(get_db)
+):
+    """Approve, reject or cancel many leave requests at once (HR and Super Admin only)"""
+    try:
+        results, notifications = leave_service.bulk_decide_leave_requests(db, decision_data.items, current_user)
+        if notifications:
+            background_tasks.add_task(leave_service.send_leave_decision_notifications, notifications)
+        
+        succeeded = sum(1 for result in results if result.success)
+        return LeaveBulkDecisionResponse(
+            processed=len(results),
+            succeeded=succeeded,
+            failed=len(results) - succeeded,
+            results=results
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Internal server error")
+
+@router.post("/leave-requests/validate", response_model=LeaveRequestValidationResponse)
+def validate_leave_requests(
+    validation_data: LeaveRequestValidationRequest,
+    current_user: User = Depends(get_hr_or_super_admin),
+    db: Session = Depends(get_read_db)
+):
+    """Check many leave requests against their leave type policies without creating them (HR and Super Admin only)"""
+    try:
+        results = leave_service.validate_leave_requests(db, validation_data.items, current_user)
+        valid = sum(1 for result in results if result.valid)
+        return LeaveRequestValidationResponse(
+            processed=len(results),
+            valid=valid,
+            invalid=len(results) - valid,
+            results=results
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Internal server error")
+
+@router.get("/leave-requests/quote", response_model=LeaveQuoteResponse)
+def quote_leave_request(
+    leave_type_id: int,
+    start_date: date,
+    end_date: date,
+    duration_type: LeaveDurationType = LeaveDurationType.FULL_DAY,
+    start_half: Optional[str] = None,
+    hours: Optional[float] = None,
+    medical_proof: Optional[str] = None,
+    documentation: Optional[str] = None,
+    current_user: User = Depends(get_employee_user),
+    db: Session = Depends(get_read_db)
+):
+    """Working days, holidays, projected balance and policy violations for a prospective request; writes nothing"""
+    try:
+        return leave_service.quote_leave_request(
+            db, current_user, leave_type_id, start_date, end_date, duration_type,
+            start_half=start_half, hours=hours, medical_proof=medical_proof, documentation=documentation
+        )
     except ValueError as e:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
     except Exception as e:
@@ -123,7 +250,7 @@ def get_pending_leave_requests(
 def get_leave_request(
     request_id: int,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     """Get a specific leave request with role-based access control"""
     try:
@@ -201,7 +328,7 @@ def cancel_leave_request(
 def get_leave_audit_logs(
     request_id: int,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     """Get audit logs for a leave request with role-based access control"""
     try:
@@ -215,12 +342,13 @@ def get_leave_audit_logs(
 @router.get("/my-requests", response_model=List[LeaveRequestResponse])
 def get_my_leave_requests(
     status_filter: str = None,
+    fields: Optional[List[str]] = Depends(get_requested_fields),
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     """Get current employee's leave requests with optional status filtering"""
     try:
-        return leave_service.get_my_leave_requests(db, current_user, status_filter)
+        return FastJSONResponse(leave_service.get_my_leave_requests(db, current_user, status_filter, fields))
     except ValueError as e:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
     except Exception as e:
@@ -230,7 +358,7 @@ def get_my_leave_requests(
 def get_my_leave_request_by_id(
     request_id: int,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     """Get specific leave request for current employee"""
     try:
@@ -283,8 +411,9 @@ def cancel_my_leave_request(
 @router.get("/balances", response_model=List[LeaveBalanceResponse])
 def get_leave_balances(
     employee_id: int = None,
+    year: int = None,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     """Get leave balances with role-based access control"""
     try:
@@ -297,13 +426,47 @@ def get_leave_balances(
             elif current_user.role not in [UserRole.HR, UserRole.SUPER_ADMIN]:
                 raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Insufficient permissions")
             
-            return employee_service.get_leave_balances(db, employee_id)
+            return FastJSONResponse(employee_service.get_leave_balance_rows(db, employee_id, year))
         else:
             # HR and Super Admin can see all balances
             if current_user.role in [UserRole.HR, UserRole.SUPER_ADMIN]:
-                return employee_service.get_all_leave_balances(db)
+                return FastJSONResponse(employee_service.get_leave_balance_rows(db, year=year))
             else:
                 raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Insufficient permissions")
+    except HTTPException:
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Internal server error")
+
+@router.get("/balances/{employee_id}/ledger", response_model=LeaveLedgerResponse)
+def get_leave_balance_ledger(
+    employee_id: int,
+    leave_type_id: int,
+    year: int = None,
+    as_of: datetime = None,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Get a balance (optionally as of a point in time) with its ledger movements"""
+    try:
+        if current_user.role == UserRole.EMPLOYEE:
+            employee = employee_service.get_employee_by_user_id(db, current_user.id)
+            if not employee or employee.id != employee_id:
+                raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="You can only view your own balances")
+        elif current_user.role not in [UserRole.HR, UserRole.SUPER_ADMIN]:
+            raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Insufficient permissions")
+        
+        year = year or datetime.now().year
+        balance = ledger_service.get_balance(db, employee_id, leave_type_id, year, as_of)
+        if not balance:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Leave balance not found")
+        
+        movements = ledger_service.get_movements(db, employee_id, leave_type_id, year, as_of=as_of)
+        return LeaveLedgerResponse(balance=balance, movements=movements)
+    except HTTPException:
+        raise
     except ValueError as e:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
     except Exception as e:
@@ -312,7 +475,7 @@ def get_leave_balances(
 @router.get("/my-balances", response_model=List[LeaveBalanceResponse])
 def get_my_leave_balances(
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     """Get current employee's leave balances"""
     try:
@@ -320,7 +483,9 @@ def get_my_leave_balances(
         if not employee:
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Employee record not found")
         
-        return employee_service.get_leave_balances(db, employee.id)
+        return FastJSONResponse(employee_service.get_leave_balance_rows(db, employee.id))
+    except HTTPException:
+        raise
     except ValueError as e:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
     except Exception as e:
@@ -331,7 +496,7 @@ def get_my_leave_balances(
 def get_leave_audit_logs(
     request_id: int,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     """Get audit logs for a leave request with role-based access control"""
     try:
@@ -361,15 +526,16 @@ def create_holiday(
 def get_holidays(
     start_date: str = None,
     end_date: str = None,
-    db: Session = Depends(get_db)
+    calendar_id: Optional[int] = None,
+    db: Session = Depends(get_read_db)
 ):
-    """Get holidays within a date range (public endpoint)"""
+    """Get holidays within a date range, optionally of one holiday calendar (public endpoint)"""
     try:
         from datetime import datetime
         start = datetime.strptime(start_date, "%Y-%m-%d").date() if start_date else None
         end = datetime.strptime(end_date, "%Y-%m-%d").date() if end_date else None
         
-        return leave_service.get_holidays(db, start, end)
+        return leave_service.get_holidays(db, start, end, calendar_id)
     except ValueError as e:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid date format. Use YYYY-MM-DD")
     except Exception as e:
@@ -378,7 +544,7 @@ def get_holidays(
 @router.get("/holidays/{holiday_id}", response_model=HolidayResponse)
 def get_holiday(
     holiday_id: int,
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     """Get a specific holiday by ID (public endpoint)"""
     holiday = db.query(Holiday).filter(Holiday.id == holiday_id).first()
@@ -395,20 +561,14 @@ def update_holiday(
 ):
     """Update a holiday (HR and Super Admin only)"""
     try:
-        holiday = db.query(Holiday).filter(Holiday.id == holiday_id).first()
-        if not holiday:
-            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Holiday not found")
-        
-        # Update fields
-        for field, value in holiday_data.dict(exclude_unset=True).items():
-            setattr(holiday, field, value)
-        
-        db.commit()
-        db.refresh(holiday)
-        return holiday
+        holiday = leave_service.update_holiday(db, holiday_id, holiday_data, current_user)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
     except Exception as e:
-        db.rollback()
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Internal server error")
+    if not holiday:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Holiday not found")
+    return holiday
 
 @router.delete("/holidays/{holiday_id}", status_code=status.HTTP_204_NO_CONTENT)
 def delete_holiday(
@@ -418,13 +578,11 @@ def delete_holiday(
 ):
     """Delete a holiday (HR and Super Admin only)"""
     try:
-        holiday = db.query(Holiday).filter(Holiday.id == holiday_id).first()
-        if not holiday:
-            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Holiday not found")
-        
-        db.delete(holiday)
-        db.commit()
-        return None
+        deleted = leave_service.delete_holiday(db, holiday_id, current_user)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
     except Exception as e:
-        db.rollback()
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Internal server error")
+    if not deleted:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Holiday not found")
+    return None
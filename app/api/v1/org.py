@@ -0,0 +1,91 @@
+from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy.orm import Session
+from typing import List, Optional
+from datetime import date
+import logging
+
+from app.database import get_db, get_read_db
+from app.api.deps import get_any_authenticated_user, get_super_admin
+from app.api.responses import FastJSONResponse
+from app.models.user import User
+from app.schemas.leave import LeaveRequestResponse
+from app.schemas.org import TeamMemberResponse, TeamAbsenceResponse
+from app.services.container import get_org_hierarchy_service
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(prefix="/org", tags=["Org"])
+org_hierarchy_service = get_org_hierarchy_service()
+
+
+@router.get("/managers/{manager_id}/reports", response_model=List[TeamMemberResponse])
+def get_team(
+    manager_id: int,
+    max_depth: Optional[int] = None,
+    current_user: User = Depends(get_any_authenticated_user),
+    db: Session = Depends(get_read_db)
+):
+    """Everyone reporting to a manager, directly or transitively (depth 1 = direct reports)"""
+    try:
+        org_hierarchy_service.check_team_access(db, current_user, manager_id)
+        return FastJSONResponse(org_hierarchy_service.get_team_rows(db, manager_id, max_depth))
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    except Exception as e:
+        logger.error(f"Error getting team of manager {manager_id}: {e}")
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Internal server error")
+
+
+@router.get("/managers/{manager_id}/pending-requests", response_model=List[LeaveRequestResponse])
+def get_team_pending_requests(
+    manager_id: int,
+    max_depth: Optional[int] = None,
+    current_user: User = Depends(get_any_authenticated_user),
+    db: Session = Depends(get_read_db)
+):
+    """Pending leave requests of everyone under a manager"""
+    try:
+        org_hierarchy_service.check_team_access(db, current_user, manager_id)
+        return FastJSONResponse(org_hierarchy_service.get_team_pending_requests(db, manager_id, max_depth))
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    except Exception as e:
+        logger.error(f"Error getting pending requests of manager {manager_id}: {e}")
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Internal server error")
+
+
+@router.get("/managers/{manager_id}/out", response_model=List[TeamAbsenceResponse])
+def get_team_absences(
+    manager_id: int,
+    on: Optional[date] = None,
+    max_depth: Optional[int] = None,
+    current_user: User = Depends(get_any_authenticated_user),
+    db: Session = Depends(get_read_db)
+):
+    """Who under a manager is on approved leave on a date (default today)"""
+    try:
+        org_hierarchy_service.check_team_access(db, current_user, manager_id)
+        return FastJSONResponse(
+            org_hierarchy_service.get_team_absences(db, manager_id, on or date.today(), max_depth)
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    except Exception as e:
+        logger.error(f"Error getting absences of manager {manager_id}: {e}")
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Internal server error")
+
+
+@router.post("/rebuild")
+def rebuild_hierarchy(
+    current_user: User = Depends(get_super_admin),
+    db: Session = Depends(get_db)
+):
+    """Recompute the reporting closure table from employee manager IDs (Super Admin only)"""
+    try:
+        links = org_hierarchy_service.rebuild(db)
+        db.commit()
+        return {"links": links}
+    except Exception as e:
+        db.rollback()
+        logger.error(f"Error rebuilding org hierarchy: {e}")
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Internal server error")
@@ -0,0 +1,47 @@
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from typing import List, Optional
+from datetime import datetime
+import logging
+
+from app.database import get_read_db, fetch_rows
+from app.api.deps import get_super_admin
+from app.api.responses import FastJSONResponse
+from app.models.user import User
+from app.models.job_run import JobRun
+from app.schemas.scheduler import ScheduledJobResponse, JobRunResponse
+from app.scheduler import scheduler as job_scheduler
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(prefix="/scheduler", tags=["Scheduler"])
+
+
+@router.get("/jobs", response_model=List[ScheduledJobResponse])
+def get_scheduled_jobs(current_user: User = Depends(get_super_admin)):
+    """Periodic jobs and when each is next due (UTC, before jitter)"""
+    now = datetime.utcnow()
+    return [
+        ScheduledJobResponse(name=job.name, cron=job.schedule.expression, timeout_seconds=job.timeout_seconds,
+                             next_run_at=job.schedule.next_after(now))
+        for job in job_scheduler.jobs
+    ]
+
+
+@router.get("/runs", response_model=List[JobRunResponse])
+def get_job_runs(
+    job_name: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=500),
+    current_user: User = Depends(get_super_admin),
+    db: Session = Depends(get_read_db)
+):
+    """Most recent scheduled job runs with their status, duration and rows processed"""
+    try:
+        query = select(*JobRun.__table__.columns).order_by(JobRun.started_at.desc(), JobRun.id.desc()).limit(limit)
+        if job_name:
+            query = query.where(JobRun.job_name == job_name)
+        return FastJSONResponse(fetch_rows(db, query))
+    except Exception as e:
+        logger.error(f"Error getting job runs: {e}")
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Internal server error")
@@ -1,24 +1,24 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, status
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
 from fastapi import BackgroundTasks
 import logging
 
-from app.database import get_db
-from app.services.user_service import UserService
-from app.services.employee_service import EmployeeService
+from app.database import get_db, get_read_db
+from app.services.container import get_user_service, get_employee_service
 from app.schemas.user import UserCreate, UserUpdate, UserResponse
-from app.schemas.employee import EmployeeOnboard, EmployeeResponse
+from app.schemas.employee import EmployeeOnboard, EmployeeResponse, EmployeeSearchResponse
 from app.models.user import User, UserRole
 from app.models.employee import Employee
-from app.api.deps import get_super_admin, get_hr_or_super_admin, get_any_authenticated_user
+from app.api.deps import get_super_admin, get_hr_or_super_admin, get_any_authenticated_user, get_requested_fields
+from app.api.responses import FastJSONResponse
 from app.schemas.user import UserPasswordChange
 from app.api.deps import get_any_authenticated_user
 logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/users", tags=["Users"])
-user_service = UserService()
-employee_service = EmployeeService()
+user_service = get_user_service()
+employee_service = get_employee_service()
 
 # -----------------------------
 # ✅ FIRST: /me endpoint to avoid conflict with /{user_id}
@@ -110,26 +110,60 @@ async def onboard_employee_route(
 # -----------------------------
 @router.get("/employees/list", response_model=List[EmployeeResponse])
 async def list_employees(
+    skip: int = 0,
+    limit: int = 100,
+    fields: Optional[List[str]] = Depends(get_requested_fields),
     current_user: User = Depends(get_hr_or_super_admin),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     try:
-        return employee_service.get_all_employees(db)
+        return FastJSONResponse(employee_service.get_employee_rows(db, skip, limit, fields))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         logger.error(f"Error getting employee users: {e}")
         raise HTTPException(status_code=500, detail="Internal server error")
 
 
+# -----------------------------
+# Directory search (HR or Super Admin); must come before /employees/{employee_id}
+# -----------------------------
+@router.get("/employees/search", response_model=EmployeeSearchResponse)
+async def search_employees(
+    q: Optional[str] = None,
+    department: Optional[str] = None,
+    designation: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=200),
+    cursor: Optional[str] = None,
+    fields: Optional[List[str]] = Depends(get_requested_fields),
+    current_user: User = Depends(get_hr_or_super_admin),
+    db: Session = Depends(get_read_db)
+):
+    try:
+        items, next_cursor = employee_service.search_employees(
+            db, q=q, department=department, designation=designation, limit=limit, cursor=cursor, fields=fields
+        )
+        return FastJSONResponse({"items": items, "next_cursor": next_cursor})
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error(f"Error searching employees: {e}")
+        raise HTTPException(status_code=500, detail="Internal server error")
+
+
 # -----------------------------
 # Get HR users
 # -----------------------------
 @router.get("/hr", response_model=List[UserResponse])
 async def get_hr_users(
+    fields: Optional[List[str]] = Depends(get_requested_fields),
     current_user: User = Depends(get_hr_or_super_admin),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     try:
-        return user_service.get_users_by_role(db, UserRole.HR)
+        return FastJSONResponse(user_service.get_user_rows(db, UserRole.HR, fields))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         logger.error(f"Error getting HR users: {e}")
         raise HTTPException(status_code=500, detail="Internal server error")
@@ -139,7 +173,7 @@ async def get_hr_users(
 # Get employee by employee ID
 # -----------------------------
 @router.get("/employees/{employee_id}", response_model=EmployeeResponse)
-async def get_employee(employee_id: str, db: Session = Depends(get_db)):
+async def get_employee(employee_id: str, db: Session = Depends(get_read_db)):
     employee = db.query(Employee).filter(Employee.employee_id == employee_id).first()
     if not employee:
         raise HTTPException(status_code=404, detail="Employee not found")
@@ -151,11 +185,14 @@ async def get_employee(employee_id: str, db: Session = Depends(get_db)):
 # -----------------------------
 @router.get("/employees", response_model=List[UserResponse])
 async def get_employee_users(
+    fields: Optional[List[str]] = Depends(get_requested_fields),
     current_user: User = Depends(get_hr_or_super_admin),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     try:
-        return user_service.get_users_by_role(db, UserRole.EMPLOYEE)
+        return FastJSONResponse(user_service.get_user_rows(db, UserRole.EMPLOYEE, fields))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         logger.error(f"Error getting employee users: {e}")
         raise HTTPException(status_code=500, detail="Internal server error")
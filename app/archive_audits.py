@@ -0,0 +1,44 @@
+#!/usr/bin/env python3
+"""
+Move leave request audits older than the archive horizon into compressed segment files.
+
+Usage: python -m app.archive_audits [--older-than-days N] [--batch-size N] [--tenant ID]
+"""
+
+import argparse
+import logging
+import sys
+
+from app.database import init_db, SessionLocal, tenant_names, use_tenant
+from app.services.audit_archive_service import AuditArchiveService
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Archive old leave request audits")
+    parser.add_argument("--older-than-days", type=int, default=None,
+                        help="Archive horizon in days (defaults to AUDIT_ARCHIVE_DAYS)")
+    parser.add_argument("--batch-size", type=int, default=10000, help="Audits written per segment")
+    parser.add_argument("--tenant", help="Only run for this tenant's shard (default: every tenant)")
+    args = parser.parse_args()
+
+    try:
+        for tenant in tenant_names(args.tenant):
+            with use_tenant(tenant):
+                init_db()
+                db = SessionLocal()
+                try:
+                    segments = AuditArchiveService().archive_all(db, args.older_than_days, args.batch_size)
+                    logger.info(f"Archived {sum(segment.record_count for segment in segments)} audits "
+                                f"into {len(segments)} segments" + (f" for tenant {tenant}" if tenant else ""))
+                finally:
+                    db.close()
+    except Exception as e:
+        logger.error(f"Error archiving audits: {e}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
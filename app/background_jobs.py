@@ -0,0 +1,180 @@
+"""
+Background job kinds.
+
+Each kind pairs a payload schema, checked when the job is queued, with a handler
+``handler(context) -> result dict`` that a worker runs with its own Session.
+Handlers report progress through ``context.progress`` so ``GET /jobs/{id}``
+can show how far along they are.
+"""
+
+import asyncio
+import csv
+import json
+import logging
+import os
+import time
+from datetime import date
+from typing import Any, Callable, Dict, Optional, Type
+
+from pydantic import BaseModel
+from sqlalchemy import select, func
+from sqlalchemy.orm import Session
+
+from app.options import option
+from app.database import SessionLocal, current_tenant, use_tenant
+from app.models.user import User
+from app.models.leave_request import LeaveRequest
+from app.models.background_job import BackgroundJob
+from app.schemas.jobs import EmptyJobPayload, YearRolloverPayload, LeaveRequestExportPayload, BulkOnboardPayload
+from app.services.container import (
+    get_employee_service, get_org_hierarchy_service, get_analytics_service, get_job_queue_service
+)
+from app.services.leave_service import LEAVE_REQUEST_LIST_COLUMNS
+
+logger = logging.getLogger(__name__)
+
+# Progress writes are throttled so chatty handlers do not turn into a write per row
+PROGRESS_INTERVAL_SECONDS = 1.0
+EXPORT_CHUNK_SIZE = 5000
+
+
+class JobContext:
+    def __init__(self, job_id: int, worker: str, payload: BaseModel, created_by_id: Optional[int],
+                 db: Session, session_factory=SessionLocal):
+        self.job_id = job_id
+        self.worker = worker
+        self.payload = payload
+        self.created_by_id = created_by_id
+        self.db = db
+        self.session_factory = session_factory
+        self._last_progress = 0.0
+
+    def progress(self, done: float, total: float, message: Optional[str] = None, force: bool = False):
+        """Record done/total in a separate short transaction, at most once per interval"""
+        now = time.monotonic()
+        if not force and now - self._last_progress < PROGRESS_INTERVAL_SECONDS and done < total:
+            return
+        self._last_progress = now
+        with self.session_factory() as db:
+            get_job_queue_service().report_progress(db, self.job_id, self.worker,
+                                                    done / total if total else 1.0, message)
+
+
+class JobKind:
+    def __init__(self, payload_model: Type[BaseModel], handler: Callable[[JobContext], Dict[str, Any]]):
+        self.payload_model = payload_model
+        self.handler = handler
+
+
+# Handlers
+def year_rollover(context: JobContext) -> Dict[str, Any]:
+    year = context.payload.year or date.today().year
+    employee_service = get_employee_service()
+    context.progress(0, 2, "Carrying forward balances", force=True)
+    carried = employee_service.carry_forward_all(context.db, year - 1, year)
+    context.progress(1, 2, "Opening balances", force=True)
+    opened = employee_service.initialize_year_balances(context.db, year)
+    return {"year": year, "employees_carried_forward": carried, "balances_opened": opened}
+
+
+def export_leave_requests(context: JobContext) -> Dict[str, Any]:
+    """Write matching leave requests to a CSV file, reading them in keyset chunks"""
+    payload = context.payload
+    conditions = []
+    if payload.status is not None:
+        conditions.append(LeaveRequest.status == payload.status.value)
+    if payload.start_date is not None:
+        conditions.append(LeaveRequest.end_date >= payload.start_date)
+    if payload.end_date is not None:
+        conditions.append(LeaveRequest.start_date <= payload.end_date)
+    total = context.db.execute(select(func.count(LeaveRequest.id)).where(*conditions)).scalar()
+
+    export_dir = option("export_dir", "exports")
+    if current_tenant.get() is not None:
+        # Job ids are per shard, so each tenant gets its own directory
+        export_dir = os.path.join(export_dir, current_tenant.get())
+    os.makedirs(export_dir, exist_ok=True)
+    path = os.path.join(export_dir, f"leave_requests_{context.job_id}.csv")
+    columns = [column.key for column in LEAVE_REQUEST_LIST_COLUMNS]
+    written, last_id = 0, 0
+    with open(path, "w", newline="") as file:
+        writer = csv.writer(file)
+        writer.writerow(columns)
+        while True:
+            rows = context.db.execute(
+                select(*LEAVE_REQUEST_LIST_COLUMNS).where(LeaveRequest.id > last_id, *conditions)
+                .order_by(LeaveRequest.id).limit(EXPORT_CHUNK_SIZE)
+            ).all()
+            if not rows:
+                break
+            writer.writerows(rows)
+            written += len(rows)
+            last_id = rows[-1].id
+            context.progress(written, total, f"{written} of {total} rows")
+    return {"file": path, "rows": written}
+
+
+def bulk_onboard(context: JobContext) -> Dict[str, Any]:
+    """Onboard employees one by one; a failure is reported per employee and does not stop the rest"""
+    employee_service = get_employee_service()
+    created_by = context.db.get(User, context.created_by_id)
+    if created_by is None:
+        raise ValueError("The user who queued this job no longer exists")
+    employees = context.payload.employees
+    created, errors = [], []
+    for index, employee_data in enumerate(employees):
+        try:
+            employee, temp_password = asyncio.run(employee_service.onboard_employee(context.db, employee_data, created_by))
+            created.append(employee.id)
+            asyncio.run(employee_service.email_service.send_welcome_email(employee.user, temp_password))
+        except Exception as e:
+            errors.append({"index": index, "email": employee_data.email, "error": str(e)})
+        context.progress(index + 1, len(employees), f"{index + 1} of {len(employees)} employees")
+    return {"created": created, "errors": errors}
+
+
+def rebuild_analytics(context: JobContext) -> Dict[str, Any]:
+    return get_analytics_service().rebuild(context.session_factory).dict()
+
+
+def rebuild_org_hierarchy(context: JobContext) -> Dict[str, Any]:
+    links = get_org_hierarchy_service().rebuild(context.db)
+    context.db.commit()
+    return {"links": links}
+
+
+JOB_KINDS: Dict[str, JobKind] = {
+    "year_rollover": JobKind(YearRolloverPayload, year_rollover),
+    "export_leave_requests": JobKind(LeaveRequestExportPayload, export_leave_requests),
+    "bulk_onboard": JobKind(BulkOnboardPayload, bulk_onboard),
+    "rebuild_analytics": JobKind(EmptyJobPayload, rebuild_analytics),
+    "rebuild_org_hierarchy": JobKind(EmptyJobPayload, rebuild_org_hierarchy),
+}
+
+
+def validate_payload(kind: str, payload: Dict[str, Any]) -> Dict[str, Any]:
+    """Check a payload against its kind's schema before queueing; raises ValueError"""
+    if kind not in JOB_KINDS:
+        raise ValueError(f"Unknown job kind '{kind}'")
+    return json.loads(JOB_KINDS[kind].payload_model(**payload).json())
+
+
+def execute_job(job_id: int, worker: str, tenant: Optional[str] = None, session_factory=SessionLocal):
+    """Run a claimed job (of tenant's shard) to completion and record its result or error; safe in a child process"""
+    queue = get_job_queue_service()
+    with use_tenant(tenant), session_factory() as db:
+        job = db.get(BackgroundJob, job_id)
+        kind = JOB_KINDS.get(job.kind)
+        try:
+            if kind is None:
+                raise ValueError(f"Unknown job kind '{job.kind}'")
+            context = JobContext(job.id, worker, kind.payload_model(**json.loads(job.payload)),
+                                 job.created_by_id, db, session_factory)
+            result = kind.handler(context)
+        except Exception as e:
+            db.rollback()
+            logger.error(f"Background job {job_id} ({job.kind}) failed: {e}")
+            queue.finish(db, job_id, worker, error=str(e))
+            return
+        queue.finish(db, job_id, worker, result=result)
+        logger.info(f"Background job {job_id} ({job.kind}) succeeded")
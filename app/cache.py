@@ -0,0 +1,381 @@
+"""
+In-process caches with cross-worker invalidation.
+
+Every uvicorn worker keeps its own ``LocalCache`` instances. Writers call
+``publish_invalidation`` after committing; the change is evicted locally at once
+and broadcast through the configured bus backend so the other workers evict
+the same keys or tags:
+
+- ``memory``: in-process fan-out, for tests and single-worker runs
+- ``file``: an append-only log every worker on the host tails
+- ``postgres``: ``NOTIFY`` on a channel every worker ``LISTEN``s to
+
+With tenant shards, keys and tags are prefixed with the current tenant, so
+tenants never read or evict each other's entries.
+
+Loading a value races with invalidations: a writer may commit and evict
+between the load and the ``set``, which would store the stale value until its
+TTL. Every eviction bumps the cache's ``generation``; ``get_or_set`` (and
+callers passing ``generation`` to ``set``) drop a value loaded before one.
+"""
+
+import json
+import logging
+import os
+import select
+import threading
+import time
+import uuid
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from app.options import option
+from app.database import current_tenant
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TTL_SECONDS = option("cache_ttl_seconds", 300)
+
+# Sent by a bus backend that may have missed messages: every worker cache it reaches is cleared
+FLUSH_MESSAGE = json.dumps({"flush": True})
+
+
+def scoped(name: str) -> str:
+    """A key or tag as stored: prefixed with the current tenant, if any"""
+    tenant = current_tenant.get()
+    return name if tenant is None else f"{tenant}/{name}"
+
+
+class LocalCache:
+    """Thread-safe TTL cache whose entries can be evicted by key or by tag"""
+
+    def __init__(self, name: str, ttl_seconds: float = None):
+        self.name = name
+        self.ttl_seconds = DEFAULT_TTL_SECONDS if ttl_seconds is None else ttl_seconds
+        self._entries: Dict[str, Tuple[Any, float, Tuple[str, ...]]] = {}
+        self._tags: Dict[str, Set[str]] = {}
+        self._generation = 0
+        self._lock = threading.RLock()
+
+    @property
+    def generation(self) -> int:
+        """Bumped by every eviction; read it before loading a value to pass to ``set``"""
+        return self._generation
+
+    def get(self, key: str, default: Any = None) -> Any:
+        key = scoped(key)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return default
+            value, expires_at, _ = entry
+            if expires_at < time.monotonic():
+                self._evict(key)
+                return default
+            return value
+
+    def set(self, key: str, value: Any, tags: Iterable[str] = (), generation: Optional[int] = None) -> bool:
+        """Store a value; with ``generation``, only if nothing was evicted since it was read"""
+        key, tags = scoped(key), tuple(scoped(tag) for tag in tags)
+        with self._lock:
+            if generation is not None and generation != self._generation:
+                return False
+            self._evict(key)
+            self._entries[key] = (value, time.monotonic() + self.ttl_seconds, tags)
+            for tag in tags:
+                self._tags.setdefault(tag, set()).add(key)
+            return True
+
+    def get_or_set(self, key: str, loader: Callable[[], Any], tags: Iterable[str] = ()) -> Any:
+        """Return the cached value, loading and caching it on a miss (unless evicted meanwhile)"""
+        missing = object()
+        value = self.get(key, missing)
+        if value is missing:
+            generation = self._generation
+            value = loader()
+            self.set(key, value, tags, generation)
+        return value
+
+    def invalidate(self, keys: Iterable[str] = (), tags: Iterable[str] = ()):
+        self.evict_scoped([scoped(key) for key in keys], [scoped(tag) for tag in tags])
+
+    def evict_scoped(self, keys: Iterable[str] = (), tags: Iterable[str] = ()):
+        """Evict keys/tags already prefixed with their tenant (as the bus carries them)"""
+        with self._lock:
+            # Also when nothing is cached yet: a value being loaded right now may be stale
+            self._generation += 1
+            for key in keys:
+                self._evict(key)
+            for tag in tags:
+                for key in list(self._tags.get(tag, ())):
+                    self._evict(key)
+
+    def clear(self):
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
+            self._tags.clear()
+
+    def _evict(self, key: str):
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        for tag in entry[2]:
+            keys = self._tags.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tags[tag]
+
+
+class MemoryBusBackend:
+    """Delivers messages to every subscriber in this process"""
+
+    _subscribers: List[Callable[[str], None]] = []
+    _lock = threading.Lock()
+
+    def start(self, on_message: Callable[[str], None]):
+        with self._lock:
+            self._subscribers.append(on_message)
+
+    def publish(self, message: str):
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for on_message in subscribers:
+            on_message(message)
+
+    def stop(self):
+        with self._lock:
+            self._subscribers.clear()
+
+
+class FileBusBackend:
+    """Single-host bus: messages are appended to a log file that every worker tails.
+
+    Past ``max_bytes`` the publisher replaces the log with a new file that
+    starts with a ``#<generation>`` line, instead of truncating it. Readers
+    keep the old file open, so they finish reading it once they notice the
+    path points to a new inode; publishers hold a lock file while appending
+    and rotating, so nothing is appended to a file after it has been
+    replaced. A reader that slept through more than one rotation has missed
+    a whole file and evicts everything (``FLUSH_MESSAGE``).
+    """
+
+    def __init__(self, path: str, poll_interval: float = 0.02, max_bytes: int = 1024 * 1024):
+        self.path = path
+        self.lock_path = f"{path}.lock"
+        self.poll_interval = poll_interval
+        self.max_bytes = max_bytes
+        self._stopped = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self, on_message: Callable[[str], None]):
+        self._stopped.clear()
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        open(self.path, "ab").close()
+        log = open(self.path, "rb")
+        generation = self._generation(log)
+        log.seek(0, os.SEEK_END)  # Only messages published from now on
+
+        def tail():
+            nonlocal log, generation
+            partial = b""
+            while not self._stopped.wait(self.poll_interval):
+                try:
+                    partial = self._read_lines(log, partial, on_message)
+                    if os.stat(self.path).st_ino != os.fstat(log.fileno()).st_ino:
+                        # Rotated: the old file is complete, so finish it and follow the new one from its start
+                        self._read_lines(log, partial, on_message)
+                        log.close()
+                        log, partial = open(self.path, "rb"), b""
+                        previous, generation = generation, self._generation(log)
+                        if generation != previous + 1:
+                            on_message(FLUSH_MESSAGE)
+                except Exception as e:
+                    logger.error(f"Cache bus file tail failed: {e}")
+            log.close()
+
+        self._thread = threading.Thread(target=tail, name="cache-bus-file", daemon=True)
+        self._thread.start()
+
+    @staticmethod
+    def _generation(log) -> int:
+        """Generation in a log's ``#<generation>`` first line (0 for the first log), read from its start"""
+        log.seek(0)
+        header = log.readline()
+        if header.startswith(b"#") and header.endswith(b"\n"):
+            return int(header[1:])
+        log.seek(0)
+        return 0
+
+    @staticmethod
+    def _read_lines(log, partial: bytes, on_message: Callable[[str], None]) -> bytes:
+        """Deliver the complete lines appended since the last read; returns an unfinished last line"""
+        data = partial + log.read()
+        complete = data.rfind(b"\n") + 1
+        for line in data[:complete].splitlines():
+            on_message(line.decode("utf-8"))
+        return data[complete:]
+
+    def publish(self, message: str):
+        import fcntl
+
+        with open(self.lock_path, "ab") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)  # Released when the file closes
+            with open(self.path, "ab") as log:
+                log.write(message.encode("utf-8") + b"\n")
+                size = log.tell()
+            if size > self.max_bytes:
+                with open(self.path, "rb") as log:
+                    generation = self._generation(log) + 1
+                fresh = f"{self.path}.{os.getpid()}.new"
+                with open(fresh, "wb") as log:
+                    log.write(f"#{generation}\n".encode("utf-8"))
+                os.replace(fresh, self.path)
+
+    def stop(self):
+        self._stopped.set()
+
+
+class PostgresBusBackend:
+    """Cross-host bus over Postgres LISTEN/NOTIFY (requires psycopg2)"""
+
+    def __init__(self, engine, channel: str = "lms_cache_invalidation"):
+        self.engine = engine
+        self.channel = channel
+        self._stopped = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _connect(self):
+        raw = self.engine.raw_connection()
+        raw.detach()  # Held for as long as it listens; closed, never returned to the pool still LISTENing
+        connection = raw.driver_connection
+        if not hasattr(connection, "notifies"):
+            connection.close()
+            raise RuntimeError("The postgres cache bus requires the psycopg2 driver")
+        connection.autocommit = True
+        return connection
+
+    def start(self, on_message: Callable[[str], None]):
+        self._stopped.clear()
+
+        def listen():
+            while not self._stopped.is_set():
+                connection = None
+                try:
+                    connection = self._connect()
+                    with connection.cursor() as cursor:
+                        cursor.execute(f'LISTEN "{self.channel}"')
+                    while not self._stopped.is_set():
+                        if select.select([connection], [], [], 1.0) == ([], [], []):
+                            continue
+                        connection.poll()
+                        while connection.notifies:
+                            on_message(connection.notifies.pop(0).payload)
+                except Exception as e:
+                    logger.error(f"Cache bus listener failed, reconnecting: {e}")
+                finally:
+                    # Close the old connection before the next attempt opens another
+                    if connection is not None:
+                        try:
+                            connection.close()
+                        except Exception:
+                            pass
+                self._stopped.wait(1.0)
+
+        self._thread = threading.Thread(target=listen, name="cache-bus-postgres", daemon=True)
+        self._thread.start()
+
+    def publish(self, message: str):
+        with self.engine.connect() as connection:
+            connection.exec_driver_sql("SELECT pg_notify(%(channel)s, %(message)s)",
+                                       {"channel": self.channel, "message": message})
+            connection.commit()
+
+    def stop(self):
+        self._stopped.set()
+
+
+class InvalidationBus:
+    """Fans invalidations out to this worker's caches and, via the backend, to other workers"""
+
+    def __init__(self, backend):
+        self.backend = backend
+        self.origin = uuid.uuid4().hex
+        self._caches: List[LocalCache] = []
+        self._started = False
+        self._lock = threading.Lock()
+
+    def register(self, cache: LocalCache) -> LocalCache:
+        with self._lock:
+            self._caches.append(cache)
+        return cache
+
+    def start(self):
+        """Start receiving other workers' invalidations; called from the lifespan, after any fork"""
+        with self._lock:
+            if not self._started:
+                self.backend.start(self._on_message)
+                self._started = True
+
+    def stop(self):
+        with self._lock:
+            if self._started:
+                self.backend.stop()
+                self._started = False
+
+    def publish(self, keys: Iterable[str] = (), tags: Iterable[str] = ()):
+        keys, tags = [scoped(key) for key in keys], [scoped(tag) for tag in tags]
+        self._evict(keys, tags)
+        try:
+            self.backend.publish(json.dumps({"origin": self.origin, "keys": keys, "tags": tags}))
+        except Exception as e:
+            # Other workers fall back to TTL expiry
+            logger.error(f"Error publishing cache invalidation: {e}")
+
+    def _on_message(self, message: str):
+        try:
+            payload = json.loads(message)
+        except ValueError:
+            return
+        if payload.get("flush"):
+            for cache in list(self._caches):
+                cache.clear()
+        elif payload.get("origin") != self.origin:
+            self._evict(payload.get("keys", ()), payload.get("tags", ()))
+
+    def _evict(self, keys: Iterable[str], tags: Iterable[str]):
+        for cache in list(self._caches):
+            cache.evict_scoped(keys, tags)
+
+
+def create_bus() -> InvalidationBus:
+    backend_name = option("cache_bus_backend", "memory")
+    if backend_name == "postgres":
+        from app.database import engine
+        backend = PostgresBusBackend(engine)
+    elif backend_name == "file":
+        backend = FileBusBackend(option("cache_bus_path", "/tmp/lms_cache_bus.log"))
+    else:
+        backend = MemoryBusBackend()
+    return InvalidationBus(backend)
+
+
+bus = create_bus()
+
+# Shared caches; values are plain data, never ORM instances
+holiday_cache = bus.register(LocalCache("holidays"))
+leave_type_cache = bus.register(LocalCache("leave_types"))
+user_cache = bus.register(LocalCache("users"))
+# Short-lived: leave quotes read it on every date-picker change
+balance_cache = bus.register(LocalCache("balances", option("balance_cache_ttl_seconds", 30)))
+# Short-lived: one composite dashboard per user, evicted by the tags of everything it shows
+dashboard_cache = bus.register(LocalCache("dashboards", option("dashboard_cache_ttl_seconds", 15)))
+# Rendered iCalendar feed bodies, evicted per feed by the leave and holiday writers
+feed_cache = bus.register(LocalCache("feeds", option("feed_cache_ttl_seconds", 3600)))
+
+
+def publish_invalidation(keys: Iterable[str] = (), tags: Iterable[str] = ()):
+    """Evict keys/tags in every worker; call after the writing transaction commits"""
+    bus.publish(keys, tags)
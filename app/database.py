@@ -1,25 +1,219 @@
+"""
+Engines, sessions and tenant routing.
+
+Single-tenant deployments use ``DATABASE_URL`` (plus an optional read replica).
+With ``TENANT_DATABASE_URL`` set, every company in ``TENANTS`` gets its own
+shard: the template's ``{tenant}`` names a SQLite file, a database or (through
+``options=-csearch_path%3D{tenant}``) a Postgres schema. The tenant in effect is
+a context variable, set per request from the access token (``app.main``) and per
+shard by ``use_tenant`` in migrations, the scheduler and job workers. Sessions
+bind to that tenant's engine when opened; engines are created on first use and
+the least recently used ones are disposed beyond ``TENANT_ENGINE_CACHE_SIZE``,
+so each shard has its own connection pool.
+"""
+
+from collections import OrderedDict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator, List, Optional, Tuple
+import re
+
 from sqlalchemy import create_engine
+from sqlalchemy.engine import Engine
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import Session, sessionmaker
+from fastapi import HTTPException, Request, status
 from app.config import settings
+from app.options import option
+from app.pool_metrics import InstrumentedQueuePool, worker_pool_status
+import hashlib
+import threading
+import time
+
+
+def create_pooled_engine(url: str, name: str):
+    """Create an engine whose pool is sized from settings and reports checkout metrics"""
+    options = {
+        "pool_pre_ping": option("db_pool_pre_ping", True),
+        "pool_recycle": option("db_pool_recycle", 300),
+        "pool_logging_name": name,
+        "echo": settings.debug,
+    }
+    # In-memory SQLite needs its single-connection pool; everything else gets a sized QueuePool
+    if not (url.startswith("sqlite") and (":memory:" in url or url.rstrip("/") in ("sqlite:", "sqlite:/"))):
+        options.update({
+            "poolclass": InstrumentedQueuePool,
+            "pool_size": option("db_pool_size", 5),
+            "max_overflow": option("db_max_overflow", 10),
+            "pool_timeout": option("db_pool_timeout", 30),
+        })
+    return create_engine(url, **options)
+
 
 # Create database engine
-engine = create_engine(
-    settings.database_url,
-    pool_pre_ping=True,
-    pool_recycle=300,
-    echo=settings.debug
-)
+engine = create_pooled_engine(settings.database_url, "primary")
+
+# Optional read replica; without one every session uses the primary
+replica_url = option("database_replica_url", None)
+replica_engine = create_pooled_engine(replica_url, "replica") if replica_url else engine
+
+# Tenant shards (disabled unless TENANT_DATABASE_URL is set)
+TENANT_DATABASE_URL = option("tenant_database_url", None)
+TENANT_DATABASE_REPLICA_URL = option("tenant_database_replica_url", None)
+# Tenant ids end up in file, schema and database names
+TENANT_ID_PATTERN = re.compile(r"^[a-z0-9][a-z0-9_-]{0,62}$")
+
+current_tenant: ContextVar[Optional[str]] = ContextVar("tenant", default=None)
+
+
+class TenantError(ValueError):
+    """The tenant is missing, unknown or not allowed here"""
+
+
+def tenancy_enabled() -> bool:
+    return TENANT_DATABASE_URL is not None
+
+
+def configured_tenants() -> List[str]:
+    tenants = option("tenants", None) or []
+    if isinstance(tenants, str):
+        tenants = tenants.split(",")
+    return [tenant.strip() for tenant in tenants if tenant.strip()]
+
+
+def check_tenant(tenant: Optional[str]) -> str:
+    if tenant is None:
+        raise TenantError("No tenant selected")
+    if not TENANT_ID_PATTERN.match(tenant) or tenant not in configured_tenants():
+        raise TenantError(f"Unknown tenant '{tenant}'")
+    return tenant
+
+
+class TenantEngines:
+    """Primary and replica engine per tenant, created on first use, least recently used disposed first"""
+
+    def __init__(self, capacity: int):
+        self.capacity = max(1, capacity)
+        self._engines: "OrderedDict[str, Tuple[Engine, Engine]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, tenant: str) -> Tuple[Engine, Engine]:
+        with self._lock:
+            engines = self._engines.get(tenant)
+            if engines is not None:
+                self._engines.move_to_end(tenant)
+                return engines
+            check_tenant(tenant)
+            primary = create_pooled_engine(TENANT_DATABASE_URL.format(tenant=tenant), f"{tenant}:primary")
+            replica = (create_pooled_engine(TENANT_DATABASE_REPLICA_URL.format(tenant=tenant), f"{tenant}:replica")
+                       if TENANT_DATABASE_REPLICA_URL else primary)
+            self._engines[tenant] = (primary, replica)
+            while len(self._engines) > self.capacity:
+                _, (evicted, evicted_replica) = self._engines.popitem(last=False)
+                # Connections checked out of an evicted pool are closed when their sessions end
+                evicted.dispose()
+                if evicted_replica is not evicted:
+                    evicted_replica.dispose()
+            return primary, replica
+
+    def items(self) -> List[Tuple[str, Tuple[Engine, Engine]]]:
+        with self._lock:
+            return list(self._engines.items())
+
+    def dispose_all(self, close: bool = True):
+        with self._lock:
+            for primary, replica in self._engines.values():
+                primary.dispose(close=close)
+                if replica is not primary:
+                    replica.dispose(close=close)
+            if close:
+                self._engines.clear()
+
+
+tenant_engines = TenantEngines(option("tenant_engine_cache_size", 16))
+
+
+def get_engine(replica: bool = False, tenant: Optional[str] = None) -> Engine:
+    """Engine of the given (default: current) tenant's shard, or the default database without tenants"""
+    if not tenancy_enabled():
+        return replica_engine if replica else engine
+    primary, replica_of_tenant = tenant_engines.get(check_tenant(tenant or current_tenant.get()))
+    return replica_of_tenant if replica else primary
+
+
+class RoutingSession(Session):
+    """Session bound to the shard of the tenant current when it was opened"""
+
+    def __init__(self, *args, replica: bool = False, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.tenant = current_tenant.get()
+        self.replica = replica
+
+    def get_bind(self, mapper=None, **kwargs):
+        if not tenancy_enabled():
+            return super().get_bind(mapper, **kwargs)
+        return get_engine(self.replica, self.tenant)
+
+
+@contextmanager
+def use_tenant(tenant: Optional[str]) -> Iterator[Optional[str]]:
+    """Run a block against one tenant's shard (None: the default database)"""
+    token = current_tenant.set(tenant)
+    try:
+        yield tenant
+    finally:
+        current_tenant.reset(token)
 
-# Create session factory
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+def tenant_names(tenant: Optional[str] = None) -> List[Optional[str]]:
+    """Shards a maintenance task runs on: the given tenant, every configured one, or [None] without tenants"""
+    if not tenancy_enabled():
+        return [None]
+    return [check_tenant(tenant)] if tenant else configured_tenants()
+
+
+# Create session factories
+SessionLocal = sessionmaker(class_=RoutingSession, autocommit=False, autoflush=False, bind=engine)
+ReplicaSessionLocal = sessionmaker(class_=RoutingSession, autocommit=False, autoflush=False, bind=replica_engine,
+                                   replica=True)
+
+
+@contextmanager
+def primary_session(db: Session) -> Iterator[Session]:
+    """db itself, or a short-lived primary Session of the same tenant when db reads a replica.
+
+    Shared caches load their misses through it: a replica lagging behind the
+    write that just invalidated an entry would otherwise cache the old rows
+    again, for every worker and for the whole TTL.
+    """
+    if not getattr(db, "replica", False) or (replica_engine is engine and not TENANT_DATABASE_REPLICA_URL):
+        yield db
+        return
+    with use_tenant(getattr(db, "tenant", None)):
+        primary = SessionLocal()
+    try:
+        yield primary
+    finally:
+        primary.close()
+
+
+# Read-your-writes: after a client's own write, its reads go to the primary for this long
+READ_YOUR_WRITES_SECONDS = option("read_your_writes_seconds", 5)
+READ_PRIMARY_COOKIE = "lms_read_primary_until"
+_recent_writers = {}
+_recent_writers_lock = threading.Lock()
 
 # Create base class for models
 Base = declarative_base()
 
 
 def get_db():
-    """Dependency to get database session"""
+    """Dependency to get database session.
+
+    A Session only checks out a pooled connection on its first statement, so
+    endpoints that never query do not hold one.
+    """
+    require_tenant()
     db = SessionLocal()
     try:
         yield db
@@ -27,11 +221,102 @@ def get_db():
         db.close()
 
 
+def get_read_db(request: Request):
+    """Dependency for read-only endpoints: a replica session unless the client wrote recently"""
+    require_tenant()
+    factory = SessionLocal if has_recent_write(request) else ReplicaSessionLocal
+    db = factory()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+def require_tenant():
+    """With tenants configured, requests must name theirs (token claim or X-Tenant-ID)"""
+    if tenancy_enabled() and current_tenant.get() is None:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Tenant required (X-Tenant-ID header)")
+
+
+def writer_key(request: Request):
+    """Identify a client by its bearer token without keeping the token itself"""
+    authorization = request.headers.get("authorization")
+    return hashlib.sha256(authorization.encode()).hexdigest() if authorization else None
+
+
+def mark_recent_write(request: Request) -> float:
+    """Pin this client's reads to the primary; returns the pin's expiry (epoch seconds)"""
+    sticky_until = time.time() + READ_YOUR_WRITES_SECONDS
+    key = writer_key(request)
+    if key:
+        with _recent_writers_lock:
+            _recent_writers[key] = sticky_until
+            # Drop expired pins so the map only holds clients active in the window
+            if len(_recent_writers) > 1000:
+                now = time.time()
+                for stale in [k for k, until in _recent_writers.items() if until < now]:
+                    del _recent_writers[stale]
+    return sticky_until
+
+
+def has_recent_write(request: Request) -> bool:
+    """True while the client is within its read-your-writes window.
+
+    The in-process map covers this worker; the cookie covers requests that land
+    on other workers.
+    """
+    if replica_engine is engine and not TENANT_DATABASE_REPLICA_URL:
+        return True
+    now = time.time()
+    try:
+        if float(request.cookies.get(READ_PRIMARY_COOKIE, 0)) > now:
+            return True
+    except ValueError:
+        pass
+    key = writer_key(request)
+    with _recent_writers_lock:
+        return bool(key) and _recent_writers.get(key, 0) > now
+
+
+def get_pool_status() -> dict:
+    """Pool occupancy and checkout metrics for this worker process"""
+    engines = {"primary": engine}
+    if replica_engine is not engine:
+        engines["replica"] = replica_engine
+    for tenant, (primary, replica) in tenant_engines.items():
+        engines[f"{tenant}:primary"] = primary
+        if replica is not primary:
+            engines[f"{tenant}:replica"] = replica
+    return worker_pool_status(engines)
+
+
+def fetch_rows(db, statement) -> list:
+    """Execute a Core select and return plain dict rows, bypassing the ORM identity map"""
+    result = db.execute(statement)
+    keys = list(result.keys())
+    return [dict(zip(keys, row)) for row in result]
+
+
+def project_columns(columns, fields=None, required=("id",)) -> list:
+    """The columns named in fields (all of them when fields is None), in their original order.
+
+    Lets list endpoints select only what a client asked for (``?fields=``);
+    required names are always kept. Raises ValueError for unknown names.
+    """
+    if fields is None:
+        return list(columns)
+    wanted = set(fields) | set(required)
+    unknown = wanted - {column.key for column in columns}
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(sorted(unknown))}")
+    return [column for column in columns if column.key in wanted]
+
+
 def init_db():
     """Initialize database tables"""
     # Import all models so that they are registered with SQLAlchemy's Base
     from app import models  
 
-    Base.metadata.create_all(bind=engine)
+    Base.metadata.create_all(bind=get_engine())
 
 
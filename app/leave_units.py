@@ -0,0 +1,26 @@
+"""
+Fixed-point leave quantities.
+
+Leave is stored, posted to the ledger and summed as whole minutes of an 8-hour
+working day: a full day is 480, a half day 240 and an hour 60. Balance
+arithmetic is exact integer arithmetic, in Python and in SQL ``SUM``; days only
+appear at the edges, in request payloads and API responses.
+"""
+
+from typing import Optional
+
+MINUTES_PER_HOUR = 60
+HOURS_PER_DAY = 8
+MINUTES_PER_DAY = MINUTES_PER_HOUR * HOURS_PER_DAY
+
+
+def days_to_minutes(days: float) -> int:
+    return int(round(days * MINUTES_PER_DAY))
+
+
+def hours_to_minutes(hours: float) -> int:
+    return int(round(hours * MINUTES_PER_HOUR))
+
+
+def minutes_to_days(minutes: Optional[int]) -> Optional[float]:
+    return None if minutes is None else minutes / MINUTES_PER_DAY
@@ -1,14 +1,28 @@
-from fastapi import FastAPI, Depends
+from fastapi import FastAPI, Depends, Request
+from fastapi.responses import JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.middleware.trustedhost import TrustedHostMiddleware
 from contextlib import asynccontextmanager
 from sqlalchemy.orm import Session
+import asyncio
 import logging
 
 from app.config import settings
-from app.database import init_db, get_db
-from app.services.user_service import UserService
-from app.api.v1 import auth, users, leave
+from app.options import option
+from app.database import (
+    get_pool_status, mark_recent_write, READ_PRIMARY_COOKIE, READ_YOUR_WRITES_SECONDS,
+    current_tenant, tenancy_enabled, TenantError
+)
+from app.api.deps import resolve_request_tenant
+from app.migrate import run_migrations
+from app.cache import bus
+from app.warmup import warmup_state, run_warmup, probe_dependencies
+from app.scheduler import scheduler
+from app.worker import job_workers
+from app.api.v1 import (
+    auth, users, leave, analytics, org, jobs, dashboard, holiday_calendars, calendar_feeds,
+    scheduler as scheduler_api
+)
 
 # Configure logging
 logging.basicConfig(
@@ -23,32 +37,44 @@ async def lifespan(app: FastAPI):
     """Application lifespan events"""
     # Startup
     logger.info("Starting Leave Management System...")
+    app.state.ready = False
     
-    # Initialize database
-    try:
-        init_db()
-        logger.info("Database initialized successfully")
-    except Exception as e:
-        logger.error(f"Failed to initialize database: {e}")
-        raise
+    # Schema and Super Admin are normally prepared by `python -m app.migrate` before workers start
+    if option("auto_migrate", False):
+        try:
+            run_migrations()
+        except Exception as e:
+            logger.error(f"Failed to initialize database: {e}")
+            raise
     
-    # Initialize Super Admin
-    try:
-        db = next(get_db())
-        user_service = UserService()
-        super_admin = user_service.initialize_super_admin(db)
-        if super_admin:
-            logger.info(f"Super Admin initialized: {super_admin.email}")
-        else:
-            logger.warning("Failed to initialize Super Admin")
-    except Exception as e:
-        logger.error(f"Failed to initialize Super Admin: {e}")
+    # Receive other workers' cache invalidations, then warm pools and caches in the background
+    bus.start()
+    if option("warmup_enabled", True):
+        app.state.warmup = asyncio.create_task(asyncio.to_thread(run_warmup, warmup_state))
+    else:
+        warmup_state.begin([])
+        warmup_state.finish()
+    
+    # Periodic jobs; every worker schedules them and a database lock elects who runs each one
+    if option("scheduler_enabled", True):
+        scheduler.start()
     
+    # Background jobs queued by HTTP handlers; dedicated `python -m app.worker` processes can share the queue
+    if option("job_worker_enabled", True):
+        for job_worker in job_workers:
+            job_worker.start()
+    
+    app.state.ready = True
     logger.info("Leave Management System started successfully")
     
     yield
     
     # Shutdown
+    app.state.ready = False
+    await scheduler.stop()
+    for job_worker in job_workers:
+        job_worker.stop(timeout=5)
+    bus.stop()
     logger.info("Shutting down Leave Management System...")
 
 
@@ -76,10 +102,44 @@ app.add_middleware(
     allowed_hosts=["*"] if settings.debug else ["localhost", "127.0.0.1"]  # Configure for production
 )
 
+
+@app.middleware("http")
+async def read_your_writes(request: Request, call_next):
+    """Route a client's reads to the primary for a short window after it writes"""
+    response = await call_next(request)
+    if request.method not in ("GET", "HEAD", "OPTIONS") and response.status_code < 400:
+        sticky_until = mark_recent_write(request)
+        response.set_cookie(READ_PRIMARY_COOKIE, str(sticky_until), max_age=READ_YOUR_WRITES_SECONDS,
+                            httponly=True, samesite="lax")
+    return response
+
+
+@app.middleware("http")
+async def route_tenant(request: Request, call_next):
+    """Bind the request to its tenant's shard for every session and cache it touches"""
+    if not tenancy_enabled():
+        return await call_next(request)
+    try:
+        tenant = resolve_request_tenant(request)
+    except TenantError as e:
+        return JSONResponse(status_code=404, content={"detail": str(e)})
+    token = current_tenant.set(tenant)
+    try:
+        return await call_next(request)
+    finally:
+        current_tenant.reset(token)
+
 # Include routers
 app.include_router(auth.router, prefix="/api/v1")
 app.include_router(users.router, prefix="/api/v1")
 app.include_router(leave.router, prefix="/api/v1")
+app.include_router(holiday_calendars.router, prefix="/api/v1")
+app.include_router(calendar_feeds.router, prefix="/api/v1")
+app.include_router(analytics.router, prefix="/api/v1")
+app.include_router(org.router, prefix="/api/v1")
+app.include_router(scheduler_api.router, prefix="/api/v1")
+app.include_router(jobs.router, prefix="/api/v1")
+app.include_router(dashboard.router, prefix="/api/v1")
 
 # Health check endpoint
 @app.get("/health")
@@ -93,6 +153,30 @@ async def health_check():
     }
 
 
+@app.get("/ready")
+def readiness_check():
+    """Readiness probe: 200 once warm-up has finished and every database answers"""
+    if not getattr(app.state, "ready", False):
+        return JSONResponse(status_code=503, content={"status": "starting"})
+    
+    dependencies = probe_dependencies()
+    if not all(dependency["ok"] for dependency in dependencies.values()):
+        status_text = "unavailable"
+    elif not warmup_state.finished:
+        status_text = "warming"
+    else:
+        status_text = "ready"
+    
+    content = {"status": status_text, "warmup": warmup_state.as_dict(), "dependencies": dependencies}
+    return JSONResponse(status_code=200 if status_text == "ready" else 503, content=content)
+
+
+@app.get("/metrics/pool")
+async def pool_metrics():
+    """Connection pool occupancy, checkout wait times and overflow events for this worker"""
+    return get_pool_status()
+
+
 # Root endpoint
 @app.get("/")
 async def root():
@@ -113,6 +197,3 @@ if __name__ == "__main__":
     reload=settings.debug,
     log_level="info"
 )
-
-for route in app.routes:
-    print(route.path, route.name)
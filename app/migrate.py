@@ -0,0 +1,242 @@
+#!/usr/bin/env python3
+"""
+Prepare the database before application workers start: create missing tables,
+convert columns whose representation changed, and create the initial Super Admin.
+With tenant shards every configured tenant is migrated, one after the other.
+
+Usage: python -m app.migrate [--tenant TENANT]
+"""
+
+import argparse
+import logging
+import os
+import sys
+from typing import Optional
+
+from sqlalchemy import inspect, text
+
+from app.database import (
+    Base, init_db, SessionLocal, get_engine, use_tenant, tenant_names, current_tenant, TENANT_DATABASE_URL
+)
+from app.leave_units import MINUTES_PER_DAY
+from app.models.holiday import Holiday
+from app.models.holiday_calendar import HolidayCalendarAssignment
+from app.services.container import get_user_service, get_org_hierarchy_service
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Leave quantities once stored as (fractional) days, now integer minutes: table -> [(old, new, nullable)]
+LEAVE_MINUTE_COLUMNS = {
+    "leave_requests": [("number_of_days", "number_of_minutes", False)],
+    "employee_leave_balances": [
+        ("allocated_days", "allocated_minutes", False), ("used_days", "used_minutes", False),
+        ("pending_days", "pending_minutes", False), ("carried_forward_days", "carried_forward_minutes", False),
+        ("available_balance", "available_minutes", False),
+    ],
+    "leave_balance_movements": [
+        ("allocated_delta", "allocated_minutes", False), ("used_delta", "used_minutes", False),
+        ("pending_delta", "pending_minutes", False), ("carried_delta", "carried_minutes", False),
+    ],
+    "leave_balance_snapshots": [
+        ("allocated_days", "allocated_minutes", False), ("used_days", "used_minutes", False),
+        ("pending_days", "pending_minutes", False), ("carried_forward_days", "carried_forward_minutes", False),
+    ],
+    "leave_rollups": [
+        ("requested_days", "requested_minutes", False), ("approved_days", "approved_minutes", False),
+        ("pending_days", "pending_minutes", False),
+    ],
+    "leave_accrual_rules": [("monthly_days", "monthly_minutes", True)],
+}
+
+
+def convert_leave_quantities():
+    """Rewrite day-valued leave columns of databases created before minutes were used; idempotent"""
+    shard = get_engine()
+    with shard.begin() as connection:
+        inspector = inspect(connection)  # Inside the transaction, which may be the pool's only connection
+        tables = set(inspector.get_table_names())
+        for table, columns in LEAVE_MINUTE_COLUMNS.items():
+            if table not in tables:
+                continue
+            existing = {column["name"] for column in inspector.get_columns(table)}
+            for old, new, nullable in columns:
+                if old not in existing:
+                    continue
+                if new not in existing:
+                    constraint = "" if nullable else " NOT NULL DEFAULT 0"
+                    connection.execute(text(f"ALTER TABLE {table} ADD COLUMN {new} INTEGER{constraint}"))
+                connection.execute(text(f"UPDATE {table} SET {new} = CAST(ROUND({old} * {MINUTES_PER_DAY}) AS INTEGER)"))
+                connection.execute(text(f"ALTER TABLE {table} DROP COLUMN {old}"))
+                logger.info(f"Converted {table}.{old} to {new}")
+
+
+def add_holiday_calendars():
+    """Give databases created before holiday calendars their new columns; idempotent.
+
+    ``holidays.date`` was unique on its own and is now unique per calendar, so
+    its old constraint goes too: dropped on PostgreSQL, by copying the table on
+    SQLite (which cannot drop constraints).
+    """
+    shard = get_engine()
+    with shard.begin() as connection:
+        inspector = inspect(connection)
+        if "location" not in {column["name"] for column in inspector.get_columns("employees")}:
+            connection.execute(text("ALTER TABLE employees ADD COLUMN location VARCHAR"))
+            logger.info("Added employees.location")
+        if "calendar_id" in {column["name"] for column in inspector.get_columns("holidays")}:
+            return
+
+        if shard.dialect.name == "sqlite":
+            columns = ", ".join(column["name"] for column in inspector.get_columns("holidays"))
+            indexes = [index["name"] for index in inspector.get_indexes("holidays")]
+            connection.execute(text("ALTER TABLE holidays RENAME TO holidays_before_calendars"))
+            for index in indexes:
+                connection.execute(text(f'DROP INDEX IF EXISTS "{index}"'))
+            Holiday.__table__.create(connection)
+            connection.execute(text(f"INSERT INTO holidays ({columns}) SELECT {columns} FROM holidays_before_calendars"))
+            connection.execute(text("DROP TABLE holidays_before_calendars"))
+        else:
+            connection.execute(text(
+                "ALTER TABLE holidays ADD COLUMN calendar_id INTEGER REFERENCES holiday_calendars (id) ON DELETE CASCADE"
+            ))
+            for constraint in inspector.get_unique_constraints("holidays"):
+                if constraint["column_names"] == ["date"]:
+                    connection.execute(text(f'ALTER TABLE holidays DROP CONSTRAINT "{constraint["name"]}"'))
+        logger.info("Scoped holidays to holiday calendars")
+
+
+# Unique constraints over nullable columns replaced by COALESCE unique indexes: (table, model, index name)
+NULL_SAFE_UNIQUE_INDEXES = [
+    ("holidays", Holiday, "uq_holiday_calendar_date"),
+    ("holiday_calendar_assignments", HolidayCalendarAssignment, "uq_holiday_calendar_assignment"),
+]
+
+
+def index_names(connection, table: str) -> set:
+    """Names of a table's indexes, expression indexes included (the SQLite inspector skips those)"""
+    if connection.dialect.name == "sqlite":
+        query = "SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = :table AND sql IS NOT NULL"
+    else:
+        query = "SELECT indexname FROM pg_indexes WHERE schemaname = current_schema() AND tablename = :table"
+    return set(connection.execute(text(query), {"table": table}).scalars())
+
+
+def add_null_safe_unique_indexes():
+    """Replace unique constraints that NULLs slipped through with the models' COALESCE indexes; idempotent.
+
+    PostgreSQL drops the constraint; SQLite, which keeps constraints in the
+    table definition, gets the table copied. Rows that already collide stop
+    the migration, to be resolved by hand.
+    """
+    shard = get_engine()
+    with shard.begin() as connection:
+        inspector = inspect(connection)
+        pending = []
+        for table, model, name in NULL_SAFE_UNIQUE_INDEXES:
+            # On PostgreSQL the old constraint's index has the same name; SQLite names constraint indexes itself
+            if name in index_names(connection, table) and (shard.dialect.name == "sqlite" or name not in {
+                    constraint["name"] for constraint in inspector.get_unique_constraints(table)}):
+                continue
+            index = next(index for index in model.__table__.indexes if index.name == name)
+            key = ", ".join(str(expression.compile(shard, compile_kwargs={"literal_binds": True}))
+                            for expression in index.expressions)
+            duplicates = connection.execute(text(
+                f"SELECT COUNT(*) FROM (SELECT 1 FROM {table} GROUP BY {key} HAVING COUNT(*) > 1) AS duplicates"
+            )).scalar()
+            if duplicates:
+                raise RuntimeError(f"{duplicates} duplicate {table} entries block {name}; remove them and rerun")
+            pending.append((table, model, name, index))
+
+        for table, model, name, index in pending:
+            if shard.dialect.name == "sqlite":
+                columns = ", ".join(column["name"] for column in inspector.get_columns(table))
+                indexes = index_names(connection, table)
+                connection.execute(text(f"ALTER TABLE {table} RENAME TO {table}_before_unique_index"))
+                for existing in indexes:
+                    connection.execute(text(f'DROP INDEX IF EXISTS "{existing}"'))
+                model.__table__.create(connection)
+                connection.execute(text(
+                    f"INSERT INTO {table} ({columns}) SELECT {columns} FROM {table}_before_unique_index"
+                ))
+                connection.execute(text(f"DROP TABLE {table}_before_unique_index"))
+            else:
+                connection.execute(text(f'ALTER TABLE {table} DROP CONSTRAINT IF EXISTS "{name}"'))
+                index.create(connection)
+            logger.info(f"Made {table} unique through {name}")
+
+
+def add_missing_indexes():
+    """Create the models' non-unique indexes that tables created before them lack; idempotent.
+
+    create_all only creates missing tables, so indexes added to an existing
+    table (ix_leave_requests_employee_status, ix_leave_request_audits_*, ...)
+    are created here. Unique indexes are left to the migrations that check
+    existing rows first.
+    """
+    shard = get_engine()
+    with shard.begin() as connection:
+        for table in Base.metadata.sorted_tables:
+            existing = index_names(connection, table.name)
+            for index in sorted(table.indexes, key=lambda index: index.name):
+                if not index.unique and index.name not in existing:
+                    index.create(connection)
+                    logger.info(f"Created index {index.name} on {table.name}")
+
+
+def prepare_shard():
+    """Create the current tenant's SQLite directory or Postgres schema so its tables can be created"""
+    tenant = current_tenant.get()
+    if tenant is None:
+        return
+    shard = get_engine()
+    if shard.dialect.name == "sqlite" and shard.url.database:
+        os.makedirs(os.path.dirname(os.path.abspath(shard.url.database)), exist_ok=True)
+    elif shard.dialect.name == "postgresql" and "search_path" in TENANT_DATABASE_URL:
+        with shard.begin() as connection:
+            connection.execute(text(f'CREATE SCHEMA IF NOT EXISTS "{tenant}"'))
+
+
+def run_migrations(tenant: Optional[str] = None):
+    """Migrate the given tenant's shard, every tenant's, or the single database without tenants"""
+    for name in tenant_names(tenant):
+        with use_tenant(name):
+            if name is not None:
+                logger.info(f"Migrating tenant {name}")
+            migrate_shard()
+
+
+def migrate_shard():
+    """Create missing tables, backfill derived tables and make sure a Super Admin exists"""
+    prepare_shard()
+    init_db()
+    convert_leave_quantities()
+    add_holiday_calendars()
+    add_null_safe_unique_indexes()
+    add_missing_indexes()
+    logger.info("Database initialized successfully")
+
+    with SessionLocal() as db:
+        get_org_hierarchy_service().ensure_built(db)
+
+        super_admin = get_user_service().initialize_super_admin(db)
+        if super_admin:
+            logger.info(f"Super Admin initialized: {super_admin.email}")
+        else:
+            logger.warning("Failed to initialize Super Admin")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Create and upgrade the database schema")
+    parser.add_argument("--tenant", help="Only migrate this tenant's shard (default: every tenant)")
+    args = parser.parse_args()
+
+    try:
+        run_migrations(args.tenant)
+    except Exception as e:
+        logger.error(f"Error during migration: {e}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -5,6 +5,16 @@ from .leave_balance import EmployeeLeaveBalance
 from .leave_request import LeaveRequest, LeaveStatus
 from .leave_audit import LeaveRequestAudit, AuditAction
 from .holiday import Holiday
+from .holiday_calendar import HolidayCalendar, HolidayCalendarAssignment
+from .leave_ledger import LeaveBalanceMovement, LeaveBalanceSnapshot, BalanceMovementKind
+from .leave_rollup import LeaveRollup, LeaveApproverRollup
+from .audit_archive import AuditArchiveSegment, AuditArchiveEntry
+from .employee_search import EMPLOYEE_SEARCH_TABLE
+from .org_hierarchy import EmployeeHierarchy
+from .leave_accrual import LeaveAccrualRule, LeaveAccrualCursor
+from .job_run import JobRun, SchedulerLock
+from .background_job import BackgroundJob, BackgroundJobStatus
+from .hr_digest import HrDigestDelivery
 
 __all__ = [
     "User",
@@ -15,5 +25,23 @@ __all__ = [
     "LeaveStatus",
     "LeaveRequestAudit",
     "AuditAction",
-    "Holiday"
+    "Holiday",
+    "HolidayCalendar",
+    "HolidayCalendarAssignment",
+    "LeaveBalanceMovement",
+    "LeaveBalanceSnapshot",
+    "BalanceMovementKind",
+    "LeaveRollup",
+    "LeaveApproverRollup",
+    "AuditArchiveSegment",
+    "AuditArchiveEntry",
+    "EMPLOYEE_SEARCH_TABLE",
+    "EmployeeHierarchy",
+    "LeaveAccrualRule",
+    "LeaveAccrualCursor",
+    "JobRun",
+    "SchedulerLock",
+    "BackgroundJob",
+    "HrDigestDelivery",
+    "BackgroundJobStatus"
 ]
@@ -0,0 +1,39 @@
+from sqlalchemy import Column, Integer, String, BigInteger, ForeignKey, DateTime, Index
+from sqlalchemy.sql import func
+from app.database import Base
+
+
+class AuditArchiveSegment(Base):
+    """Append-only compressed file holding audits moved out of leave_request_audits"""
+    __tablename__ = "audit_archive_segments"
+
+    id = Column(Integer, primary_key=True, index=True)
+    path = Column(String, nullable=False)  # Relative to the archive directory
+    archived_before = Column(DateTime(timezone=True), nullable=False)  # Cutoff used for this run
+    record_count = Column(Integer, nullable=False, default=0)
+    min_audit_id = Column(Integer, nullable=True)
+    max_audit_id = Column(Integer, nullable=True)
+    size_bytes = Column(BigInteger, nullable=False, default=0)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    def __repr__(self):
+        return f"<AuditArchiveSegment(id={self.id}, path='{self.path}', records={self.record_count})>"
+
+
+class AuditArchiveEntry(Base):
+    """Where a leave request's archived audits live: one compressed frame per request and segment"""
+    __tablename__ = "audit_archive_index"
+
+    id = Column(Integer, primary_key=True)
+    leave_request_id = Column(Integer, nullable=False)
+    segment_id = Column(Integer, ForeignKey("audit_archive_segments.id"), nullable=False)
+    offset = Column(BigInteger, nullable=False)
+    length = Column(Integer, nullable=False)
+    record_count = Column(Integer, nullable=False, default=0)
+
+    __table_args__ = (
+        Index("ix_audit_archive_index_request", "leave_request_id", "segment_id"),
+    )
+
+    def __repr__(self):
+        return f"<AuditArchiveEntry(leave_request_id={self.leave_request_id}, segment_id={self.segment_id})>"
@@ -0,0 +1,39 @@
+from sqlalchemy import Column, Integer, String, Float, Text, ForeignKey, DateTime, Index
+from sqlalchemy.sql import func
+from app.database import Base
+import enum
+
+
+class BackgroundJobStatus(str, enum.Enum):
+    QUEUED = "queued"
+    RUNNING = "running"
+    SUCCEEDED = "succeeded"
+    FAILED = "failed"
+
+
+class BackgroundJob(Base):
+    """Queued unit of heavy work, claimed by one worker at a time"""
+    __tablename__ = "background_jobs"
+
+    id = Column(Integer, primary_key=True, index=True)
+    kind = Column(String(50), nullable=False)
+    status = Column(String(20), nullable=False, default=BackgroundJobStatus.QUEUED.value)
+    payload = Column(Text, nullable=False, default="{}")  # JSON
+    result = Column(Text, nullable=True)  # JSON, once succeeded
+    error = Column(Text, nullable=True)
+    progress = Column(Float, nullable=False, default=0)  # 0-1
+    progress_message = Column(String(255), nullable=True)
+    attempts = Column(Integer, nullable=False, default=0)
+    worker = Column(String(100), nullable=True)
+    created_by_id = Column(Integer, ForeignKey("users.id"), nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    started_at = Column(DateTime(timezone=True), nullable=True)
+    heartbeat_at = Column(DateTime(timezone=True), nullable=True)
+    finished_at = Column(DateTime(timezone=True), nullable=True)
+
+    __table_args__ = (
+        Index("ix_background_jobs_claim", "status", "id"),
+    )
+
+    def __repr__(self):
+        return f"<BackgroundJob(id={self.id}, kind='{self.kind}', status='{self.status}')>"
@@ -14,6 +14,7 @@ class Employee(Base):
     last_name = Column(String, nullable=False)
     phone = Column(String, nullable=True)
     department = Column(String, nullable=False)
+    location = Column(String, nullable=True)  # Office or region; selects the holiday calendar with department
     designation = Column(String, nullable=False)
     joining_date = Column(Date, nullable=False)
     manager_id = Column(Integer, ForeignKey("employees.id"), nullable=True)
@@ -0,0 +1,117 @@
+"""
+Directory search indexes.
+
+Not a mapped table: the index is created next to the tables by ``init_db`` /
+``python -m app.migrate`` and kept current by the database itself.
+
+- SQLite: an FTS5 table ``employee_search`` (rowid = ``employees.id``) with
+  prefix indexes, maintained by triggers on ``employees`` and ``users``
+- Postgres: ``pg_trgm`` GIN indexes over the searchable text, so substring
+  ``LIKE`` lookups are index scans
+
+Both also get b-tree indexes matching the directory's keyset ordering.
+"""
+
+import logging
+
+from sqlalchemy import event
+
+from app.database import Base
+
+logger = logging.getLogger(__name__)
+
+EMPLOYEE_SEARCH_TABLE = "employee_search"
+
+# (last_name, first_name, id) is the directory's sort key and keyset cursor
+ORDERING_INDEXES = [
+    "CREATE INDEX IF NOT EXISTS ix_employees_directory_order ON employees (last_name, first_name, id)",
+    "CREATE INDEX IF NOT EXISTS ix_employees_department_order ON employees (department, last_name, first_name, id)",
+    "CREATE INDEX IF NOT EXISTS ix_employees_designation_order ON employees (designation, last_name, first_name, id)",
+]
+
+_SQLITE_INDEXED_ROW = """
+    SELECT employees.id, employees.first_name, employees.last_name, users.email,
+           employees.employee_id, employees.department, employees.designation
+    FROM employees JOIN users ON users.id = employees.user_id
+"""
+
+SQLITE_DDL = [
+    f"""
+    CREATE VIRTUAL TABLE IF NOT EXISTS {EMPLOYEE_SEARCH_TABLE} USING fts5(
+        first_name, last_name, email, employee_code, department, designation,
+        prefix = '2 3 4 5', tokenize = 'unicode61 remove_diacritics 2'
+    )
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS employee_search_insert AFTER INSERT ON employees BEGIN
+        INSERT INTO {EMPLOYEE_SEARCH_TABLE}
+            (rowid, first_name, last_name, email, employee_code, department, designation)
+        {_SQLITE_INDEXED_ROW} WHERE employees.id = new.id;
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS employee_search_update AFTER UPDATE ON employees BEGIN
+        DELETE FROM {EMPLOYEE_SEARCH_TABLE} WHERE rowid = old.id;
+        INSERT INTO {EMPLOYEE_SEARCH_TABLE}
+            (rowid, first_name, last_name, email, employee_code, department, designation)
+        {_SQLITE_INDEXED_ROW} WHERE employees.id = new.id;
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS employee_search_delete AFTER DELETE ON employees BEGIN
+        DELETE FROM {EMPLOYEE_SEARCH_TABLE} WHERE rowid = old.id;
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS employee_search_user_email AFTER UPDATE OF email ON users BEGIN
+        UPDATE {EMPLOYEE_SEARCH_TABLE} SET email = new.email
+        WHERE rowid IN (SELECT id FROM employees WHERE user_id = new.id);
+    END
+    """,
+    # Backfill rows written before the index existed; a no-op once it is current
+    f"""
+    INSERT INTO {EMPLOYEE_SEARCH_TABLE}
+        (rowid, first_name, last_name, email, employee_code, department, designation)
+    {_SQLITE_INDEXED_ROW}
+    WHERE employees.id NOT IN (SELECT rowid FROM {EMPLOYEE_SEARCH_TABLE})
+    """,
+]
+
+# Must stay identical to EmployeeService._search_document() for the planner to use the index
+POSTGRES_SEARCH_DOCUMENT = (
+    "lower(employees.first_name || ' ' || employees.last_name || ' ' || employees.employee_id"
+    " || ' ' || employees.department || ' ' || employees.designation)"
+)
+
+POSTGRES_TRIGRAM_DDL = [
+    f"CREATE INDEX IF NOT EXISTS ix_employees_search_trgm ON employees USING gin ({POSTGRES_SEARCH_DOCUMENT} gin_trgm_ops)",
+    "CREATE INDEX IF NOT EXISTS ix_users_email_trgm ON users USING gin (lower(email) gin_trgm_ops)",
+]
+
+
+def _create_sqlite_index(connection):
+    for statement in SQLITE_DDL:
+        connection.exec_driver_sql(statement)
+
+
+def _create_postgres_index(connection):
+    try:
+        with connection.begin_nested():
+            connection.exec_driver_sql("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    except Exception as e:
+        # Search still works without it, as sequential LIKE scans
+        logger.warning(f"pg_trgm unavailable, directory search will not be indexed: {e}")
+        return
+    for statement in POSTGRES_TRIGRAM_DDL:
+        connection.exec_driver_sql(statement)
+
+
+@event.listens_for(Base.metadata, "after_create")
+def create_employee_search_index(target, connection, **kw):
+    """Create (or backfill) the directory search index after the tables exist"""
+    for statement in ORDERING_INDEXES:
+        connection.exec_driver_sql(statement)
+    if connection.dialect.name == "sqlite":
+        _create_sqlite_index(connection)
+    elif connection.dialect.name == "postgresql":
+        _create_postgres_index(connection)
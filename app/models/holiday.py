@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, Date, Text
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, Date, Text, ForeignKey, Index
 from sqlalchemy.sql import func
 from app.database import Base
 
@@ -7,7 +7,8 @@ class Holiday(Base):
     __tablename__ = "holidays"
     
     id = Column(Integer, primary_key=True, index=True)
-    date = Column(Date, nullable=False, unique=True)
+    calendar_id = Column(Integer, ForeignKey("holiday_calendars.id", ondelete="CASCADE"), nullable=True)  # None: company-wide
+    date = Column(Date, nullable=False)  # Recurring holidays apply on this month and day from this year on
     name = Column(String(100), nullable=False)
     description = Column(Text, nullable=True)
     is_recurring = Column(Boolean, default=True)  # Recurring yearly holidays
@@ -15,6 +16,9 @@ class Holiday(Base):
     
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+
+    # One holiday per calendar and date; COALESCE so company-wide (NULL calendar) dates are unique too
+    __table_args__ = (Index("uq_holiday_calendar_date", func.coalesce(calendar_id, 0), date, unique=True),)
     
     def __repr__(self):
         return f"<Holiday(id={self.id}, date='{self.date}', name='{self.name}')>"
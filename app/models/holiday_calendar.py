@@ -0,0 +1,50 @@
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, Text, ForeignKey, Index
+from sqlalchemy.sql import func
+from app.database import Base
+
+# Bit i of a weekend mask is weekday i (Monday = 0): Saturday and Sunday
+DEFAULT_WEEKEND_MASK = 0b1100000
+
+
+class HolidayCalendar(Base):
+    """Named holiday calendar (a region, office or country) with its own weekend and holidays.
+
+    Company-wide holidays (``Holiday.calendar_id`` NULL) apply to every calendar
+    that includes them; the calendar's own holidays come on top.
+    """
+    __tablename__ = "holiday_calendars"
+
+    id = Column(Integer, primary_key=True, index=True)
+    name = Column(String(100), nullable=False, unique=True)
+    description = Column(Text, nullable=True)
+    weekend_mask = Column(Integer, nullable=False, default=DEFAULT_WEEKEND_MASK)
+    include_company_holidays = Column(Boolean, nullable=False, default=True)
+    is_default = Column(Boolean, nullable=False, default=False)  # For employees no assignment matches
+
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+
+    @property
+    def weekend_days(self):
+        return [day for day in range(7) if self.weekend_mask >> day & 1]
+
+    def __repr__(self):
+        return f"<HolidayCalendar(id={self.id}, name='{self.name}')>"
+
+
+class HolidayCalendarAssignment(Base):
+    """Employees of a department, a location, or a department at a location, follow a calendar"""
+    __tablename__ = "holiday_calendar_assignments"
+
+    id = Column(Integer, primary_key=True, index=True)
+    calendar_id = Column(Integer, ForeignKey("holiday_calendars.id", ondelete="CASCADE"), nullable=False, index=True)
+    department = Column(String, nullable=True)
+    location = Column(String, nullable=True)
+
+    # NULLs never compare equal in a unique constraint, so department-only and location-only rows need the COALESCE
+    __table_args__ = (
+        Index("uq_holiday_calendar_assignment", func.coalesce(department, ""), func.coalesce(location, ""), unique=True),
+    )
+
+    def __repr__(self):
+        return f"<HolidayCalendarAssignment(calendar_id={self.calendar_id}, department='{self.department}', location='{self.location}')>"
@@ -0,0 +1,15 @@
+from sqlalchemy import Column, Integer, ForeignKey, DateTime
+from sqlalchemy.sql import func
+from app.database import Base
+
+
+class HrDigestDelivery(Base):
+    """Pending leave request already included in an HR user's pending-leave digest"""
+    __tablename__ = "hr_digest_deliveries"
+
+    hr_user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    leave_request_id = Column(Integer, ForeignKey("leave_requests.id", ondelete="CASCADE"), primary_key=True)
+    sent_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    def __repr__(self):
+        return f"<HrDigestDelivery(hr_user_id={self.hr_user_id}, leave_request_id={self.leave_request_id})>"
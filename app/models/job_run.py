@@ -0,0 +1,38 @@
+from sqlalchemy import Column, Integer, String, Float, Text, DateTime, UniqueConstraint, Index
+from app.database import Base
+
+
+class JobRun(Base):
+    """One execution of a scheduled job; (job_name, scheduled_for) is unique so a slot runs once"""
+    __tablename__ = "job_runs"
+
+    id = Column(Integer, primary_key=True, index=True)
+    job_name = Column(String(100), nullable=False)
+    scheduled_for = Column(DateTime(timezone=True), nullable=False)
+    status = Column(String(20), nullable=False, default="running")  # running, succeeded, failed, timed_out
+    worker = Column(String(100), nullable=True)
+    started_at = Column(DateTime(timezone=True), nullable=False)
+    finished_at = Column(DateTime(timezone=True), nullable=True)
+    duration_seconds = Column(Float, nullable=True)
+    rows_processed = Column(Integer, nullable=True)
+    error = Column(Text, nullable=True)
+
+    __table_args__ = (
+        UniqueConstraint("job_name", "scheduled_for", name="uq_job_runs_slot"),
+        Index("ix_job_runs_started", "job_name", "started_at"),
+    )
+
+    def __repr__(self):
+        return f"<JobRun(id={self.id}, job_name='{self.job_name}', status='{self.status}')>"
+
+
+class SchedulerLock(Base):
+    """Leader lease for a job on databases without advisory locks (SQLite)"""
+    __tablename__ = "scheduler_locks"
+
+    name = Column(String(100), primary_key=True)
+    owner = Column(String(100), nullable=False)
+    locked_until = Column(DateTime(timezone=True), nullable=False)
+
+    def __repr__(self):
+        return f"<SchedulerLock(name='{self.name}', owner='{self.owner}', locked_until={self.locked_until})>"
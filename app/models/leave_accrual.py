@@ -0,0 +1,36 @@
+from sqlalchemy import Column, Integer, Date, ForeignKey, DateTime
+from sqlalchemy.sql import func
+from app.database import Base
+from app.leave_units import minutes_to_days
+
+
+class LeaveAccrualRule(Base):
+    """Leave type earned month by month instead of allocated up front"""
+    __tablename__ = "leave_accrual_rules"
+
+    leave_type_id = Column(Integer, ForeignKey("leave_types.id", ondelete="CASCADE"), primary_key=True)
+    monthly_minutes = Column(Integer, nullable=True)  # None: the leave type's default_balance / 12
+    starts_on = Column(Date, nullable=False)  # No periods before this month are accrued
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+
+    @property
+    def monthly_days(self):
+        return minutes_to_days(self.monthly_minutes)
+
+    def __repr__(self):
+        return f"<LeaveAccrualRule(leave_type_id={self.leave_type_id}, monthly_minutes={self.monthly_minutes})>"
+
+
+class LeaveAccrualCursor(Base):
+    """Last month accrued for one balance; accrual runs only post the months after it"""
+    __tablename__ = "leave_accrual_cursors"
+
+    employee_id = Column(Integer, ForeignKey("employees.id", ondelete="CASCADE"), primary_key=True)
+    leave_type_id = Column(Integer, ForeignKey("leave_types.id", ondelete="CASCADE"), primary_key=True)
+    year = Column(Integer, primary_key=True)
+    last_month = Column(Integer, nullable=False)  # 1-12
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+    def __repr__(self):
+        return f"<LeaveAccrualCursor(employee_id={self.employee_id}, leave_type_id={self.leave_type_id}, year={self.year}, last_month={self.last_month})>"
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, Text, Enum
+from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, Text, Enum, Index
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 from app.database import Base
@@ -31,6 +31,11 @@ class LeaveRequestAudit(Base):
     leave_request = relationship("LeaveRequest", back_populates="audit_logs")
     performed_by = relationship("User")
     
+    __table_args__ = (
+        Index("ix_leave_request_audits_request", "leave_request_id"),
+        Index("ix_leave_request_audits_created_at", "created_at"),
+    )
+    
     def __repr__(self):
         return f"<LeaveRequestAudit(id={self.id}, action='{self.action}', leave_request_id={self.leave_request_id})>"
 
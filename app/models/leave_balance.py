@@ -11,11 +11,12 @@ class EmployeeLeaveBalance(Base):
     employee_id = Column(Integer, ForeignKey("employees.id"), nullable=False)
     leave_type_id = Column(Integer, ForeignKey("leave_types.id"), nullable=False)
     year = Column(Integer, nullable=False)  # Year for which balance is tracked
-    allocated_days = Column(Integer, nullable=False, default=0)
-    used_days = Column(Integer, nullable=False, default=0)
-    pending_days = Column(Integer, nullable=False, default=0)
-    carried_forward_days = Column(Integer, nullable=False, default=0)
-    available_balance = Column(Integer, nullable=False, default=0)
+    # Quantities in minutes of leave (see app.leave_units)
+    allocated_minutes = Column(Integer, nullable=False, default=0)
+    used_minutes = Column(Integer, nullable=False, default=0)
+    pending_minutes = Column(Integer, nullable=False, default=0)
+    carried_forward_minutes = Column(Integer, nullable=False, default=0)
+    available_minutes = Column(Integer, nullable=False, default=0)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
     
@@ -24,5 +25,5 @@ class EmployeeLeaveBalance(Base):
     leave_type = relationship("LeaveType", back_populates="leave_balances")
     
     def __repr__(self):
-        return f"<EmployeeLeaveBalance(employee_id={self.employee_id}, leave_type_id={self.leave_type_id}, year={self.year}, available={self.available_balance})>"
+        return f"<EmployeeLeaveBalance(employee_id={self.employee_id}, leave_type_id={self.leave_type_id}, year={self.year}, available_minutes={self.available_minutes})>"
 
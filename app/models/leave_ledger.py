@@ -0,0 +1,61 @@
+from sqlalchemy import Column, Integer, ForeignKey, DateTime, Enum, Index
+from sqlalchemy.sql import func
+from app.database import Base
+import enum
+
+
+class BalanceMovementKind(str, enum.Enum):
+    ALLOCATE = "allocate"   # allocated +
+    RESERVE = "reserve"     # pending + (request submitted)
+    CONSUME = "consume"     # pending -, used + (request approved)
+    RELEASE = "release"     # pending - (request rejected, cancelled or modified)
+    REFUND = "refund"       # used - (approved request cancelled)
+    CARRY = "carry"         # carried forward +
+
+
+class LeaveBalanceMovement(Base):
+    """Immutable balance movement; rows are only ever inserted"""
+    __tablename__ = "leave_balance_movements"
+
+    id = Column(Integer, primary_key=True, index=True)
+    employee_id = Column(Integer, ForeignKey("employees.id"), nullable=False)
+    leave_type_id = Column(Integer, ForeignKey("leave_types.id"), nullable=False)
+    year = Column(Integer, nullable=False)
+    kind = Column(Enum(BalanceMovementKind), nullable=False)
+    # Signed changes in minutes of leave (see app.leave_units)
+    allocated_minutes = Column(Integer, nullable=False, default=0)
+    used_minutes = Column(Integer, nullable=False, default=0)
+    pending_minutes = Column(Integer, nullable=False, default=0)
+    carried_minutes = Column(Integer, nullable=False, default=0)
+    leave_request_id = Column(Integer, ForeignKey("leave_requests.id"), nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    __table_args__ = (
+        Index("ix_leave_balance_movements_key", "employee_id", "leave_type_id", "year", "id"),
+    )
+
+    def __repr__(self):
+        return f"<LeaveBalanceMovement(id={self.id}, employee_id={self.employee_id}, kind='{self.kind}')>"
+
+
+class LeaveBalanceSnapshot(Base):
+    """Folded balance state covering every movement up to ledger_position"""
+    __tablename__ = "leave_balance_snapshots"
+
+    id = Column(Integer, primary_key=True, index=True)
+    employee_id = Column(Integer, ForeignKey("employees.id"), nullable=False)
+    leave_type_id = Column(Integer, ForeignKey("leave_types.id"), nullable=False)
+    year = Column(Integer, nullable=False)
+    ledger_position = Column(Integer, nullable=False, default=0)  # Last folded movement id
+    allocated_minutes = Column(Integer, nullable=False, default=0)
+    used_minutes = Column(Integer, nullable=False, default=0)
+    pending_minutes = Column(Integer, nullable=False, default=0)
+    carried_forward_minutes = Column(Integer, nullable=False, default=0)
+    taken_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    __table_args__ = (
+        Index("ix_leave_balance_snapshots_key", "employee_id", "leave_type_id", "year", "ledger_position"),
+    )
+
+    def __repr__(self):
+        return f"<LeaveBalanceSnapshot(employee_id={self.employee_id}, leave_type_id={self.leave_type_id}, position={self.ledger_position})>"
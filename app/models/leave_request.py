@@ -1,7 +1,9 @@
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, Date, Text, Float, ForeignKey
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, Date, Text, Float, ForeignKey, Index
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
+from sqlalchemy.ext.hybrid import hybrid_property
 from app.database import Base
+from app.leave_units import MINUTES_PER_DAY, minutes_to_days
 from app.models.enums import LeaveStatus, LeaveDurationType  # <-- updated import
 from enum import Enum
 
@@ -26,7 +28,7 @@ class LeaveRequest(Base):
     duration_type = Column(String(20), nullable=False, default=LeaveDurationType.FULL_DAY.value)
     start_half = Column(String(20), nullable=True)  # "morning" or "afternoon" for half-day
     hours = Column(Float, nullable=True)  # For hourly leaves
-    number_of_days = Column(Float, nullable=False)  # Changed to float to support half-days and hours
+    number_of_minutes = Column(Integer, nullable=False)  # Minutes of leave (see app.leave_units)
     reason = Column(Text, nullable=False)
     status = Column(String(20), nullable=False, default=LeaveStatus.PENDING.value)
     approved_by_id = Column(Integer, ForeignKey("users.id"), nullable=True)
@@ -45,6 +47,19 @@ class LeaveRequest(Base):
     leave_type = relationship("LeaveType", back_populates="leave_requests")
     approved_by = relationship("User", foreign_keys=[approved_by_id])
     audit_logs = relationship("LeaveRequestAudit", back_populates="leave_request")
+
+    # Per-employee status lookups (team pending requests, who is out) once the team is known
+    __table_args__ = (
+        Index("ix_leave_requests_employee_status", "employee_id", "status", "start_date"),
+    )
     
+    @hybrid_property
+    def number_of_days(self):
+        return minutes_to_days(self.number_of_minutes)
+
+    @number_of_days.expression
+    def number_of_days(cls):
+        return (cls.number_of_minutes / float(MINUTES_PER_DAY)).label("number_of_days")
+
     def __repr__(self):
         return f"<LeaveRequest(id={self.id}, employee_id={self.employee_id}, status='{self.status}')>"
@@ -0,0 +1,44 @@
+from sqlalchemy import Column, Integer, String, Date, ForeignKey, UniqueConstraint
+from app.database import Base
+
+
+class LeaveRollup(Base):
+    """Leave request counters per (department, leave type, month of leave start)"""
+    __tablename__ = "leave_rollups"
+
+    id = Column(Integer, primary_key=True, index=True)
+    department = Column(String, nullable=False)
+    leave_type_id = Column(Integer, ForeignKey("leave_types.id"), nullable=False)
+    month = Column(Date, nullable=False)  # First day of the month
+    requested_count = Column(Integer, nullable=False, default=0)
+    approved_count = Column(Integer, nullable=False, default=0)
+    rejected_count = Column(Integer, nullable=False, default=0)
+    cancelled_count = Column(Integer, nullable=False, default=0)
+    requested_minutes = Column(Integer, nullable=False, default=0)
+    approved_minutes = Column(Integer, nullable=False, default=0)
+    pending_minutes = Column(Integer, nullable=False, default=0)
+
+    __table_args__ = (
+        UniqueConstraint("department", "leave_type_id", "month", name="uq_leave_rollups_key"),
+    )
+
+    def __repr__(self):
+        return f"<LeaveRollup(department='{self.department}', leave_type_id={self.leave_type_id}, month='{self.month}')>"
+
+
+class LeaveApproverRollup(Base):
+    """Decisions per approver and month of decision"""
+    __tablename__ = "leave_approver_rollups"
+
+    id = Column(Integer, primary_key=True, index=True)
+    approver_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    month = Column(Date, nullable=False)  # First day of the month
+    approved_count = Column(Integer, nullable=False, default=0)
+    rejected_count = Column(Integer, nullable=False, default=0)
+
+    __table_args__ = (
+        UniqueConstraint("approver_id", "month", name="uq_leave_approver_rollups_key"),
+    )
+
+    def __repr__(self):
+        return f"<LeaveApproverRollup(approver_id={self.approver_id}, month='{self.month}')>"
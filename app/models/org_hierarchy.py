@@ -0,0 +1,22 @@
+from sqlalchemy import Column, Integer, ForeignKey, Index
+from app.database import Base
+
+
+class EmployeeHierarchy(Base):
+    """Closure table of the reporting tree: one row per (manager, report) pair at any depth.
+
+    Every employee also has a depth-0 row to itself, so "the subtree under X" is
+    ``WHERE ancestor_id = X`` and "X's management chain" is ``WHERE descendant_id = X``.
+    """
+    __tablename__ = "employee_hierarchy"
+
+    ancestor_id = Column(Integer, ForeignKey("employees.id", ondelete="CASCADE"), primary_key=True)
+    descendant_id = Column(Integer, ForeignKey("employees.id", ondelete="CASCADE"), primary_key=True)
+    depth = Column(Integer, nullable=False)
+
+    __table_args__ = (
+        Index("ix_employee_hierarchy_descendant", "descendant_id", "depth"),
+    )
+
+    def __repr__(self):
+        return f"<EmployeeHierarchy(ancestor_id={self.ancestor_id}, descendant_id={self.descendant_id}, depth={self.depth})>"
@@ -0,0 +1,37 @@
+"""
+Optional settings that ``Settings`` (app/config.py) does not have to declare.
+
+Pydantic ``BaseSettings`` only reads the environment for fields it declares, so
+tuning knobs such as ``TENANT_DATABASE_URL``, ``CACHE_BUS_BACKEND`` or
+``HR_NOTIFICATION_MODE`` are read here instead: from ``Settings`` when a
+deployment does declare the field, otherwise from the upper-cased environment
+variable or ``.env`` (see env.example), coerced to the default's type.
+"""
+
+import os
+from typing import Any
+
+from dotenv import dotenv_values
+
+from app.config import settings
+
+TRUE_VALUES = ("1", "true", "yes", "on")
+
+_env_file = {name.upper(): value for name, value in dotenv_values(".env").items() if value is not None}
+
+
+def option(name: str, default: Any = None) -> Any:
+    """Setting name from Settings, the NAME environment variable or .env, else default"""
+    value = getattr(settings, name, None)
+    if value is not None:
+        return value
+    raw = os.environ.get(name.upper(), _env_file.get(name.upper()))
+    if raw is None or (raw == "" and default is not None):
+        return default
+    if isinstance(default, bool):
+        return raw.strip().lower() in TRUE_VALUES
+    if isinstance(default, int):
+        return int(raw)
+    if isinstance(default, float):
+        return float(raw)
+    return raw
@@ -0,0 +1,112 @@
+"""
+Connection pool telemetry.
+
+Pools are per process, so every uvicorn worker reports its own numbers; size
+``DB_POOL_SIZE`` / ``DB_MAX_OVERFLOW`` from the per-worker wait and overflow counts.
+"""
+
+import os
+import threading
+import time
+from typing import Dict
+
+from sqlalchemy import exc
+from sqlalchemy.pool import QueuePool
+
+# Upper bounds (seconds) of the checkout wait histogram buckets
+WAIT_BUCKETS = (0.001, 0.01, 0.1, 1.0, float("inf"))
+
+
+class PoolMetrics:
+    """Checkout counters for one pool, safe to update from request threads"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+        self.wait_buckets = [0] * len(WAIT_BUCKETS)
+        self.overflow_events = 0
+        self.timeouts = 0
+
+    def record_checkout(self, waited: float, overflowed: bool):
+        with self._lock:
+            self.checkouts += 1
+            self.wait_seconds_total += waited
+            self.wait_seconds_max = max(self.wait_seconds_max, waited)
+            for index, bound in enumerate(WAIT_BUCKETS):
+                if waited <= bound:
+                    self.wait_buckets[index] += 1
+                    break
+            if overflowed:
+                self.overflow_events += 1
+
+    def record_timeout(self):
+        with self._lock:
+            self.timeouts += 1
+
+    def as_dict(self) -> dict:
+        with self._lock:
+            return {
+                "checkouts": self.checkouts,
+                "wait_seconds_total": round(self.wait_seconds_total, 6),
+                "wait_seconds_avg": round(self.wait_seconds_total / self.checkouts, 6) if self.checkouts else 0.0,
+                "wait_seconds_max": round(self.wait_seconds_max, 6),
+                "wait_histogram": {
+                    ("+Inf" if bound == float("inf") else f"le_{bound}"): count
+                    for bound, count in zip(WAIT_BUCKETS, self.wait_buckets)
+                },
+                "overflow_events": self.overflow_events,
+                "timeouts": self.timeouts,
+            }
+
+
+# Keyed by pool logging name so counters survive Pool.recreate() after dispose/invalidation
+_metrics: Dict[str, PoolMetrics] = {}
+_metrics_lock = threading.Lock()
+
+
+def metrics_for(name: str) -> PoolMetrics:
+    with _metrics_lock:
+        return _metrics.setdefault(name, PoolMetrics())
+
+
+class InstrumentedQueuePool(QueuePool):
+    """QueuePool that times checkouts and counts overflow connections and timeouts"""
+
+    def _do_get(self):
+        metrics = metrics_for(self._orig_logging_name or "default")
+        overflow_before = self._overflow
+        started = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except exc.TimeoutError:
+            metrics.record_timeout()
+            raise
+        metrics.record_checkout(time.perf_counter() - started,
+                                self._overflow > overflow_before and self._overflow > 0)
+        return connection
+
+
+def pool_status(name: str, engine) -> dict:
+    """Current occupancy plus cumulative checkout metrics of an engine's pool"""
+    pool = engine.pool
+    status = {"pool_class": type(pool).__name__}
+    if isinstance(pool, QueuePool):
+        status.update({
+            "size": pool.size(),
+            "max_overflow": pool._max_overflow,
+            "timeout": pool.timeout(),
+            "checked_out": pool.checkedout(),
+            "checked_in": pool.checkedin(),
+            "overflow": max(pool.overflow(), 0),
+        })
+    status.update(metrics_for(name).as_dict())
+    return status
+
+
+def worker_pool_status(engines: Dict[str, object]) -> dict:
+    return {
+        "pid": os.getpid(),
+        "pools": {name: pool_status(name, engine) for name, engine in engines.items()},
+    }
@@ -0,0 +1,43 @@
+#!/usr/bin/env python3
+"""
+Rebuild the leave analytics rollup tables from leave_requests.
+
+Usage: python -m app.rebuild_analytics [--chunk-size N] [--workers N] [--tenant ID]
+"""
+
+import argparse
+import logging
+import sys
+
+from app.database import init_db, tenant_names, use_tenant
+from app.services.analytics_service import AnalyticsService
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rebuild leave analytics rollups")
+    parser.add_argument("--chunk-size", type=int, default=5000, help="Leave requests aggregated per chunk")
+    parser.add_argument("--workers", type=int, default=4, help="Chunks aggregated in parallel (at most DB_POOL_SIZE)")
+    parser.add_argument("--tenant", help="Only run for this tenant's shard (default: every tenant)")
+    args = parser.parse_args()
+
+    try:
+        for tenant in tenant_names(args.tenant):
+            with use_tenant(tenant):
+                init_db()
+                result = AnalyticsService().rebuild(chunk_size=args.chunk_size, workers=args.workers)
+            logger.info(
+                (f"Tenant {tenant}: " if tenant else "")
+                + f"Scanned {result.leave_requests_scanned} leave requests in {result.chunks} chunks: "
+                f"{result.rollup_rows} rollup rows, {result.approver_rows} approver rows "
+                f"({result.duration_seconds}s)"
+            )
+    except Exception as e:
+        logger.error(f"Error rebuilding analytics rollups: {e}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
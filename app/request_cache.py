@@ -0,0 +1,68 @@
+"""
+Request-scoped lookup cache.
+
+A ``RequestCache`` lives in ``Session.info``. The API opens one Session per
+request (``get_db``), so services that look the same row up several times while
+handling a request (the employee, its leave type, a balance) only query once.
+Services reach it with ``request_cache(db)``; routes need no dependency of
+their own, since FastAPI already hands the same Session to every dependency.
+
+The cache is a unit of work: it is emptied whenever the Session's transaction
+commits or rolls back, and services that write a cached value ``forget`` its key.
+Unlike ``app.cache``, nothing is shared between requests or workers.
+"""
+
+from typing import Any, Callable, Hashable
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+REQUEST_CACHE_KEY = "request_cache"
+
+
+class RequestCache:
+    """Memoized lookups for one Session; ``None`` results are not cached"""
+
+    def __init__(self):
+        self._values = {}
+        self.hits = 0
+        self.misses = 0
+
+    def get_or_load(self, key: Hashable, loader: Callable[[], Any]) -> Any:
+        if key in self._values:
+            self.hits += 1
+            return self._values[key]
+        self.misses += 1
+        value = loader()
+        if value is not None:
+            self._values[key] = value
+        return value
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        return self._values.get(key, default)
+
+    def set(self, key: Hashable, value: Any):
+        self._values[key] = value
+
+    def forget(self, *keys: Hashable):
+        for key in keys:
+            self._values.pop(key, None)
+
+    def clear(self):
+        self._values.clear()
+
+
+def request_cache(db: Session) -> RequestCache:
+    """The cache bound to this Session, created on first use"""
+    cache = db.info.get(REQUEST_CACHE_KEY)
+    if cache is None:
+        cache = db.info[REQUEST_CACHE_KEY] = RequestCache()
+    return cache
+
+
+@event.listens_for(Session, "after_commit")
+@event.listens_for(Session, "after_rollback")
+def _end_unit_of_work(session):
+    cache = session.info.get(REQUEST_CACHE_KEY)
+    if cache is not None:
+        cache.clear()
@@ -0,0 +1,315 @@
+"""
+In-process periodic job scheduler.
+
+Every worker runs the same ``Scheduler`` from the FastAPI lifespan. When a job
+is due, each worker sleeps a random jitter and then competes for the job's
+leader lock: a session-level ``pg_try_advisory_lock`` on PostgreSQL, or a lease
+row in ``scheduler_locks`` elsewhere (SQLite). The lock keeps a slow run from
+overlapping the next one. The winner also claims the slot in ``job_runs``, which
+is unique per (job, scheduled time), so a slot runs once however many workers
+there are. That row records the run's status, duration and rows processed.
+
+Jobs are plain functions ``job(db) -> rows processed`` run in a thread with
+their own Session. A job that outlives its timeout is recorded as ``timed_out``;
+its thread cannot be killed, so it keeps the lock until it returns. With tenant
+shards every slot runs once per tenant, each against (and locked in) its own shard.
+"""
+
+import asyncio
+import logging
+import os
+import random
+import socket
+import zlib
+from datetime import datetime, date, timedelta
+from typing import Callable, List, Optional, Set
+
+from sqlalchemy import select, update, delete, func
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.options import option
+from app.database import SessionLocal, current_tenant, get_engine, tenant_names
+from app.models.job_run import JobRun, SchedulerLock
+from app.services.container import (
+    get_accrual_service, get_employee_service, get_ledger_service, get_audit_archive_service,
+    get_hr_digest_service
+)
+
+logger = logging.getLogger(__name__)
+
+WORKER_ID = f"{socket.gethostname()}:{os.getpid()}"
+
+# Lease on the SQLite lock row, as a multiple of the job timeout, in case a worker dies holding it
+LEASE_FACTOR = 2
+
+
+class CronSchedule:
+    """Five-field cron expression (minute hour day-of-month month day-of-week), in UTC.
+
+    Fields accept ``*``, numbers, ``a-b`` ranges, ``*/n`` or ``a-b/n`` steps and
+    comma lists. Day of week runs 0-6 from Sunday (7 is also Sunday). As in cron,
+    when both day fields are restricted a day matching either one is due.
+    """
+
+    FIELDS = ((0, 59), (0, 23), (1, 31), (1, 12), (0, 7))
+
+    def __init__(self, expression: str):
+        parts = expression.split()
+        if len(parts) != 5:
+            raise ValueError(f"Cron expression needs 5 fields: {expression!r}")
+        self.expression = expression
+        self.minutes, self.hours, self.days, self.months, weekdays = (
+            self._parse(part, low, high) for part, (low, high) in zip(parts, self.FIELDS)
+        )
+        self.weekdays = {day % 7 for day in weekdays}
+        self.any_day = parts[2] == "*"
+        self.any_weekday = parts[4] == "*"
+
+    @staticmethod
+    def _parse(field: str, low: int, high: int) -> Set[int]:
+        values = set()
+        for item in field.split(","):
+            spec, _, step = item.partition("/")
+            if spec == "*":
+                start, end = low, high
+            elif "-" in spec:
+                start, end = (int(value) for value in spec.split("-", 1))
+            else:
+                start = end = int(spec)
+            if start < low or end > high or start > end:
+                raise ValueError(f"Cron field {field!r} is outside {low}-{high}")
+            values.update(range(start, end + 1, int(step) if step else 1))
+        return values
+
+    def _day_matches(self, day: date) -> bool:
+        in_days = day.day in self.days
+        in_weekdays = (day.weekday() + 1) % 7 in self.weekdays
+        if self.any_day or self.any_weekday:
+            return in_days and in_weekdays
+        return in_days or in_weekdays
+
+    def next_after(self, moment: datetime) -> datetime:
+        """First due minute strictly after moment"""
+        candidate = moment.replace(second=0, microsecond=0) + timedelta(minutes=1)
+        limit = candidate + timedelta(days=366 * 5)
+        while candidate < limit:
+            if candidate.month not in self.months:
+                year, month = candidate.year + candidate.month // 12, candidate.month % 12 + 1
+                candidate = datetime(year, month, 1)
+            elif not self._day_matches(candidate.date()):
+                candidate = datetime.combine(candidate.date() + timedelta(days=1), datetime.min.time())
+            elif candidate.hour not in self.hours:
+                candidate = candidate.replace(minute=0) + timedelta(hours=1)
+            elif candidate.minute not in self.minutes:
+                candidate += timedelta(minutes=1)
+            else:
+                return candidate
+        raise ValueError(f"Cron expression {self.expression!r} never fires")
+
+
+class ScheduledJob:
+    def __init__(self, name: str, cron: str, function: Callable[[Session], int],
+                 timeout_seconds: float = 600, jitter_seconds: Optional[float] = None):
+        self.name = name
+        self.schedule = CronSchedule(cron)
+        self.function = function
+        self.timeout_seconds = timeout_seconds
+        self.jitter_seconds = (option("scheduler_jitter_seconds", 30)
+                               if jitter_seconds is None else jitter_seconds)
+
+
+class JobLock:
+    """Leader lock for one job: advisory lock on PostgreSQL, lease row otherwise"""
+
+    def __init__(self, name: str, lease_seconds: float):
+        self.name = name
+        self.lease_seconds = lease_seconds
+        self.tenant = current_tenant.get()
+        self._connection = None
+
+    @property
+    def key(self) -> int:
+        # Tenant schemas can share a database, and advisory locks are database-wide
+        scope = f"{self.tenant}:" if self.tenant else ""
+        return zlib.crc32(f"scheduler:{scope}{self.name}".encode())
+
+    def acquire(self) -> bool:
+        engine = get_engine(tenant=self.tenant)
+        if engine.dialect.name == "postgresql":
+            self._connection = engine.connect()
+            key = self.key
+            if self._connection.execute(select(func.pg_try_advisory_lock(key))).scalar():
+                self._connection.commit()
+                return True
+            self._connection.close()
+            self._connection = None
+            return False
+
+        now = datetime.utcnow()
+        lease = {"owner": WORKER_ID, "locked_until": now + timedelta(seconds=self.lease_seconds)}
+        with SessionLocal() as db:
+            taken = db.execute(update(SchedulerLock).where(
+                SchedulerLock.name == self.name, SchedulerLock.locked_until < now
+            ).values(**lease)).rowcount
+            if not taken:
+                try:
+                    db.add(SchedulerLock(name=self.name, **lease))
+                    db.flush()
+                except IntegrityError:
+                    db.rollback()
+                    return False
+            db.commit()
+            return True
+
+    def release(self):
+        if self._connection is not None:
+            try:
+                self._connection.execute(select(func.pg_advisory_unlock(self.key)))
+            finally:
+                self._connection.close()
+                self._connection = None
+            return
+
+        with SessionLocal() as db:
+            db.execute(update(SchedulerLock).where(
+                SchedulerLock.name == self.name, SchedulerLock.owner == WORKER_ID
+            ).values(locked_until=datetime.utcnow()))
+            db.commit()
+
+
+class Scheduler:
+    def __init__(self, jobs: List[ScheduledJob], session_factory=SessionLocal):
+        self.jobs = jobs
+        self.session_factory = session_factory
+        self._tasks: List[asyncio.Task] = []
+
+    def start(self):
+        self._tasks = [asyncio.create_task(self._loop(job), name=f"scheduler:{job.name}") for job in self.jobs]
+        logger.info(f"Scheduler started with {len(self.jobs)} jobs on {WORKER_ID}")
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def _loop(self, job: ScheduledJob):
+        while True:
+            slot = job.schedule.next_after(datetime.utcnow())
+            delay = (slot - datetime.utcnow()).total_seconds() + random.uniform(0, job.jitter_seconds)
+            await asyncio.sleep(max(delay, 0))
+            await asyncio.gather(*(self._run_for_tenant(job, slot, tenant) for tenant in tenant_names()))
+
+    async def _run_for_tenant(self, job: ScheduledJob, slot: datetime, tenant: Optional[str]):
+        # Each gathered task runs in a copy of the context, so this only selects the shard for this one
+        current_tenant.set(tenant)
+        try:
+            await self.run_job(job, slot)
+        except Exception as e:
+            logger.error(f"Scheduled job {job.name} could not run" + (f" for tenant {tenant}" if tenant else "")
+                         + f": {e}")
+
+    async def run_job(self, job: ScheduledJob, slot: datetime) -> Optional[int]:
+        """Run one slot of a job if this worker wins it; returns the JobRun id"""
+        lock = JobLock(job.name, job.timeout_seconds * LEASE_FACTOR)
+        if not await asyncio.to_thread(lock.acquire):
+            return None
+        run_id = None
+        try:
+            run_id = await asyncio.to_thread(self._claim, job, slot)
+        finally:
+            if run_id is None:
+                await asyncio.to_thread(lock.release)
+        if run_id is None:
+            return None
+
+        try:
+            await asyncio.wait_for(asyncio.to_thread(self._execute, job, run_id, lock), job.timeout_seconds)
+        except asyncio.TimeoutError:
+            logger.error(f"Scheduled job {job.name} exceeded {job.timeout_seconds}s")
+            await asyncio.to_thread(self._finish, run_id, "timed_out", None,
+                                    f"Exceeded timeout of {job.timeout_seconds}s")
+        return run_id
+
+    def _claim(self, job: ScheduledJob, slot: datetime) -> Optional[int]:
+        with self.session_factory() as db:
+            run = JobRun(job_name=job.name, scheduled_for=slot, status="running", worker=WORKER_ID,
+                         started_at=datetime.utcnow())
+            db.add(run)
+            try:
+                db.commit()
+            except IntegrityError:
+                db.rollback()  # Another worker already ran this slot
+                return None
+            return run.id
+
+    def _execute(self, job: ScheduledJob, run_id: int, lock: JobLock):
+        try:
+            with self.session_factory() as db:
+                rows = job.function(db)
+            self._finish(run_id, "succeeded", rows)
+        except Exception as e:
+            logger.error(f"Scheduled job {job.name} failed: {e}")
+            self._finish(run_id, "failed", None, str(e))
+        finally:
+            lock.release()
+
+    def _finish(self, run_id: int, status: str, rows: Optional[int], error: Optional[str] = None):
+        """Record the outcome, unless the run was already closed (a late finish after a timeout)"""
+        finished_at = datetime.utcnow()
+        with self.session_factory() as db:
+            started_at = db.execute(select(JobRun.started_at).where(JobRun.id == run_id)).scalar()
+            db.execute(update(JobRun).where(JobRun.id == run_id, JobRun.status == "running").values(
+                status=status,
+                finished_at=finished_at,
+                duration_seconds=round((finished_at - started_at.replace(tzinfo=None)).total_seconds(), 3),
+                rows_processed=rows,
+                error=error
+            ))
+            db.commit()
+        logger.info(f"Scheduled job run {run_id} {status}" + (f": {rows} rows" if rows is not None else ""))
+
+
+# Jobs
+def accrue_leave(db: Session) -> int:
+    return get_accrual_service().run(db).movements_posted
+
+
+def roll_over_year(db: Session) -> int:
+    """Open the new year's balances: carry forward last year's, then allocate the rest"""
+    year = date.today().year
+    employee_service = get_employee_service()
+    carried = employee_service.carry_forward_all(db, year - 1, year)
+    return carried + employee_service.initialize_year_balances(db, year)
+
+
+def compact_ledger(db: Session) -> int:
+    return get_ledger_service().compact(db)
+
+
+def archive_audits(db: Session) -> int:
+    return sum(segment.record_count for segment in get_audit_archive_service().archive_all(db))
+
+
+def send_hr_digest(db: Session) -> int:
+    return get_hr_digest_service().send_digests(db)
+
+
+def prune_job_runs(db: Session) -> int:
+    cutoff = datetime.utcnow() - timedelta(days=option("job_run_retention_days", 30))
+    pruned = db.execute(delete(JobRun).where(JobRun.started_at < cutoff)).rowcount
+    db.commit()
+    return pruned
+
+
+DEFAULT_JOBS = [
+    ScheduledJob("accrue_leave", "15 0 * * *", accrue_leave),
+    ScheduledJob("roll_over_year", "30 0 1 1 *", roll_over_year, timeout_seconds=3600),
+    ScheduledJob("compact_ledger", "0 2 * * *", compact_ledger, timeout_seconds=1800),
+    ScheduledJob("archive_audits", "0 3 * * 0", archive_audits, timeout_seconds=3600),
+    ScheduledJob("send_hr_digest", option("hr_digest_cron", "0 * * * *"), send_hr_digest),
+    ScheduledJob("prune_job_runs", "30 3 * * *", prune_job_runs),
+]
+
+scheduler = Scheduler(DEFAULT_JOBS)
@@ -7,19 +7,54 @@ from .auth import (
     PasswordSetup
 )
 from .user import UserResponse, UserUpdate, UserCreateResponse
-from .employee import EmployeeCreate, EmployeeUpdate, EmployeeResponse, EmployeeCreateResponse
+from .employee import (
+    EmployeeCreate, EmployeeUpdate, EmployeeResponse, EmployeeCreateResponse, EmployeeSearchResponse
+)
 
 from .leave import (
     LeaveTypeCreate, LeaveTypeUpdate, LeaveTypeResponse,
     LeaveRequestCreate, LeaveRequestUpdate, LeaveRequestResponse,
-    LeaveBalanceResponse, LeaveAuditResponse, HolidayBase, HolidayCreate, HolidayResponse
+    LeaveBalanceResponse, LeaveAuditResponse, HolidayBase, HolidayCreate, HolidayResponse,
+    LeaveLedgerBalance, LeaveBalanceMovementResponse, LeaveLedgerResponse,
+    LeaveDecision, LeaveBulkDecisionItem, LeaveBulkDecisionRequest, LeaveBulkDecisionResult,
+    LeaveBulkDecisionResponse, LeaveRequestValidationItem, LeaveRequestValidationRequest,
+    LeaveRequestValidationResult, LeaveRequestValidationResponse, LeaveQuoteResponse
+)
+from .holiday_calendar import (
+    HolidayCalendarAssignmentItem, HolidayCalendarCreate, HolidayCalendarUpdate, HolidayCalendarResponse,
+    CalendarHolidayResponse, CalendarYearResponse
+)
+from .org import TeamMemberResponse, TeamAbsenceResponse
+from .accrual import LeaveAccrualRuleUpdate, LeaveAccrualRuleResponse, AccrualRunResponse
+from .scheduler import ScheduledJobResponse, JobRunResponse
+from .jobs import JobCreate, JobResponse, JobResultResponse
+from .dashboard import (
+    DashboardEmployee, DashboardHoliday, DashboardAbsence, DashboardPendingRequest,
+    EmployeeDashboardResponse, HrDashboardResponse
+)
+from .calendar_feed import CalendarFeedResponse
+from .analytics import (
+    AbsenceRateResponse, LeaveTypeUtilizationResponse, ApproverStatsResponse, RollupRebuildResponse
 )
 
 __all__ = [
     "Token", "TokenData", "UserLogin", "UserCreate", "PasswordReset", "PasswordSetup",
     "UserResponse", "UserUpdate", "UserCreateResponse",
-    "EmployeeCreate", "EmployeeUpdate", "EmployeeResponse", "EmployeeCreateResponse",
+    "EmployeeCreate", "EmployeeUpdate", "EmployeeResponse", "EmployeeCreateResponse", "EmployeeSearchResponse",
     "LeaveTypeCreate", "LeaveTypeUpdate", "LeaveTypeResponse",
     "LeaveRequestCreate", "LeaveRequestUpdate", "LeaveRequestResponse", 
-    "LeaveBalanceResponse", "LeaveAuditResponse", "HolidayBase", "HolidayCreate", "HolidayResponse"
+    "LeaveBalanceResponse", "LeaveAuditResponse", "HolidayBase", "HolidayCreate", "HolidayResponse",
+    "LeaveLedgerBalance", "LeaveBalanceMovementResponse", "LeaveLedgerResponse",
+    "LeaveDecision", "LeaveBulkDecisionItem", "LeaveBulkDecisionRequest", "LeaveBulkDecisionResult",
+    "LeaveBulkDecisionResponse", "LeaveRequestValidationItem", "LeaveRequestValidationRequest",
+    "LeaveRequestValidationResult", "LeaveRequestValidationResponse", "LeaveQuoteResponse",
+    "HolidayCalendarAssignmentItem", "HolidayCalendarCreate", "HolidayCalendarUpdate", "HolidayCalendarResponse",
+    "CalendarHolidayResponse", "CalendarYearResponse", "CalendarFeedResponse",
+    "AbsenceRateResponse", "LeaveTypeUtilizationResponse", "ApproverStatsResponse", "RollupRebuildResponse",
+    "TeamMemberResponse", "TeamAbsenceResponse",
+    "LeaveAccrualRuleUpdate", "LeaveAccrualRuleResponse", "AccrualRunResponse",
+    "ScheduledJobResponse", "JobRunResponse",
+    "JobCreate", "JobResponse", "JobResultResponse",
+    "DashboardEmployee", "DashboardHoliday", "DashboardAbsence", "DashboardPendingRequest",
+    "EmployeeDashboardResponse", "HrDashboardResponse"
 ]
@@ -0,0 +1,35 @@
+from pydantic import BaseModel, validator
+from typing import Optional
+from datetime import date, datetime
+
+
+class LeaveAccrualRuleUpdate(BaseModel):
+    monthly_days: Optional[float] = None  # Defaults to the leave type's default_balance / 12
+    starts_on: Optional[date] = None  # Defaults to the first day of the current month
+
+    @validator('monthly_days')
+    def validate_monthly_days(cls, v):
+        """Validate the monthly accrual is positive"""
+        if v is not None and v <= 0:
+            raise ValueError('monthly_days must be positive')
+        return v
+
+
+class LeaveAccrualRuleResponse(BaseModel):
+    leave_type_id: int
+    monthly_minutes: Optional[int] = None
+    monthly_days: Optional[float] = None
+    starts_on: date
+    created_at: datetime
+    updated_at: Optional[datetime] = None
+
+    class Config:
+        orm_mode = True
+
+
+class AccrualRunResponse(BaseModel):
+    through: date
+    movements_posted: int
+    days_accrued: float
+    balances_created: int
+    duration_seconds: float
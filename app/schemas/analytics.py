@@ -0,0 +1,40 @@
+from pydantic import BaseModel
+from typing import Optional
+from datetime import date
+
+
+class AbsenceRateResponse(BaseModel):
+    department: str
+    month: date
+    approved_days: float
+    headcount: int
+    working_days: int
+    absence_rate: float  # approved_days / (headcount * working_days)
+
+
+class LeaveTypeUtilizationResponse(BaseModel):
+    leave_type_id: int
+    leave_type_name: str
+    requested_count: int
+    approved_count: int
+    rejected_count: int
+    cancelled_count: int
+    approved_days: float
+    allocated_days: float
+    utilization: Optional[float] = None  # approved_days / allocated_days
+
+
+class ApproverStatsResponse(BaseModel):
+    approver_id: int
+    approver_name: str
+    approved_count: int
+    rejected_count: int
+    total_decisions: int
+
+
+class RollupRebuildResponse(BaseModel):
+    leave_requests_scanned: int
+    rollup_rows: int
+    approver_rows: int
+    chunks: int
+    duration_seconds: float
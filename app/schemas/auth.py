@@ -15,6 +15,7 @@ class TokenData(BaseModel):
     email: Optional[str] = None
     user_id: Optional[int] = None
     role: Optional[UserRole] = None
+    tenant: Optional[str] = None
 
 
 class LoginResponse(BaseModel):
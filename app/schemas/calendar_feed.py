@@ -0,0 +1,7 @@
+from pydantic import BaseModel
+
+
+class CalendarFeedResponse(BaseModel):
+    scope: str  # employee, department or company
+    name: str
+    url: str  # Signed iCalendar URL to subscribe to; anyone holding it can read the feed
@@ -0,0 +1,70 @@
+from pydantic import BaseModel
+from typing import List, Optional
+from datetime import date, datetime
+
+from app.schemas.user import UserResponse
+from app.schemas.leave import LeaveTypeResponse, LeaveRequestResponse, LeaveBalanceResponse
+
+
+class DashboardEmployee(BaseModel):
+    id: int
+    employee_id: str
+    first_name: str
+    last_name: str
+    department: str
+    location: Optional[str] = None
+    designation: str
+    joining_date: date
+    manager_id: Optional[int] = None
+
+
+class DashboardHoliday(BaseModel):
+    id: int
+    date: date
+    name: str
+    description: Optional[str] = None
+
+
+class EmployeeDashboardResponse(BaseModel):
+    profile: UserResponse
+    employee: Optional[DashboardEmployee] = None
+    balances: List[LeaveBalanceResponse]  # Current year
+    recent_requests: List[LeaveRequestResponse]  # Newest first
+    upcoming_holidays: List[DashboardHoliday]
+    leave_types: List[LeaveTypeResponse]
+
+
+class DashboardAbsence(BaseModel):
+    employee_id: int
+    employee_code: str
+    first_name: str
+    last_name: str
+    department: str
+    leave_request_id: int
+    leave_type_name: str
+    start_date: date
+    end_date: date
+    duration_type: str
+    start_half: Optional[str] = None
+    hours: Optional[float] = None
+
+
+class DashboardPendingRequest(BaseModel):
+    id: int
+    employee_id: int
+    employee_code: str
+    first_name: str
+    last_name: str
+    leave_type_name: str
+    start_date: date
+    end_date: date
+    number_of_days: float
+    created_at: datetime
+
+
+class HrDashboardResponse(BaseModel):
+    profile: UserResponse
+    pending_count: int
+    oldest_pending: List[DashboardPendingRequest]  # Oldest first, at most DASHBOARD_LIST_LIMIT
+    out_today_count: int
+    out_today: List[DashboardAbsence]  # At most DASHBOARD_LIST_LIMIT
@@ -1,5 +1,5 @@
 from pydantic import BaseModel, validator
-from typing import Optional
+from typing import Optional, List
 from datetime import date, datetime
 
 
@@ -8,6 +8,7 @@ class EmployeeBase(BaseModel):
     last_name: str
     phone: Optional[str] = None
     department: str
+    location: Optional[str] = None
     designation: str
     joining_date: date
     manager_id: Optional[int] = None
@@ -28,6 +29,7 @@ class EmployeeUpdate(BaseModel):
     last_name: Optional[str] = None
     phone: Optional[str] = None
     department: Optional[str] = None
+    location: Optional[str] = None
     designation: Optional[str] = None
     manager_id: Optional[int] = None
 
@@ -43,12 +45,19 @@ class EmployeeResponse(EmployeeBase):
         orm_mode = True
 
 
+class EmployeeSearchResponse(BaseModel):
+    """A page of directory search results; pass next_cursor back to get the next page"""
+    items: List[EmployeeResponse]
+    next_cursor: Optional[str] = None
+
+
 class EmployeeOnboard(BaseModel):
     email: str
     first_name: str
     last_name: str
     phone: Optional[str] = None
     department: str
+    location: Optional[str] = None
     designation: str
     joining_date: date
     employee_id: str
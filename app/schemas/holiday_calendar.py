@@ -0,0 +1,75 @@
+from pydantic import BaseModel, validator, root_validator
+from typing import Optional, List
+from datetime import date, datetime
+
+
+def _check_weekend_days(v):
+    if v is not None and any(day < 0 or day > 6 for day in v):
+        raise ValueError('weekend_days are weekdays from 0 (Monday) to 6 (Sunday)')
+    return v
+
+
+class HolidayCalendarAssignmentItem(BaseModel):
+    department: Optional[str] = None
+    location: Optional[str] = None
+
+    @root_validator(skip_on_failure=True)
+    def validate_department_or_location(cls, values):
+        """Validate the assignment matches something"""
+        if not values.get('department') and not values.get('location'):
+            raise ValueError('An assignment needs a department, a location or both')
+        return values
+
+    class Config:
+        orm_mode = True
+
+
+class HolidayCalendarBase(BaseModel):
+    name: str
+    description: Optional[str] = None
+    weekend_days: List[int] = [5, 6]  # 0 = Monday
+    include_company_holidays: bool = True  # Company-wide holidays apply on top of the calendar's own
+    is_default: bool = False  # Used for employees no assignment matches
+
+    _weekend_days = validator('weekend_days', allow_reuse=True)(_check_weekend_days)
+
+
+class HolidayCalendarCreate(HolidayCalendarBase):
+    assignments: List[HolidayCalendarAssignmentItem] = []
+
+
+class HolidayCalendarUpdate(BaseModel):
+    name: Optional[str] = None
+    description: Optional[str] = None
+    weekend_days: Optional[List[int]] = None
+    include_company_holidays: Optional[bool] = None
+    is_default: Optional[bool] = None
+
+    _weekend_days = validator('weekend_days', allow_reuse=True)(_check_weekend_days)
+
+
+class HolidayCalendarResponse(HolidayCalendarBase):
+    id: int
+    assignments: List[HolidayCalendarAssignmentItem] = []
+    created_at: datetime
+    updated_at: Optional[datetime] = None
+
+    class Config:
+        orm_mode = True
+
+
+class CalendarHolidayResponse(BaseModel):
+    """A holiday as it falls in a given year (recurring holidays moved to that year)"""
+    date: date
+    name: str
+    description: Optional[str] = None
+    holiday_id: int
+    calendar_id: Optional[int] = None  # None: company-wide
+
+
+class CalendarYearResponse(BaseModel):
+    calendar_id: Optional[int] = None  # None: the company calendar (no named calendar applies)
+    year: int
+    weekend_days: List[int]
+    working_days: int
+    holidays: List[CalendarHolidayResponse]
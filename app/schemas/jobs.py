@@ -0,0 +1,62 @@
+from pydantic import BaseModel, validator
+from typing import Optional, List, Any, Dict
+from datetime import date, datetime
+
+from app.schemas.employee import EmployeeOnboard
+from app.models.enums import LeaveStatus
+
+
+class JobCreate(BaseModel):
+    kind: str
+    payload: Dict[str, Any] = {}
+
+
+class JobResponse(BaseModel):
+    id: int
+    kind: str
+    status: str
+    progress: float
+    progress_message: Optional[str] = None
+    error: Optional[str] = None
+    attempts: int
+    worker: Optional[str] = None
+    created_by_id: Optional[int] = None
+    created_at: Optional[datetime] = None
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+
+
+class JobResultResponse(BaseModel):
+    id: int
+    kind: str
+    status: str
+    result: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+
+
+# Payloads, one per job kind
+class EmptyJobPayload(BaseModel):
+    pass
+
+
+class YearRolloverPayload(BaseModel):
+    year: Optional[int] = None  # Year to open; defaults to the current year
+
+
+class LeaveRequestExportPayload(BaseModel):
+    status: Optional[LeaveStatus] = None
+    start_date: Optional[date] = None
+    end_date: Optional[date] = None
+
+
+class BulkOnboardPayload(BaseModel):
+    employees: List[EmployeeOnboard]
+
+    @validator('employees')
+    def validate_employees(cls, v):
+        """Validate batch size"""
+        if not v:
+            raise ValueError('At least one employee is required')
+        if len(v) > 5000:
+            raise ValueError('Cannot onboard more than 5000 employees in one job')
+        return v
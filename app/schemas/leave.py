@@ -1,9 +1,10 @@
-from pydantic import BaseModel, validator
+from pydantic import BaseModel, validator, root_validator
 from typing import Optional, List
 from datetime import date, datetime
 from app.models.leave_audit import AuditAction
 from enum import Enum
 from app.models.enums import LeaveDurationType, LeaveTypeCategory, LeaveStatus
+from app.leave_units import minutes_to_days
 
 class LeaveDurationType(str, Enum):
     """Types of leave duration"""
@@ -258,7 +259,8 @@ class LeaveRequestUpdate(BaseModel):
 class LeaveRequestResponse(LeaveRequestBase):
     id: int
     employee_id: int
-    number_of_days: float  # Changed to float to support half-days and hours
+    number_of_minutes: int  # Exact quantity; see app.leave_units
+    number_of_days: float
     status: LeaveStatus
     approved_by_id: Optional[int] = None
     approved_at: Optional[datetime] = None
@@ -273,20 +275,181 @@ class LeaveRequestResponse(LeaveRequestBase):
 
 class LeaveBalanceResponse(BaseModel):
     id: int
+    employee_id: int
     leave_type_id: int
     leave_type_name: str
     leave_type_category: LeaveTypeCategory
     year: int
-    allocated_days: int
+    allocated_minutes: int
+    used_minutes: int
+    pending_minutes: int
+    carried_forward_minutes: int
+    available_minutes: int
+    allocated_days: float
     used_days: float
     pending_days: float
-    carried_forward_days: int
+    carried_forward_days: float
     available_balance: float
     
     class Config:
         from_attributes = True
 
 
+class LeaveDecision(str, Enum):
+    """Decisions HR can apply in bulk"""
+    APPROVE = "approve"
+    REJECT = "reject"
+    CANCEL = "cancel"
+
+
+class LeaveBulkDecisionItem(BaseModel):
+    request_id: int
+    decision: LeaveDecision
+    comments: Optional[str] = None  # Used as the rejection reason for rejections
+
+    @validator('comments', always=True)
+    def validate_rejection_reason(cls, v, values):
+        """Rejections need a reason, as with the single reject endpoint"""
+        if values.get('decision') == LeaveDecision.REJECT and not (v and v.strip()):
+            raise ValueError('comments are required when rejecting a leave request')
+        return v
+
+
+class LeaveBulkDecisionRequest(BaseModel):
+    items: List[LeaveBulkDecisionItem]
+
+    @validator('items')
+    def validate_items(cls, v):
+        """Validate batch size and that each request appears only once"""
+        if not v:
+            raise ValueError('At least one decision is required')
+        if len(v) > 500:
+            raise ValueError('Cannot decide more than 500 leave requests at once')
+        request_ids = [item.request_id for item in v]
+        if len(request_ids) != len(set(request_ids)):
+            raise ValueError('Each leave request can only appear once per batch')
+        return v
+
+
+class LeaveBulkDecisionResult(BaseModel):
+    request_id: int
+    decision: LeaveDecision
+    success: bool
+    status: Optional[str] = None
+    error: Optional[str] = None
+
+
+class LeaveBulkDecisionResponse(BaseModel):
+    processed: int
+    succeeded: int
+    failed: int
+    results: List[LeaveBulkDecisionResult]
+
+
+class LeaveRequestValidationItem(BaseModel):
+    employee_id: int
+    request: LeaveRequestCreate
+
+
+class LeaveRequestValidationRequest(BaseModel):
+    items: List[LeaveRequestValidationItem]
+
+    @validator('items')
+    def validate_items(cls, v):
+        """Validate batch size"""
+        if not v:
+            raise ValueError('At least one leave request is required')
+        if len(v) > 1000:
+            raise ValueError('Cannot validate more than 1000 leave requests at once')
+        return v
+
+
+class LeaveRequestValidationResult(BaseModel):
+    index: int
+    employee_id: int
+    valid: bool
+    error: Optional[str] = None
+
+
+class LeaveRequestValidationResponse(BaseModel):
+    processed: int
+    valid: int
+    invalid: int
+    results: List[LeaveRequestValidationResult]
+
+
+class LeaveQuoteResponse(BaseModel):
+    leave_type_id: int
+    start_date: date
+    end_date: date
+    duration_type: LeaveDurationType
+    calendar_days: int
+    working_days: Optional[float] = None
+    holidays: List[date] = []
+    available_balance: Optional[float] = None
+    projected_balance: Optional[float] = None
+    violations: List[str] = []
+    can_submit: bool
+
+
+class LeaveLedgerBalance(BaseModel):
+    employee_id: int
+    leave_type_id: int
+    year: int
+    allocated_minutes: int = 0
+    used_minutes: int = 0
+    pending_minutes: int = 0
+    carried_forward_minutes: int = 0
+    available_minutes: int = 0
+    # Day values of the minutes above, filled in by the validator
+    allocated_days: float = 0
+    used_days: float = 0
+    pending_days: float = 0
+    carried_forward_days: float = 0
+    available_balance: float = 0
+    ledger_position: int = 0  # Last balance movement included
+    as_of: Optional[datetime] = None
+
+    @root_validator(skip_on_failure=True)
+    def derive_days(cls, values):
+        for name in ("allocated", "used", "pending", "carried_forward"):
+            values[f"{name}_days"] = minutes_to_days(values[f"{name}_minutes"])
+        values["available_balance"] = minutes_to_days(values["available_minutes"])
+        return values
+
+
+class LeaveBalanceMovementResponse(BaseModel):
+    id: int
+    leave_type_id: int
+    year: int
+    kind: str
+    allocated_minutes: int
+    used_minutes: int
+    pending_minutes: int
+    carried_minutes: int
+    # Day values of the minutes above, filled in by the validator
+    allocated_delta: float = 0
+    used_delta: float = 0
+    pending_delta: float = 0
+    carried_delta: float = 0
+    leave_request_id: Optional[int] = None
+    created_at: datetime
+
+    class Config:
+        orm_mode = True
+
+    @root_validator(skip_on_failure=True)
+    def derive_days(cls, values):
+        for name in ("allocated", "used", "pending", "carried"):
+            values[f"{name}_delta"] = minutes_to_days(values[f"{name}_minutes"])
+        return values
+
+
+class LeaveLedgerResponse(BaseModel):
+    balance: LeaveLedgerBalance
+    movements: List[LeaveBalanceMovementResponse]
+
+
 class LeaveAuditResponse(BaseModel):
     id: int
     leave_request_id: int
@@ -307,6 +470,7 @@ class HolidayBase(BaseModel):
     name: str
     description: Optional[str] = None
     is_recurring: bool = True  # Recurring yearly holidays
+    calendar_id: Optional[int] = None  # None: company-wide
 
 
 class HolidayCreate(HolidayBase):
@@ -318,5 +482,5 @@ class HolidayResponse(HolidayBase):
     created_at: datetime
     
     class Config:
-        from_attributes = True
+        orm_mode = True
 
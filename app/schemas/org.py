@@ -0,0 +1,25 @@
+from pydantic import BaseModel
+from typing import Optional
+from datetime import date
+
+from app.schemas.employee import EmployeeResponse
+
+
+class TeamMemberResponse(EmployeeResponse):
+    depth: int  # 1 = direct report
+
+
+class TeamAbsenceResponse(BaseModel):
+    employee_id: int
+    employee_code: str
+    first_name: str
+    last_name: str
+    depth: int
+    leave_request_id: int
+    leave_type_id: int
+    leave_type_name: str
+    start_date: date
+    end_date: date
+    duration_type: str
+    start_half: Optional[str] = None
+    hours: Optional[float] = None
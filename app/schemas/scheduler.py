@@ -0,0 +1,23 @@
+from pydantic import BaseModel
+from typing import Optional
+from datetime import datetime
+
+
+class ScheduledJobResponse(BaseModel):
+    name: str
+    cron: str
+    timeout_seconds: float
+    next_run_at: datetime
+
+
+class JobRunResponse(BaseModel):
+    id: int
+    job_name: str
+    scheduled_for: datetime
+    status: str
+    worker: Optional[str] = None
+    started_at: datetime
+    finished_at: Optional[datetime] = None
+    duration_seconds: Optional[float] = None
+    rows_processed: Optional[int] = None
+    error: Optional[str] = None
@@ -1,10 +1,12 @@
+import argparse
 import os
 import sys
 from datetime import datetime, date
 from sqlalchemy.orm import Session
-from app.database import SessionLocal, engine
+from app.database import SessionLocal, get_engine, use_tenant, tenant_names
 from app.models import Base, User, Employee, LeaveType, EmployeeLeaveBalance, Holiday
 from app.models.user import UserRole
+from app.leave_units import days_to_minutes
 from app.schemas.leave import LeaveTypeCategory
 from app.services.auth_service import AuthService
 from app.services.employee_service import EmployeeService
@@ -307,57 +309,67 @@ def seed_leave_balances(db: Session):
                 employee_id=employee.id,
                 leave_type_id=leave_type.id,
                 year=current_year,
-                allocated_days=leave_type.default_balance,
-                used_days=0,
-                pending_days=0,
-                carried_forward_days=0,
-                available_balance=leave_type.default_balance
+                allocated_minutes=days_to_minutes(leave_type.default_balance),
+                used_minutes=0,
+                pending_minutes=0,
+                carried_forward_minutes=0,
+                available_minutes=days_to_minutes(leave_type.default_balance)
             )
             db.add(balance)
     
     db.commit()
     logger.info("Seeded leave balances for all employees")
 
+def seed_shard():
+    """Seed the current tenant's shard (or the single database)"""
+    # Create tables
+    Base.metadata.create_all(bind=get_engine())
+    logger.info("Database tables created/verified")
+    
+    # Get database session
+    db = SessionLocal()
+    
+    try:
+        # Seed in order
+        seed_holidays(db)
+        seed_leave_types(db)
+        seed_super_admin(db)
+        seed_sample_hr(db)
+        seed_sample_employee(db)
+        seed_leave_balances(db)
+    finally:
+        db.close()
+
 def main():
     """Main seeding function"""
+    parser = argparse.ArgumentParser(description="Seed development data")
+    parser.add_argument("--tenant", help="Only seed this tenant's shard (default: every tenant)")
+    args = parser.parse_args()
     logger.info("Starting database seeding...")
     
     try:
-        # Create tables
-        Base.metadata.create_all(bind=engine)
-        logger.info("Database tables created/verified")
+        for tenant in tenant_names(args.tenant):
+            with use_tenant(tenant):
+                if tenant is not None:
+                    logger.info(f"Seeding tenant {tenant}")
+                seed_shard()
         
-        # Get database session
-        db = SessionLocal()
+        logger.info("Database seeding completed successfully!")
         
-        try:
-            # Seed in order
-            seed_holidays(db)
-            seed_leave_types(db)
-            seed_super_admin(db)
-            seed_sample_hr(db)
-            seed_sample_employee(db)
-            seed_leave_balances(db)
-            
-            logger.info("Database seeding completed successfully!")
-            
-            # Print login credentials
-            logger.info("\n" + "="*50)
-            logger.info("LOGIN CREDENTIALS:")
-            logger.info("="*50)
-            logger.info("Super Admin:")
-            logger.info(f"  Email: {os.getenv('SUPER_ADMIN_EMAIL', 'admin@company.com')}")
-            logger.info(f"  Password: {os.getenv('SUPER_ADMIN_PASSWORD', 'admin123')}")
-            logger.info("\nHR User:")
-            logger.info("  Email: hr@company.com")
-            logger.info("  Password: hr123")
-            logger.info("\nSample Employee:")
-            logger.info("  Email: employee@company.com")
-            logger.info("  Password: emp123")
-            logger.info("="*50)
-            
-        finally:
-            db.close()
+        # Print login credentials
+        logger.info("\n" + "="*50)
+        logger.info("LOGIN CREDENTIALS:")
+        logger.info("="*50)
+        logger.info("Super Admin:")
+        logger.info(f"  Email: {os.getenv('SUPER_ADMIN_EMAIL', 'admin@company.com')}")
+        logger.info(f"  Password: {os.getenv('SUPER_ADMIN_PASSWORD', 'admin123')}")
+        logger.info("\nHR User:")
+        logger.info("  Email: hr@company.com")
+        logger.info("  Password: hr123")
+        logger.info("\nSample Employee:")
+        logger.info("  Email: employee@company.com")
+        logger.info("  Password: emp123")
+        logger.info("="*50)
             
     except Exception as e:
         logger.error(f"Error during seeding: {e}")
@@ -3,13 +3,19 @@ from .user_service import UserService
 from .employee_service import EmployeeService
 from .leave_service import LeaveService
 from .email_service import EmailService
+from .ledger_service import LedgerService
+from .analytics_service import AnalyticsService
+from .audit_archive_service import AuditArchiveService
 
 __all__ = [
     "AuthService",
     "UserService", 
     "EmployeeService",
     "LeaveService",
-    "EmailService"
+    "EmailService",
+    "LedgerService",
+    "AnalyticsService",
+    "AuditArchiveService"
 ]
 
 
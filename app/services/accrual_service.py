@@ -0,0 +1,226 @@
+from datetime import date
+from calendar import monthrange
+from typing import Optional, Tuple
+from sqlalchemy import select, insert, update, func, literal, exists, case, extract, tuple_, true, and_, or_
+from sqlalchemy.orm import Session
+from app.cache import publish_invalidation
+from app.leave_units import MINUTES_PER_DAY, days_to_minutes, minutes_to_days
+from app.models.user import User
+from app.models.employee import Employee
+from app.models.leave_type import LeaveType
+from app.models.leave_balance import EmployeeLeaveBalance
+from app.models.leave_ledger import LeaveBalanceMovement, BalanceMovementKind
+from app.models.leave_accrual import LeaveAccrualRule, LeaveAccrualCursor
+from app.schemas.accrual import LeaveAccrualRuleUpdate, AccrualRunResponse
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+# Postgres advisory lock held for the transaction of a run, so concurrent runs cannot double-post
+ACCRUAL_LOCK_KEY = 4101
+
+BALANCE_COLUMNS = ["employee_id", "leave_type_id", "year", "allocated_minutes", "used_minutes", "pending_minutes",
+                   "carried_forward_minutes", "available_minutes"]
+MOVEMENT_COLUMNS = ["employee_id", "leave_type_id", "year", "kind", "allocated_minutes", "used_minutes",
+                    "pending_minutes", "carried_minutes"]
+CURSOR_COLUMNS = ["employee_id", "leave_type_id", "year", "last_month"]
+
+
+def _later(first, second):
+    """Portable GREATEST of two dates"""
+    return case((first > second, first), else_=second)
+
+
+class AccrualService:
+    """Monthly leave accruals posted to the balance ledger.
+
+    Leave types with a ``LeaveAccrualRule`` start each year at zero and earn
+    ``monthly_minutes`` per month. Years whose balance was already allocated
+    up front when the rule is created (or its start moved) keep that allocation
+    and accrue nothing; accrual takes over from the following year. A run posts, per employee and accruing leave type,
+    a single ALLOCATE movement covering every month since its
+    ``LeaveAccrualCursor`` and then advances the cursors, using a fixed number of
+    INSERT ... SELECT / UPDATE statements per year whatever the headcount. Rerunning
+    a month posts nothing; a run after missed months catches them all up at once.
+    Balances read through the ledger, so accrued days show up without recomputation.
+    """
+
+    # Rules
+    def get_rule(self, db: Session, leave_type_id: int) -> Optional[LeaveAccrualRule]:
+        return db.get(LeaveAccrualRule, leave_type_id)
+
+    def get_accruing_leave_type_ids(self, db: Session) -> set:
+        return set(db.execute(select(LeaveAccrualRule.leave_type_id)).scalars())
+
+    def set_rule(self, db: Session, leave_type_id: int, rule_data: LeaveAccrualRuleUpdate) -> Optional[LeaveAccrualRule]:
+        """Make a leave type accrue monthly (or change its rate); affects months not yet accrued"""
+        if db.get(LeaveType, leave_type_id) is None:
+            return None
+        rule = self.get_rule(db, leave_type_id)
+        starts_on = rule.starts_on if rule is not None else None
+        if rule is None:
+            today = date.today()
+            rule = LeaveAccrualRule(leave_type_id=leave_type_id, starts_on=date(today.year, today.month, 1))
+            db.add(rule)
+        if "monthly_days" in rule_data.__fields_set__:
+            rule.monthly_minutes = None if rule_data.monthly_days is None else days_to_minutes(rule_data.monthly_days)
+        if rule_data.starts_on is not None:
+            rule.starts_on = date(rule_data.starts_on.year, rule_data.starts_on.month, 1)
+        if rule.starts_on != starts_on:
+            self._keep_upfront_allocations(db, leave_type_id, rule.starts_on.year)
+        db.commit()
+        db.refresh(rule)
+        return rule
+
+    def _keep_upfront_allocations(self, db: Session, leave_type_id: int, first_year: int) -> None:
+        """Close the accrual of years that already hold an up-front allocation, so runs do not stack on it"""
+        allocated_movement = exists().where(
+            LeaveBalanceMovement.employee_id == EmployeeLeaveBalance.employee_id,
+            LeaveBalanceMovement.leave_type_id == EmployeeLeaveBalance.leave_type_id,
+            LeaveBalanceMovement.year == EmployeeLeaveBalance.year,
+            LeaveBalanceMovement.kind == BalanceMovementKind.ALLOCATE,
+            LeaveBalanceMovement.allocated_minutes > 0
+        )
+        has_cursor = exists().where(
+            LeaveAccrualCursor.employee_id == EmployeeLeaveBalance.employee_id,
+            LeaveAccrualCursor.leave_type_id == EmployeeLeaveBalance.leave_type_id,
+            LeaveAccrualCursor.year == EmployeeLeaveBalance.year
+        )
+        db.execute(insert(LeaveAccrualCursor).from_select(CURSOR_COLUMNS, select(
+            EmployeeLeaveBalance.employee_id, EmployeeLeaveBalance.leave_type_id, EmployeeLeaveBalance.year,
+            literal(12)
+        ).where(
+            EmployeeLeaveBalance.leave_type_id == leave_type_id,
+            EmployeeLeaveBalance.year >= first_year,
+            or_(EmployeeLeaveBalance.allocated_minutes > 0, allocated_movement),
+            ~has_cursor
+        )))
+
+    def delete_rule(self, db: Session, leave_type_id: int) -> bool:
+        """Stop accruing a leave type; days already accrued stay in the ledger"""
+        rule = self.get_rule(db, leave_type_id)
+        if rule is None:
+            return False
+        db.delete(rule)
+        db.commit()
+        return True
+
+    # Runs
+    def run(self, db: Session, through: Optional[date] = None, employee_id: Optional[int] = None) -> AccrualRunResponse:
+        """Accrue every month up to and including through's month (default: this month); commits"""
+        started = time.perf_counter()
+        through = through or date.today()
+        if db.get_bind().dialect.name == "postgresql":
+            db.execute(select(func.pg_advisory_xact_lock(ACCRUAL_LOCK_KEY)))
+
+        first_year = db.execute(select(func.min(LeaveAccrualRule.starts_on))).scalar()
+        movements = minutes = created = 0
+        if first_year is not None:
+            for year in range(first_year.year, through.year + 1):
+                last_month = 12 if year < through.year else through.month
+                year_movements, year_minutes, year_created = self._accrue_year(db, year, last_month, employee_id)
+                movements += year_movements
+                minutes += year_minutes
+                created += year_created
+        db.commit()
+        if movements:
+            publish_invalidation(tags=["balances"])
+
+        result = AccrualRunResponse(
+            through=through,
+            movements_posted=movements,
+            days_accrued=minutes_to_days(minutes),
+            balances_created=created,
+            duration_seconds=round(time.perf_counter() - started, 3)
+        )
+        logger.info(f"Leave accruals through {through:%Y-%m}: {movements} movements, "
+                    f"{result.days_accrued} days, {created} new balances")
+        return result
+
+    def _eligible(self, year: int, last_month: int, employee_id: Optional[int]):
+        """(employee, accruing leave type) pairs with at least one month to accrue in year, up to last_month"""
+        year_start = date(year, 1, 1)
+        period_end = date(year, last_month, monthrange(year, last_month)[1])
+        accrues_from = _later(_later(Employee.joining_date, LeaveAccrualRule.starts_on), literal(year_start))
+        query = (
+            select(
+                Employee.id.label("employee_id"),
+                LeaveAccrualRule.leave_type_id,
+                extract("month", accrues_from).label("first_month"),
+                func.coalesce(
+                    LeaveAccrualRule.monthly_minutes, LeaveType.default_balance * (MINUTES_PER_DAY // 12)
+                ).label("monthly_minutes"),
+            )
+            .select_from(Employee)
+            .join(User, and_(User.id == Employee.user_id, User.is_active == True))
+            .join(LeaveAccrualRule, true())
+            .join(LeaveType, and_(LeaveType.id == LeaveAccrualRule.leave_type_id, LeaveType.is_active == True))
+            .where(accrues_from <= period_end)
+        )
+        if employee_id is not None:
+            query = query.where(Employee.id == employee_id)
+        return query.subquery("eligible")
+
+    def _accrue_year(self, db: Session, year: int, last_month: int,
+                     employee_id: Optional[int]) -> Tuple[int, int, int]:
+        eligible = self._eligible(year, last_month, employee_id)
+        cursor = LeaveAccrualCursor.__table__.alias("accrual_cursor")
+        # Months already accrued, or (first time) the months before the pair started accruing
+        accrued_through = _later(func.coalesce(cursor.c.last_month, 0), eligible.c.first_month - 1)
+        months = literal(last_month) - accrued_through
+        due = (
+            eligible.outerjoin(cursor, and_(
+                cursor.c.employee_id == eligible.c.employee_id,
+                cursor.c.leave_type_id == eligible.c.leave_type_id,
+                cursor.c.year == year
+            ))
+        )
+
+        count, minutes = db.execute(
+            select(func.count(), func.coalesce(func.sum(months * eligible.c.monthly_minutes), 0))
+            .select_from(due).where(months > 0)
+        ).one()
+        if not count:
+            return 0, 0, 0
+
+        # Accruing balances open at zero for years nobody allocated
+        has_balance = exists().where(
+            EmployeeLeaveBalance.employee_id == eligible.c.employee_id,
+            EmployeeLeaveBalance.leave_type_id == eligible.c.leave_type_id,
+            EmployeeLeaveBalance.year == year
+        )
+        created = db.execute(insert(EmployeeLeaveBalance).from_select(BALANCE_COLUMNS, select(
+            eligible.c.employee_id, eligible.c.leave_type_id, literal(year),
+            literal(0), literal(0), literal(0), literal(0), literal(0)
+        ).where(~has_balance))).rowcount
+
+        # Share-lock the balance rows until commit, like LedgerService.record, so compaction cannot fold past these
+        db.execute(select(EmployeeLeaveBalance.id).where(
+            EmployeeLeaveBalance.year == year,
+            tuple_(EmployeeLeaveBalance.employee_id, EmployeeLeaveBalance.leave_type_id).in_(
+                select(eligible.c.employee_id, eligible.c.leave_type_id).select_from(due).where(months > 0)
+            )
+        ).order_by(EmployeeLeaveBalance.id).with_for_update(read=True))
+
+        kind = literal(BalanceMovementKind.ALLOCATE, LeaveBalanceMovement.kind.type)
+        db.execute(insert(LeaveBalanceMovement).from_select(MOVEMENT_COLUMNS, select(
+            eligible.c.employee_id, eligible.c.leave_type_id, literal(year), kind,
+            months * eligible.c.monthly_minutes, literal(0), literal(0), literal(0)
+        ).select_from(due).where(months > 0)))
+
+        db.execute(update(LeaveAccrualCursor).where(
+            LeaveAccrualCursor.year == year,
+            LeaveAccrualCursor.last_month < last_month,
+            tuple_(LeaveAccrualCursor.employee_id, LeaveAccrualCursor.leave_type_id).in_(
+                select(eligible.c.employee_id, eligible.c.leave_type_id)
+            )
+        ).values(last_month=last_month, updated_at=func.now()).execution_options(synchronize_session=False))
+        db.execute(insert(LeaveAccrualCursor).from_select(CURSOR_COLUMNS, select(
+            eligible.c.employee_id, eligible.c.leave_type_id, literal(year), literal(last_month)
+        ).where(~exists().where(
+            LeaveAccrualCursor.employee_id == eligible.c.employee_id,
+            LeaveAccrualCursor.leave_type_id == eligible.c.leave_type_id,
+            LeaveAccrualCursor.year == year
+        ))))
+        return count, int(minutes), created
@@ -0,0 +1,361 @@
+from datetime import datetime, date
+from typing import Optional, List, Dict, Tuple
+from concurrent.futures import ThreadPoolExecutor
+from sqlalchemy import select, func, extract, insert, delete, update, and_
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+from app.options import option
+from app.database import SessionLocal, current_tenant, use_tenant
+from app.leave_units import minutes_to_days
+from app.models.user import User
+from app.models.employee import Employee
+from app.models.leave_type import LeaveType
+from app.models.leave_balance import EmployeeLeaveBalance
+from app.models.leave_request import LeaveRequest, LeaveStatus
+from app.models.leave_audit import LeaveRequestAudit, AuditAction
+from app.models.leave_rollup import LeaveRollup, LeaveApproverRollup
+from app.services.container import get_audit_archive_service, get_holiday_calendar_service
+from app.schemas.analytics import (
+    AbsenceRateResponse, LeaveTypeUtilizationResponse, ApproverStatsResponse, RollupRebuildResponse
+)
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+ROLLUP_COUNTERS = (
+    "requested_count", "approved_count", "rejected_count", "cancelled_count",
+    "requested_minutes", "approved_minutes", "pending_minutes",
+)
+APPROVER_COUNTERS = ("approved_count", "rejected_count")
+
+# Each rebuild worker holds a pooled connection, so never run more workers than the pool keeps open
+MAX_REBUILD_WORKERS = option("db_pool_size", 5)
+MAX_REBUILD_CHUNK_SIZE = 100000
+
+
+def month_start(day: date) -> date:
+    return date(day.year, day.month, 1)
+
+
+class AnalyticsService:
+    """Leave analytics served from rollup tables.
+
+    ``LeaveService`` calls ``record_transition`` / ``record_modification`` inside
+    the same transaction as every status change, so rollups stay current without
+    scanning ``leave_requests``. ``rebuild`` recomputes them from scratch.
+    """
+
+    # Incremental maintenance
+    def record_transition(self, db: Session, leave_request: LeaveRequest, department: str,
+                          old_status: Optional[LeaveStatus], new_status: LeaveStatus,
+                          performed_by_id: Optional[int] = None):
+        """Apply one status transition of a leave request to the rollups"""
+        old_status = LeaveStatus(old_status) if old_status else None
+        new_status = LeaveStatus(new_status)
+        minutes = leave_request.number_of_minutes or 0
+        deltas = {}
+
+        if old_status is None and new_status == LeaveStatus.PENDING:
+            deltas = {"requested_count": 1, "requested_minutes": minutes, "pending_minutes": minutes}
+        elif old_status == LeaveStatus.PENDING and new_status == LeaveStatus.APPROVED:
+            deltas = {"approved_count": 1, "approved_minutes": minutes, "pending_minutes": -minutes}
+        elif old_status == LeaveStatus.PENDING and new_status == LeaveStatus.REJECTED:
+            deltas = {"rejected_count": 1, "pending_minutes": -minutes}
+        elif old_status == LeaveStatus.PENDING and new_status == LeaveStatus.CANCELLED:
+            deltas = {"cancelled_count": 1, "pending_minutes": -minutes}
+        elif old_status == LeaveStatus.APPROVED and new_status == LeaveStatus.CANCELLED:
+            deltas = {"cancelled_count": 1, "approved_count": -1, "approved_minutes": -minutes}
+
+        self._increment(db, LeaveRollup, {
+            "department": department,
+            "leave_type_id": leave_request.leave_type_id,
+            "month": month_start(leave_request.start_date)
+        }, deltas)
+
+        if performed_by_id and new_status in [LeaveStatus.APPROVED, LeaveStatus.REJECTED] \
+                and old_status == LeaveStatus.PENDING:
+            counter = "approved_count" if new_status == LeaveStatus.APPROVED else "rejected_count"
+            self._increment(db, LeaveApproverRollup, {
+                "approver_id": performed_by_id,
+                "month": month_start(datetime.utcnow().date())
+            }, {counter: 1})
+
+    def record_modification(self, db: Session, department: str, leave_type_id: int,
+                            old_start_date: date, old_minutes: int, new_start_date: date, new_minutes: int):
+        """Move a pending request's leave when its dates change (possibly into another month)"""
+        if month_start(old_start_date) == month_start(new_start_date):
+            self._increment(db, LeaveRollup, {
+                "department": department, "leave_type_id": leave_type_id, "month": month_start(new_start_date)
+            }, {"requested_minutes": new_minutes - old_minutes, "pending_minutes": new_minutes - old_minutes})
+            return
+
+        self._increment(db, LeaveRollup, {
+            "department": department, "leave_type_id": leave_type_id, "month": month_start(old_start_date)
+        }, {"requested_count": -1, "requested_minutes": -old_minutes, "pending_minutes": -old_minutes})
+        self._increment(db, LeaveRollup, {
+            "department": department, "leave_type_id": leave_type_id, "month": month_start(new_start_date)
+        }, {"requested_count": 1, "requested_minutes": new_minutes, "pending_minutes": new_minutes})
+
+    def _increment(self, db: Session, model, key: dict, deltas: dict):
+        """Atomically add deltas to the rollup row for key, creating it if needed"""
+        deltas = {column: value for column, value in deltas.items() if value}
+        if not deltas:
+            return
+
+        table = model.__table__
+        dialect = db.get_bind().dialect.name
+        if dialect in ("postgresql", "sqlite"):
+            insert_fn = postgresql.insert if dialect == "postgresql" else sqlite.insert
+            statement = insert_fn(table).values(**key, **deltas)
+            statement = statement.on_conflict_do_update(
+                index_elements=list(key),
+                set_={column: table.c[column] + value for column, value in deltas.items()}
+            )
+            db.execute(statement)
+            return
+
+        result = db.execute(
+            update(table)
+            .where(and_(*[table.c[column] == value for column, value in key.items()]))
+            .values({column: table.c[column] + value for column, value in deltas.items()})
+        )
+        if result.rowcount == 0:
+            db.execute(insert(table).values(**key, **deltas))
+
+    # Aggregations
+    def get_absence_rates(self, db: Session, year: int, department: Optional[str] = None) -> List[AbsenceRateResponse]:
+        """Approved leave days over available working days, per department and month.
+
+        Working days come from each department's holiday calendar (assignments to
+        a location alone are not considered, a department spans locations).
+        """
+        query = select(
+            LeaveRollup.department, LeaveRollup.month, func.sum(LeaveRollup.approved_minutes)
+        ).where(
+            LeaveRollup.month >= date(year, 1, 1), LeaveRollup.month <= date(year, 12, 1)
+        ).group_by(LeaveRollup.department, LeaveRollup.month).order_by(LeaveRollup.department, LeaveRollup.month)
+        if department:
+            query = query.where(LeaveRollup.department == department)
+        rows = db.execute(query).all()
+
+        headcounts = dict(db.execute(
+            select(Employee.department, func.count(Employee.id)).group_by(Employee.department)
+        ).all())
+        calendars = get_holiday_calendar_service()
+        working_days_by_department = {}
+
+        rates = []
+        for row_department, month, approved_minutes in rows:
+            if row_department not in working_days_by_department:
+                calendar_year = calendars.get_year(db, calendars.resolve_calendar_id(db, row_department), year)
+                working_days_by_department[row_department] = calendar_year.working_days_by_month()
+            working_days = working_days_by_department[row_department]
+            approved_days = minutes_to_days(approved_minutes or 0)
+            headcount = headcounts.get(row_department, 0)
+            capacity = headcount * working_days[month.month]
+            rates.append(AbsenceRateResponse(
+                department=row_department,
+                month=month,
+                approved_days=approved_days,
+                headcount=headcount,
+                working_days=working_days[month.month],
+                absence_rate=round(approved_days / capacity, 4) if capacity else 0.0
+            ))
+        return rates
+
+    def get_leave_type_utilization(self, db: Session, year: int) -> List[LeaveTypeUtilizationResponse]:
+        """Requests and approved days per leave type against days allocated for the year"""
+        totals = {row[0]: row[1:] for row in db.execute(
+            select(
+                LeaveRollup.leave_type_id,
+                func.sum(LeaveRollup.requested_count), func.sum(LeaveRollup.approved_count),
+                func.sum(LeaveRollup.rejected_count), func.sum(LeaveRollup.cancelled_count),
+                func.sum(LeaveRollup.approved_minutes)
+            ).where(
+                LeaveRollup.month >= date(year, 1, 1), LeaveRollup.month <= date(year, 12, 1)
+            ).group_by(LeaveRollup.leave_type_id)
+        )}
+        allocated = dict(db.execute(
+            select(
+                EmployeeLeaveBalance.leave_type_id,
+                func.sum(EmployeeLeaveBalance.allocated_minutes + EmployeeLeaveBalance.carried_forward_minutes)
+            ).where(EmployeeLeaveBalance.year == year).group_by(EmployeeLeaveBalance.leave_type_id)
+        ).all())
+
+        utilization = []
+        for leave_type_id, name in db.execute(select(LeaveType.id, LeaveType.name).order_by(LeaveType.id)):
+            requested, approved, rejected, cancelled, approved_minutes = totals.get(leave_type_id, (0, 0, 0, 0, 0))
+            approved_minutes = approved_minutes or 0
+            allocated_minutes = allocated.get(leave_type_id) or 0
+            utilization.append(LeaveTypeUtilizationResponse(
+                leave_type_id=leave_type_id,
+                leave_type_name=name,
+                requested_count=requested or 0,
+                approved_count=approved or 0,
+                rejected_count=rejected or 0,
+                cancelled_count=cancelled or 0,
+                approved_days=minutes_to_days(approved_minutes),
+                allocated_days=minutes_to_days(allocated_minutes),
+                utilization=round(approved_minutes / allocated_minutes, 4) if allocated_minutes else None
+            ))
+        return utilization
+
+    def get_top_approvers(self, db: Session, year: int, limit: int = 10) -> List[ApproverStatsResponse]:
+        """HR users with the most leave decisions in the year"""
+        approved = func.sum(LeaveApproverRollup.approved_count)
+        rejected = func.sum(LeaveApproverRollup.rejected_count)
+        rows = db.execute(
+            select(LeaveApproverRollup.approver_id, User.first_name, User.last_name, User.email, approved, rejected)
+            .join(User, User.id == LeaveApproverRollup.approver_id)
+            .where(LeaveApproverRollup.month >= date(year, 1, 1), LeaveApproverRollup.month <= date(year, 12, 1))
+            .group_by(LeaveApproverRollup.approver_id, User.first_name, User.last_name, User.email)
+            .order_by((approved + rejected).desc())
+            .limit(limit)
+        ).all()
+        return [
+            ApproverStatsResponse(
+                approver_id=approver_id,
+                approver_name=" ".join(part for part in [first_name, last_name] if part) or email,
+                approved_count=approved_count or 0,
+                rejected_count=rejected_count or 0,
+                total_decisions=(approved_count or 0) + (rejected_count or 0)
+            )
+            for approver_id, first_name, last_name, email, approved_count, rejected_count in rows
+        ]
+
+    # Full rebuild
+    def rebuild(self, session_factory=SessionLocal, chunk_size: int = 5000, workers: int = 4) -> RollupRebuildResponse:
+        """Recompute all rollups from leave_requests, aggregating id-range chunks in parallel.
+
+        Run while leave decisions are paused: the tables are replaced wholesale. ``workers``
+        is capped at ``MAX_REBUILD_WORKERS`` and ``chunk_size`` at ``MAX_REBUILD_CHUNK_SIZE``.
+        """
+        started = time.perf_counter()
+        chunk_size = min(max(chunk_size, 1), MAX_REBUILD_CHUNK_SIZE)
+        workers = min(max(workers, 1), MAX_REBUILD_WORKERS)
+        with session_factory() as db:
+            min_id, max_id, total = db.execute(
+                select(func.min(LeaveRequest.id), func.max(LeaveRequest.id), func.count(LeaveRequest.id))
+            ).one()
+
+        ranges = []
+        if min_id is not None:
+            ranges = [(low, min(low + chunk_size - 1, max_id)) for low in range(min_id, max_id + 1, chunk_size)]
+
+        rollups: Dict[Tuple, Dict[str, int]] = {}
+        approvers: Dict[Tuple, Dict[str, int]] = {}
+        tenant = current_tenant.get()
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            for chunk_rollups, chunk_approvers in pool.map(
+                lambda bounds: self._aggregate_chunk(session_factory, *bounds, tenant=tenant), ranges
+            ):
+                self._merge(rollups, chunk_rollups, ROLLUP_COUNTERS)
+                self._merge(approvers, chunk_approvers, APPROVER_COUNTERS)
+
+        with session_factory() as db:
+            db.execute(delete(LeaveRollup))
+            db.execute(delete(LeaveApproverRollup))
+            if rollups:
+                db.execute(insert(LeaveRollup), [
+                    {"department": key[0], "leave_type_id": key[1], "month": key[2], **counters}
+                    for key, counters in rollups.items()
+                ])
+            if approvers:
+                db.execute(insert(LeaveApproverRollup), [
+                    {"approver_id": key[0], "month": key[1], **counters}
+                    for key, counters in approvers.items()
+                ])
+            db.commit()
+
+        result = RollupRebuildResponse(
+            leave_requests_scanned=total or 0,
+            rollup_rows=len(rollups),
+            approver_rows=len(approvers),
+            chunks=len(ranges),
+            duration_seconds=round(time.perf_counter() - started, 3)
+        )
+        logger.info(f"Leave rollups rebuilt: {result}")
+        return result
+
+    def _aggregate_chunk(self, session_factory, low_id: int, high_id: int, tenant: Optional[str] = None):
+        """GROUP BY one id range of leave_requests into partial rollups (pool threads do not inherit the tenant)"""
+        rollups: Dict[Tuple, Dict[str, int]] = {}
+        approvers: Dict[Tuple, Dict[str, int]] = {}
+        in_chunk = LeaveRequest.id.between(low_id, high_id)
+
+        with use_tenant(tenant), session_factory() as db:
+            rows = db.execute(
+                select(
+                    Employee.department, LeaveRequest.leave_type_id,
+                    extract("year", LeaveRequest.start_date), extract("month", LeaveRequest.start_date),
+                    LeaveRequest.status, func.count(LeaveRequest.id), func.sum(LeaveRequest.number_of_minutes)
+                ).join(Employee, Employee.id == LeaveRequest.employee_id).where(in_chunk).group_by(
+                    Employee.department, LeaveRequest.leave_type_id,
+                    extract("year", LeaveRequest.start_date), extract("month", LeaveRequest.start_date),
+                    LeaveRequest.status
+                )
+            ).all()
+            for department, leave_type_id, year, month, status, count, minutes in rows:
+                counters = rollups.setdefault(
+                    (department, leave_type_id, date(int(year), int(month), 1)),
+                    dict.fromkeys(ROLLUP_COUNTERS, 0)
+                )
+                minutes = minutes or 0
+                counters["requested_count"] += count
+                counters["requested_minutes"] += minutes
+                if status == LeaveStatus.PENDING.value:
+                    counters["pending_minutes"] += minutes
+                elif status == LeaveStatus.APPROVED.value:
+                    counters["approved_count"] += count
+                    counters["approved_minutes"] += minutes
+                elif status == LeaveStatus.REJECTED.value:
+                    counters["rejected_count"] += count
+                elif status == LeaveStatus.CANCELLED.value:
+                    counters["cancelled_count"] += count
+
+            approvals = db.execute(
+                select(
+                    LeaveRequest.approved_by_id,
+                    extract("year", LeaveRequest.approved_at), extract("month", LeaveRequest.approved_at),
+                    func.count(LeaveRequest.id)
+                ).where(in_chunk, LeaveRequest.approved_by_id.isnot(None), LeaveRequest.approved_at.isnot(None))
+                .group_by(
+                    LeaveRequest.approved_by_id,
+                    extract("year", LeaveRequest.approved_at), extract("month", LeaveRequest.approved_at)
+                )
+            ).all()
+            rejections = db.execute(
+                select(
+                    LeaveRequestAudit.performed_by_id,
+                    extract("year", LeaveRequestAudit.created_at), extract("month", LeaveRequestAudit.created_at),
+                    func.count(LeaveRequestAudit.id)
+                ).where(
+                    LeaveRequestAudit.leave_request_id.between(low_id, high_id),
+                    LeaveRequestAudit.action == AuditAction.REJECTED
+                ).group_by(
+                    LeaveRequestAudit.performed_by_id,
+                    extract("year", LeaveRequestAudit.created_at), extract("month", LeaveRequestAudit.created_at)
+                )
+            ).all()
+
+            rejections += [
+                (record["performed_by_id"], record["created_at"].year, record["created_at"].month, 1)
+                for record in get_audit_archive_service().get_archived_audits_in_range(
+                    db, low_id, high_id, AuditAction.REJECTED
+                )
+            ]
+
+        for counter, rows in (("approved_count", approvals), ("rejected_count", rejections)):
+            for approver_id, year, month, count in rows:
+                counters = approvers.setdefault(
+                    (approver_id, date(int(year), int(month), 1)), dict.fromkeys(APPROVER_COUNTERS, 0)
+                )
+                counters[counter] += count
+        return rollups, approvers
+
+    def _merge(self, target: dict, partial: dict, counters: tuple):
+        for key, values in partial.items():
+            merged = target.setdefault(key, dict.fromkeys(counters, 0))
+            for counter in counters:
+                merged[counter] += values[counter]
@@ -0,0 +1,176 @@
+from datetime import datetime, timedelta
+from typing import Optional, List, Dict, Iterable
+from itertools import groupby
+from sqlalchemy import select, delete, insert
+from sqlalchemy.orm import Session
+from app.options import option
+from app.database import current_tenant
+from app.models.user import User
+from app.models.leave_audit import LeaveRequestAudit, AuditAction
+from app.models.audit_archive import AuditArchiveSegment, AuditArchiveEntry
+import json
+import logging
+import os
+import zlib
+
+logger = logging.getLogger(__name__)
+
+SEGMENT_MAGIC = b"LRA1"
+ARCHIVED_COLUMNS = (
+    "id", "leave_request_id", "action", "performed_by_id", "old_status", "new_status",
+    "comments", "ip_address", "user_agent", "created_at",
+)
+
+
+class AuditArchiveService:
+    """Moves old leave request audits into compressed, append-only segment files.
+
+    Each archive run writes one segment. Inside it, every leave request's audits
+    are one zlib frame of JSON lines, and ``audit_archive_index`` maps
+    leave_request_id -> (segment, offset, length) so reads seek straight to it.
+    """
+
+    def __init__(self, archive_dir: str = None, horizon_days: int = None):
+        self.archive_dir = archive_dir or option("audit_archive_dir", "audit_archive")
+        self.horizon_days = horizon_days or option("audit_archive_days", 365)
+
+    def archive(self, db: Session, older_than_days: int = None, batch_size: int = 10000) -> Optional[AuditArchiveSegment]:
+        """Archive up to batch_size audits older than the horizon into a new segment"""
+        cutoff = datetime.utcnow() - timedelta(days=older_than_days or self.horizon_days)
+        audits = db.execute(
+            select(*[getattr(LeaveRequestAudit, column) for column in ARCHIVED_COLUMNS])
+            .where(LeaveRequestAudit.created_at < cutoff)
+            .order_by(LeaveRequestAudit.leave_request_id, LeaveRequestAudit.id)
+            .limit(batch_size)
+        ).all()
+        if not audits:
+            return None
+
+        segment = AuditArchiveSegment(archived_before=cutoff, record_count=len(audits), path="")
+        db.add(segment)
+        db.flush()
+        segment.path = f"audit-segment-{segment.id:08d}.lra"
+        if current_tenant.get() is not None:
+            # Segment ids are per shard, so each tenant's segments live in their own directory
+            segment.path = f"{current_tenant.get()}/{segment.path}"
+        file_path = os.path.join(self.archive_dir, segment.path)
+        os.makedirs(os.path.dirname(file_path), exist_ok=True)
+
+        entries = []
+        try:
+            with open(file_path + ".tmp", "wb") as segment_file:
+                segment_file.write(SEGMENT_MAGIC)
+                offset = len(SEGMENT_MAGIC)
+                for leave_request_id, rows in groupby(audits, key=lambda row: row.leave_request_id):
+                    rows = list(rows)
+                    frame = zlib.compress(
+                        "\n".join(json.dumps(self._encode(row)) for row in rows).encode("utf-8")
+                    )
+                    segment_file.write(frame)
+                    entries.append({
+                        "leave_request_id": leave_request_id,
+                        "segment_id": segment.id,
+                        "offset": offset,
+                        "length": len(frame),
+                        "record_count": len(rows)
+                    })
+                    offset += len(frame)
+                segment_file.flush()
+                os.fsync(segment_file.fileno())
+            os.replace(file_path + ".tmp", file_path)
+
+            audit_ids = [row.id for row in audits]
+            segment.min_audit_id = min(audit_ids)
+            segment.max_audit_id = max(audit_ids)
+            segment.size_bytes = offset
+            db.execute(insert(AuditArchiveEntry), entries)
+            db.execute(delete(LeaveRequestAudit).where(LeaveRequestAudit.id.in_(audit_ids)))
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            for path in (file_path + ".tmp", file_path):
+                if os.path.exists(path):
+                    os.remove(path)
+            logger.error(f"Error archiving leave request audits: {e}")
+            raise
+
+        logger.info(f"Archived {len(audits)} audits for {len(entries)} leave requests into {segment.path}")
+        return segment
+
+    def archive_all(self, db: Session, older_than_days: int = None, batch_size: int = 10000) -> List[AuditArchiveSegment]:
+        """Archive in batches until no audit older than the horizon is left in the hot table"""
+        segments = []
+        while True:
+            segment = self.archive(db, older_than_days, batch_size)
+            if not segment:
+                return segments
+            segments.append(segment)
+
+    def get_archived_audits(self, db: Session, leave_request_id: int) -> List[dict]:
+        """Archived audit records of one leave request"""
+        return self._read_entries(db.execute(
+            select(AuditArchiveEntry, AuditArchiveSegment.path)
+            .join(AuditArchiveSegment, AuditArchiveSegment.id == AuditArchiveEntry.segment_id)
+            .where(AuditArchiveEntry.leave_request_id == leave_request_id)
+            .order_by(AuditArchiveEntry.segment_id)
+        ).all())
+
+    def get_archived_audits_in_range(self, db: Session, low_id: int, high_id: int,
+                                     action: AuditAction = None) -> List[dict]:
+        """Archived audit records for a range of leave request ids, optionally of one action"""
+        records = self._read_entries(db.execute(
+            select(AuditArchiveEntry, AuditArchiveSegment.path)
+            .join(AuditArchiveSegment, AuditArchiveSegment.id == AuditArchiveEntry.segment_id)
+            .where(AuditArchiveEntry.leave_request_id.between(low_id, high_id))
+            .order_by(AuditArchiveEntry.segment_id, AuditArchiveEntry.offset)
+        ).all())
+        if action:
+            records = [record for record in records if record["action"] == action]
+        return records
+
+    def get_audit_logs(self, db: Session, leave_request_id: int) -> List[dict]:
+        """Hot and archived audits of a leave request, newest first, with performer names"""
+        hot = [
+            {column: getattr(row, column) for column in ARCHIVED_COLUMNS}
+            for row in db.execute(
+                select(*[getattr(LeaveRequestAudit, column) for column in ARCHIVED_COLUMNS])
+                .where(LeaveRequestAudit.leave_request_id == leave_request_id)
+            )
+        ]
+        records = hot + self.get_archived_audits(db, leave_request_id)
+
+        performer_ids = {record["performed_by_id"] for record in records}
+        names = {
+            user_id: " ".join(part for part in [first_name, last_name] if part) or email
+            for user_id, first_name, last_name, email in db.execute(
+                select(User.id, User.first_name, User.last_name, User.email).where(User.id.in_(performer_ids))
+            )
+        } if performer_ids else {}
+        for record in records:
+            record["performed_by_name"] = names.get(record["performed_by_id"], "")
+        records.sort(key=lambda record: (record["created_at"] is not None, record["created_at"], record["id"]),
+                     reverse=True)
+        return records
+
+    def _read_entries(self, entries: Iterable) -> List[dict]:
+        records = []
+        for path, group in groupby(entries, key=lambda row: row.path):
+            with open(os.path.join(self.archive_dir, path), "rb") as segment_file:
+                for entry, _ in group:
+                    segment_file.seek(entry.offset)
+                    frame = zlib.decompress(segment_file.read(entry.length)).decode("utf-8")
+                    records.extend(self._decode(json.loads(line)) for line in frame.split("\n"))
+        return records
+
+    def _encode(self, row) -> Dict:
+        record = {column: getattr(row, column) for column in ARCHIVED_COLUMNS}
+        record["action"] = AuditAction(record["action"]).value
+        if record["created_at"] is not None:
+            record["created_at"] = record["created_at"].isoformat()
+        return record
+
+    def _decode(self, record: Dict) -> Dict:
+        record["action"] = AuditAction(record["action"])
+        if record["created_at"] is not None:
+            record["created_at"] = datetime.fromisoformat(record["created_at"])
+        return record
@@ -4,6 +4,7 @@ from jose import JWTError, jwt
 from passlib.context import CryptContext
 from sqlalchemy.orm import Session
 from app.config import settings
+from app.database import current_tenant
 from app.models.user import User, UserRole
 from app.schemas.auth import TokenData
 from app.schemas.user import UserLogin, UserPasswordSetup
@@ -58,7 +59,7 @@ class AuthService:
             if email is None or user_id is None or role is None:
                 return None
             
-            token_data = TokenData(email=email, user_id=user_id, role=UserRole(role))
+            token_data = TokenData(email=email, user_id=user_id, role=UserRole(role), tenant=payload.get("tenant"))
             return token_data
         except JWTError:
             return None
@@ -75,17 +76,22 @@ class AuthService:
         return user
     
     def create_access_token(self, user: User) -> dict:
-        """Create access and refresh tokens for user"""
+        """Create access and refresh tokens for user; with tenant shards they name the user's tenant"""
         access_token_expires = timedelta(minutes=self.access_token_expire_minutes)
         refresh_token_expires = timedelta(days=self.refresh_token_expire_days)
         
+        claims = {"sub": user.email, "user_id": user.id, "role": user.role.value}
+        tenant = current_tenant.get()
+        if tenant is not None:
+            claims["tenant"] = tenant
+        
         access_token = self.generate_token(
-            data={"sub": user.email, "user_id": user.id, "role": user.role.value},
+            data=claims,
             expires_delta=access_token_expires
         )
         
         refresh_token = self.generate_refresh_token(
-            data={"sub": user.email, "user_id": user.id, "role": user.role.value}
+            data=claims
         )
         
         return {
@@ -134,9 +140,12 @@ class AuthService:
             if email is None or user_id is None or role is None:
                 return None
             
+            claims = {"sub": email, "user_id": user_id, "role": role}
+            if payload.get("tenant") is not None:
+                claims["tenant"] = payload["tenant"]
             access_token_expires = timedelta(minutes=self.access_token_expire_minutes)
             access_token = self.generate_token(
-                data={"sub": email, "user_id": user_id, "role": role},
+                data=claims,
                 expires_delta=access_token_expires
             )
             
@@ -0,0 +1,193 @@
+import hashlib
+import hmac
+from datetime import date, datetime, timedelta, timezone
+from typing import List, Optional
+from urllib.parse import quote
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from app.cache import feed_cache
+from app.config import settings
+from app.options import option
+from app.database import current_tenant, fetch_rows
+from app.leave_units import minutes_to_days
+from app.models.user import User, UserRole
+from app.models.employee import Employee
+from app.models.leave_type import LeaveType
+from app.models.leave_request import LeaveRequest, LeaveStatus
+from app.models.enums import LeaveDurationType
+from app.services.container import get_employee_service, get_holiday_calendar_service
+import logging
+
+logger = logging.getLogger(__name__)
+
+FEED_LEAVE_COLUMNS = (
+    LeaveRequest.id, LeaveRequest.start_date, LeaveRequest.end_date, LeaveRequest.duration_type,
+    LeaveRequest.start_half, LeaveRequest.hours, LeaveRequest.number_of_minutes, LeaveRequest.approved_at,
+    LeaveRequest.created_at, Employee.first_name, Employee.last_name, LeaveType.name.label("leave_type_name"),
+)
+
+
+def feed_tags(employee_id: int, department: str) -> List[str]:
+    """Cache tags of every feed showing this employee's approved leave"""
+    return [f"feeds:employee:{employee_id}", f"feeds:department:{department}", "feeds:company"]
+
+
+def _escape(text: str) -> str:
+    return (text.replace("\\", "\\\\").replace(";", "\\;").replace(",", "\\,")
+            .replace("\r\n", "\\n").replace("\n", "\\n"))
+
+
+def _fold(line: str) -> str:
+    """Split a content line into 75-octet chunks joined by CRLF and a space (RFC 5545 3.1)"""
+    encoded = line.encode("utf-8")
+    if len(encoded) <= 75:
+        return line
+    chunks, start = [], 0
+    while start < len(encoded):
+        end = min(start + (75 if not chunks else 74), len(encoded))
+        while end < len(encoded) and encoded[end] & 0xC0 == 0x80:  # Never split a UTF-8 sequence
+            end -= 1
+        chunks.append(encoded[start:end].decode("utf-8"))
+        start = end
+    return "\r\n ".join(chunks)
+
+
+def _stamp(moment: Optional[datetime], fallback: date) -> str:
+    if moment is None:
+        return fallback.strftime("%Y%m%dT000000Z")
+    if moment.tzinfo is not None:
+        moment = moment.astimezone(timezone.utc)
+    return moment.strftime("%Y%m%dT%H%M%SZ")
+
+
+class CalendarFeedService:
+    """iCalendar feeds of approved leave and holidays, for calendar clients to subscribe to.
+
+    There is one feed per employee, per department and for the whole company,
+    each behind a URL signed with ``FEED_SIGNING_KEY`` (``SECRET_KEY`` by
+    default) since calendar clients cannot send tokens. Feeds show approved
+    leave ending on or after 1 January of last year and the holidays of the
+    feed's calendar from last year to next year.
+
+    Bodies are rendered once and kept in ``feed_cache`` with their ETag.
+    Approving or cancelling leave evicts only the employee's, their
+    department's and the company feed (``feed_tags``); holiday and calendar
+    changes evict every feed through the ``holidays`` tag. Misses are rendered
+    from the primary, never a replica that may not have the evicting change
+    yet. Bodies are built from stored timestamps only, so every worker renders the same bytes and
+    ETag for the same data.
+    """
+
+    def __init__(self):
+        self.employee_service = get_employee_service()
+        self.holiday_calendar_service = get_holiday_calendar_service()
+        self.signing_key = (option("feed_signing_key", None) or settings.secret_key).encode("utf-8")
+        self.product_id = option("feed_product_id", "-//Leave Management System//Leave Feeds//EN")
+
+    # Signed URLs
+    def sign(self, scope: str, subject: str) -> str:
+        """Signature of a feed, bound to the current tenant"""
+        message = f"{current_tenant.get() or ''}:{scope}:{subject}".encode("utf-8")
+        return hmac.new(self.signing_key, message, hashlib.sha256).hexdigest()[:32]
+
+    def verify(self, scope: str, subject: str, signature: Optional[str]) -> bool:
+        return signature is not None and hmac.compare_digest(self.sign(scope, subject), signature)
+
+    def feed_path(self, scope: str, subject: str) -> str:
+        """Path and query of a feed below the feeds router, signature and tenant included"""
+        path = "/company.ics" if scope == "company" else f"/{scope}s/{quote(subject, safe='')}.ics"
+        query = f"sig={self.sign(scope, subject)}"
+        tenant = current_tenant.get()
+        if tenant is not None:
+            query += f"&tenant={tenant}"
+        return f"{path}?{query}"
+
+    def get_feed_links(self, db: Session, user: User, department: Optional[str] = None) -> List[dict]:
+        """Feeds the user may subscribe to, shaped like CalendarFeedResponse but with ``feed_path`` paths.
+
+        Everyone gets their own and their department's feed; HR and Super Admin
+        also get the company feed and, with ``department``, any department's.
+        """
+        links = []
+        employee = self.employee_service.get_employee_by_user_id(db, user.id)
+        if employee is not None:
+            links.append({"scope": "employee", "name": f"{employee.first_name} {employee.last_name}",
+                          "path": self.feed_path("employee", str(employee.id))})
+        manager = user.role in [UserRole.HR, UserRole.SUPER_ADMIN]
+        if department is not None and not manager:
+            if employee is None or employee.department != department:
+                raise ValueError("You can only subscribe to your own department's feed")
+        department = department or (employee.department if employee is not None else None)
+        if department:
+            links.append({"scope": "department", "name": department,
+                          "path": self.feed_path("department", department)})
+        if manager:
+            links.append({"scope": "company", "name": "Company", "path": self.feed_path("company", "all")})
+        return links
+
+    # Feeds
+    def get_feed(self, db: Session, scope: str, subject: str) -> Optional[dict]:
+        """``{"body": bytes, "etag": str}`` of a feed, rendered on a cache miss; None for unknown employees"""
+        key = f"feed:{scope}:{subject}"
+        feed = feed_cache.get(key)
+        if feed is None:
+            generation = feed_cache.generation
+            feed = self._render_feed(db, scope, subject)
+            if feed is None:
+                return None
+            tag = "feeds:company" if scope == "company" else f"feeds:{scope}:{subject}"
+            feed_cache.set(key, feed, [tag, "holidays"], generation)
+        return feed
+
+    def _render_feed(self, db: Session, scope: str, subject: str) -> Optional[dict]:
+        since = date(date.today().year - 1, 1, 1)
+        query = select(*FEED_LEAVE_COLUMNS).join(Employee, Employee.id == LeaveRequest.employee_id) \
+            .join(LeaveType, LeaveType.id == LeaveRequest.leave_type_id) \
+            .where(LeaveRequest.status == LeaveStatus.APPROVED.value, LeaveRequest.end_date >= since) \
+            .order_by(LeaveRequest.start_date, LeaveRequest.id)
+        if scope == "employee":
+            employee = self.employee_service.get_employee_by_id(db, int(subject))
+            if employee is None:
+                return None
+            name = f"{employee.first_name} {employee.last_name}"
+            calendar_id = self.holiday_calendar_service.calendar_id_for(db, employee)
+            query = query.where(LeaveRequest.employee_id == employee.id)
+        elif scope == "department":
+            name = subject
+            calendar_id = self.holiday_calendar_service.resolve_calendar_id(db, subject, None)
+            query = query.where(Employee.department == subject)
+        else:
+            name = "Company"
+            calendar_id = self.holiday_calendar_service.calendar_id_for(db, None)
+
+        lines = ["BEGIN:VCALENDAR", "VERSION:2.0", f"PRODID:{self.product_id}", "CALSCALE:GREGORIAN",
+                 f"X-WR-CALNAME:{_escape(f'Leave - {name}')}"]
+        domain = current_tenant.get() or "leave-management"
+        for row in fetch_rows(db, query):
+            summary = row["leave_type_name"] if scope == "employee" else \
+                f"{row['first_name']} {row['last_name']} - {row['leave_type_name']}"
+            if row["duration_type"] == LeaveDurationType.HALF_DAY.value:
+                summary += f" ({row['start_half'] or 'half day'})"
+            elif row["duration_type"] == LeaveDurationType.HOURLY.value:
+                summary += f" ({row['hours']:g}h)"
+            lines += ["BEGIN:VEVENT", f"UID:leave-{row['id']}@{domain}",
+                      f"DTSTAMP:{_stamp(row['approved_at'] or row['created_at'], row['start_date'])}",
+                      f"DTSTART;VALUE=DATE:{row['start_date']:%Y%m%d}",
+                      f"DTEND;VALUE=DATE:{row['end_date'] + timedelta(days=1):%Y%m%d}",
+                      f"SUMMARY:{_escape(summary)}",
+                      f"DESCRIPTION:{minutes_to_days(row['number_of_minutes']):g} day(s)",
+                      "TRANSP:OPAQUE", "END:VEVENT"]
+        for year in range(since.year, since.year + 3):
+            for holiday in self.holiday_calendar_service.get_year(db, calendar_id, year).holidays:
+                lines += ["BEGIN:VEVENT", f"UID:holiday-{holiday['holiday_id']}-{holiday['date']:%Y%m%d}@{domain}",
+                          f"DTSTAMP:{_stamp(None, holiday['date'])}",
+                          f"DTSTART;VALUE=DATE:{holiday['date']:%Y%m%d}",
+                          f"DTEND;VALUE=DATE:{holiday['date'] + timedelta(days=1):%Y%m%d}",
+                          f"SUMMARY:{_escape(holiday['name'])}"]
+                if holiday["description"]:
+                    lines.append(f"DESCRIPTION:{_escape(holiday['description'])}")
+                lines += ["TRANSP:TRANSPARENT", "END:VEVENT"]
+        lines.append("END:VCALENDAR")
+
+        body = ("\r\n".join(_fold(line) for line in lines) + "\r\n").encode("utf-8")
+        return {"body": body, "etag": f'"{hashlib.sha256(body).hexdigest()[:32]}"'}
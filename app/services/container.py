@@ -0,0 +1,105 @@
+"""
+Shared service instances.
+
+Services are stateless apart from their collaborators, so each worker needs one
+of each. They are built on first use and shared by routers, dependencies and
+other services; import the getters rather than instantiating services.
+"""
+
+from functools import lru_cache
+
+
+@lru_cache(maxsize=None)
+def get_auth_service():
+    from app.services.auth_service import AuthService
+    return AuthService()
+
+
+@lru_cache(maxsize=None)
+def get_email_service():
+    from app.services.email_service import EmailService
+    return EmailService()
+
+
+@lru_cache(maxsize=None)
+def get_user_service():
+    from app.services.user_service import UserService
+    return UserService()
+
+
+@lru_cache(maxsize=None)
+def get_employee_service():
+    from app.services.employee_service import EmployeeService
+    return EmployeeService()
+
+
+@lru_cache(maxsize=None)
+def get_org_hierarchy_service():
+    from app.services.org_hierarchy_service import OrgHierarchyService
+    return OrgHierarchyService()
+
+
+@lru_cache(maxsize=None)
+def get_ledger_service():
+    from app.services.ledger_service import LedgerService
+    return LedgerService()
+
+
+@lru_cache(maxsize=None)
+def get_accrual_service():
+    from app.services.accrual_service import AccrualService
+    return AccrualService()
+
+
+@lru_cache(maxsize=None)
+def get_job_queue_service():
+    from app.services.job_queue_service import JobQueueService
+    return JobQueueService()
+
+
+@lru_cache(maxsize=None)
+def get_hr_digest_service():
+    from app.services.hr_digest_service import HrDigestService
+    return HrDigestService()
+
+
+@lru_cache(maxsize=None)
+def get_analytics_service():
+    from app.services.analytics_service import AnalyticsService
+    return AnalyticsService()
+
+
+@lru_cache(maxsize=None)
+def get_audit_archive_service():
+    from app.services.audit_archive_service import AuditArchiveService
+    return AuditArchiveService()
+
+
+@lru_cache(maxsize=None)
+def get_holiday_calendar_service():
+    from app.services.holiday_calendar_service import HolidayCalendarService
+    return HolidayCalendarService()
+
+
+@lru_cache(maxsize=None)
+def get_leave_policy_service():
+    from app.services.leave_policy_service import LeavePolicyService
+    return LeavePolicyService()
+
+
+@lru_cache(maxsize=None)
+def get_dashboard_service():
+    from app.services.dashboard_service import DashboardService
+    return DashboardService()
+
+
+@lru_cache(maxsize=None)
+def get_calendar_feed_service():
+    from app.services.calendar_feed_service import CalendarFeedService
+    return CalendarFeedService()
+
+
+@lru_cache(maxsize=None)
+def get_leave_service():
+    from app.services.leave_service import LeaveService
+    return LeaveService()
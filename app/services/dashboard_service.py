@@ -0,0 +1,134 @@
+from datetime import date
+from typing import List, Tuple
+from sqlalchemy import select, func
+from sqlalchemy.orm import Session
+from app.cache import dashboard_cache
+from app.options import option
+from app.database import fetch_rows
+from app.models.user import User
+from app.models.employee import Employee
+from app.models.leave_type import LeaveType
+from app.models.leave_request import LeaveRequest, LeaveStatus
+from app.schemas.user import UserResponse
+from app.services.container import get_employee_service, get_leave_service, get_holiday_calendar_service
+from app.services.leave_service import LEAVE_REQUEST_LIST_COLUMNS
+import logging
+
+logger = logging.getLogger(__name__)
+
+DASHBOARD_EMPLOYEE_COLUMNS = (
+    Employee.id, Employee.employee_id, Employee.first_name, Employee.last_name, Employee.department,
+    Employee.location, Employee.designation, Employee.joining_date, Employee.manager_id,
+)
+DASHBOARD_PENDING_COLUMNS = (
+    LeaveRequest.id, LeaveRequest.employee_id, Employee.employee_id.label("employee_code"),
+    Employee.first_name, Employee.last_name, LeaveType.name.label("leave_type_name"),
+    LeaveRequest.start_date, LeaveRequest.end_date, LeaveRequest.number_of_days, LeaveRequest.created_at,
+)
+DASHBOARD_ABSENCE_COLUMNS = (
+    Employee.id.label("employee_id"), Employee.employee_id.label("employee_code"), Employee.first_name,
+    Employee.last_name, Employee.department, LeaveRequest.id.label("leave_request_id"),
+    LeaveType.name.label("leave_type_name"), LeaveRequest.start_date, LeaveRequest.end_date,
+    LeaveRequest.duration_type, LeaveRequest.start_half, LeaveRequest.hours,
+)
+
+
+class DashboardService:
+    """Composite dashboards, one response per role instead of a request per widget.
+
+    Each dashboard runs a fixed number of statements however much data there is:
+    the employee one reads the employee row, this year's balances (plus the
+    ledger movements not yet folded into them) and the latest requests, with the
+    next holidays coming from the employee's materialized holiday calendar and
+    leave types from ``leave_type_cache``; the HR one reads
+    the oldest pending requests and who is out today, each with its total from
+    a ``COUNT(*) OVER ()`` window instead of a second query. Results are kept
+    per user in ``dashboard_cache`` for ``DASHBOARD_CACHE_TTL_SECONDS`` and are
+    evicted early by the tags the underlying writers already publish.
+    """
+
+    def __init__(self):
+        self.employee_service = get_employee_service()
+        self.leave_service = get_leave_service()
+        self.holiday_calendar_service = get_holiday_calendar_service()
+        self.list_limit = option("dashboard_list_limit", 10)
+
+    def get_employee_dashboard(self, db: Session, user: User) -> dict:
+        """Profile, balances, recent requests and upcoming holidays, shaped like EmployeeDashboardResponse"""
+        key = f"dashboard:employee:{user.id}"
+        dashboard = dashboard_cache.get(key)
+        if dashboard is None:
+            generation = dashboard_cache.generation
+            dashboard = self._load_employee_dashboard(db, user)
+            employee = dashboard["employee"]
+            tags = ["users", "holidays", "leave_types", "balances"]
+            if employee is not None:
+                tags.append(f"balances:{employee['id']}")
+            dashboard_cache.set(key, dashboard, tags, generation)
+        return dashboard
+
+    def _load_employee_dashboard(self, db: Session, user: User) -> dict:
+        today = date.today()
+        employees = fetch_rows(db, select(*DASHBOARD_EMPLOYEE_COLUMNS).where(Employee.user_id == user.id))
+        employee = employees[0] if employees else None
+        balances, recent_requests = [], []
+        if employee is not None:
+            balances = self.employee_service.get_leave_balance_rows(db, employee["id"], today.year)
+            recent_requests = fetch_rows(db, select(*LEAVE_REQUEST_LIST_COLUMNS)
+                                         .where(LeaveRequest.employee_id == employee["id"])
+                                         .order_by(LeaveRequest.created_at.desc(), LeaveRequest.id.desc())
+                                         .limit(self.list_limit))
+        calendar_id = self.holiday_calendar_service.resolve_calendar_id(
+            db, employee["department"], employee["location"]
+        ) if employee is not None else self.holiday_calendar_service.calendar_id_for(db, None)
+        upcoming_holidays = [
+            {"id": holiday["holiday_id"], "date": holiday["date"], "name": holiday["name"],
+             "description": holiday["description"]}
+            for holiday in self.holiday_calendar_service.upcoming_holidays(db, calendar_id, today, self.list_limit)
+        ]
+        leave_types = [row for row in self.leave_service.get_leave_type_rows(db) if row["is_active"]]
+        return {
+            "profile": UserResponse.from_orm(user).dict(),
+            "employee": employee,
+            "balances": balances,
+            "recent_requests": recent_requests,
+            "upcoming_holidays": upcoming_holidays,
+            "leave_types": leave_types,
+        }
+
+    def get_hr_dashboard(self, db: Session, user: User) -> dict:
+        """Pending requests and today's absences across the company, shaped like HrDashboardResponse"""
+        return dashboard_cache.get_or_set(
+            f"dashboard:hr:{user.id}", lambda: self._load_hr_dashboard(db, user), tags=["users", "leave_requests"]
+        )
+
+    def _load_hr_dashboard(self, db: Session, user: User) -> dict:
+        today = date.today()
+        pending_count, oldest_pending = self._fetch_with_total(db, select(*DASHBOARD_PENDING_COLUMNS)
+                                                               .where(LeaveRequest.status == LeaveStatus.PENDING.value)
+                                                               .order_by(LeaveRequest.created_at, LeaveRequest.id))
+        out_today_count, out_today = self._fetch_with_total(db, select(*DASHBOARD_ABSENCE_COLUMNS)
+                                                            .where(LeaveRequest.status == LeaveStatus.APPROVED.value,
+                                                                   LeaveRequest.start_date <= today,
+                                                                   LeaveRequest.end_date >= today)
+                                                            .order_by(Employee.department, Employee.last_name,
+                                                                      Employee.first_name, LeaveRequest.id))
+        return {
+            "profile": UserResponse.from_orm(user).dict(),
+            "pending_count": pending_count,
+            "oldest_pending": oldest_pending,
+            "out_today_count": out_today_count,
+            "out_today": out_today,
+        }
+
+    def _fetch_with_total(self, db: Session, query) -> Tuple[int, List[dict]]:
+        """First list_limit rows of a leave request query joined to employees and leave types, and the total"""
+        rows = fetch_rows(db, query.add_columns(func.count().over().label("total"))
+                          .select_from(LeaveRequest)
+                          .join(Employee, Employee.id == LeaveRequest.employee_id)
+                          .join(LeaveType, LeaveType.id == LeaveRequest.leave_type_id)
+                          .limit(self.list_limit))
+        total = rows[0]["total"] if rows else 0
+        for row in rows:
+            del row["total"]
+        return total, rows
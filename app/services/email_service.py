@@ -2,8 +2,17 @@ import aiosmtplib
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 import logging
+from datetime import date
+from typing import List
 from app.config import settings
 from app.models.user import User  # ✅ add this import
+
+logger = logging.getLogger(__name__)
+
+# Requests listed in one HR digest email; the rest are counted
+DIGEST_MAX_ROWS = 100
+
+
 class EmailService:
     def __init__(self):
         self.smtp_host = settings.smtp_host
@@ -78,3 +87,82 @@ class EmailService:
             await self.send_email(user.email, subject, html_content, text_content)
         except Exception as e:
             logger.error(f"Failed to send welcome email: {e}")
+
+    async def send_leave_decision_email(self, email: str, first_name: str, leave_request_id: int,
+                                        start_date: date, end_date: date, number_of_days: float,
+                                        status: str, comments: str = None):
+        """Notify an employee that their leave request was approved or rejected"""
+        subject = f"Your leave request has been {status}"
+
+        html_content = f"""
+        <html>
+        <body>
+            <p>Hello {first_name},</p>
+            <p>Your leave request #{leave_request_id} from {start_date} to {end_date}
+            ({number_of_days} days) has been <strong>{status}</strong>.</p>
+            {f"<p><strong>Comments:</strong> {comments}</p>" if comments else ""}
+            <br>
+            <p>Best regards,<br>HR Team</p>
+        </body>
+        </html>
+        """
+
+        text_content = f"""
+        Hello {first_name},
+
+        Your leave request #{leave_request_id} from {start_date} to {end_date} ({number_of_days} days) has been {status}.
+        {f"Comments: {comments}" if comments else ""}
+
+        Best regards,
+        HR Team
+        """
+
+        return await self.send_email(email, subject, html_content, text_content)
+
+    async def send_hr_leave_digest_email(self, email: str, first_name: str, leave_requests: List[dict]):
+        """Send an HR user one email listing every pending leave request new since their last digest"""
+        count = len(leave_requests)
+        shown = leave_requests[:DIGEST_MAX_ROWS]
+        more = count - len(shown)
+        subject = f"{count} leave request{'s' if count != 1 else ''} awaiting review"
+
+        html_rows = "".join(
+            f"<tr><td>#{row['id']}</td><td>{row['first_name']} {row['last_name']} ({row['employee_code']})</td>"
+            f"<td>{row['department']}</td><td>{row['leave_type']}</td>"
+            f"<td>{row['start_date']} to {row['end_date']}</td><td>{row['number_of_days']}</td></tr>"
+            for row in shown
+        )
+        html_content = f"""
+        <html>
+        <body>
+            <p>Hello {first_name},</p>
+            <p>{count} leave request{'s are' if count != 1 else ' is'} waiting for a decision:</p>
+            <table border="1" cellpadding="4" cellspacing="0">
+                <tr><th>Request</th><th>Employee</th><th>Department</th><th>Leave type</th><th>Dates</th><th>Days</th></tr>
+                {html_rows}
+            </table>
+            {f"<p>...and {more} more.</p>" if more else ""}
+            <br>
+            <p>Best regards,<br>HR Team</p>
+        </body>
+        </html>
+        """
+
+        text_rows = "\n".join(
+            f"        #{row['id']} {row['first_name']} {row['last_name']} ({row['department']}): "
+            f"{row['leave_type']}, {row['start_date']} to {row['end_date']}, {row['number_of_days']} days"
+            for row in shown
+        )
+        text_content = f"""
+        Hello {first_name},
+
+        {count} leave request{'s are' if count != 1 else ' is'} waiting for a decision:
+
+{text_rows}
+        {f"...and {more} more." if more else ""}
+
+        Best regards,
+        HR Team
+        """
+
+        return await self.send_email(email, subject, html_content, text_content)
@@ -1,25 +1,62 @@
 from datetime import datetime, date
-from typing import Optional, List
+from typing import Optional, List, Tuple, Dict
+from sqlalchemy import select, insert, tuple_, text, and_, or_, func, literal, literal_column, case, exists
 from sqlalchemy.orm import Session
 from sqlalchemy.exc import IntegrityError
+import base64
+import json
 import logging
+import re
+from app.cache import publish_invalidation
+from app.database import fetch_rows, project_columns
+from app.request_cache import request_cache
+from app.leave_units import MINUTES_PER_DAY, days_to_minutes
 from app.schemas.user import UserCreate
 from app.models.user import User, UserRole
 from app.models.employee import Employee
 from app.models.leave_type import LeaveType
 from app.models.leave_balance import EmployeeLeaveBalance
+from app.models.leave_ledger import BalanceMovementKind
+from app.models.leave_accrual import LeaveAccrualRule
+from app.models.employee_search import EMPLOYEE_SEARCH_TABLE
 from app.schemas.employee import EmployeeOnboard, EmployeeUpdate
-from app.services.user_service import UserService
-from app.services.email_service import EmailService
+from app.services.container import (
+    get_user_service, get_email_service, get_ledger_service, get_org_hierarchy_service, get_accrual_service
+)
+from app.services.calendar_feed_service import feed_tags
 from app.schemas.employee import EmployeeOnboard
 from app.models.employee import Employee
 logger = logging.getLogger(__name__)
+
+# EmployeeResponse columns; the nested ``user`` field comes from EMPLOYEE_USER_COLUMNS
+EMPLOYEE_ROW_COLUMNS = (
+    Employee.id, Employee.user_id, Employee.employee_id,
+    Employee.first_name, Employee.last_name, Employee.phone,
+    Employee.department, Employee.location, Employee.designation, Employee.joining_date,
+    Employee.manager_id, Employee.created_at, Employee.updated_at,
+)
+EMPLOYEE_USER_COLUMNS = (User.email, User.role)
+# Keyset of directory search pages, selected even when not requested
+SEARCH_SORT_FIELDS = ("last_name", "first_name", "id")
 import uuid
 import secrets
 class EmployeeService:
+    # Above this many FTS matches a directory search scans in sort order instead of by id
+    SEARCH_DENSE_MATCHES = 1000
+
     def __init__(self):
-        self.user_service = UserService()
-        self.email_service = EmailService()
+        self.user_service = get_user_service()
+        self.email_service = get_email_service()
+        self.ledger_service = get_ledger_service()
+
+    @property
+    def org_hierarchy_service(self):
+        # Resolved on use: OrgHierarchyService itself depends on this service
+        return get_org_hierarchy_service()
+
+    @property
+    def accrual_service(self):
+        return get_accrual_service()
     
     
         
@@ -49,11 +86,14 @@ class EmployeeService:
                 last_name=employee_data.last_name,
                 phone=employee_data.phone,
                 department=employee_data.department,
+                location=employee_data.location,
                 designation=employee_data.designation,
                 joining_date=employee_data.joining_date,
                 manager_id=employee_data.manager_id
             )
             db.add(employee)
+            db.flush()
+            self.org_hierarchy_service.add_employee(db, employee.id, employee.manager_id)
             db.commit()
             db.refresh(employee)
 
@@ -82,24 +122,56 @@ class EmployeeService:
         employee = db.query(Employee).filter(Employee.id==employee_id).first()
         if not employee:
             return
+        accruing = self.accrual_service.get_accruing_leave_type_ids(db)
         for leave_type in leave_types:
             days_remaining = (date(year, 12, 31) - employee.joining_date).days + 1
-            pro_rated_balance = round((leave_type.default_balance * days_remaining)/365, 2)
+            # Accruing leave types start empty and earn their days month by month
+            pro_rated_minutes = 0 if leave_type.id in accruing else round(
+                leave_type.default_balance * MINUTES_PER_DAY * days_remaining / 365
+            )
             balance = EmployeeLeaveBalance(
                 employee_id=employee_id,
                 leave_type_id=leave_type.id,
                 year=year,
-                allocated_days=pro_rated_balance,
-                available_balance=pro_rated_balance
+                allocated_minutes=pro_rated_minutes,
+                available_minutes=pro_rated_minutes
             )
             db.add(balance)
         db.commit()
+        publish_invalidation(tags=[f"balances:{employee_id}"])
+        # Credit the months already started rather than waiting for the next accrual run
+        if accruing:
+            self.accrual_service.run(db, employee_id=employee_id)
 
     def get_employee_by_id(self, db: Session, employee_id: int) -> Optional[Employee]:
-        return db.query(Employee).filter(Employee.id == employee_id).first()
+        """Memoized for the request, together with get_employee_by_user_id"""
+        return request_cache(db).get_or_load(
+            ("employee", employee_id), lambda: db.query(Employee).filter(Employee.id == employee_id).first()
+        )
+
+    def get_employees_by_ids(self, db: Session, employee_ids) -> Dict[int, Employee]:
+        """Employees by id, loading the ones not yet cached for the request in one query"""
+        cache = request_cache(db)
+        employees = {}
+        for employee_id in employee_ids:
+            employee = cache.get(("employee", employee_id))
+            if employee is not None:
+                employees[employee_id] = employee
+        unloaded = [employee_id for employee_id in employee_ids if employee_id not in employees]
+        if unloaded:
+            for employee in db.query(Employee).filter(Employee.id.in_(unloaded)):
+                cache.set(("employee", employee.id), employee)
+                employees[employee.id] = employee
+        return employees
 
     def get_employee_by_user_id(self, db: Session, user_id: int) -> Optional[Employee]:
-        return db.query(Employee).filter(Employee.user_id == user_id).first()
+        cache = request_cache(db)
+        employee = cache.get_or_load(
+            ("employee_by_user", user_id), lambda: db.query(Employee).filter(Employee.user_id == user_id).first()
+        )
+        if employee is not None:
+            cache.set(("employee", employee.id), employee)
+        return employee
 
     def get_employee_by_employee_id(self, db: Session, employee_id: str) -> Optional[Employee]:
         return db.query(Employee).filter(Employee.employee_id == employee_id).first()
@@ -107,17 +179,163 @@ class EmployeeService:
     def get_all_employees(self, db: Session, skip: int = 0, limit: int = 100) -> List[Employee]:
         return db.query(Employee).offset(skip).limit(limit).all()
 
+    def employee_row_query(self, fields: Optional[List[str]] = None, required=("id",), join_user: bool = False):
+        """Select of the EmployeeResponse columns, or only fields; pass its rows through ``nest_user``.
+
+        Users are joined only when the ``user`` field is selected (or join_user is set).
+        """
+        with_user = fields is None or "user" in fields
+        columns = project_columns(
+            EMPLOYEE_ROW_COLUMNS, None if fields is None else [field for field in fields if field != "user"], required
+        )
+        query = select(*columns)
+        if with_user:
+            query = query.add_columns(*EMPLOYEE_USER_COLUMNS)
+        if with_user or join_user:
+            query = query.join(User, User.id == Employee.user_id)
+        return query
+
+    @staticmethod
+    def nest_user(rows: List[dict]) -> List[dict]:
+        for row in rows:
+            if "email" in row:
+                row["user"] = {"email": row.pop("email"), "role": row.pop("role")}
+        return rows
+
+    def get_employee_rows(self, db: Session, skip: int = 0, limit: int = 100,
+                          fields: Optional[List[str]] = None) -> List[dict]:
+        """Employees shaped like EmployeeResponse (or just fields), read with a single select"""
+        query = self.employee_row_query(fields).order_by(Employee.id).offset(skip).limit(limit)
+        return self.nest_user(fetch_rows(db, query))
+
+    @staticmethod
+    def _search_document():
+        # Must stay identical to POSTGRES_SEARCH_DOCUMENT so the trigram index applies
+        space = literal_column("' '")
+        return func.lower(
+            Employee.first_name.op("||")(space).op("||")(Employee.last_name)
+            .op("||")(space).op("||")(Employee.employee_id)
+            .op("||")(space).op("||")(Employee.department)
+            .op("||")(space).op("||")(Employee.designation)
+        )
+
+    @staticmethod
+    def encode_search_cursor(row: dict) -> str:
+        key = json.dumps([row["last_name"], row["first_name"], row["id"]])
+        return base64.urlsafe_b64encode(key.encode()).decode()
+
+    @staticmethod
+    def decode_search_cursor(cursor: str) -> Tuple[str, str, int]:
+        try:
+            last_name, first_name, employee_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+            return str(last_name), str(first_name), int(employee_id)
+        except Exception:
+            raise ValueError("Invalid cursor")
+
+    def search_employees(self, db: Session, q: Optional[str] = None, department: Optional[str] = None,
+                         designation: Optional[str] = None, limit: int = 50, cursor: Optional[str] = None,
+                         fields: Optional[List[str]] = None) -> Tuple[List[dict], Optional[str]]:
+        """Directory search ordered by (last name, first name, id) with keyset pagination.
+
+        Every word of ``q`` must prefix-match (SQLite FTS5) or occur in (Postgres
+        trigram) the name, email, employee ID, department or designation.
+        Returns the page and the cursor of the next one, if any.
+        """
+        tokens = re.findall(r"\w+", (q or "").lower())
+        searches_email = bool(tokens) and db.get_bind().dialect.name != "sqlite"
+        query = self.employee_row_query(fields, SEARCH_SORT_FIELDS, join_user=searches_email)
+        if tokens:
+            if db.get_bind().dialect.name == "sqlite":
+                match = " ".join(f'"{token}"*' for token in tokens)
+                matching_ids = text(
+                    f"SELECT rowid FROM {EMPLOYEE_SEARCH_TABLE} WHERE {EMPLOYEE_SEARCH_TABLE} MATCH :match"
+                ).bindparams(match=match)
+                matches = db.execute(
+                    text(f"SELECT count(*) FROM {EMPLOYEE_SEARCH_TABLE} WHERE {EMPLOYEE_SEARCH_TABLE} MATCH :match"),
+                    {"match": match},
+                ).scalar()
+                # Few matches: fetch them by id and sort. Many: walk the ordering index and stop
+                # after one page; the unary + keeps SQLite from choosing the id lookups instead.
+                id_column = Employee.id if matches <= self.SEARCH_DENSE_MATCHES else literal_column("+employees.id")
+                query = query.where(id_column.in_(matching_ids))
+            else:
+                document = self._search_document()
+                email = func.lower(User.email)
+                query = query.where(and_(*[
+                    or_(document.contains(token, autoescape=True), email.contains(token, autoescape=True))
+                    for token in tokens
+                ]))
+        if department:
+            query = query.where(Employee.department == department)
+        if designation:
+            query = query.where(Employee.designation == designation)
+        if cursor:
+            query = query.where(
+                tuple_(Employee.last_name, Employee.first_name, Employee.id) > tuple_(*self.decode_search_cursor(cursor))
+            )
+
+        # One extra row tells whether another page exists
+        query = query.order_by(Employee.last_name, Employee.first_name, Employee.id).limit(limit + 1)
+        rows = fetch_rows(db, query)
+        next_cursor = self.encode_search_cursor(rows[limit - 1]) if len(rows) > limit else None
+        rows = rows[:limit]
+        if fields is not None:
+            for row in rows:
+                for field in SEARCH_SORT_FIELDS:
+                    if field != "id" and field not in fields:
+                        del row[field]
+        return self.nest_user(rows), next_cursor
+
+    def get_leave_balance_rows(self, db: Session, employee_id: Optional[int] = None,
+                               year: Optional[int] = None) -> List[dict]:
+        """Leave balances shaped like LeaveBalanceResponse, joined with their leave type"""
+        query = (
+            select(
+                EmployeeLeaveBalance.id, EmployeeLeaveBalance.employee_id,
+                EmployeeLeaveBalance.leave_type_id,
+                LeaveType.name.label("leave_type_name"),
+                LeaveType.category.label("leave_type_category"),
+                EmployeeLeaveBalance.year, EmployeeLeaveBalance.allocated_minutes,
+                EmployeeLeaveBalance.used_minutes, EmployeeLeaveBalance.pending_minutes,
+                EmployeeLeaveBalance.carried_forward_minutes,
+                EmployeeLeaveBalance.available_minutes,
+            )
+            .join(LeaveType, LeaveType.id == EmployeeLeaveBalance.leave_type_id)
+            .order_by(EmployeeLeaveBalance.employee_id, EmployeeLeaveBalance.leave_type_id)
+        )
+        if employee_id is not None:
+            query = query.where(EmployeeLeaveBalance.employee_id == employee_id)
+        if year is not None:
+            query = query.where(EmployeeLeaveBalance.year == year)
+        rows = fetch_rows(db, query)
+        # Balance rows mirror the latest ledger snapshot; add movements appended since
+        return self.ledger_service.apply_unfolded_deltas(db, rows, employee_id, year)
+
     def update_employee(self, db: Session, employee_id: int, employee_data: EmployeeUpdate) -> Optional[Employee]:
         employee = self.get_employee_by_id(db, employee_id)
         if not employee:
             return None
         
         update_data = employee_data.dict(exclude_unset=True)
+        new_manager_id = update_data.get("manager_id", employee.manager_id)
+        if new_manager_id != employee.manager_id:
+            if new_manager_id is not None and not self.get_employee_by_id(db, new_manager_id):
+                raise ValueError("Manager not found")
+            # Raises before anything is written if the move would create a cycle
+            self.org_hierarchy_service.move_employee(db, employee.id, new_manager_id)
+
+        # Names, department and location show in (or pick the holidays of) the calendar feeds
+        feeds_changed = any(update_data.get(field, getattr(employee, field)) != getattr(employee, field)
+                            for field in ("first_name", "last_name", "department", "location"))
+        departments = {employee.department, update_data.get("department", employee.department)}
         for field, value in update_data.items():
             setattr(employee, field, value)
         
         employee.updated_at = datetime.utcnow()
         db.commit()
+        if feeds_changed:
+            publish_invalidation(tags=list(dict.fromkeys(tag for department in departments
+                                                         for tag in feed_tags(employee_id, department))))
         db.refresh(employee)
         return employee
 
@@ -133,12 +351,14 @@ class EmployeeService:
         """Carry forward leaves for all leave types that allow it"""
         try:
             from_balances = self.get_employee_leave_balances(db, employee_id, from_year)
-            for balance in from_balances:
-                leave_type = db.query(LeaveType).filter(LeaveType.id == balance.leave_type_id).first()
+            accruing = self.accrual_service.get_accruing_leave_type_ids(db)
+            for from_balance in from_balances:
+                leave_type = db.query(LeaveType).filter(LeaveType.id == from_balance.leave_type_id).first()
                 if not leave_type or not leave_type.allow_carry_forward:
                     continue
 
-                carry_forward_amount = min(balance.available_balance, leave_type.max_carry_forward)
+                balance = self.ledger_service.get_balance(db, employee_id, from_balance.leave_type_id, from_year)
+                carry_forward_amount = min(balance.available_minutes, days_to_minutes(leave_type.max_carry_forward))
                 if carry_forward_amount <= 0:
                     continue
 
@@ -149,26 +369,68 @@ class EmployeeService:
                 ).first()
                 
                 if not to_balance:
+                    allocated_minutes = 0 if leave_type.id in accruing else days_to_minutes(leave_type.default_balance)
                     to_balance = EmployeeLeaveBalance(
                         employee_id=employee_id,
                         leave_type_id=balance.leave_type_id,
                         year=to_year,
-                        allocated_days=leave_type.default_balance,
-                        carried_forward_days=carry_forward_amount,
-                        available_balance=leave_type.default_balance + carry_forward_amount
+                        allocated_minutes=allocated_minutes,
+                        carried_forward_minutes=carry_forward_amount,
+                        available_minutes=allocated_minutes + carry_forward_amount
                     )
                     db.add(to_balance)
                 else:
-                    to_balance.carried_forward_days = carry_forward_amount
-                    to_balance.available_balance = to_balance.allocated_days + carry_forward_amount
+                    # Existing balances only change through the ledger
+                    current = self.ledger_service.get_balance(db, employee_id, balance.leave_type_id, to_year)
+                    adjustment = carry_forward_amount - current.carried_forward_minutes
+                    if adjustment:
+                        self.ledger_service.record(db, employee_id, balance.leave_type_id, to_year,
+                                                   BalanceMovementKind.CARRY, adjustment)
 
             db.commit()
+            publish_invalidation(tags=[f"balances:{employee_id}"])
             return True
         except Exception as e:
             db.rollback()
             logger.error(f"Error carrying forward leaves: {e}")
             return False
 
+    def carry_forward_all(self, db: Session, from_year: int, to_year: int) -> int:
+        """Carry forward every employee holding a carry-forward balance; returns employees carried"""
+        employee_ids = db.execute(
+            select(EmployeeLeaveBalance.employee_id).distinct()
+            .join(LeaveType, LeaveType.id == EmployeeLeaveBalance.leave_type_id)
+            .where(EmployeeLeaveBalance.year == from_year, LeaveType.allow_carry_forward == True)
+        ).scalars().all()
+        return sum(1 for employee_id in employee_ids if self.carry_forward_leaves(db, employee_id, from_year, to_year))
+
+    def initialize_year_balances(self, db: Session, year: int) -> int:
+        """Open the year's balance for every active employee and leave type still missing one, in one statement.
+
+        Leave types that accrue open at zero; the rest get their full default balance.
+        """
+        allocated = case((LeaveAccrualRule.leave_type_id.is_(None), LeaveType.default_balance * MINUTES_PER_DAY), else_=0)
+        missing = (
+            select(Employee.id, LeaveType.id, literal(year), allocated, literal(0), literal(0), literal(0), allocated)
+            .join(User, and_(User.id == Employee.user_id, User.is_active == True))
+            .join(LeaveType, LeaveType.is_active == True)
+            .outerjoin(LeaveAccrualRule, LeaveAccrualRule.leave_type_id == LeaveType.id)
+            .where(~exists().where(
+                EmployeeLeaveBalance.employee_id == Employee.id,
+                EmployeeLeaveBalance.leave_type_id == LeaveType.id,
+                EmployeeLeaveBalance.year == year
+            ))
+        )
+        created = db.execute(insert(EmployeeLeaveBalance).from_select([
+            "employee_id", "leave_type_id", "year", "allocated_minutes", "used_minutes", "pending_minutes",
+            "carried_forward_minutes", "available_minutes"
+        ], missing)).rowcount
+        db.commit()
+        if created:
+            publish_invalidation(tags=["balances"])
+        logger.info(f"Opened {created} leave balances for {year}")
+        return created
+
     def get_employee_profile(self, db: Session, employee_id: int, requesting_user: User) -> Optional[Employee]:
         """Get employee profile with role-based access control"""
         employee = self.get_employee_by_id(db, employee_id)
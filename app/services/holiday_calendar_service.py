@@ -0,0 +1,362 @@
+from calendar import isleap
+from datetime import date, timedelta
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy import select, delete, update, func, tuple_, or_, and_
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from app.cache import holiday_cache, publish_invalidation
+from app.database import primary_session
+from app.models.user import User, UserRole
+from app.models.employee import Employee
+from app.models.holiday import Holiday
+from app.models.holiday_calendar import HolidayCalendar, HolidayCalendarAssignment, DEFAULT_WEEKEND_MASK
+from app.schemas.holiday_calendar import HolidayCalendarCreate, HolidayCalendarUpdate, HolidayCalendarAssignmentItem
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+def weekend_mask(weekend_days: List[int]) -> int:
+    mask = 0
+    for day in weekend_days:
+        mask |= 1 << day
+    return mask
+
+
+def _count_bits(bits: int) -> int:
+    return bin(bits).count("1")
+
+
+class CalendarYear:
+    """One calendar's year materialized as bitmaps over the days of the year.
+
+    Bit ``n`` stands for January 1st + n days. ``holiday_bits`` marks holidays
+    and ``working_bits`` days that are neither holidays nor weekend days, so a
+    day is one shift and mask and a range is one shift, mask and popcount.
+    """
+
+    __slots__ = ("calendar_id", "year", "weekend_mask", "first_ordinal", "days", "holiday_bits", "working_bits",
+                 "holidays")
+
+    def __init__(self, calendar_id: Optional[int], year: int, weekend_mask: int, holidays: List[dict]):
+        self.calendar_id = calendar_id
+        self.year = year
+        self.weekend_mask = weekend_mask
+        self.first_ordinal = date(year, 1, 1).toordinal()
+        self.days = 366 if isleap(year) else 365
+        self.holidays = tuple(sorted(holidays, key=lambda holiday: (holiday["date"], holiday["name"])))
+
+        self.holiday_bits = 0
+        for holiday in self.holidays:
+            self.holiday_bits |= 1 << (holiday["date"].toordinal() - self.first_ordinal)
+        weekend_bits = 0
+        first_weekday = date(year, 1, 1).weekday()
+        for offset in range(self.days):
+            if weekend_mask >> ((first_weekday + offset) % 7) & 1:
+                weekend_bits |= 1 << offset
+        self.working_bits = ((1 << self.days) - 1) & ~(self.holiday_bits | weekend_bits)
+
+    def _span(self, start: date, end: date) -> Tuple[int, int]:
+        """Bit offset and mask of start..end, clipped to this year"""
+        low = max(start.toordinal() - self.first_ordinal, 0)
+        high = min(end.toordinal() - self.first_ordinal, self.days - 1)
+        if high < low:
+            return 0, 0
+        return low, (1 << (high - low + 1)) - 1
+
+    def is_holiday(self, day: date) -> bool:
+        return bool(self.holiday_bits >> (day.toordinal() - self.first_ordinal) & 1)
+
+    def is_working_day(self, day: date) -> bool:
+        return bool(self.working_bits >> (day.toordinal() - self.first_ordinal) & 1)
+
+    def working_days(self, start: date, end: date) -> int:
+        low, mask = self._span(start, end)
+        return _count_bits(self.working_bits >> low & mask)
+
+    def holiday_dates(self, start: date, end: date) -> List[date]:
+        low, mask = self._span(start, end)
+        bits = self.holiday_bits >> low & mask
+        first = self.first_ordinal + low
+        days = []
+        while bits:
+            lowest = bits & -bits
+            days.append(date.fromordinal(first + lowest.bit_length() - 1))
+            bits ^= lowest
+        return days
+
+    def working_days_by_month(self) -> Dict[int, int]:
+        return {month: self.working_days(date(self.year, month, 1),
+                                         date(self.year + month // 12, month % 12 + 1, 1) - timedelta(days=1))
+                for month in range(1, 13)}
+
+    def weekend_days(self) -> List[int]:
+        return [day for day in range(7) if self.weekend_mask >> day & 1]
+
+
+class HolidayCalendarService:
+    """Named holiday calendars, who follows which, and their per-year materialization.
+
+    An employee follows the calendar assigned to their department at their
+    location, else to their location, else to their department, else the
+    default calendar; with none of those, the company calendar (company-wide
+    holidays, Saturday and Sunday off). Recurring holidays repeat on the same
+    month and day every year from their own; the others only fall once.
+
+    Years are materialized into ``CalendarYear`` bitmaps on first use and kept
+    in ``holiday_cache`` with the assignments, so working-day counts read no
+    rows. Every calendar or holiday change publishes the ``holidays`` tag.
+    """
+
+    # Calendars
+    def get_calendars(self, db: Session) -> List[HolidayCalendar]:
+        return db.query(HolidayCalendar).order_by(HolidayCalendar.name).all()
+
+    def get_calendar(self, db: Session, calendar_id: int) -> Optional[HolidayCalendar]:
+        return db.get(HolidayCalendar, calendar_id)
+
+    def get_assignments(self, db: Session, calendar_id: int) -> List[HolidayCalendarAssignment]:
+        return db.query(HolidayCalendarAssignment).filter(
+            HolidayCalendarAssignment.calendar_id == calendar_id
+        ).order_by(HolidayCalendarAssignment.department, HolidayCalendarAssignment.location).all()
+
+    def calendar_response(self, db: Session, calendar: HolidayCalendar) -> dict:
+        """Calendar fields with weekend days and assignments, shaped like HolidayCalendarResponse"""
+        return {
+            "id": calendar.id,
+            "name": calendar.name,
+            "description": calendar.description,
+            "weekend_days": calendar.weekend_days,
+            "include_company_holidays": calendar.include_company_holidays,
+            "is_default": calendar.is_default,
+            "assignments": [{"department": assignment.department, "location": assignment.location}
+                            for assignment in self.get_assignments(db, calendar.id)],
+            "created_at": calendar.created_at,
+            "updated_at": calendar.updated_at,
+        }
+
+    def create_calendar(self, db: Session, calendar_data: HolidayCalendarCreate, created_by: User) -> HolidayCalendar:
+        """Create a calendar with its assignments (HR and Super Admin only)"""
+        self._check_manager(created_by)
+        self._check_assignments(db, None, calendar_data.assignments)
+        try:
+            if calendar_data.is_default:
+                self._clear_default(db)
+            calendar = HolidayCalendar(
+                name=calendar_data.name,
+                description=calendar_data.description,
+                weekend_mask=weekend_mask(calendar_data.weekend_days),
+                include_company_holidays=calendar_data.include_company_holidays,
+                is_default=calendar_data.is_default
+            )
+            db.add(calendar)
+            db.flush()
+            self._add_assignments(db, calendar.id, calendar_data.assignments)
+            db.commit()
+        except IntegrityError:
+            db.rollback()
+            raise ValueError("Calendar name or assignment already in use")
+        publish_invalidation(tags=["holidays"])
+        db.refresh(calendar)
+        logger.info(f"Holiday calendar created: {calendar.name}")
+        return calendar
+
+    def update_calendar(self, db: Session, calendar_id: int, calendar_data: HolidayCalendarUpdate,
+                        updated_by: User) -> Optional[HolidayCalendar]:
+        self._check_manager(updated_by)
+        calendar = self.get_calendar(db, calendar_id)
+        if calendar is None:
+            return None
+        changes = calendar_data.dict(exclude_unset=True)
+        if changes.get("is_default"):
+            self._clear_default(db)
+        if changes.get("weekend_days") is not None:
+            calendar.weekend_mask = weekend_mask(changes.pop("weekend_days"))
+        for field, value in changes.items():
+            if value is not None:
+                setattr(calendar, field, value)
+        try:
+            db.commit()
+        except IntegrityError:
+            db.rollback()
+            raise ValueError("Calendar name already in use")
+        publish_invalidation(tags=["holidays"])
+        db.refresh(calendar)
+        return calendar
+
+    def set_assignments(self, db: Session, calendar_id: int, assignments: List[HolidayCalendarAssignmentItem],
+                        updated_by: User) -> Optional[HolidayCalendar]:
+        """Replace the departments and locations that follow a calendar"""
+        self._check_manager(updated_by)
+        calendar = self.get_calendar(db, calendar_id)
+        if calendar is None:
+            return None
+        self._check_assignments(db, calendar_id, assignments)
+        try:
+            db.execute(delete(HolidayCalendarAssignment).where(HolidayCalendarAssignment.calendar_id == calendar_id))
+            self._add_assignments(db, calendar_id, assignments)
+            db.commit()
+        except IntegrityError:
+            db.rollback()
+            raise ValueError("A department or location is already assigned to another calendar")
+        publish_invalidation(tags=["holidays"])
+        return calendar
+
+    def delete_calendar(self, db: Session, calendar_id: int, deleted_by: User) -> bool:
+        """Delete a calendar, its own holidays and its assignments; its employees fall back to the default"""
+        self._check_manager(deleted_by)
+        calendar = self.get_calendar(db, calendar_id)
+        if calendar is None:
+            return False
+        # Not every database enforces ON DELETE CASCADE (SQLite needs a pragma)
+        db.execute(delete(HolidayCalendarAssignment).where(HolidayCalendarAssignment.calendar_id == calendar_id))
+        db.execute(delete(Holiday).where(Holiday.calendar_id == calendar_id))
+        db.delete(calendar)
+        db.commit()
+        publish_invalidation(tags=["holidays"])
+        return True
+
+    def _check_manager(self, user: User):
+        if user.role not in [UserRole.HR, UserRole.SUPER_ADMIN]:
+            raise ValueError("Only HR or Super Admin can manage holiday calendars")
+
+    def _clear_default(self, db: Session):
+        db.execute(update(HolidayCalendar).where(HolidayCalendar.is_default == True).values(is_default=False))
+
+    def _check_assignments(self, db: Session, calendar_id: Optional[int],
+                           assignments: List[HolidayCalendarAssignmentItem]):
+        """Reject assignments listed twice or already held by another calendar, before anything is written"""
+        keys = [(assignment.department or "", assignment.location or "") for assignment in assignments]
+        if len(set(keys)) != len(keys):
+            raise ValueError("The same department and location are listed twice")
+        if not keys:
+            return
+        key = tuple_(func.coalesce(HolidayCalendarAssignment.department, ""),
+                     func.coalesce(HolidayCalendarAssignment.location, ""))
+        query = select(HolidayCalendarAssignment.department, HolidayCalendarAssignment.location).where(key.in_(keys))
+        if calendar_id is not None:
+            query = query.where(HolidayCalendarAssignment.calendar_id != calendar_id)
+        taken = db.execute(query.limit(1)).first()
+        if taken is not None:
+            where = " at ".join(part for part in taken if part)
+            raise ValueError(f"{where} is already assigned to another calendar")
+
+    def _add_assignments(self, db: Session, calendar_id: int, assignments: List[HolidayCalendarAssignmentItem]):
+        for assignment in assignments:
+            db.add(HolidayCalendarAssignment(calendar_id=calendar_id, department=assignment.department or None,
+                                             location=assignment.location or None))
+        db.flush()
+
+    # Resolution
+    def _directory(self, db: Session) -> dict:
+        """Assignments, default calendar and calendar settings, cached until a calendar changes"""
+        return holiday_cache.get_or_set("holiday_calendars", lambda: self._load_directory(db), tags=["holidays"])
+
+    def _load_directory(self, db: Session) -> dict:
+        # Misses load from the primary, as every worker then shares the result (see primary_session)
+        with primary_session(db) as source:
+            calendars, assignments, default = {}, {}, None
+            for row in source.execute(select(
+                HolidayCalendar.id, HolidayCalendar.weekend_mask, HolidayCalendar.include_company_holidays,
+                HolidayCalendar.is_default, HolidayCalendarAssignment.department, HolidayCalendarAssignment.location,
+                HolidayCalendarAssignment.id.label("assignment_id")
+            ).outerjoin(HolidayCalendarAssignment, HolidayCalendarAssignment.calendar_id == HolidayCalendar.id)
+                                  .order_by(HolidayCalendar.id)):
+                calendars[row.id] = (row.weekend_mask, row.include_company_holidays)
+                if row.is_default and default is None:
+                    default = row.id
+                if row.assignment_id is not None:
+                    assignments[(row.department, row.location)] = row.id
+        return {"calendars": calendars, "default": default, "assignments": assignments}
+
+    def resolve_calendar_id(self, db: Session, department: Optional[str] = None,
+                            location: Optional[str] = None) -> Optional[int]:
+        """Calendar followed at a department and location; None for the company calendar"""
+        directory = self._directory(db)
+        assignments = directory["assignments"]
+        for key in ((department, location), (None, location), (department, None)):
+            if key != (None, None) and key in assignments:
+                return assignments[key]
+        return directory["default"]
+
+    def calendar_id_for(self, db: Session, employee: Optional[Employee]) -> Optional[int]:
+        if employee is None:
+            return self._directory(db)["default"]
+        return self.resolve_calendar_id(db, employee.department, employee.location)
+
+    # Materialization
+    def get_year(self, db: Session, calendar_id: Optional[int], year: int) -> CalendarYear:
+        return holiday_cache.get_or_set(
+            f"holiday_calendar:{calendar_id or 'company'}:{year}",
+            lambda: self._materialize(db, calendar_id, year),
+            tags=["holidays"]
+        )
+
+    def _materialize(self, db: Session, calendar_id: Optional[int], year: int) -> CalendarYear:
+        with primary_session(db) as source:
+            return self._materialize_from(source, calendar_id, year)
+
+    def _materialize_from(self, db: Session, calendar_id: Optional[int], year: int) -> CalendarYear:
+        mask, include_company = DEFAULT_WEEKEND_MASK, True
+        if calendar_id is not None:
+            settings = self._directory(db)["calendars"].get(calendar_id)
+            if settings is None:
+                raise ValueError(f"Holiday calendar {calendar_id} not found")
+            mask, include_company = settings
+
+        calendars = [Holiday.calendar_id == calendar_id] if calendar_id is not None else []
+        if include_company:
+            calendars.append(Holiday.calendar_id.is_(None))
+        year_start, year_end = date(year, 1, 1), date(year, 12, 31)
+        rows = db.execute(select(
+            Holiday.id, Holiday.calendar_id, Holiday.date, Holiday.name, Holiday.description, Holiday.is_recurring
+        ).where(
+            Holiday.is_active == True,
+            or_(*calendars),
+            or_(Holiday.date.between(year_start, year_end), and_(Holiday.is_recurring == True, Holiday.date < year_start))
+        )).all()
+
+        holidays = []
+        for row in rows:
+            day = row.date
+            if day.year != year:
+                if day.month == 2 and day.day == 29 and not isleap(year):
+                    continue  # A recurring February 29th only falls in leap years
+                day = day.replace(year=year)
+            holidays.append({"date": day, "name": row.name, "description": row.description,
+                             "holiday_id": row.id, "calendar_id": row.calendar_id})
+        return CalendarYear(calendar_id, year, mask, holidays)
+
+    def _years(self, db: Session, calendar_id: Optional[int], start_date: date, end_date: date) -> List[CalendarYear]:
+        return [self.get_year(db, calendar_id, year) for year in range(start_date.year, end_date.year + 1)]
+
+    def working_days(self, db: Session, calendar_id: Optional[int], start_date: date, end_date: date) -> int:
+        """Days from start_date to end_date (inclusive) that are neither weekend days nor holidays"""
+        return sum(year.working_days(start_date, end_date) for year in self._years(db, calendar_id, start_date, end_date))
+
+    def holiday_dates(self, db: Session, calendar_id: Optional[int], start_date: date, end_date: date) -> List[date]:
+        days = []
+        for year in self._years(db, calendar_id, start_date, end_date):
+            days.extend(year.holiday_dates(start_date, end_date))
+        return days
+
+    def upcoming_holidays(self, db: Session, calendar_id: Optional[int], start_date: date, limit: int) -> List[dict]:
+        """The next holidays from start_date on, looking into next year if this one runs out"""
+        holidays = []
+        for year in range(start_date.year, start_date.year + 2):
+            holidays.extend(holiday for holiday in self.get_year(db, calendar_id, year).holidays
+                            if holiday["date"] >= start_date)
+            if len(holidays) >= limit:
+                break
+        return holidays[:limit]
+
+    def year_response(self, db: Session, calendar_id: Optional[int], year: int) -> dict:
+        """A calendar's year shaped like CalendarYearResponse"""
+        calendar_year = self.get_year(db, calendar_id, year)
+        return {
+            "calendar_id": calendar_id,
+            "year": year,
+            "weekend_days": calendar_year.weekend_days(),
+            "working_days": _count_bits(calendar_year.working_bits),
+            "holidays": list(calendar_year.holidays),
+        }
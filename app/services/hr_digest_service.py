@@ -0,0 +1,122 @@
+from datetime import datetime
+from typing import List, Set, Tuple
+import asyncio
+from sqlalchemy import select, insert, delete
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+from app.options import option
+from app.database import fetch_rows
+from app.models.employee import Employee
+from app.models.leave_type import LeaveType
+from app.models.leave_request import LeaveRequest, LeaveStatus
+from app.models.hr_digest import HrDigestDelivery
+from app.services.container import get_email_service, get_user_service
+import logging
+
+logger = logging.getLogger(__name__)
+
+DIGEST_COLUMNS = (
+    LeaveRequest.id,
+    LeaveRequest.start_date,
+    LeaveRequest.end_date,
+    LeaveRequest.number_of_days,
+    LeaveRequest.reason,
+    LeaveRequest.created_at,
+    Employee.employee_id.label("employee_code"),
+    Employee.first_name,
+    Employee.last_name,
+    Employee.department,
+    LeaveType.name.label("leave_type"),
+)
+
+
+class HrDigestService:
+    """Pending-leave notifications for HR, batched into one email per recipient.
+
+    Submitting a leave request sends nothing by itself. Every digest window (the
+    ``send_hr_digest`` scheduler job, ``HR_DIGEST_CRON``) one query reads the
+    still-pending requests, joined to their employees and leave types, and each
+    active HR user gets a single email listing the ones they have not been sent
+    yet. Every request in a delivered email is recorded in ``HrDigestDelivery``;
+    a failed send records nothing, so the requests are retried in the next
+    window. Tracking the requests themselves rather than the newest id sent
+    matters because ids are assigned before commit: a request can become
+    visible after a higher id was already mailed. Requests decided before the
+    window closes are never mailed, and their delivery rows are pruned once
+    they are decided.
+
+    ``HR_NOTIFICATION_MODE=immediate`` runs the same pipeline right after each
+    submission instead.
+    """
+
+    def __init__(self):
+        self.email_service = get_email_service()
+        self.user_service = get_user_service()
+        self.mode = option("hr_notification_mode", "digest")
+
+    def get_pending_rows(self, db: Session) -> List[dict]:
+        """Pending leave requests, oldest first"""
+        return fetch_rows(db, select(*DIGEST_COLUMNS)
+                          .join(Employee, Employee.id == LeaveRequest.employee_id)
+                          .join(LeaveType, LeaveType.id == LeaveRequest.leave_type_id)
+                          .where(LeaveRequest.status == LeaveStatus.PENDING)
+                          .order_by(LeaveRequest.id))
+
+    def get_delivered(self, db: Session, hr_user_ids: List[int]) -> Set[Tuple[int, int]]:
+        """(HR user id, leave request id) of the pending requests already mailed to these users"""
+        return set(db.execute(select(HrDigestDelivery.hr_user_id, HrDigestDelivery.leave_request_id)
+                              .join(LeaveRequest, LeaveRequest.id == HrDigestDelivery.leave_request_id)
+                              .where(HrDigestDelivery.hr_user_id.in_(hr_user_ids),
+                                     LeaveRequest.status == LeaveStatus.PENDING)).all())
+
+    def send_digests(self, db: Session) -> int:
+        """Email each HR user the pending requests they have not been sent yet; returns emails sent"""
+        recipients = self.user_service.get_hr_contacts(db)
+        if not recipients:
+            return 0
+        self._prune(db)
+        rows = self.get_pending_rows(db)
+        if not rows:
+            db.commit()
+            return 0
+        delivered = self.get_delivered(db, [recipient["id"] for recipient in recipients])
+
+        batches = []
+        for recipient in recipients:
+            unseen = [row for row in rows if (recipient["id"], row["id"]) not in delivered]
+            if unseen:
+                batches.append((recipient, unseen))
+        sent = asyncio.run(self._send(batches)) if batches else []
+
+        now = datetime.utcnow()
+        self._record(db, [(recipient["id"], row["id"], now)
+                          for (recipient, unseen), ok in zip(batches, sent) if ok for row in unseen])
+        db.commit()
+        emails = sum(1 for ok in sent if ok)
+        logger.info(f"HR digest: {emails}/{len(batches)} emails covering {len(rows)} pending requests")
+        return emails
+
+    async def _send(self, batches) -> List[bool]:
+        return await asyncio.gather(*(
+            self.email_service.send_hr_leave_digest_email(recipient["email"], recipient["first_name"], unseen)
+            for recipient, unseen in batches
+        ))
+
+    def _record(self, db: Session, deliveries: List[Tuple[int, int, datetime]]):
+        """Insert delivery rows, skipping any another sender recorded meanwhile"""
+        if not deliveries:
+            return
+        values = [{"hr_user_id": hr_user_id, "leave_request_id": leave_request_id, "sent_at": sent_at}
+                  for hr_user_id, leave_request_id, sent_at in deliveries]
+        dialect = db.get_bind().dialect.name
+        if dialect in ("postgresql", "sqlite"):
+            insert_fn = postgresql.insert if dialect == "postgresql" else sqlite.insert
+            db.execute(insert_fn(HrDigestDelivery).on_conflict_do_nothing(), values)
+            return
+        db.execute(insert(HrDigestDelivery), values)
+
+    def _prune(self, db: Session):
+        """Drop the delivery rows of requests that are no longer pending"""
+        db.execute(delete(HrDigestDelivery).where(HrDigestDelivery.leave_request_id.in_(
+            select(LeaveRequest.id).where(LeaveRequest.status != LeaveStatus.PENDING)
+        )).execution_options(synchronize_session=False))
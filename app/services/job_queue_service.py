@@ -0,0 +1,139 @@
+from datetime import datetime, timedelta
+from typing import Optional, List, Dict, Any, Iterable
+import json
+from sqlalchemy import select, update
+from sqlalchemy.orm import Session
+from app.options import option
+from app.database import fetch_rows
+from app.models.user import User
+from app.models.background_job import BackgroundJob, BackgroundJobStatus
+import logging
+
+logger = logging.getLogger(__name__)
+
+JOB_COLUMNS = (
+    BackgroundJob.id, BackgroundJob.kind, BackgroundJob.status, BackgroundJob.progress,
+    BackgroundJob.progress_message, BackgroundJob.error, BackgroundJob.attempts, BackgroundJob.worker,
+    BackgroundJob.created_by_id, BackgroundJob.created_at, BackgroundJob.started_at, BackgroundJob.finished_at,
+)
+FINISHED = (BackgroundJobStatus.SUCCEEDED.value, BackgroundJobStatus.FAILED.value)
+
+
+class JobQueueService:
+    """Background jobs persisted in ``background_jobs``.
+
+    HTTP handlers ``enqueue`` and return; workers (``app.worker``) ``claim`` the
+    oldest queued job with ``SELECT ... FOR UPDATE SKIP LOCKED`` on PostgreSQL, so
+    any number of worker processes can poll the same table without blocking each
+    other. On SQLite, which serializes writers anyway, the claim is a conditional
+    UPDATE that only one worker can win. Workers heartbeat their running jobs;
+    jobs whose worker stopped heartbeating are requeued up to ``max_attempts``.
+    """
+
+    def __init__(self):
+        self.stale_seconds = option("job_stale_seconds", 300)
+        self.max_attempts = option("job_max_attempts", 3)
+
+    # Producers
+    def enqueue(self, db: Session, kind: str, payload: Dict[str, Any], created_by: Optional[User] = None) -> BackgroundJob:
+        """Queue a validated job payload (see ``app.background_jobs``); dates are stored as ISO strings"""
+        job = BackgroundJob(
+            kind=kind,
+            status=BackgroundJobStatus.QUEUED.value,
+            payload=json.dumps(payload, default=str),
+            created_by_id=created_by.id if created_by else None
+        )
+        db.add(job)
+        db.commit()
+        db.refresh(job)
+        logger.info(f"Queued {kind} job {job.id}")
+        return job
+
+    def get_job_row(self, db: Session, job_id: int) -> Optional[dict]:
+        rows = fetch_rows(db, select(*JOB_COLUMNS).where(BackgroundJob.id == job_id))
+        return rows[0] if rows else None
+
+    def get_job_rows(self, db: Session, kind: Optional[str] = None, status: Optional[str] = None,
+                     limit: int = 50) -> List[dict]:
+        query = select(*JOB_COLUMNS).order_by(BackgroundJob.id.desc()).limit(limit)
+        if kind:
+            query = query.where(BackgroundJob.kind == kind)
+        if status:
+            query = query.where(BackgroundJob.status == status)
+        return fetch_rows(db, query)
+
+    def get_result(self, db: Session, job_id: int) -> Optional[dict]:
+        row = db.execute(select(
+            BackgroundJob.id, BackgroundJob.kind, BackgroundJob.status, BackgroundJob.result, BackgroundJob.error
+        ).where(BackgroundJob.id == job_id)).mappings().first()
+        if row is None:
+            return None
+        if row["status"] not in FINISHED:
+            raise ValueError("Job has not finished yet")
+        return {**row, "result": json.loads(row["result"]) if row["result"] else None}
+
+    # Workers
+    def claim(self, db: Session, worker: str) -> Optional[int]:
+        """Take the oldest queued job for this worker; returns its id, or None if the queue is empty"""
+        query = (select(BackgroundJob.id).where(BackgroundJob.status == BackgroundJobStatus.QUEUED.value)
+                 .order_by(BackgroundJob.id).limit(1))
+        if db.get_bind().dialect.name == "postgresql":
+            query = query.with_for_update(skip_locked=True)
+        job_id = db.execute(query).scalar()
+        if job_id is None:
+            db.rollback()
+            return None
+
+        now = datetime.utcnow()
+        claimed = db.execute(update(BackgroundJob).where(
+            BackgroundJob.id == job_id, BackgroundJob.status == BackgroundJobStatus.QUEUED.value
+        ).values(
+            status=BackgroundJobStatus.RUNNING.value, worker=worker, started_at=now, heartbeat_at=now,
+            attempts=BackgroundJob.attempts + 1, progress=0, progress_message=None
+        )).rowcount
+        db.commit()
+        return job_id if claimed else None
+
+    def heartbeat(self, db: Session, job_ids: Iterable[int]):
+        job_ids = list(job_ids)
+        if job_ids:
+            db.execute(update(BackgroundJob).where(
+                BackgroundJob.id.in_(job_ids), BackgroundJob.status == BackgroundJobStatus.RUNNING.value
+            ).values(heartbeat_at=datetime.utcnow()))
+            db.commit()
+
+    def report_progress(self, db: Session, job_id: int, worker: str, progress: float, message: Optional[str] = None):
+        db.execute(update(BackgroundJob).where(BackgroundJob.id == job_id, BackgroundJob.worker == worker).values(
+            progress=max(0.0, min(progress, 1.0)), progress_message=message, heartbeat_at=datetime.utcnow()
+        ))
+        db.commit()
+
+    def finish(self, db: Session, job_id: int, worker: str, result: Optional[dict] = None,
+               error: Optional[str] = None):
+        """Record the outcome, unless the job was meanwhile requeued to another worker"""
+        db.execute(update(BackgroundJob).where(
+            BackgroundJob.id == job_id, BackgroundJob.worker == worker,
+            BackgroundJob.status == BackgroundJobStatus.RUNNING.value
+        ).values(
+            status=BackgroundJobStatus.FAILED.value if error else BackgroundJobStatus.SUCCEEDED.value,
+            result=json.dumps(result, default=str) if result is not None else None,
+            error=error,
+            progress=1.0 if not error else BackgroundJob.progress,
+            finished_at=datetime.utcnow()
+        ))
+        db.commit()
+
+    def requeue_stale(self, db: Session) -> int:
+        """Requeue running jobs whose worker stopped heartbeating; fail them after max_attempts"""
+        cutoff = datetime.utcnow() - timedelta(seconds=self.stale_seconds)
+        stale = (BackgroundJob.status == BackgroundJobStatus.RUNNING.value, BackgroundJob.heartbeat_at < cutoff)
+        requeued = db.execute(update(BackgroundJob).where(*stale, BackgroundJob.attempts < self.max_attempts).values(
+            status=BackgroundJobStatus.QUEUED.value, worker=None
+        )).rowcount
+        failed = db.execute(update(BackgroundJob).where(*stale).values(
+            status=BackgroundJobStatus.FAILED.value, error="Worker stopped responding", finished_at=datetime.utcnow()
+        )).rowcount
+        db.commit()
+        if requeued or failed:
+            logger.warning(f"Stale background jobs: {requeued} requeued, {failed} failed")
+        return requeued
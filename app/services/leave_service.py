@@ -1,30 +1,75 @@
-from datetime import datetime, date, timedelta
+from datetime import datetime, date
 from typing import Optional, List, Dict
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.orm import Session, joinedload
 from sqlalchemy.exc import IntegrityError
+from app.database import fetch_rows, primary_session, project_columns
+from pydantic import ValidationError
+from app.cache import leave_type_cache, balance_cache, publish_invalidation
+from app.request_cache import request_cache
+from app.leave_units import MINUTES_PER_DAY, hours_to_minutes, minutes_to_days
 from app.models.user import User, UserRole
 from app.models.employee import Employee
 from app.models.leave_type import LeaveType
-from app.models.leave_balance import EmployeeLeaveBalance
 from app.models.leave_request import LeaveRequest, LeaveStatus
 from app.models.leave_audit import LeaveRequestAudit, AuditAction
 from app.models.holiday import Holiday
+from app.models.leave_ledger import BalanceMovementKind
 from app.schemas.leave import (
     LeaveTypeCreate, LeaveTypeUpdate, LeaveRequestCreate, LeaveRequestUpdate,
-    LeaveDurationType, LeaveTypeCategory
+    LeaveDurationType, LeaveTypeCategory, LeaveBulkDecisionItem, LeaveBulkDecisionResult, LeaveDecision,
+    LeaveRequestValidationItem, LeaveRequestValidationResult, LeaveQuoteResponse
 )
-from app.services.employee_service import EmployeeService
-from app.services.email_service import EmailService
+from app.services.container import (
+    get_employee_service, get_email_service, get_ledger_service, get_analytics_service, get_audit_archive_service,
+    get_leave_policy_service, get_hr_digest_service, get_holiday_calendar_service
+)
+from app.services.calendar_feed_service import feed_tags
 import logging
 from app.schemas.leave import LeaveTypeResponse
 
 logger = logging.getLogger(__name__)
 
+# Past tense of each bulk decision, for error messages
+_DECISION_VERBS = {
+    LeaveDecision.APPROVE: "approved",
+    LeaveDecision.REJECT: "rejected",
+    LeaveDecision.CANCEL: "cancelled",
+}
+
+# Columns documented by LeaveRequestResponse, selected directly for list endpoints
+LEAVE_REQUEST_LIST_COLUMNS = (
+    LeaveRequest.id,
+    LeaveRequest.employee_id,
+    LeaveRequest.leave_type_id,
+    LeaveRequest.start_date,
+    LeaveRequest.end_date,
+    LeaveRequest.duration_type,
+    LeaveRequest.start_half,
+    LeaveRequest.hours,
+    LeaveRequest.number_of_minutes,
+    LeaveRequest.number_of_days,
+    LeaveRequest.reason,
+    LeaveRequest.status,
+    LeaveRequest.approved_by_id,
+    LeaveRequest.approved_at,
+    LeaveRequest.rejection_reason,
+    LeaveRequest.medical_proof,
+    LeaveRequest.documentation,
+    LeaveRequest.created_at,
+    LeaveRequest.updated_at,
+)
+
 
 class LeaveService:
     def __init__(self):
-        self.employee_service = EmployeeService()
-        self.email_service = EmailService()
+        self.employee_service = get_employee_service()
+        self.email_service = get_email_service()
+        self.ledger_service = get_ledger_service()
+        self.analytics_service = get_analytics_service()
+        self.audit_archive_service = get_audit_archive_service()
+        self.leave_policy_service = get_leave_policy_service()
+        self.holiday_calendar_service = get_holiday_calendar_service()
     
     def create_leave_type(self, db: Session, leave_type_data: LeaveTypeCreate, created_by: User) -> Optional[LeaveType]:
         """Create a new leave type (only HR and Super Admin can do this)"""
@@ -35,6 +80,7 @@ class LeaveService:
             leave_type = LeaveType(**leave_type_data.dict())
             db.add(leave_type)
             db.commit()
+            publish_invalidation(tags=["leave_types"])
             db.refresh(leave_type)
             
             logger.info(f"Leave type created: {leave_type.name}")
@@ -50,8 +96,17 @@ class LeaveService:
             raise
     
     def get_leave_type_by_id(self, db: Session, leave_type_id: int) -> Optional[LeaveType]:
-        """Get leave type by ID"""
-        return db.query(LeaveType).filter(LeaveType.id == leave_type_id).first()
+        """Get leave type by ID, memoized for the request"""
+        return request_cache(db).get_or_load(
+            ("leave_type", leave_type_id), lambda: db.query(LeaveType).filter(LeaveType.id == leave_type_id).first()
+        )
+    
+    def get_leave_type_rows(self, db: Session) -> List[dict]:
+        """All leave types shaped like LeaveTypeResponse, cached until a leave type changes"""
+        def load():
+            with primary_session(db) as source:  # Shared by every worker, so never from a lagging replica
+                return [LeaveTypeResponse.from_orm(leave_type).dict() for leave_type in source.query(LeaveType).all()]
+        return leave_type_cache.get_or_set("leave_types:all", load, tags=["leave_types"])
     
     def get_all_leave_types(self, db: Session, active_only: bool = True) -> List[LeaveType]:
         """Get all leave types"""
@@ -76,6 +131,7 @@ class LeaveService:
         
         leave_type.updated_at = datetime.utcnow()
         db.commit()
+        publish_invalidation(tags=["leave_types"])
         db.refresh(leave_type)
         return leave_type
     
@@ -90,9 +146,6 @@ class LeaveService:
             employee = self.employee_service.get_employee_by_user_id(db, employee_user.id)
             if not employee:
                 raise ValueError("Employee record not found")
-
-            if self._employee_on_probation(db, employee.id):
-                raise ValueError("Employees on probation cannot apply for leave")
             
             # Get leave type for validation
             leave_type = self.get_leave_type_by_id(db, leave_request_data.leave_type_id)
@@ -100,23 +153,19 @@ class LeaveService:
                 raise ValueError("Selected leave type is not available")
             
             # Enhanced business logic validations
-            self._validate_leave_request_business_rules(db, leave_request_data, employee.id, leave_type)
+            calendar_id = self.holiday_calendar_service.calendar_id_for(db, employee)
+            self._validate_leave_request_business_rules(db, leave_request_data, employee.id, leave_type, calendar_id)
             
-            # Calculate number of days (now supports half-days and hours)
+            # Calculate the leave requested, in minutes (supports half-days and hours)
             start_date = leave_request_data.start_date
             end_date = leave_request_data.end_date
             duration_type = leave_request_data.duration_type
-            
-            if duration_type == LeaveDurationType.HOURLY:
-                number_of_days = leave_request_data.hours / 8.0  # Convert hours to days
-            elif duration_type == LeaveDurationType.HALF_DAY:
-                number_of_days = self._calculate_half_day_leave_days(db, start_date, end_date)
-            else:
-                number_of_days = self._calculate_leave_days(db, start_date, end_date)
+            number_of_minutes = self._calculate_requested_minutes(db, duration_type, start_date, end_date,
+                                                                  leave_request_data.hours, calendar_id)
             
             # Validate leave balance (with special rules for sick leave)
             if not self._validate_leave_balance(db, employee.id, leave_request_data.leave_type_id, 
-                                              number_of_days, leave_type, leave_request_data.medical_proof):
+                                              number_of_minutes, leave_type, leave_request_data.medical_proof):
                 raise ValueError("Insufficient leave balance")
             
             # Create leave request
@@ -128,7 +177,7 @@ class LeaveService:
                 duration_type=duration_type.value,
                 start_half=leave_request_data.start_half,
                 hours=leave_request_data.hours,
-                number_of_days=number_of_days,
+                number_of_minutes=number_of_minutes,
                 reason=leave_request_data.reason,
                 medical_proof=leave_request_data.medical_proof,
                 documentation=leave_request_data.documentation,
@@ -136,21 +185,28 @@ class LeaveService:
             )
             
             db.add(leave_request)
-            db.commit()
-            db.refresh(leave_request)
+            db.flush()
             
-            # Update pending days in leave balance
+            # Reserve the requested days in the balance ledger
             self._update_pending_leave_balance(db, employee.id, leave_request_data.leave_type_id, 
-                                            number_of_days, add=True)
+                                            number_of_minutes, add=True, leave_request_id=leave_request.id)
             
             # Create audit log
             self._create_audit_log(db, leave_request.id, AuditAction.CREATED, employee_user.id)
+            self.analytics_service.record_transition(db, leave_request, employee.department,
+                                                     None, LeaveStatus.PENDING)
+            
+            # Committing expires the employee; keep its id rather than reloading it
+            employee_id = employee.id
+            db.commit()
+            self._publish_balance_change([employee_id])
+            db.refresh(leave_request)
             
             # Send notification email to HR
             self._notify_hr_leave_request(db, leave_request)
             
             # Console log for leave application
-            logger.info(f"Leave request created: {leave_request.id} by employee {employee.id} for {number_of_days} days")
+            logger.info(f"Leave request created: {leave_request.id} by employee {employee_id} for {minutes_to_days(number_of_minutes)} days")
             
             return leave_request
             
@@ -160,157 +216,157 @@ class LeaveService:
             raise
 
     def _validate_leave_request_business_rules(self, db: Session, leave_request_data: LeaveRequestCreate, 
-                                             employee_id: int, leave_type: LeaveType):
-        """Enhanced validation for leave requests"""
-        start_date = leave_request_data.start_date
-        end_date = leave_request_data.end_date
-        duration_type = leave_request_data.duration_type
-        
-        # 1. Check leave type specific rules
-        if duration_type == LeaveDurationType.HALF_DAY and not leave_type.allow_half_day:
-            raise ValueError(f"Leave type '{leave_type.name}' does not support half-day leaves")
-        
-        if duration_type == LeaveDurationType.HOURLY and not leave_type.allow_hourly:
-            raise ValueError(f"Leave type '{leave_type.name}' does not support hourly leaves")
-        
-        # 2. Maximum consecutive days (leave type specific)
-        max_consecutive_days = leave_type.max_consecutive_days
-        if (end_date - start_date).days + 1 > max_consecutive_days:
-            raise ValueError(f"Leave request cannot exceed {max_consecutive_days} consecutive days for this leave type")
-        
-        # 3. Check for overlapping leave requests
-        if self._has_overlapping_leave_requests(db, employee_id, start_date, end_date):
-            raise ValueError("You have overlapping leave requests for these dates")
-        
-        # 4. Check if dates fall within company holidays
-        holiday_dates = self._get_holiday_dates(db, start_date, end_date)
+                                             employee_id: int, leave_type: LeaveType, calendar_id: Optional[int] = None):
+        """Apply the leave type's compiled policy; raises ValueError on the first violation"""
+        self.leave_policy_service.validate(db, leave_request_data, employee_id, leave_type)
+        
+        holiday_dates = self._get_holiday_dates(db, leave_request_data.start_date, leave_request_data.end_date,
+                                                calendar_id)
         if holiday_dates:
             logger.warning(f"Leave request dates include holidays: {holiday_dates}")
+
+    def validate_leave_requests(self, db: Session, items: List[LeaveRequestValidationItem],
+                                requesting_user: User) -> List[LeaveRequestValidationResult]:
+        """Dry-run policy validation of many leave requests, e.g. before a bulk import"""
+        if requesting_user.role not in [UserRole.HR, UserRole.SUPER_ADMIN]:
+            raise ValueError("Only HR or Super Admin can validate leave requests in bulk")
         
-        # 5. Check if employee is on probation
-        if self._employee_on_probation(db, employee_id):
-            raise ValueError("Employees on probation cannot apply for leave")
-        
-        # 6. Check if dates are within current year
-        current_year = datetime.now().year
-        if start_date.year != current_year or end_date.year != current_year:
-            raise ValueError("Leave requests can only be made for the current year")
-        
-        # 7. Check if employee has any pending disciplinary actions
-        if self._employee_has_disciplinary_actions(db, employee_id):
-            raise ValueError("Leave requests are restricted due to pending disciplinary actions")
+        errors = self.leave_policy_service.validate_batch(db, [(item.employee_id, item.request) for item in items])
+        return [
+            LeaveRequestValidationResult(index=index, employee_id=item.employee_id, valid=error is None, error=error)
+            for index, (item, error) in enumerate(zip(items, errors))
+        ]
+
+    def quote_leave_request(self, db: Session, employee_user: User, leave_type_id: int, start_date: date,
+                            end_date: date, duration_type: LeaveDurationType = LeaveDurationType.FULL_DAY,
+                            start_half: str = None, hours: float = None, medical_proof: str = None,
+                            documentation: str = None) -> LeaveQuoteResponse:
+        """What a leave request would cost and why it would be refused, without writing anything.
+
+        Backed by the employee's materialized holiday calendar and the short-lived ``balance_cache``,
+        so it is cheap enough to call on every date change in the apply form.
+        """
+        if employee_user.role != UserRole.EMPLOYEE:
+            raise ValueError("Only employees can quote leave requests")
+        if end_date < start_date:
+            raise ValueError("End date must be after start date")
         
-        # 8. Validate documentation requirements
-        if leave_type.requires_documentation and not leave_request_data.documentation:
-            raise ValueError(f"Documentation is required for {leave_type.name} leaves")
+        employee = self.employee_service.get_employee_by_user_id(db, employee_user.id)
+        if not employee:
+            raise ValueError("Employee record not found")
+        leave_type = self.get_leave_type_by_id(db, leave_type_id)
+        if not leave_type or not leave_type.is_active:
+            raise ValueError("Selected leave type is not available")
         
-        # 9. Validate medical proof for sick leave exceeding balance
-        if leave_type.category == LeaveTypeCategory.SICK and leave_request_data.medical_proof:
-            if not leave_request_data.medical_proof.strip():
-                raise ValueError("Medical proof is required for sick leave exceeding balance")
+        fields = dict(
+            leave_type_id=leave_type_id, start_date=start_date, end_date=end_date, duration_type=duration_type,
+            start_half=start_half, hours=hours, medical_proof=medical_proof, documentation=documentation,
+            reason="Leave quote (not submitted)"
+        )
+        violations = []
+        try:
+            leave_request_data = LeaveRequestCreate(**fields)
+        except ValidationError as e:
+            # Report field errors alongside policy ones rather than stopping at the first
+            violations.extend(error["msg"] for error in e.errors())
+            leave_request_data = LeaveRequestCreate.construct(**fields)
+        violations.extend(self.leave_policy_service.violations(db, leave_request_data, employee.id, leave_type))
+        
+        calendar_id = self.holiday_calendar_service.calendar_id_for(db, employee)
+        requested = None
+        if duration_type != LeaveDurationType.HOURLY or hours:
+            requested = self._calculate_requested_minutes(db, duration_type, start_date, end_date, hours, calendar_id)
+        
+        balance = self.get_cached_balance(db, employee.id, leave_type_id, datetime.now().year)
+        available = balance["available_minutes"] if balance else None
+        projected = available - requested if available is not None and requested is not None else None
+        if requested is not None and not self._balance_covers(leave_type, available, requested, medical_proof):
+            violations.append("Insufficient leave balance")
+        
+        return LeaveQuoteResponse(
+            leave_type_id=leave_type_id,
+            start_date=start_date,
+            end_date=end_date,
+            duration_type=duration_type,
+            calendar_days=(end_date - start_date).days + 1,
+            working_days=minutes_to_days(requested),
+            holidays=self._get_holiday_dates(db, start_date, end_date, calendar_id),
+            available_balance=minutes_to_days(available),
+            projected_balance=minutes_to_days(projected),
+            violations=violations,
+            can_submit=not violations
+        )
 
-    def _has_overlapping_leave_requests(self, db: Session, employee_id: int, 
-                                      start_date: date, end_date: date) -> bool:
-        """Check if employee has overlapping leave requests"""
-        overlapping_requests = db.query(LeaveRequest).filter(
-            LeaveRequest.employee_id == employee_id,
-            LeaveRequest.status.in_([LeaveStatus.PENDING, LeaveStatus.APPROVED]),
-            # Check for overlap: new start < existing end AND new end > existing start
-            LeaveRequest.start_date <= end_date,
-            LeaveRequest.end_date >= start_date
-        ).first()
-        
-        return overlapping_requests is not None
+    def get_cached_balance(self, db: Session, employee_id: int, leave_type_id: int, year: int) -> Optional[dict]:
+        """Current ledger balance as a dict, cached briefly per employee for read-only callers.
 
-    def _get_holiday_dates(self, db: Session, start_date: date, end_date: date) -> List[date]:
-        """Get holiday dates within the leave period"""
-        holidays = db.query(Holiday).filter(
-            Holiday.date >= start_date,
-            Holiday.date <= end_date,
-            Holiday.is_active == True
-        ).all()
-        
-        return [holiday.date for holiday in holidays]
+        Entries carry the ``balances:{employee_id}`` tag every balance change
+        publishes (and ``balances`` for bulk writers such as accrual runs), so the
+        TTL only bounds staleness from writers that bypass them.
+        """
+        def load():
+            balance = self.ledger_service.peek_balance(db, employee_id, leave_type_id, year)
+            return balance.dict() if balance else None
+        return balance_cache.get_or_set(
+            f"balance:{employee_id}:{leave_type_id}:{year}", load, tags=[f"balances:{employee_id}", "balances"]
+        )
 
-    def _calculate_half_day_leave_days(self, db: Session, start_date: date, end_date: date) -> float:
-        """Calculate half-day leave days excluding weekends and holidays"""
-        days = 0.0
-        current_date = start_date
-        
-        while current_date <= end_date:
-            if current_date.weekday() < 5:  # Monday to Friday (0-4)
-                # Check if it's a holiday
-                holiday = db.query(Holiday).filter(
-                    Holiday.date == current_date,
-                    Holiday.is_active == True
-                ).first()
-                
-                if not holiday:  # Only count non-holiday weekdays
-                    days += 0.5  # Half day
-            current_date += timedelta(days=1)
-        
-        return days
+    def _get_holiday_dates(self, db: Session, start_date: date, end_date: date,
+                           calendar_id: Optional[int] = None) -> List[date]:
+        """Holiday dates within the leave period, in a holiday calendar (default: the company's)"""
+        return self.holiday_calendar_service.holiday_dates(db, calendar_id, start_date, end_date)
 
-    def _calculate_leave_days(self, db: Session, start_date: date, end_date: date) -> float:
-        """Calculate number of leave days excluding weekends and holidays"""
-        days = 0.0
-        current_date = start_date
-        
-        while current_date <= end_date:
-            if current_date.weekday() < 5:  # Monday to Friday (0-4)
-                # Check if it's a holiday
-                holiday = db.query(Holiday).filter(
-                    Holiday.date == current_date,
-                    Holiday.is_active == True
-                ).first()
-                
-                if not holiday:  # Only count non-holiday weekdays
-                    days += 1.0
-            current_date += timedelta(days=1)
-        
-        return days
+    def _count_working_days(self, db: Session, start_date: date, end_date: date,
+                            calendar_id: Optional[int] = None) -> int:
+        """Calculate number of leave days excluding the calendar's weekend days and holidays"""
+        return self.holiday_calendar_service.working_days(db, calendar_id, start_date, end_date)
+
+    def _calculate_requested_minutes(self, db: Session, duration_type: LeaveDurationType, start_date: date,
+                                     end_date: date, hours: float = None, calendar_id: Optional[int] = None) -> int:
+        """Minutes of leave a request draws from the balance, by duration type"""
+        if duration_type == LeaveDurationType.HOURLY:
+            return hours_to_minutes(hours)
+        working_days = self._count_working_days(db, start_date, end_date, calendar_id)
+        if duration_type == LeaveDurationType.HALF_DAY:
+            return working_days * MINUTES_PER_DAY // 2
+        return working_days * MINUTES_PER_DAY
 
     def _validate_leave_balance(self, db: Session, employee_id: int, leave_type_id: int, 
-                               requested_days: float, leave_type: LeaveType, medical_proof: str = None) -> bool:
+                               requested_minutes: int, leave_type: LeaveType, medical_proof: str = None) -> bool:
         """Enhanced leave balance validation with special rules"""
         current_year = datetime.now().year
-        balance = db.query(EmployeeLeaveBalance).filter(
-            EmployeeLeaveBalance.employee_id == employee_id,
-            EmployeeLeaveBalance.leave_type_id == leave_type_id,
-            EmployeeLeaveBalance.year == current_year
-        ).first()
+        # Locked so the reservation recorded next cannot interleave with a compaction
+        balance = self.ledger_service.get_balance(db, employee_id, leave_type_id, current_year, lock=True)
         
-        if not balance:
+        # Ledger balances already net out pending leave
+        available_minutes = balance.available_minutes if balance else None
+        return self._balance_covers(leave_type, available_minutes, requested_minutes, medical_proof)
+
+    def _balance_covers(self, leave_type: LeaveType, available_minutes: Optional[int], requested_minutes: int,
+                        medical_proof: str = None) -> bool:
+        if available_minutes is None:
             return False
         
-        available_balance = balance.available_balance - balance.pending_days
-        
         # Special rule for sick leave with medical proof
         if leave_type.category == LeaveTypeCategory.SICK and leave_type.can_exceed_balance and medical_proof:
-            logger.info(f"Sick leave with medical proof - allowing balance exceed for employee {employee_id}")
+            logger.info(f"Sick leave with medical proof - allowing balance exceed for leave type {leave_type.id}")
             return True
         
-        return available_balance >= requested_days
+        return available_minutes >= requested_minutes
 
     def _update_pending_leave_balance(self, db: Session, employee_id: int, leave_type_id: int, 
-                                    days: float, add: bool = True):
-        """Update pending days in leave balance"""
+                                    minutes: int, add: bool = True, leave_request_id: int = None):
+        """Reserve or release pending leave by appending to the balance ledger (committed by the caller)"""
         current_year = datetime.now().year
-        balance = db.query(EmployeeLeaveBalance).filter(
-            EmployeeLeaveBalance.employee_id == employee_id,
-            EmployeeLeaveBalance.leave_type_id == leave_type_id,
-            EmployeeLeaveBalance.year == current_year
-        ).first()
-        
-        if balance:
-            if add:
-                balance.pending_days += days
-            else:
-                balance.pending_days = max(0, balance.pending_days - days)
-            
-            balance.available_balance = (balance.allocated_days - balance.used_days - 
-                                       balance.pending_days + balance.carried_forward_days)
-            db.commit()
+        kind = BalanceMovementKind.RESERVE if add else BalanceMovementKind.RELEASE
+        self.ledger_service.record(db, employee_id, leave_type_id, current_year, kind, minutes, leave_request_id)
+    
+    def _consume_pending_leave_balance(self, db: Session, employee_id: int, leave_type_id: int, 
+                                     minutes: int, leave_request_id: int = None):
+        """Move pending leave to used leave when a request is approved (committed by the caller)"""
+        current_year = datetime.now().year
+        self.ledger_service.record(db, employee_id, leave_type_id, current_year,
+                                   BalanceMovementKind.CONSUME, minutes, leave_request_id)
     
     def approve_leave_request(self, db: Session, leave_request_id: int, approved_by: User, 
                             comments: str = None) -> Optional[LeaveRequest]:
@@ -332,22 +388,26 @@ class LeaveService:
             leave_request.approved_by_id = approved_by.id
             leave_request.approved_at = datetime.utcnow()
             
-            # Update leave balance
-            self._update_pending_leave_balance(db, leave_request.employee_id, 
-                                            leave_request.leave_type_id, leave_request.number_of_days, add=False)
+            # Update leave balance (pending leave becomes used leave)
+            self._consume_pending_leave_balance(db, leave_request.employee_id, leave_request.leave_type_id,
+                                              leave_request.number_of_minutes, leave_request.id)
             
             # Create audit log
             self._create_audit_log(db, leave_request.id, AuditAction.APPROVED, approved_by.id, 
                                  old_status=LeaveStatus.PENDING.value, new_status=LeaveStatus.APPROVED.value,
                                  comments=comments)
+            self._record_rollup_transition(db, leave_request, LeaveStatus.PENDING, LeaveStatus.APPROVED,
+                                           approved_by.id)
             
             # Send notification email to employee
             self._notify_employee_leave_decision(db, leave_request, LeaveStatus.APPROVED)
             
             # Console log for leave approval
             logger.info(f"Leave request {leave_request_id} approved by {approved_by.id} for employee {leave_request.employee_id}")
+            feed_employees = [(leave_request.employee_id, leave_request.employee.department)]
             
             db.commit()
+            self._publish_balance_change([leave_request.employee_id], feed_employees)
             return leave_request
             
         except Exception as e:
@@ -376,12 +436,15 @@ class LeaveService:
             
             # Update leave balance (remove pending days)
             self._update_pending_leave_balance(db, leave_request.employee_id, 
-                                            leave_request.leave_type_id, leave_request.number_of_days, add=False)
+                                            leave_request.leave_type_id, leave_request.number_of_minutes, add=False,
+                                            leave_request_id=leave_request.id)
             
             # Create audit log
             self._create_audit_log(db, leave_request.id, AuditAction.REJECTED, rejected_by.id,
                                  old_status=LeaveStatus.PENDING.value, new_status=LeaveStatus.REJECTED.value,
                                  comments=rejection_reason)
+            self._record_rollup_transition(db, leave_request, LeaveStatus.PENDING, LeaveStatus.REJECTED,
+                                           rejected_by.id)
             
             # Send notification email to employee
             self._notify_employee_leave_decision(db, leave_request, LeaveStatus.REJECTED)
@@ -390,6 +453,7 @@ class LeaveService:
             logger.info(f"Leave request {leave_request_id} rejected by {rejected_by.id} for employee {leave_request.employee_id}")
             
             db.commit()
+            self._publish_balance_change([leave_request.employee_id])
             return leave_request
             
         except Exception as e:
@@ -417,27 +481,34 @@ class LeaveService:
             raise ValueError("Leave request cannot be cancelled in its current status")
         
         try:
-            old_status = leave_request.status
+            old_status = LeaveStatus(leave_request.status)
             leave_request.status = LeaveStatus.CANCELLED
             
             # Update leave balance
             if old_status == LeaveStatus.PENDING:
                 self._update_pending_leave_balance(db, leave_request.employee_id, 
-                                                leave_request.leave_type_id, leave_request.number_of_days, add=False)
+                                                leave_request.leave_type_id, leave_request.number_of_minutes, add=False,
+                                                leave_request_id=leave_request.id)
             elif old_status == LeaveStatus.APPROVED:
                 # Refund used days
                 self._refund_used_leave_balance(db, leave_request.employee_id, 
-                                              leave_request.leave_type_id, leave_request.number_of_days)
+                                              leave_request.leave_type_id, leave_request.number_of_minutes,
+                                              leave_request.id)
             
             # Create audit log
             self._create_audit_log(db, leave_request.id, AuditAction.CANCELLED, cancelled_by.id,
                                  old_status=old_status.value, new_status=LeaveStatus.CANCELLED.value,
                                  comments=comments)
+            self._record_rollup_transition(db, leave_request, old_status, LeaveStatus.CANCELLED)
             
             # Console log for leave cancellation
             logger.info(f"Leave request {leave_request_id} cancelled by {cancelled_by.id} for employee {leave_request.employee_id}")
+            # Only approved leave shows in the calendar feeds
+            feed_employees = [(leave_request.employee_id, leave_request.employee.department)] \
+                if old_status == LeaveStatus.APPROVED else []
             
             db.commit()
+            self._publish_balance_change([leave_request.employee_id], feed_employees)
             return leave_request
             
         except Exception as e:
@@ -445,20 +516,138 @@ class LeaveService:
             logger.error(f"Error cancelling leave request: {e}")
             raise
     
-    def _refund_used_leave_balance(self, db: Session, employee_id: int, leave_type_id: int, days: float):
-        """Refund used leave balance when request is cancelled"""
-        current_year = datetime.now().year
-        balance = db.query(EmployeeLeaveBalance).filter(
-            EmployeeLeaveBalance.employee_id == employee_id,
-            EmployeeLeaveBalance.leave_type_id == leave_type_id,
-            EmployeeLeaveBalance.year == current_year
-        ).first()
+    def bulk_decide_leave_requests(self, db: Session, items: List[LeaveBulkDecisionItem],
+                                   performed_by: User) -> tuple[List[LeaveBulkDecisionResult], List[dict]]:
+        """Approve, reject or cancel many leave requests in a single transaction (HR and Super Admin only).
+        
+        Returns per-item outcomes and the employee notifications to send once committed.
+        """
+        if performed_by.role not in [UserRole.HR, UserRole.SUPER_ADMIN]:
+            raise ValueError("Only HR or Super Admin can decide leave requests")
+        
+        # Lock and load every affected request with its employee and user in one query.
+        # Balances only take a shared lock: decisions append ledger movements without checking them.
+        request_ids = [item.request_id for item in items]
+        leave_requests = db.query(LeaveRequest).options(
+            joinedload(LeaveRequest.employee, innerjoin=True).joinedload(Employee.user, innerjoin=True)
+        ).filter(
+            LeaveRequest.id.in_(request_ids)
+        ).with_for_update(of=LeaveRequest).all()
+        requests_by_id = {leave_request.id: leave_request for leave_request in leave_requests}
+        
+        results = []
+        audit_logs = []
+        notifications = []
+        feed_employees = set()
+        decided_at = datetime.utcnow()
+        current_year = decided_at.year
+        # Every balance row up front in one ordered statement, shared, so compaction waits for this batch
+        self.ledger_service.lock_balances(db, {(leave_request.employee_id, leave_request.leave_type_id, current_year)
+                                               for leave_request in leave_requests})
+        
+        for item in items:
+            leave_request = requests_by_id.get(item.request_id)
+            if not leave_request:
+                results.append(LeaveBulkDecisionResult(request_id=item.request_id, decision=item.decision,
+                                                       success=False, error="Leave request not found"))
+                continue
+            
+            old_status = LeaveStatus(leave_request.status)
+            allowed = [LeaveStatus.PENDING, LeaveStatus.APPROVED] if item.decision == LeaveDecision.CANCEL \
+                else [LeaveStatus.PENDING]
+            if old_status not in allowed:
+                results.append(LeaveBulkDecisionResult(
+                    request_id=item.request_id, decision=item.decision, success=False, status=old_status.value,
+                    error=f"Leave request cannot be {_DECISION_VERBS[item.decision]} in its current status"
+                ))
+                continue
+            
+            minutes = leave_request.number_of_minutes
+            if item.decision == LeaveDecision.APPROVE:
+                new_status, action, kind = LeaveStatus.APPROVED, AuditAction.APPROVED, BalanceMovementKind.CONSUME
+                leave_request.approved_by_id = performed_by.id
+                leave_request.approved_at = decided_at
+            elif item.decision == LeaveDecision.REJECT:
+                new_status, action, kind = LeaveStatus.REJECTED, AuditAction.REJECTED, BalanceMovementKind.RELEASE
+                leave_request.rejection_reason = item.comments
+            else:
+                new_status, action = LeaveStatus.CANCELLED, AuditAction.CANCELLED
+                kind = BalanceMovementKind.RELEASE if old_status == LeaveStatus.PENDING else BalanceMovementKind.REFUND
+            
+            leave_request.status = new_status
+            self.ledger_service.record(db, leave_request.employee_id, leave_request.leave_type_id,
+                                       current_year, kind, minutes, leave_request.id)
+            audit_logs.append(LeaveRequestAudit(
+                leave_request_id=leave_request.id,
+                action=action,
+                performed_by_id=performed_by.id,
+                old_status=old_status.value,
+                new_status=new_status.value,
+                comments=item.comments
+            ))
+            self.analytics_service.record_transition(db, leave_request, leave_request.employee.department,
+                                                     old_status, new_status, performed_by.id)
+            if LeaveStatus.APPROVED in (old_status, new_status):
+                feed_employees.add((leave_request.employee_id, leave_request.employee.department))
+            
+            if new_status in [LeaveStatus.APPROVED, LeaveStatus.REJECTED]:
+                employee_user = leave_request.employee.user
+                notifications.append({
+                    "email": employee_user.email,
+                    "first_name": employee_user.first_name,
+                    "leave_request_id": leave_request.id,
+                    "start_date": leave_request.start_date,
+                    "end_date": leave_request.end_date,
+                    "number_of_days": minutes_to_days(minutes),
+                    "status": new_status.value,
+                    "comments": item.comments
+                })
+            results.append(LeaveBulkDecisionResult(request_id=item.request_id, decision=item.decision,
+                                                   success=True, status=new_status.value))
         
-        if balance:
-            balance.used_days = max(0, balance.used_days - days)
-            balance.available_balance = (balance.allocated_days - balance.used_days - 
-                                       balance.pending_days + balance.carried_forward_days)
+        try:
+            db.add_all(audit_logs)
             db.commit()
+            self._publish_balance_change({leave_request.employee_id for leave_request in leave_requests},
+                                         feed_employees)
+        except Exception as e:
+            db.rollback()
+            logger.error(f"Error applying bulk leave decisions: {e}")
+            raise
+        
+        succeeded = sum(1 for result in results if result.success)
+        logger.info(f"Bulk leave decisions by {performed_by.id}: {succeeded}/{len(results)} applied")
+        return results, notifications
+    
+    async def send_leave_decision_notifications(self, notifications: List[dict]):
+        """Send decision emails queued by bulk_decide_leave_requests"""
+        for notification in notifications:
+            await self.email_service.send_leave_decision_email(**notification)
+    
+    def _refund_used_leave_balance(self, db: Session, employee_id: int, leave_type_id: int, minutes: int,
+                                   leave_request_id: int = None):
+        """Refund used leave balance when request is cancelled (committed by the caller)"""
+        current_year = datetime.now().year
+        self.ledger_service.record(db, employee_id, leave_type_id, current_year,
+                                   BalanceMovementKind.REFUND, minutes, leave_request_id)
+    
+    def _publish_balance_change(self, employee_ids, feed_employees=()):
+        """Tell every worker's caches that these employees' balances and leave requests changed.
+        
+        ``feed_employees`` are the (employee id, department) pairs whose approved leave changed,
+        so that only the calendar feeds showing it are rebuilt.
+        """
+        tags = [f"balances:{employee_id}" for employee_id in employee_ids] + ["leave_requests"]
+        for employee_id, department in feed_employees:
+            tags.extend(feed_tags(employee_id, department))
+        publish_invalidation(tags=list(dict.fromkeys(tags)))
+    
+    def _record_rollup_transition(self, db: Session, leave_request: LeaveRequest, old_status: LeaveStatus,
+                                  new_status: LeaveStatus, performed_by_id: int = None):
+        """Apply a status change to the analytics rollups (committed by the caller)"""
+        department = db.query(Employee.department).filter(Employee.id == leave_request.employee_id).scalar()
+        self.analytics_service.record_transition(db, leave_request, department, old_status, new_status,
+                                                 performed_by_id)
     
     def _create_audit_log(self, db: Session, leave_request_id: int, action: AuditAction, 
                           performed_by_id: int, old_status: str = None, new_status: str = None, 
@@ -475,13 +664,12 @@ class LeaveService:
         db.add(audit_log)
     
     def _notify_hr_leave_request(self, db: Session, leave_request: LeaveRequest):
-        """Send notification email to HR about new leave request"""
+        """Notify HR about a new leave request, right away or in the next digest"""
         try:
-            # Get HR users
-            hr_users = db.query(User).filter(User.role == UserRole.HR, User.is_active == True).all()
-            
-            for hr_user in hr_users:
-                self.email_service.send_hr_leave_request_notification(hr_user, leave_request)
+            # In digest mode the request goes out with the next scheduled HR digest
+            hr_digest_service = get_hr_digest_service()
+            if hr_digest_service.mode == "immediate":
+                hr_digest_service.send_digests(db)
         except Exception as e:
             logger.error(f"Error sending HR notification: {e}")
     
@@ -507,6 +695,27 @@ class LeaveService:
         
         return db.query(LeaveRequest).filter(LeaveRequest.employee_id == employee_id).all()
     
+    def get_leave_request_rows(self, db: Session, requesting_user: User, employee_id: int = None,
+                               status: LeaveStatus = None, fields: Optional[List[str]] = None) -> List[dict]:
+        """Get leave requests as plain rows for list endpoints, with role-based access control.
+
+        ``fields`` limits the select to those columns (plus ``id``), so table and
+        calendar views do not read or ship the reason and documentation texts.
+        """
+        if employee_id is not None and requesting_user.role == UserRole.EMPLOYEE:
+            employee = self.employee_service.get_employee_by_user_id(db, requesting_user.id)
+            if not employee or employee.id != employee_id:
+                raise ValueError("You can only view your own leave requests")
+        elif requesting_user.role not in [UserRole.HR, UserRole.SUPER_ADMIN]:
+            raise ValueError("Insufficient permissions")
+        
+        query = select(*project_columns(LEAVE_REQUEST_LIST_COLUMNS, fields)).order_by(LeaveRequest.id)
+        if employee_id is not None:
+            query = query.where(LeaveRequest.employee_id == employee_id)
+        if status is not None:
+            query = query.where(LeaveRequest.status == status.value)
+        return fetch_rows(db, query)
+    
     def get_pending_leave_requests(self, db: Session, requesting_user: User) -> List[LeaveRequest]:
         """Get all pending leave requests (HR and Super Admin only)"""
         if requesting_user.role not in [UserRole.HR, UserRole.SUPER_ADMIN]:
@@ -515,8 +724,8 @@ class LeaveService:
         return db.query(LeaveRequest).filter(LeaveRequest.status == LeaveStatus.PENDING).all()
     
     def get_leave_audit_logs(self, db: Session, leave_request_id: int, 
-                            requesting_user: User) -> List[LeaveRequestAudit]:
-        """Get audit logs for a leave request"""
+                            requesting_user: User) -> List[dict]:
+        """Get audit logs for a leave request, including archived ones"""
         # Check if user has access to this leave request
         leave_request = db.query(LeaveRequest).filter(LeaveRequest.id == leave_request_id).first()
         if not leave_request:
@@ -529,32 +738,31 @@ class LeaveService:
         elif requesting_user.role not in [UserRole.HR, UserRole.SUPER_ADMIN]:
             raise ValueError("Insufficient permissions")
         
-        return db.query(LeaveRequestAudit).filter(
-            LeaveRequestAudit.leave_request_id == leave_request_id
-        ).order_by(LeaveRequestAudit.created_at.desc()).all()
+        return self.audit_archive_service.get_audit_logs(db, leave_request_id)
 
     # Employee-specific methods
     def get_my_leave_requests(self, db: Session, current_user: User, 
-                             status_filter: str = None) -> List[LeaveRequest]:
-        """Get current employee's leave requests with optional status filtering"""
+                             status_filter: str = None, fields: Optional[List[str]] = None) -> List[dict]:
+        """Get current employee's leave requests as plain rows with optional status filtering"""
         if current_user.role != UserRole.EMPLOYEE:
             raise ValueError("Only employees can access this method")
         
+        columns = project_columns(LEAVE_REQUEST_LIST_COLUMNS, fields)
         employee = self.employee_service.get_employee_by_user_id(db, current_user.id)
         if not employee:
             return []
         
-        query = db.query(LeaveRequest).filter(LeaveRequest.employee_id == employee.id)
+        query = select(*columns).where(LeaveRequest.employee_id == employee.id)
         
         if status_filter:
             try:
                 status_enum = LeaveStatus(status_filter.lower())
-                query = query.filter(LeaveRequest.status == status_enum)
+                query = query.where(LeaveRequest.status == status_enum.value)
             except ValueError:
                 # Invalid status filter, return all
                 pass
         
-        return query.order_by(LeaveRequest.created_at.desc()).all()
+        return fetch_rows(db, query.order_by(LeaveRequest.created_at.desc()))
 
     def get_my_leave_request_by_id(self, db: Session, request_id: int, 
                                   current_user: User) -> Optional[LeaveRequest]:
@@ -606,7 +814,7 @@ class LeaveService:
             update_dict = update_data.dict(exclude_unset=True)
             
             if 'start_date' in update_dict or 'end_date' in update_dict:
-                # If dates are being changed, recalculate number of days
+                # If dates are being changed, recalculate the leave requested
                 new_start_date = update_dict.get('start_date', leave_request.start_date)
                 new_end_date = update_dict.get('end_date', leave_request.end_date)
                 
@@ -614,29 +822,34 @@ class LeaveService:
                 if new_end_date < new_start_date:
                     raise ValueError("End date must be after start date")
                 
-                # Calculate new number of days based on duration type
-                if leave_request.duration_type == LeaveDurationType.HOURLY.value:
-                    new_number_of_days = leave_request.hours / 8.0
-                elif leave_request.duration_type == LeaveDurationType.HALF_DAY.value:
-                    new_number_of_days = self._calculate_half_day_leave_days(db, new_start_date, new_end_date)
-                else:
-                    new_number_of_days = self._calculate_leave_days(db, new_start_date, new_end_date)
+                # Calculate the new amount based on duration type
+                new_number_of_minutes = self._calculate_requested_minutes(
+                    db, LeaveDurationType(leave_request.duration_type), new_start_date, new_end_date,
+                    leave_request.hours, self.holiday_calendar_service.calendar_id_for(db, employee)
+                )
                 
                 # Validate leave balance for new duration
                 if not self._validate_leave_balance(db, employee.id, leave_request.leave_type_id, 
-                                                  new_number_of_days, leave_request.leave_type, leave_request.medical_proof):
+                                                  new_number_of_minutes, leave_request.leave_type, leave_request.medical_proof):
                     raise ValueError("Insufficient leave balance for new duration")
                 
-                # Update pending days in leave balance
+                # Update pending leave in leave balance
                 self._update_pending_leave_balance(db, employee.id, leave_request.leave_type_id, 
-                                                leave_request.number_of_days, add=False)  # Remove old
+                                                leave_request.number_of_minutes, add=False,
+                                                leave_request_id=leave_request.id)  # Remove old
                 self._update_pending_leave_balance(db, employee.id, leave_request.leave_type_id, 
-                                                new_number_of_days, add=True)  # Add new
+                                                new_number_of_minutes, add=True,
+                                                leave_request_id=leave_request.id)  # Add new
+                
+                self.analytics_service.record_modification(
+                    db, employee.department, leave_request.leave_type_id,
+                    leave_request.start_date, leave_request.number_of_minutes, new_start_date, new_number_of_minutes
+                )
                 
                 # Update leave request
                 leave_request.start_date = new_start_date
                 leave_request.end_date = new_end_date
-                leave_request.number_of_days = new_number_of_days
+                leave_request.number_of_minutes = new_number_of_minutes
             
             if 'reason' in update_dict:
                 leave_request.reason = update_dict['reason']
@@ -652,6 +865,7 @@ class LeaveService:
                                          f"Reason: {old_reason}→{leave_request.reason}")
             
             db.commit()
+            self._publish_balance_change([employee.id])
             db.refresh(leave_request)
             
             logger.info(f"Leave request modified: {leave_request.id}")
@@ -685,24 +899,30 @@ class LeaveService:
             raise ValueError("Leave request cannot be cancelled in its current status")
         
         try:
-            old_status = leave_request.status
+            old_status = LeaveStatus(leave_request.status)
             leave_request.status = LeaveStatus.CANCELLED
             
             # Update leave balance
             if old_status == LeaveStatus.PENDING:
                 self._update_pending_leave_balance(db, leave_request.employee_id, 
-                                                leave_request.leave_type_id, leave_request.number_of_days, add=False)
+                                                leave_request.leave_type_id, leave_request.number_of_minutes, add=False,
+                                                leave_request_id=leave_request.id)
             elif old_status == LeaveStatus.APPROVED:
                 # Refund used days
                 self._refund_used_leave_balance(db, leave_request.employee_id, 
-                                              leave_request.leave_type_id, leave_request.number_of_days)
+                                              leave_request.leave_type_id, leave_request.number_of_minutes,
+                                              leave_request.id)
             
             # Create audit log
             self._create_audit_log(db, leave_request.id, AuditAction.MODIFIED, current_user.id,
                                  old_status=old_status.value, new_status=LeaveStatus.CANCELLED.value,
                                  comments=comments or "Cancelled by employee")
+            self.analytics_service.record_transition(db, leave_request, employee.department,
+                                                     old_status, LeaveStatus.CANCELLED)
+            feed_employees = [(employee.id, employee.department)] if old_status == LeaveStatus.APPROVED else []
             
             db.commit()
+            self._publish_balance_change([leave_request.employee_id], feed_employees)
             return leave_request
             
         except Exception as e:
@@ -716,10 +936,19 @@ class LeaveService:
         if created_by.role not in [UserRole.HR, UserRole.SUPER_ADMIN]:
             raise ValueError("Only HR or Super Admin can create holidays")
         
+        if holiday_data.calendar_id is not None and self.holiday_calendar_service.get_calendar(
+                db, holiday_data.calendar_id) is None:
+            raise ValueError("Holiday calendar not found")
+        # NULLs never collide in the unique constraint, so company-wide dates are checked here
+        if db.query(Holiday.id).filter(Holiday.calendar_id == holiday_data.calendar_id,
+                                       Holiday.date == holiday_data.date).first():
+            raise ValueError("Holiday date already exists")
+        
         try:
             holiday = Holiday(**holiday_data.dict())
             db.add(holiday)
             db.commit()
+            publish_invalidation(tags=["holidays"])
             db.refresh(holiday)
             
             logger.info(f"Holiday created: {holiday.name} on {holiday.date}")
@@ -734,9 +963,54 @@ class LeaveService:
             logger.error(f"Error creating holiday: {e}")
             raise
 
-    def get_holidays(self, db: Session, start_date: date = None, end_date: date = None) -> List[Holiday]:
-        """Get holidays within a date range"""
+    def update_holiday(self, db: Session, holiday_id: int, holiday_data, updated_by: User) -> Optional[Holiday]:
+        """Update a holiday's fields that were sent (HR and Super Admin only)"""
+        if updated_by.role not in [UserRole.HR, UserRole.SUPER_ADMIN]:
+            raise ValueError("Only HR or Super Admin can update holidays")
+        holiday = db.get(Holiday, holiday_id)
+        if holiday is None:
+            return None
+
+        changes = holiday_data.dict(exclude_unset=True)
+        calendar_id = changes.get("calendar_id", holiday.calendar_id)
+        holiday_date = changes.get("date", holiday.date)
+        if calendar_id is not None and self.holiday_calendar_service.get_calendar(db, calendar_id) is None:
+            raise ValueError("Holiday calendar not found")
+        if db.query(Holiday.id).filter(Holiday.calendar_id == calendar_id, Holiday.date == holiday_date,
+                                       Holiday.id != holiday_id).first():
+            raise ValueError("Holiday date already exists")
+
+        try:
+            for field, value in changes.items():
+                setattr(holiday, field, value)
+            db.commit()
+        except IntegrityError:
+            db.rollback()
+            raise ValueError("Holiday date already exists")
+        publish_invalidation(tags=["holidays"])
+        db.refresh(holiday)
+        logger.info(f"Holiday updated: {holiday.name} on {holiday.date}")
+        return holiday
+
+    def delete_holiday(self, db: Session, holiday_id: int, deleted_by: User) -> bool:
+        """Delete a holiday (HR and Super Admin only)"""
+        if deleted_by.role not in [UserRole.HR, UserRole.SUPER_ADMIN]:
+            raise ValueError("Only HR or Super Admin can delete holidays")
+        holiday = db.get(Holiday, holiday_id)
+        if holiday is None:
+            return False
+        db.delete(holiday)
+        db.commit()
+        publish_invalidation(tags=["holidays"])
+        logger.info(f"Holiday deleted: {holiday.name} on {holiday.date}")
+        return True
+
+    def get_holidays(self, db: Session, start_date: date = None, end_date: date = None,
+                     calendar_id: Optional[int] = None) -> List[Holiday]:
+        """Get holidays within a date range, as entered (recurring ones on their first date)"""
         query = db.query(Holiday).filter(Holiday.is_active == True)
+        if calendar_id is not None:
+            query = query.filter(Holiday.calendar_id == calendar_id)
         
         if start_date:
             query = query.filter(Holiday.date >= start_date)
@@ -745,17 +1019,3 @@ class LeaveService:
         
         return query.order_by(Holiday.date).all()
 
-    def _employee_on_probation(self, db: Session, employee_id: int) -> bool:
-        """Check if employee is on probation (first 3 months)"""
-        employee = db.query(Employee).filter(Employee.id == employee_id).first()
-        if not employee or not employee.joining_date:
-            return False
-        
-        probation_end_date = employee.joining_date + timedelta(days=90)  # 3 months
-        return datetime.now().date() <= probation_end_date
-
-    def _employee_has_disciplinary_actions(self, db: Session, employee_id: int) -> bool:
-        """Check if employee has pending disciplinary actions (placeholder)"""
-        # This is a placeholder - in production, you would query a disciplinary actions table
-        # For now, return False (no restrictions)
-        return False
@@ -0,0 +1,346 @@
+from datetime import datetime
+from typing import Optional, List, Dict, Tuple, Iterable
+from sqlalchemy import select, func, and_, tuple_
+from sqlalchemy.orm import Session
+from app.models.leave_balance import EmployeeLeaveBalance
+from app.models.leave_ledger import LeaveBalanceMovement, LeaveBalanceSnapshot, BalanceMovementKind
+from app.schemas.leave import LeaveLedgerBalance
+from app.request_cache import request_cache
+from app.leave_units import minutes_to_days
+import logging
+
+logger = logging.getLogger(__name__)
+
+# A reserving writer (holding the exclusive lock) folds a balance with this many unfolded movements
+SNAPSHOT_EVERY = 50
+
+# (allocated, used, pending, carried) multipliers applied to the movement's minutes
+_MOVEMENT_DELTAS = {
+    BalanceMovementKind.ALLOCATE: (1, 0, 0, 0),
+    BalanceMovementKind.RESERVE: (0, 0, 1, 0),
+    BalanceMovementKind.CONSUME: (0, 1, -1, 0),
+    BalanceMovementKind.RELEASE: (0, 0, -1, 0),
+    BalanceMovementKind.REFUND: (0, -1, 0, 0),
+    BalanceMovementKind.CARRY: (0, 0, 0, 1),
+}
+
+BalanceKey = Tuple[int, int, int]
+
+BALANCE_QUANTITIES = ("allocated", "used", "pending", "carried_forward")
+
+
+def add_balance_days(row: dict) -> dict:
+    """Add the day values that balance responses carry next to the minutes"""
+    for name in BALANCE_QUANTITIES:
+        row[f"{name}_days"] = minutes_to_days(row[f"{name}_minutes"])
+    row["available_balance"] = minutes_to_days(row["available_minutes"])
+    return row
+
+
+class LedgerService:
+    """Append-only leave balance ledger.
+
+    Writers only insert ``LeaveBalanceMovement`` rows. The current balance is the
+    ``EmployeeLeaveBalance`` row (kept equal to the latest snapshot) plus the
+    movements appended after that snapshot. ``LeaveBalanceSnapshot`` history
+    answers point-in-time queries. All quantities are integer minutes
+    (``app.leave_units``), so folding and summing them is exact.
+
+    A snapshot covers every movement id up to its position, but ids are handed
+    out at insert and only become visible at commit. Writers therefore hold a
+    shared lock on the balance row (``lock_balances``) from before their insert
+    until they commit; shared locks do not block each other, so appends still
+    run side by side. ``take_snapshot`` takes the row exclusively, so a fold
+    waits for the movements in flight instead of passing them. The reserve
+    path, which checks the balance before appending, also reads it exclusively
+    (``get_balance(lock=True)``). Plain reads never fold: snapshots are taken by
+    ``compact`` and by writers already holding the exclusive lock.
+    """
+
+    def lock_balances(self, db: Session, keys: Iterable[BalanceKey], exclusive: bool = False):
+        """Lock balance rows (employee, leave type, year) until the transaction ends, in id order.
+
+        Shared (``FOR SHARE``) unless exclusive. Each row is locked once per
+        transaction and strength; later calls that need no stronger lock issue nothing.
+        """
+        cache = request_cache(db)
+        wanted = "exclusive" if exclusive else "shared"
+        keys = sorted({tuple(key) for key in keys
+                       if cache.get(("ledger_lock",) + tuple(key)) not in (wanted, "exclusive")})
+        if not keys:
+            return
+        db.execute(select(EmployeeLeaveBalance.id).where(
+            tuple_(EmployeeLeaveBalance.employee_id, EmployeeLeaveBalance.leave_type_id,
+                   EmployeeLeaveBalance.year).in_(keys)
+        ).order_by(EmployeeLeaveBalance.id).with_for_update(read=not exclusive))
+        for key in keys:
+            cache.set(("ledger_lock",) + key, wanted)
+
+    def record(self, db: Session, employee_id: int, leave_type_id: int, year: int,
+               kind: BalanceMovementKind, minutes: int,
+               leave_request_id: Optional[int] = None) -> LeaveBalanceMovement:
+        """Append a balance movement; the caller commits it with its own transaction"""
+        self.lock_balances(db, [(employee_id, leave_type_id, year)])
+        allocated, used, pending, carried = _MOVEMENT_DELTAS[kind]
+        movement = LeaveBalanceMovement(
+            employee_id=employee_id,
+            leave_type_id=leave_type_id,
+            year=year,
+            kind=kind,
+            allocated_minutes=allocated * minutes,
+            used_minutes=used * minutes,
+            pending_minutes=pending * minutes,
+            carried_minutes=carried * minutes,
+            leave_request_id=leave_request_id
+        )
+        db.add(movement)
+        request_cache(db).forget(("ledger_balance", employee_id, leave_type_id, year))
+        return movement
+
+    def get_balance(self, db: Session, employee_id: int, leave_type_id: int, year: int,
+                    as_of: Optional[datetime] = None, lock: bool = False) -> Optional[LeaveLedgerBalance]:
+        """Current (or point-in-time) balance: one snapshot lookup plus a delta scan.
+
+        Current balances are memoized for the request until ``record`` changes them.
+        With ``lock``, the balance row is read ``FOR UPDATE`` (see ``lock_balances``),
+        for writers that check the balance and then record against it; only then
+        may a long run of movements be folded into a snapshot. Without it nothing is written.
+        """
+        if as_of is not None:
+            return self._compute_balance(db, employee_id, leave_type_id, year, as_of)[0]
+        cache = request_cache(db)
+        if lock and cache.get(("ledger_lock", employee_id, leave_type_id, year)) != "exclusive":
+            cache.forget(("ledger_balance", employee_id, leave_type_id, year))  # Reread under the lock
+        return cache.get_or_load(
+            ("ledger_balance", employee_id, leave_type_id, year),
+            lambda: self._load_current_balance(db, employee_id, leave_type_id, year, lock)
+        )
+
+    def peek_balance(self, db: Session, employee_id: int, leave_type_id: int,
+                     year: int) -> Optional[LeaveLedgerBalance]:
+        """Current balance, bypassing the request memo; never writes (safe on replicas)"""
+        return self._compute_balance(db, employee_id, leave_type_id, year, None)[0]
+
+    def _load_current_balance(self, db: Session, employee_id: int, leave_type_id: int,
+                              year: int, lock: bool = False) -> Optional[LeaveLedgerBalance]:
+        balance, unfolded = self._compute_balance(db, employee_id, leave_type_id, year, None, lock)
+        if lock and balance is not None and unfolded >= SNAPSHOT_EVERY:
+            self.take_snapshot(db, employee_id, leave_type_id, year)
+        return balance
+
+    def get_unfolded_deltas(self, db: Session, employee_id: Optional[int] = None,
+                            year: Optional[int] = None) -> Dict[BalanceKey, Tuple[int, int, int, int]]:
+        """Sum of movements not yet folded into a snapshot, per balance, in one query"""
+        snapshots = select(
+            LeaveBalanceSnapshot.employee_id,
+            LeaveBalanceSnapshot.leave_type_id,
+            LeaveBalanceSnapshot.year,
+            func.max(LeaveBalanceSnapshot.ledger_position).label("position")
+        ).group_by(
+            LeaveBalanceSnapshot.employee_id, LeaveBalanceSnapshot.leave_type_id, LeaveBalanceSnapshot.year
+        ).subquery()
+
+        query = select(
+            LeaveBalanceMovement.employee_id,
+            LeaveBalanceMovement.leave_type_id,
+            LeaveBalanceMovement.year,
+            func.sum(LeaveBalanceMovement.allocated_minutes),
+            func.sum(LeaveBalanceMovement.used_minutes),
+            func.sum(LeaveBalanceMovement.pending_minutes),
+            func.sum(LeaveBalanceMovement.carried_minutes),
+        ).outerjoin(snapshots, and_(
+            snapshots.c.employee_id == LeaveBalanceMovement.employee_id,
+            snapshots.c.leave_type_id == LeaveBalanceMovement.leave_type_id,
+            snapshots.c.year == LeaveBalanceMovement.year
+        )).where(
+            LeaveBalanceMovement.id > func.coalesce(snapshots.c.position, 0)
+        ).group_by(
+            LeaveBalanceMovement.employee_id, LeaveBalanceMovement.leave_type_id, LeaveBalanceMovement.year
+        )
+        if employee_id is not None:
+            query = query.where(LeaveBalanceMovement.employee_id == employee_id)
+        if year is not None:
+            query = query.where(LeaveBalanceMovement.year == year)
+
+        return {(row[0], row[1], row[2]): tuple(row[3:]) for row in db.execute(query)}
+
+    def apply_unfolded_deltas(self, db: Session, rows: List[dict], employee_id: Optional[int] = None,
+                              year: Optional[int] = None) -> List[dict]:
+        """Bring balance rows (as returned by list endpoints) up to date with the ledger, with day values"""
+        deltas = self.get_unfolded_deltas(db, employee_id, year) if rows else {}
+        for row in rows:
+            delta = deltas.get((row["employee_id"], row["leave_type_id"], row["year"]))
+            if delta:
+                row["allocated_minutes"] += delta[0]
+                row["used_minutes"] += delta[1]
+                row["pending_minutes"] += delta[2]
+                row["carried_forward_minutes"] += delta[3]
+                row["available_minutes"] = (row["allocated_minutes"] - row["used_minutes"] -
+                                            row["pending_minutes"] + row["carried_forward_minutes"])
+            add_balance_days(row)
+        return rows
+
+    def get_movements(self, db: Session, employee_id: int, leave_type_id: Optional[int] = None,
+                      year: Optional[int] = None, as_of: Optional[datetime] = None,
+                      limit: int = 200) -> List[LeaveBalanceMovement]:
+        """Most recent balance movements for an employee"""
+        query = db.query(LeaveBalanceMovement).filter(LeaveBalanceMovement.employee_id == employee_id)
+        if as_of is not None:
+            query = query.filter(LeaveBalanceMovement.created_at <= as_of)
+        if leave_type_id is not None:
+            query = query.filter(LeaveBalanceMovement.leave_type_id == leave_type_id)
+        if year is not None:
+            query = query.filter(LeaveBalanceMovement.year == year)
+        return query.order_by(LeaveBalanceMovement.id.desc()).limit(limit).all()
+
+    def take_snapshot(self, db: Session, employee_id: int, leave_type_id: int,
+                      year: int) -> Optional[LeaveBalanceSnapshot]:
+        """Fold unfolded movements into a new snapshot and refresh the balance row"""
+        row = db.query(EmployeeLeaveBalance).filter(
+            EmployeeLeaveBalance.employee_id == employee_id,
+            EmployeeLeaveBalance.leave_type_id == leave_type_id,
+            EmployeeLeaveBalance.year == year
+        ).with_for_update().first()
+        if not row:
+            return None
+        request_cache(db).set(("ledger_lock", employee_id, leave_type_id, year), "exclusive")
+
+        has_snapshot = db.query(LeaveBalanceSnapshot.id).filter(
+            LeaveBalanceSnapshot.employee_id == employee_id,
+            LeaveBalanceSnapshot.leave_type_id == leave_type_id,
+            LeaveBalanceSnapshot.year == year
+        ).first() is not None
+        if not has_snapshot:
+            # Opening snapshot so point-in-time reads before the first fold still work
+            db.add(LeaveBalanceSnapshot(
+                employee_id=employee_id, leave_type_id=leave_type_id, year=year, ledger_position=0,
+                allocated_minutes=row.allocated_minutes, used_minutes=row.used_minutes,
+                pending_minutes=row.pending_minutes, carried_forward_minutes=row.carried_forward_minutes,
+                taken_at=row.created_at
+            ))
+            db.flush()
+
+        balance, _ = self._compute_balance(db, employee_id, leave_type_id, year)
+        snapshot = LeaveBalanceSnapshot(
+            employee_id=employee_id,
+            leave_type_id=leave_type_id,
+            year=year,
+            ledger_position=balance.ledger_position,
+            allocated_minutes=balance.allocated_minutes,
+            used_minutes=balance.used_minutes,
+            pending_minutes=balance.pending_minutes,
+            carried_forward_minutes=balance.carried_forward_minutes
+        )
+        db.add(snapshot)
+
+        row.allocated_minutes = balance.allocated_minutes
+        row.used_minutes = balance.used_minutes
+        row.pending_minutes = balance.pending_minutes
+        row.carried_forward_minutes = balance.carried_forward_minutes
+        row.available_minutes = balance.available_minutes
+        row.updated_at = datetime.utcnow()
+        db.flush()
+        return snapshot
+
+    def compact(self, db: Session, employee_id: Optional[int] = None, year: Optional[int] = None) -> int:
+        """Snapshot every balance with unfolded movements; returns the number of snapshots taken"""
+        keys = list(self.get_unfolded_deltas(db, employee_id, year).keys())
+        for key in keys:
+            self.take_snapshot(db, *key)
+        db.commit()
+        logger.info(f"Leave ledger compacted: {len(keys)} balances snapshotted")
+        return len(keys)
+
+    def _compute_balance(self, db: Session, employee_id: int, leave_type_id: int, year: int,
+                         as_of: Optional[datetime] = None,
+                         lock: bool = False) -> Tuple[Optional[LeaveLedgerBalance], int]:
+        """Fold the base state with later movements; also returns how many movements were scanned"""
+        if as_of is None:
+            base, position = self._current_base(db, employee_id, leave_type_id, year, lock)
+        else:
+            base, position = self._snapshot_base(db, employee_id, leave_type_id, year, as_of)
+        if base is None:
+            return None, 0
+
+        query = select(
+            func.count(LeaveBalanceMovement.id),
+            func.max(LeaveBalanceMovement.id),
+            func.coalesce(func.sum(LeaveBalanceMovement.allocated_minutes), 0),
+            func.coalesce(func.sum(LeaveBalanceMovement.used_minutes), 0),
+            func.coalesce(func.sum(LeaveBalanceMovement.pending_minutes), 0),
+            func.coalesce(func.sum(LeaveBalanceMovement.carried_minutes), 0),
+        ).where(
+            LeaveBalanceMovement.employee_id == employee_id,
+            LeaveBalanceMovement.leave_type_id == leave_type_id,
+            LeaveBalanceMovement.year == year,
+            LeaveBalanceMovement.id > position
+        )
+        if as_of is not None:
+            query = query.where(LeaveBalanceMovement.created_at <= as_of)
+        count, last_id, allocated, used, pending, carried = db.execute(query).one()
+
+        balance = self._make_balance(
+            employee_id, leave_type_id, year,
+            base[0] + allocated, base[1] + used, base[2] + pending, base[3] + carried,
+            last_id or position, as_of
+        )
+        return balance, count
+
+    def _current_base(self, db: Session, employee_id: int, leave_type_id: int, year: int, lock: bool = False):
+        """The balance row mirrors the latest snapshot; its position is that snapshot's"""
+        query = db.query(
+            EmployeeLeaveBalance.allocated_minutes, EmployeeLeaveBalance.used_minutes,
+            EmployeeLeaveBalance.pending_minutes, EmployeeLeaveBalance.carried_forward_minutes
+        ).filter(
+            EmployeeLeaveBalance.employee_id == employee_id,
+            EmployeeLeaveBalance.leave_type_id == leave_type_id,
+            EmployeeLeaveBalance.year == year
+        )
+        row = (query.with_for_update() if lock else query).first()
+        if row is None:
+            return None, 0
+        if lock:
+            request_cache(db).set(("ledger_lock", employee_id, leave_type_id, year), "exclusive")
+
+        position = db.query(func.max(LeaveBalanceSnapshot.ledger_position)).filter(
+            LeaveBalanceSnapshot.employee_id == employee_id,
+            LeaveBalanceSnapshot.leave_type_id == leave_type_id,
+            LeaveBalanceSnapshot.year == year
+        ).scalar()
+        return tuple(value or 0 for value in row), position or 0
+
+    def _snapshot_base(self, db: Session, employee_id: int, leave_type_id: int, year: int, as_of: datetime):
+        snapshot = db.query(LeaveBalanceSnapshot).filter(
+            LeaveBalanceSnapshot.employee_id == employee_id,
+            LeaveBalanceSnapshot.leave_type_id == leave_type_id,
+            LeaveBalanceSnapshot.year == year,
+            LeaveBalanceSnapshot.taken_at <= as_of
+        ).order_by(LeaveBalanceSnapshot.ledger_position.desc()).first()
+        if snapshot is None:
+            # Never folded yet: the balance row is still the opening state
+            has_snapshot = db.query(LeaveBalanceSnapshot.id).filter(
+                LeaveBalanceSnapshot.employee_id == employee_id,
+                LeaveBalanceSnapshot.leave_type_id == leave_type_id,
+                LeaveBalanceSnapshot.year == year
+            ).first() is not None
+            if has_snapshot:
+                return None, 0
+            return self._current_base(db, employee_id, leave_type_id, year)
+        return (snapshot.allocated_minutes, snapshot.used_minutes,
+                snapshot.pending_minutes, snapshot.carried_forward_minutes), snapshot.ledger_position
+
+    def _make_balance(self, employee_id: int, leave_type_id: int, year: int, allocated: int,
+                      used: int, pending: int, carried: int, position: int,
+                      as_of: Optional[datetime]) -> LeaveLedgerBalance:
+        return LeaveLedgerBalance(
+            employee_id=employee_id,
+            leave_type_id=leave_type_id,
+            year=year,
+            allocated_minutes=allocated,
+            used_minutes=used,
+            pending_minutes=pending,
+            carried_forward_minutes=carried,
+            available_minutes=allocated - used - pending + carried,
+            ledger_position=position,
+            as_of=as_of
+        )
@@ -0,0 +1,164 @@
+from datetime import date
+from typing import Optional, List
+from sqlalchemy import select, insert, delete, func, literal, exists, true
+from sqlalchemy.orm import Session
+from app.database import fetch_rows
+from app.models.user import User, UserRole
+from app.models.employee import Employee
+from app.models.leave_type import LeaveType
+from app.models.leave_request import LeaveRequest, LeaveStatus
+from app.models.org_hierarchy import EmployeeHierarchy
+from app.services.container import get_employee_service
+from app.services.leave_service import LEAVE_REQUEST_LIST_COLUMNS
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Deepest chain rebuild() follows; stops runaway recursion if manager_id data contains a cycle
+MAX_DEPTH = 64
+
+HIERARCHY_COLUMNS = ["ancestor_id", "descendant_id", "depth"]
+
+
+class OrgHierarchyService:
+    """Reporting tree kept as a closure table.
+
+    ``EmployeeService`` calls ``add_employee`` on onboarding and ``move_employee``
+    when a manager changes, inside the same transaction, so subtree queries are a
+    single indexed join on ``employee_hierarchy`` instead of a walk down
+    ``Employee.subordinates``. ``rebuild`` recomputes the table from ``manager_id``.
+    """
+
+    def __init__(self):
+        self.employee_service = get_employee_service()
+
+    # Maintenance; the caller commits
+    def add_employee(self, db: Session, employee_id: int, manager_id: Optional[int] = None):
+        """Link a new employee (no reports yet) below its manager's chain"""
+        db.execute(insert(EmployeeHierarchy).values(ancestor_id=employee_id, descendant_id=employee_id, depth=0))
+        if manager_id is not None:
+            chain = select(
+                EmployeeHierarchy.ancestor_id, literal(employee_id), EmployeeHierarchy.depth + 1
+            ).where(EmployeeHierarchy.descendant_id == manager_id)
+            db.execute(insert(EmployeeHierarchy).from_select(HIERARCHY_COLUMNS, chain))
+
+    def move_employee(self, db: Session, employee_id: int, new_manager_id: Optional[int]):
+        """Move an employee, with everyone under them, below a new manager (or to the top)"""
+        if new_manager_id is not None and self.is_in_subtree(db, employee_id, new_manager_id):
+            raise ValueError("An employee cannot report to themselves or to one of their reports")
+
+        subtree = select(EmployeeHierarchy.descendant_id).where(EmployeeHierarchy.ancestor_id == employee_id)
+        # Detach: drop every link from the old management chain into the subtree
+        db.execute(delete(EmployeeHierarchy).where(
+            EmployeeHierarchy.descendant_id.in_(subtree),
+            EmployeeHierarchy.ancestor_id.not_in(subtree),
+        ).execution_options(synchronize_session=False))
+
+        if new_manager_id is not None:
+            # Attach: new manager's chain x subtree
+            chain = EmployeeHierarchy.__table__.alias("chain")
+            below = EmployeeHierarchy.__table__.alias("below")
+            links = (
+                select(chain.c.ancestor_id, below.c.descendant_id, chain.c.depth + below.c.depth + 1)
+                .select_from(chain.join(below, true()))
+                .where(chain.c.descendant_id == new_manager_id, below.c.ancestor_id == employee_id)
+            )
+            db.execute(insert(EmployeeHierarchy).from_select(HIERARCHY_COLUMNS, links))
+
+    def rebuild(self, db: Session) -> int:
+        """Recompute the closure table from Employee.manager_id; returns the number of links"""
+        tree = select(
+            Employee.id.label("ancestor_id"), Employee.id.label("descendant_id"), literal(0).label("depth")
+        ).cte("tree", recursive=True)
+        tree = tree.union_all(
+            select(tree.c.ancestor_id, Employee.id, tree.c.depth + 1)
+            .where(Employee.manager_id == tree.c.descendant_id, tree.c.depth < MAX_DEPTH)
+        )
+        db.execute(delete(EmployeeHierarchy).execution_options(synchronize_session=False))
+        db.execute(insert(EmployeeHierarchy).from_select(
+            HIERARCHY_COLUMNS, select(tree.c.ancestor_id, tree.c.descendant_id, tree.c.depth)
+        ))
+        return db.execute(select(func.count()).select_from(EmployeeHierarchy)).scalar()
+
+    def ensure_built(self, db: Session) -> bool:
+        """Rebuild if any employee is missing from the closure table (e.g. rows that predate it)"""
+        employees = db.execute(select(func.count()).select_from(Employee)).scalar()
+        linked = db.execute(
+            select(func.count()).select_from(EmployeeHierarchy).where(EmployeeHierarchy.depth == 0)
+        ).scalar()
+        if employees == linked:
+            return False
+        links = self.rebuild(db)
+        db.commit()
+        logger.info(f"Rebuilt org hierarchy: {employees} employees, {links} links")
+        return True
+
+    # Queries
+    def is_in_subtree(self, db: Session, manager_id: int, employee_id: int) -> bool:
+        """True if employee_id is manager_id or reports to them at any depth"""
+        return db.execute(select(exists().where(
+            EmployeeHierarchy.ancestor_id == manager_id, EmployeeHierarchy.descendant_id == employee_id
+        ))).scalar()
+
+    def check_team_access(self, db: Session, requesting_user: User, manager_id: int):
+        """HR and Super Admin see every team; employees see their own team and the teams under it"""
+        if requesting_user.role in [UserRole.HR, UserRole.SUPER_ADMIN]:
+            return
+        employee = self.employee_service.get_employee_by_user_id(db, requesting_user.id)
+        if not employee or not self.is_in_subtree(db, employee.id, manager_id):
+            raise ValueError("You can only view your own team")
+
+    def _reports(self, manager_id: int, max_depth: Optional[int] = None):
+        reports = select(EmployeeHierarchy.descendant_id, EmployeeHierarchy.depth).where(
+            EmployeeHierarchy.ancestor_id == manager_id, EmployeeHierarchy.depth > 0
+        )
+        if max_depth is not None:
+            reports = reports.where(EmployeeHierarchy.depth <= max_depth)
+        return reports.subquery("reports")
+
+    def get_team_rows(self, db: Session, manager_id: int, max_depth: Optional[int] = None) -> List[dict]:
+        """Everyone reporting to manager_id, shaped like TeamMemberResponse"""
+        reports = self._reports(manager_id, max_depth)
+        query = (
+            self.employee_service.employee_row_query()
+            .add_columns(reports.c.depth)
+            .join(reports, reports.c.descendant_id == Employee.id)
+            .order_by(reports.c.depth, Employee.last_name, Employee.first_name, Employee.id)
+        )
+        return self.employee_service.nest_user(fetch_rows(db, query))
+
+    def get_team_pending_requests(self, db: Session, manager_id: int,
+                                  max_depth: Optional[int] = None) -> List[dict]:
+        """Pending leave requests of everyone under manager_id, oldest start first"""
+        reports = self._reports(manager_id, max_depth)
+        query = (
+            select(*LEAVE_REQUEST_LIST_COLUMNS)
+            .join(reports, reports.c.descendant_id == LeaveRequest.employee_id)
+            .where(LeaveRequest.status == LeaveStatus.PENDING.value)
+            .order_by(LeaveRequest.start_date, LeaveRequest.id)
+        )
+        return fetch_rows(db, query)
+
+    def get_team_absences(self, db: Session, manager_id: int, on_date: date,
+                          max_depth: Optional[int] = None) -> List[dict]:
+        """Who under manager_id is on approved leave on on_date, shaped like TeamAbsenceResponse"""
+        reports = self._reports(manager_id, max_depth)
+        query = (
+            select(
+                Employee.id.label("employee_id"), Employee.employee_id.label("employee_code"),
+                Employee.first_name, Employee.last_name, reports.c.depth,
+                LeaveRequest.id.label("leave_request_id"), LeaveRequest.leave_type_id,
+                LeaveType.name.label("leave_type_name"), LeaveRequest.start_date, LeaveRequest.end_date,
+                LeaveRequest.duration_type, LeaveRequest.start_half, LeaveRequest.hours,
+            )
+            .join(reports, reports.c.descendant_id == LeaveRequest.employee_id)
+            .join(Employee, Employee.id == LeaveRequest.employee_id)
+            .join(LeaveType, LeaveType.id == LeaveRequest.leave_type_id)
+            .where(
+                LeaveRequest.status == LeaveStatus.APPROVED.value,
+                LeaveRequest.start_date <= on_date,
+                LeaveRequest.end_date >= on_date,
+            )
+            .order_by(reports.c.depth, Employee.last_name, Employee.first_name, LeaveRequest.id)
+        )
+        return fetch_rows(db, query)
@@ -1,21 +1,29 @@
 from datetime import datetime, timedelta
 from typing import Optional, List
+from sqlalchemy import select
 from sqlalchemy.orm import Session
 from sqlalchemy.exc import IntegrityError
+from app.database import fetch_rows, project_columns
 from app.models.user import User, UserRole
 from app.schemas.user import UserCreate, UserUpdate, UserResponse
-from app.services.auth_service import AuthService
-from app.services.email_service import EmailService
+from app.services.container import get_auth_service, get_email_service
 from app.config import settings
+from app.cache import user_cache, publish_invalidation
+from app.request_cache import request_cache
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Columns documented by UserResponse, selected directly for list endpoints
+USER_LIST_COLUMNS = (
+    User.id, User.email, User.first_name, User.last_name, User.role, User.is_active, User.is_verified,
+)
+
 
 class UserService:
     def __init__(self):
-        self.auth_service = AuthService()
-        self.email_service = EmailService()
+        self.auth_service = get_auth_service()
+        self.email_service = get_email_service()
     
     def create_user(self, db: Session, user_data: UserCreate) -> Optional[User]:
         try:
@@ -45,6 +53,7 @@ class UserService:
             db.add(user)
             db.commit()
             db.refresh(user)
+            self._publish_user_change(user.id)
 
             # Send welcome email if no password
             if not getattr(user_data, "password", None):
@@ -61,9 +70,15 @@ class UserService:
             logger.error(f"Error creating user: {e}")
             raise
     
+    def _publish_user_change(self, user_id: int):
+        """Tell every worker's caches that this user changed"""
+        publish_invalidation(keys=[f"user:{user_id}"], tags=["users"])
+    
     def get_user_by_id(self, db: Session, user_id: int) -> Optional[User]:
-        """Get user by ID"""
-        return db.query(User).filter(User.id == user_id).first()
+        """Get user by ID, memoized for the request"""
+        return request_cache(db).get_or_load(
+            ("user", user_id), lambda: db.query(User).filter(User.id == user_id).first()
+        )
     
     def get_user_by_email(self, db: Session, email: str) -> Optional[User]:
         """Get user by email"""
@@ -73,6 +88,20 @@ class UserService:
         """Get all users by role"""
         return db.query(User).filter(User.role == role, User.is_active == True).all()
     
+    def get_user_rows(self, db: Session, role: UserRole, fields: Optional[List[str]] = None) -> List[dict]:
+        """Active users of a role shaped like UserResponse (or just fields) for list endpoints"""
+        return fetch_rows(db, select(*project_columns(USER_LIST_COLUMNS, fields))
+                          .where(User.role == role, User.is_active == True).order_by(User.id))
+    
+    def get_hr_contacts(self, db: Session) -> List[dict]:
+        """Active HR users' contact details, cached until any user changes"""
+        return user_cache.get_or_set("users:hr_contacts", lambda: [
+            {"id": user_id, "email": email, "first_name": first_name, "last_name": last_name}
+            for user_id, email, first_name, last_name in db.query(
+                User.id, User.email, User.first_name, User.last_name
+            ).filter(User.role == UserRole.HR, User.is_active == True).order_by(User.id)
+        ], tags=["users"])
+    
     def update_user(self, db: Session, user_id: int, user_data: UserUpdate) -> Optional[User]:
         """Update user information"""
         user = self.get_user_by_id(db, user_id)
@@ -85,6 +114,7 @@ class UserService:
         
         user.updated_at = datetime.utcnow()
         db.commit()
+        self._publish_user_change(user_id)
         db.refresh(user)
         return user
     
@@ -97,6 +127,7 @@ class UserService:
         user.is_active = False
         user.updated_at = datetime.utcnow()
         db.commit()
+        self._publish_user_change(user_id)
         return True
     
     def activate_user(self, db: Session, user_id: int) -> bool:
@@ -108,6 +139,7 @@ class UserService:
         user.is_active = True
         user.updated_at = datetime.utcnow()
         db.commit()
+        self._publish_user_change(user_id)
         return True
     
     def reset_password_token(self, db: Session, email: str) -> bool:
@@ -141,6 +173,7 @@ class UserService:
         user.updated_at = datetime.utcnow()
         
         db.commit()
+        self._publish_user_change(user_id)
         return True
     
     def get_all_users(self, db: Session, skip: int = 0, limit: int = 100) -> List[User]:
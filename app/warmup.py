@@ -0,0 +1,181 @@
+"""
+Worker warm-up.
+
+Runs in the background after startup so ``/ready`` can report progress: fills
+the connection pools, preloads the shared caches and executes the hot queries
+once so their compiled SQL is cached. Load balancers should only route to a
+worker once ``/ready`` returns 200. With tenant shards it warms the first
+``TENANT_ENGINE_CACHE_SIZE`` configured tenants, as many as keep their engines.
+"""
+
+import logging
+import threading
+import time
+from datetime import date
+from typing import Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy import text
+
+from app.options import option
+from app.database import (
+    tenant_engines, SessionLocal, ReplicaSessionLocal, tenancy_enabled,
+    configured_tenants, get_engine, use_tenant
+)
+from app.models.user import User, UserRole
+from app.models.leave_request import LeaveStatus
+from app.services.container import get_leave_service, get_employee_service, get_user_service
+
+logger = logging.getLogger(__name__)
+
+
+class WarmupState:
+    """Progress of the warm-up stages, read by the readiness probe"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.stages: Dict[str, dict] = {}
+        self.started_at = None
+        self.finished_at = None
+
+    def begin(self, stage_names: List[str]):
+        with self._lock:
+            self.started_at = time.time()
+            self.finished_at = None
+            self.stages = {name: {"status": "pending"} for name in stage_names}
+
+    def update(self, name: str, **fields):
+        with self._lock:
+            self.stages[name].update(fields)
+
+    def finish(self):
+        with self._lock:
+            self.finished_at = time.time()
+
+    @property
+    def finished(self) -> bool:
+        return self.finished_at is not None
+
+    def as_dict(self) -> dict:
+        with self._lock:
+            return {
+                "finished": self.finished_at is not None,
+                "duration_ms": round((self.finished_at - self.started_at) * 1000, 1)
+                if self.started_at and self.finished_at else None,
+                "stages": {name: dict(stage) for name, stage in self.stages.items()},
+            }
+
+
+warmup_state = WarmupState()
+
+
+def _tenants() -> List[Optional[str]]:
+    if not tenancy_enabled():
+        return [None]
+    return configured_tenants()[:tenant_engines.capacity]
+
+
+def _engines() -> Dict[str, object]:
+    engines = {}
+    for tenant in _tenants():
+        prefix = f"{tenant}:" if tenant else ""
+        primary, replica = get_engine(tenant=tenant), get_engine(replica=True, tenant=tenant)
+        engines[f"{prefix}primary"] = primary
+        if replica is not primary:
+            engines[f"{prefix}replica"] = replica
+    return engines
+
+
+def warm_pools() -> dict:
+    """Open up to DB_WARM_CONNECTIONS connections per engine so the first requests skip connect()"""
+    opened = {}
+    for name, pooled_engine in _engines().items():
+        size = pooled_engine.pool.size() if hasattr(pooled_engine.pool, "size") else 1
+        target = min(option("db_warm_connections", size), size)
+        connections = []
+        try:
+            for _ in range(target):
+                connection = pooled_engine.connect()
+                connection.execute(text("SELECT 1"))
+                connections.append(connection)
+        finally:
+            for connection in connections:
+                connection.close()
+        opened[name] = len(connections)
+    return {"connections": opened}
+
+
+def warm_caches() -> dict:
+    today = date.today()
+    leave_types = holidays = hr_contacts = 0
+    for tenant in _tenants():
+        with use_tenant(tenant), SessionLocal() as db:
+            leave_types += len(get_leave_service().get_leave_type_rows(db))
+            holidays += len(get_leave_service()._get_holiday_dates(db, date(today.year, 1, 1),
+                                                                   date(today.year + 1, 12, 31)))
+            hr_contacts += len(get_user_service().get_hr_contacts(db))
+    return {"leave_types": leave_types, "holidays": holidays, "hr_users": hr_contacts}
+
+
+def warm_statements() -> dict:
+    """Run the per-request queries once on every engine so their compiled SQL is cached"""
+    # Transient HR user: passes the role checks without matching any rows
+    probe_user = User(id=0, role=UserRole.HR)
+    executed = 0
+    # Compiled SQL is cached per engine, and each shard has its own
+    for tenant in _tenants():
+        with use_tenant(tenant):
+            executed += _warm_statements(probe_user, get_engine(replica=True) is not get_engine())
+    return {"statements": executed}
+
+
+def _warm_statements(probe_user: User, has_replica: bool) -> int:
+    executed = 0
+    factories = [SessionLocal, ReplicaSessionLocal] if has_replica else [SessionLocal]
+    for factory in factories:
+        with factory() as db:
+            get_user_service().get_user_by_id(db, 0)
+            get_employee_service().get_employee_by_user_id(db, 0)
+            get_employee_service().get_leave_balance_rows(db, employee_id=0, year=date.today().year)
+            get_leave_service().get_leave_request_rows(db, probe_user, employee_id=0)
+            get_leave_service().get_leave_request_rows(db, probe_user, employee_id=0, status=LeaveStatus.PENDING)
+            executed += 5
+    return executed
+
+
+WARMUP_STAGES: List[Tuple[str, Callable[[], dict]]] = [
+    ("pool", warm_pools),
+    ("caches", warm_caches),
+    ("statements", warm_statements),
+]
+
+
+def run_warmup(state: WarmupState = warmup_state):
+    """Run every stage, recording duration and outcome; a failed stage does not stop the rest"""
+    state.begin([name for name, _ in WARMUP_STAGES])
+    for name, stage in WARMUP_STAGES:
+        state.update(name, status="running")
+        started = time.perf_counter()
+        try:
+            details = stage()
+            state.update(name, status="done", duration_ms=round((time.perf_counter() - started) * 1000, 1),
+                         **details)
+        except Exception as e:
+            logger.error(f"Warm-up stage {name} failed: {e}")
+            state.update(name, status="failed", duration_ms=round((time.perf_counter() - started) * 1000, 1),
+                         error=str(e))
+    state.finish()
+    logger.info(f"Warm-up finished: {state.as_dict()}")
+
+
+def probe_dependencies() -> Dict[str, dict]:
+    """Round-trip latency of each database, or the error that prevented it"""
+    results = {}
+    for name, pooled_engine in _engines().items():
+        started = time.perf_counter()
+        try:
+            with pooled_engine.connect() as connection:
+                connection.execute(text("SELECT 1"))
+            results[name] = {"ok": True, "latency_ms": round((time.perf_counter() - started) * 1000, 2)}
+        except Exception as e:
+            results[name] = {"ok": False, "error": str(e)}
+    return results
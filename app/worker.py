@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+"""
+Background job worker.
+
+Polls ``background_jobs`` and runs claimed jobs on a thread or process pool.
+The API starts one in-process (``JOB_WORKER_ENABLED``); heavier deployments run
+dedicated workers and add processes to scale. With tenant shards each tenant's
+queue lives in its own shard and gets its own polling thread.
+
+Usage: python -m app.worker [--concurrency N] [--pool thread|process] [--poll-interval SECONDS] [--tenant ID]
+"""
+
+import argparse
+import logging
+import os
+import signal
+import socket
+import sys
+import threading
+import time
+from concurrent.futures import Executor, Future, ThreadPoolExecutor, ProcessPoolExecutor
+from typing import Dict, List, Optional
+
+from app.options import option
+from app.database import (
+    init_db, engine, replica_engine, tenant_engines, SessionLocal, current_tenant, tenant_names, use_tenant
+)
+from app.background_jobs import execute_job
+from app.services.container import get_job_queue_service
+
+logger = logging.getLogger(__name__)
+
+# Seconds between heartbeats of running jobs and sweeps for jobs abandoned by dead workers
+HEARTBEAT_INTERVAL_SECONDS = 30
+
+
+def _reset_connections():
+    """Child processes must not reuse the pooled connections inherited from the parent"""
+    engine.dispose(close=False)
+    replica_engine.dispose(close=False)
+    tenant_engines.dispose_all(close=False)
+
+
+class JobWorker:
+    def __init__(self, concurrency: int = 2, pool: str = "thread", poll_interval: float = 1.0,
+                 session_factory=SessionLocal, tenant: Optional[str] = None):
+        if pool not in ("thread", "process"):
+            raise ValueError("pool must be 'thread' or 'process'")
+        self.concurrency = max(1, concurrency)
+        self.pool = pool
+        self.poll_interval = poll_interval
+        self.session_factory = session_factory
+        self.tenant = tenant
+        self.name = f"{socket.gethostname()}:{os.getpid()}"
+        self.queue = get_job_queue_service()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _executor(self) -> Executor:
+        if self.pool == "process":
+            return ProcessPoolExecutor(max_workers=self.concurrency, initializer=_reset_connections)
+        return ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="job")
+
+    def run(self):
+        """Claim and dispatch jobs until stop() is called"""
+        current_tenant.set(self.tenant)
+        scope = f" for tenant {self.tenant}" if self.tenant else ""
+        logger.info(f"Job worker {self.name}{scope} polling with {self.concurrency} {self.pool} slots")
+        running: Dict[int, Future] = {}
+        last_heartbeat = 0.0
+        with self._executor() as executor:
+            while not self._stop.is_set():
+                try:
+                    for job_id in [job_id for job_id, future in running.items() if future.done()]:
+                        running.pop(job_id).result()
+                    if time.monotonic() - last_heartbeat >= HEARTBEAT_INTERVAL_SECONDS:
+                        with self.session_factory() as db:
+                            self.queue.heartbeat(db, running)
+                            self.queue.requeue_stale(db)
+                        last_heartbeat = time.monotonic()
+
+                    claimed = False
+                    while len(running) < self.concurrency:
+                        with self.session_factory() as db:
+                            job_id = self.queue.claim(db, self.name)
+                        if job_id is None:
+                            break
+                        claimed = True
+                        running[job_id] = executor.submit(execute_job, job_id, self.name, self.tenant)
+                except Exception as e:
+                    logger.error(f"Job worker {self.name} poll failed: {e}")
+                    claimed = False
+                if not claimed:
+                    self._stop.wait(self.poll_interval)
+            # Jobs still running finish before the pool shuts down; queued ones wait for the next worker
+            logger.info(f"Job worker {self.name}{scope} stopping with {len(running)} jobs running")
+
+    def start(self):
+        """Run in a background thread of this process (used by the API)"""
+        self._stop.clear()
+        name = f"job-worker:{self.tenant}" if self.tenant else "job-worker"
+        self._thread = threading.Thread(target=self.run, name=name, daemon=True)
+        self._thread.start()
+
+    def wait(self):
+        """Block until the background thread exits, staying responsive to signals"""
+        while self._thread is not None and self._thread.is_alive():
+            self._thread.join(1)
+
+    def stop(self, timeout: Optional[float] = None):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+
+# One in-process worker per shard
+job_workers: List[JobWorker] = [
+    JobWorker(
+        concurrency=option("job_worker_concurrency", 2),
+        poll_interval=option("job_worker_poll_seconds", 1.0),
+        tenant=tenant,
+    )
+    for tenant in tenant_names()
+]
+
+
+def main():
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description="Run background jobs")
+    parser.add_argument("--concurrency", type=int, default=os.cpu_count() or 2, help="Jobs run at once")
+    parser.add_argument("--pool", choices=["thread", "process"], default="process",
+                        help="Run jobs on threads or in child processes")
+    parser.add_argument("--poll-interval", type=float, default=1.0, help="Seconds between polls of an empty queue")
+    parser.add_argument("--tenant", help="Only run this tenant's jobs (default: every tenant)")
+    args = parser.parse_args()
+
+    try:
+        workers = []
+        for tenant in tenant_names(args.tenant):
+            with use_tenant(tenant):
+                init_db()
+            workers.append(JobWorker(args.concurrency, args.pool, args.poll_interval, tenant=tenant))
+        for signal_number in (signal.SIGTERM, signal.SIGINT):
+            signal.signal(signal_number, lambda *_: [worker.stop() for worker in workers])
+        if len(workers) == 1:
+            workers[0].run()
+        else:
+            for worker in workers:
+                worker.start()
+            for worker in workers:
+                worker.wait()
+    except Exception as e:
+        logger.error(f"Job worker failed: {e}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Benchmark for the employee directory search (GET /api/v1/users/employees/search)
+
+Populates a fresh SQLite database with N employees (default 100,000) and times
+EmployeeService.search_employees for name prefixes, email, employee ID, department
+filters and keyset page walks.
+
+Usage: python bench_directory_search.py [employees] [repeats]
+"""
+
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import date
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench_directory.db')}")
+os.environ.setdefault("DEBUG", "false")
+
+FIRST_NAMES = ["James", "Mary", "Robert", "Patricia", "John", "Jennifer", "Michael", "Linda", "David",
+               "Elizabeth", "William", "Barbara", "Richard", "Susan", "Joseph", "Jessica", "Thomas", "Sarah",
+               "Priya", "Rahul", "Ananya", "Vikram", "Chen", "Wei", "Fatima", "Omar", "Yuki", "Hiro"]
+LAST_NAMES = ["Smith", "Johnson", "Williams", "Brown", "Jones", "Garcia", "Miller", "Davis", "Rodriguez",
+              "Martinez", "Hernandez", "Lopez", "Wilson", "Anderson", "Thomas", "Taylor", "Moore", "Jackson",
+              "Sharma", "Patel", "Iyer", "Reddy", "Wang", "Li", "Khan", "Hassan", "Tanaka", "Sato"]
+DEPARTMENTS = ["Engineering", "Sales", "Marketing", "Finance", "Operations", "Support", "Legal", "People"]
+DESIGNATIONS = ["Engineer", "Senior Engineer", "Manager", "Analyst", "Associate", "Director", "Lead"]
+
+
+def populate(engine, count: int):
+    from app.models.user import User, UserRole
+    from app.models.employee import Employee
+
+    rng = random.Random(42)
+    users, employees = [], []
+    for index in range(1, count + 1):
+        first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+        users.append({"id": index, "email": f"{first.lower()}.{last.lower()}{index}@example.com",
+                      "first_name": first, "last_name": last, "role": UserRole.EMPLOYEE, "is_active": True})
+        employees.append({"id": index, "user_id": index, "employee_id": f"EMP{index:06d}",
+                          "first_name": first, "last_name": last, "department": rng.choice(DEPARTMENTS),
+                          "designation": rng.choice(DESIGNATIONS), "joining_date": date(2020, 1, 1)})
+    with engine.begin() as connection:
+        connection.execute(User.__table__.insert(), users)
+        connection.execute(Employee.__table__.insert(), employees)
+        connection.exec_driver_sql("ANALYZE")
+
+
+def timed(function, repeats: int) -> float:
+    samples = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        function()
+        samples.append((time.perf_counter() - started) * 1000)
+    return statistics.median(samples)
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    repeats = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+
+    from app.database import engine, init_db, SessionLocal
+    from app.services.container import get_employee_service
+
+    init_db()
+    started = time.perf_counter()
+    populate(engine, count)
+    print(f"Populated {count} employees (search index maintained by triggers) in {time.perf_counter() - started:.1f} s")
+
+    service = get_employee_service()
+    cases = [
+        ("name prefix 'pri'", {"q": "pri"}),
+        ("full name 'john smith'", {"q": "john smith"}),
+        ("rare prefix 'hass'", {"q": "hass"}),
+        ("email 'sarah.patel12'", {"q": "sarah.patel12"}),
+        ("employee id 'EMP004242'", {"q": "EMP004242"}),
+        ("department filter", {"department": "Legal"}),
+        ("prefix + designation", {"q": "wa", "designation": "Director"}),
+        ("no filter (first page)", {}),
+    ]
+    with SessionLocal() as db:
+        print(f"{'query':32} {'rows':>5} {'median ms':>10}")
+        for label, params in cases:
+            rows, _ = service.search_employees(db, limit=50, **params)
+            elapsed = timed(lambda: service.search_employees(db, limit=50, **params), repeats)
+            print(f"{label:32} {len(rows):5d} {elapsed:10.2f}")
+
+        # Keyset pages cost the same at any depth
+        cursor, pages = None, 0
+        started = time.perf_counter()
+        while pages < 200:
+            _, cursor = service.search_employees(db, limit=50, cursor=cursor)
+            pages += 1
+            if cursor is None:
+                break
+        print(f"{'keyset walk (per page)':32} {50:5d} {(time.perf_counter() - started) * 1000 / pages:10.2f}")
+
+
+if __name__ == "__main__":
+    main()
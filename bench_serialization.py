@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Benchmark for list endpoint serialization: ORM + Pydantic (before) vs Core rows + orjson (after),
+and the same rows projected to a calendar view's fields (?fields=)
+
+Usage: python bench_serialization.py [number_of_rows]
+"""
+
+import sys
+import os
+import json
+import time
+from datetime import date, datetime, timedelta
+
+# Add the app directory to the Python path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+from fastapi.encoders import jsonable_encoder
+
+from app.database import Base
+from app.models import User, Employee, LeaveType, LeaveRequest
+from app.models.user import UserRole
+from app.schemas.leave import LeaveRequestResponse
+from app.api.responses import FastJSONResponse
+from app.services.leave_service import LeaveService
+
+# What a calendar or table view asks for with ?fields=
+CALENDAR_FIELDS = ["start_date", "end_date", "status", "leave_type_id"]
+
+
+def build_database(rows: int):
+    """Create an in-memory SQLite database holding `rows` leave requests"""
+    engine = create_engine("sqlite://", poolclass=StaticPool, connect_args={"check_same_thread": False})
+    Base.metadata.create_all(bind=engine)
+    start = date.today() + timedelta(days=1)
+    now = datetime.utcnow()
+
+    with engine.begin() as conn:
+        conn.execute(insert(User), [{"id": 1, "email": "bench@example.com", "role": UserRole.EMPLOYEE}])
+        conn.execute(insert(Employee), [{
+            "id": 1, "user_id": 1, "employee_id": "EMP-BENCH", "first_name": "Bench", "last_name": "User",
+            "department": "Engineering", "designation": "Engineer", "joining_date": date(2020, 1, 1)
+        }])
+        conn.execute(insert(LeaveType), [{"id": 1, "name": "Casual Leave", "default_balance": 12}])
+        conn.execute(insert(LeaveRequest), [{
+            "employee_id": 1, "leave_type_id": 1,
+            "start_date": start + timedelta(days=i % 180), "end_date": start + timedelta(days=i % 180),
+            "duration_type": "full_day", "number_of_minutes": 480,
+            "reason": "Benchmark leave request reason", "status": "pending", "created_at": now
+        } for i in range(rows)])
+    return sessionmaker(bind=engine)
+
+
+def serialize_before(Session) -> bytes:
+    """What FastAPI does with response_model over ORM rows"""
+    with Session() as db:
+        leave_requests = db.query(LeaveRequest).all()
+        models = [LeaveRequestResponse.from_orm(lr) for lr in leave_requests]
+        return json.dumps(jsonable_encoder(models)).encode("utf-8")
+
+
+def serialize_after(Session, hr_user) -> bytes:
+    """Core select of the documented columns, encoded directly"""
+    with Session() as db:
+        rows = LeaveService().get_leave_request_rows(db, hr_user)
+        return FastJSONResponse(rows).body
+
+
+def serialize_projected(Session, hr_user) -> bytes:
+    """Core select of only the requested columns"""
+    with Session() as db:
+        rows = LeaveService().get_leave_request_rows(db, hr_user, fields=CALENDAR_FIELDS)
+        return FastJSONResponse(rows).body
+
+
+def measure(label: str, fn, rows: int, repeat: int = 3):
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    print(f"{label:<32} {best * 1000:10.1f} ms  {rows / best:12,.0f} rows/s")
+    return best
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    Session = build_database(rows)
+    hr_user = User(id=0, email="hr@example.com", role=UserRole.HR)
+
+    print(f"Serializing {rows:,} leave requests")
+    before = measure("ORM + Pydantic + json", lambda: serialize_before(Session), rows)
+    after = measure("Core select + fast encoder", lambda: serialize_after(Session, hr_user), rows)
+    projected = measure("Projected select (?fields=)", lambda: serialize_projected(Session, hr_user), rows)
+    print(f"Speed-up: {before / after:.1f}x, {before / projected:.1f}x projected")
+    full_size = len(serialize_after(Session, hr_user))
+    projected_size = len(serialize_projected(Session, hr_user))
+    print(f"Payload: {full_size / 1024:,.0f} KiB, {projected_size / 1024:,.0f} KiB projected")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""
+Benchmark for worker startup: time to import app.main and time until the app answers /ready
+
+Each run is a fresh interpreter, as a newly spawned uvicorn worker would be. "Startup + probe"
+is what a worker forked from a preloaded master (gunicorn --preload) still pays.
+The database schema is created once up front, as `python -m app.migrate` does in deployment.
+
+Usage: python bench_startup.py [runs]
+"""
+
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+CHILD = r"""
+import time
+started = time.perf_counter()
+import app.main
+imported = time.perf_counter()
+from fastapi.testclient import TestClient
+with TestClient(app.main.app, base_url="http://localhost") as client:
+    path = "/ready" if any(getattr(route, "path", None) == "/ready" for route in app.main.app.routes) else "/health"
+    response = client.get(path)
+    while response.status_code == 503:  # Warming up
+        time.sleep(0.005)
+        response = client.get(path)
+    ready = time.perf_counter()
+print(f"{(imported - started) * 1000:.1f} {(ready - started) * 1000:.1f} {response.status_code}")
+"""
+
+
+def main():
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    database = os.path.join(tempfile.mkdtemp(), "bench_startup.db")
+    env = dict(os.environ, DATABASE_URL=f"sqlite:///{database}", PYTHONPATH=ROOT, DEBUG="false")
+
+    subprocess.run([sys.executable, "-c", "from app.database import init_db; init_db()"],
+                   cwd=ROOT, env=env, check=True)
+
+    import_times, ready_times, startup_times = [], [], []
+    for _ in range(runs):
+        output = subprocess.run([sys.executable, "-c", CHILD], cwd=ROOT, env=env, check=True,
+                                capture_output=True, text=True).stdout.strip().splitlines()[-1]
+        import_ms, ready_ms, status_code = output.split()
+        if status_code != "200":
+            raise SystemExit(f"Startup probe returned {status_code}")
+        import_times.append(float(import_ms))
+        ready_times.append(float(ready_ms))
+        startup_times.append(float(ready_ms) - float(import_ms))
+
+    print(f"Runs: {runs}")
+    print(f"Import app.main:   median {statistics.median(import_times):8.1f} ms   min {min(import_times):8.1f} ms")
+    print(f"Startup + probe:   median {statistics.median(startup_times):8.1f} ms   min {min(startup_times):8.1f} ms")
+    print(f"Ready to serve:    median {statistics.median(ready_times):8.1f} ms   min {min(ready_times):8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -5,6 +5,7 @@ Simple test script to verify the Leave Management System components
 
 import sys
 import os
+from datetime import datetime
 
 # Add the app directory to the Python path
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
@@ -19,6 +20,55 @@ logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 
+def _leave_test_db():
+    """In-memory database with HR, a manager with two reports (Eng and Ops) and a Casual leave type.
+
+    Every employee has this year's 12-day Casual balance. Returns the engine, a session and the seeded rows.
+    """
+    from datetime import date
+    from types import SimpleNamespace
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import sessionmaker
+    from sqlalchemy.pool import StaticPool
+    from app.database import Base
+    from app.models.user import UserRole
+
+    engine = create_engine("sqlite://", poolclass=StaticPool, connect_args={"check_same_thread": False})
+    Base.metadata.create_all(bind=engine)
+    db = sessionmaker(bind=engine, autoflush=False)()
+    hr = User(email="hr@example.com", first_name="Hana", last_name="Rao", role=UserRole.HR, is_active=True)
+    people = [("Mia", "Grant", "Eng", "Lead"), ("Eli", "Stone", "Eng", "Developer"), ("Ola", "Berg", "Ops", "Analyst")]
+    users = [User(email=f"{first.lower()}@example.com", first_name=first, last_name=last, role=UserRole.EMPLOYEE,
+                  is_active=True) for first, last, _, _ in people]
+    leave_type = LeaveType(name="Casual", category="casual", default_balance=12, allow_half_day=True)
+    db.add_all([hr, leave_type] + users)
+    db.flush()
+    employees = []
+    for number, (user, (first, last, department, designation)) in enumerate(zip(users, people), start=1):
+        employees.append(Employee(user_id=user.id, employee_id=f"E{number:03d}", first_name=first, last_name=last,
+                                  department=department, designation=designation, joining_date=date(2020, 1, number),
+                                  manager_id=employees[0].id if employees else None))
+        db.add(employees[-1])
+        db.flush()
+    db.add_all([EmployeeLeaveBalance(employee_id=employee.id, leave_type_id=leave_type.id, year=date.today().year,
+                                     allocated_minutes=12 * 480, available_minutes=12 * 480)
+                for employee in employees])
+    db.commit()
+    manager, *reports = employees
+    return engine, db, SimpleNamespace(hr=hr, users=users, manager=manager, reports=reports, employees=employees,
+                                       leave_type=leave_type)
+
+
+def _next_working_day(offset: int = 1):
+    """A weekday offset or more days from today, or None when the year has none left"""
+    from datetime import date, timedelta
+
+    day = date.today() + timedelta(days=offset)
+    while day.weekday() >= 5:
+        day += timedelta(days=1)
+    return day if day.year == date.today().year else None
+
+
 def test_config():
     """Test configuration loading"""
     logger.info("Testing configuration...")
@@ -52,6 +102,1324 @@ def test_database():
     return True
 
 
+def test_options_read_undeclared_settings_from_environment(monkeypatch):
+    """Settings that Settings does not declare come from the environment, converted to the default's type"""
+    from app.options import option
+
+    monkeypatch.setenv("TENANT_DATABASE_URL", "sqlite:///./tenants/{tenant}.db")
+    monkeypatch.setenv("JOB_MAX_ATTEMPTS", "5")
+    monkeypatch.setenv("SCHEDULER_ENABLED", "false")
+    monkeypatch.setenv("JOB_WORKER_POLL_SECONDS", "0.5")
+    monkeypatch.setenv("DASHBOARD_LIST_LIMIT", "")
+    assert option("tenant_database_url", None) == "sqlite:///./tenants/{tenant}.db"
+    assert option("job_max_attempts", 3) == 5
+    assert option("scheduler_enabled", True) is False
+    assert option("job_worker_poll_seconds", 1.0) == 0.5
+    assert option("dashboard_list_limit", 10) == 10
+    assert option("app_name", "unused") == settings.app_name
+
+
+def test_create_leave_request_statement_count():
+    """The leave request hot path loads the employee, leave type and balance once each"""
+    from datetime import date, timedelta
+    from sqlalchemy import create_engine, event
+    from sqlalchemy.orm import sessionmaker
+    from sqlalchemy.pool import StaticPool
+    from app.cache import holiday_cache, user_cache
+    from app.database import Base
+    from app.models.user import UserRole
+    from app.schemas.leave import LeaveRequestCreate
+    from app.services.container import get_leave_service
+
+    start = date.today() + timedelta(days=1)
+    while start.weekday() >= 5:
+        start += timedelta(days=1)
+    if start.year != date.today().year:
+        logger.info("Statement count test skipped: no working day left this year")
+        return
+
+    engine = create_engine("sqlite://", poolclass=StaticPool, connect_args={"check_same_thread": False})
+    Base.metadata.create_all(bind=engine)
+    db = sessionmaker(bind=engine, autoflush=False)()
+    user = User(email="counted@example.com", first_name="Count", last_name="Ed", role=UserRole.EMPLOYEE, is_active=True)
+    db.add(user)
+    db.flush()
+    employee = Employee(user_id=user.id, employee_id="COUNT1", first_name="Count", last_name="Ed",
+                        department="Eng", designation="Dev", joining_date=date(2020, 1, 1))
+    leave_type = LeaveType(name="Counted", category="casual", default_balance=12)
+    db.add_all([employee, leave_type])
+    db.flush()
+    db.add(EmployeeLeaveBalance(employee_id=employee.id, leave_type_id=leave_type.id, year=start.year,
+                                allocated_minutes=12 * 480, available_minutes=12 * 480))
+    db.commit()
+    leave_request_data = LeaveRequestCreate(leave_type_id=leave_type.id, start_date=start, end_date=start,
+                                            reason="Statement count check", duration_type="full_day")
+    db.refresh(user)
+    holiday_cache.clear()
+    user_cache.clear()
+
+    statements = []
+    event.listen(engine, "before_cursor_execute",
+                 lambda conn, cursor, statement, *args: statements.append(" ".join(statement.split())))
+    get_leave_service().create_leave_request(db, leave_request_data, user)
+    db.close()
+
+    def selects_from(table):
+        return sum(1 for statement in statements if statement.startswith("SELECT") and f"FROM {table} " in statement + " ")
+
+    logger.info(f"create_leave_request issued {len(statements)} statements")
+    assert selects_from("employees") == 1
+    assert selects_from("leave_types") == 1
+    assert selects_from("employee_leave_balances") == 1
+    assert selects_from("users") == 0  # HR hears about it in the next digest, not per request
+    assert len(statements) <= 13
+
+
+def test_ledger_movement_in_flight_blocks_compaction():
+    """A movement holds a shared balance row lock until commit, so compaction cannot fold past it.
+
+    Movement ids are assigned at insert but become visible at commit; a snapshot
+    taken in between would never fold the late-committing movement. SQLite has no
+    row locks, so the engine here enforces ``FOR SHARE`` / ``FOR UPDATE`` like
+    Postgres would, failing instead of waiting when another connection holds a
+    conflicting lock. Appending writers share the row; reads take no lock and never fold.
+    """
+    import tempfile
+    from datetime import date
+    from sqlalchemy import create_engine, event
+    from sqlalchemy.orm import sessionmaker
+    from app.database import Base
+    from app.models.user import UserRole
+    from app.models.leave_ledger import BalanceMovementKind, LeaveBalanceSnapshot
+    from app.services.ledger_service import LedgerService, SNAPSHOT_EVERY
+
+    class RowLocked(Exception):
+        pass
+
+    engine = create_engine(f"sqlite:///{tempfile.mkdtemp()}/ledger.db", connect_args={"timeout": 0.1})
+    Base.metadata.create_all(bind=engine)
+    holders = {}  # DBAPI connection -> "shared" or "exclusive"
+
+    @event.listens_for(engine, "before_execute")
+    def lock_rows(conn, clauseelement, multiparams, params, execution_options):
+        for_update = getattr(clauseelement, "_for_update_arg", None)
+        if for_update is not None:
+            me = conn.connection.dbapi_connection
+            others = [mode for holder, mode in holders.items() if holder is not me]
+            if "exclusive" in others or (others and not for_update.read):
+                raise RowLocked()
+            if holders.get(me) != "exclusive":
+                holders[me] = "shared" if for_update.read else "exclusive"
+
+    @event.listens_for(engine, "commit")
+    @event.listens_for(engine, "rollback")
+    def release_rows(conn):
+        holders.pop(conn.connection.dbapi_connection, None)
+
+    Session = sessionmaker(bind=engine)
+    ledger = LedgerService()
+    year = date.today().year
+    setup = Session()
+    user = User(email="ledger@example.com", first_name="Led", last_name="Ger", role=UserRole.EMPLOYEE, is_active=True)
+    setup.add(user)
+    setup.flush()
+    employee = Employee(user_id=user.id, employee_id="LEDGER1", first_name="Led", last_name="Ger",
+                        department="Eng", designation="Dev", joining_date=date(2020, 1, 1))
+    leave_type = LeaveType(name="Ledgered", category="casual", default_balance=12)
+    setup.add_all([employee, leave_type])
+    setup.flush()
+    key = (employee.id, leave_type.id, year)
+    setup.add(EmployeeLeaveBalance(employee_id=key[0], leave_type_id=key[1], year=year))
+    ledger.record(setup, *key, BalanceMovementKind.ALLOCATE, 12 * 480)
+    setup.commit()
+    setup.close()
+
+    writer, other_writer = Session(), Session()
+    ledger.record(writer, *key, BalanceMovementKind.RESERVE, 480)
+    writer.flush()  # The movement has its id but is not committed
+    ledger.lock_balances(other_writer, [key])  # Another append shares the row (SQLite itself serializes the insert)
+    other_writer.rollback()
+    other_writer.close()
+
+    compactor = Session()
+    try:
+        ledger.compact(compactor)
+        raise AssertionError("compaction folded a balance with a movement in flight")
+    except RowLocked:
+        compactor.rollback()
+    finally:
+        compactor.close()
+
+    writer.commit()
+    writer.close()
+
+    reader = Session()
+    for _ in range(SNAPSHOT_EVERY):
+        ledger.record(reader, *key, BalanceMovementKind.ALLOCATE, 0)
+    reader.commit()
+    assert ledger.get_balance(reader, *key).allocated_minutes == 5760
+    assert not reader.new and not reader.dirty and reader.query(LeaveBalanceSnapshot).count() == 0
+    reader.close()
+
+    compactor = Session()
+    assert ledger.compact(compactor) == 1
+    balance = ledger.get_balance(compactor, *key)
+    assert (balance.allocated_minutes, balance.pending_minutes, balance.available_minutes) == (5760, 480, 5280)
+    positions = [snapshot.ledger_position for snapshot in compactor.query(LeaveBalanceSnapshot)]
+    assert max(positions) == balance.ledger_position
+    assert ledger.get_unfolded_deltas(compactor) == {}
+    compactor.close()
+    engine.dispose()
+
+
+def test_cache_drops_values_invalidated_while_loading():
+    """A value whose invalidation lands between the load and the set is not cached"""
+    from app.cache import LocalCache
+
+    cache = LocalCache("test")
+    loads = []
+
+    def stale_load():
+        loads.append(1)
+        cache.invalidate(tags=["rows"])  # A writer commits and publishes mid-load
+        return "stale"
+
+    assert cache.get_or_set("row", stale_load, tags=["rows"]) == "stale"
+    assert cache.get("row") is None
+    assert cache.get_or_set("row", lambda: "fresh", tags=["rows"]) == "fresh"
+    assert cache.get("row") == "fresh"
+
+    generation = cache.generation
+    cache.invalidate(keys=["other"])
+    assert not cache.set("late", "stale", generation=generation)
+    assert cache.get("late") is None
+
+
+def test_file_bus_rotation_loses_no_messages():
+    """Readers finish a rotated log before following the new one; one that missed a whole log flushes"""
+    import tempfile
+    import time
+    from app.cache import FileBusBackend, FLUSH_MESSAGE
+
+    def deliver(messages, reader_interval, pause):
+        with tempfile.TemporaryDirectory() as folder:
+            path = os.path.join(folder, "bus.log")
+            received = []
+            reader = FileBusBackend(path, poll_interval=reader_interval, max_bytes=64)
+            reader.start(received.append)
+            writer = FileBusBackend(path, max_bytes=64)
+            try:
+                for message in messages:
+                    writer.publish(message)
+                    time.sleep(pause)
+                deadline = time.time() + 5
+                while messages[-1] not in received and time.time() < deadline:
+                    time.sleep(0.01)
+                time.sleep(reader_interval * 2)
+            finally:
+                reader.stop()
+            assert os.path.getsize(path) <= 64 + len("#99\n") + len(messages[-1]) + 1
+            return received
+
+    sent = [f"message-{number}" for number in range(60)]
+    assert deliver(sent, 0.001, 0.005) == sent  # About one rotation per poll
+    received = deliver(sent, 0.3, 0)  # Many rotations per poll
+    assert FLUSH_MESSAGE in received
+    assert [message for message in received if message != FLUSH_MESSAGE] == \
+        [message for message in sent if message in received]
+
+
+def test_accrual_rule_keeps_upfront_allocation():
+    """Making a leave type accrue does not stack monthly accruals on a year already allocated up front"""
+    from datetime import date
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import sessionmaker
+    from sqlalchemy.pool import StaticPool
+    from app.database import Base
+    from app.models.user import UserRole
+    from app.schemas.accrual import LeaveAccrualRuleUpdate
+    from app.services.accrual_service import AccrualService
+    from app.services.ledger_service import LedgerService
+
+    engine = create_engine("sqlite://", poolclass=StaticPool, connect_args={"check_same_thread": False})
+    Base.metadata.create_all(bind=engine)
+    db = sessionmaker(bind=engine, autoflush=False)()
+    year = date.today().year
+    user = User(email="accrued@example.com", first_name="Ac", last_name="Crued", role=UserRole.EMPLOYEE, is_active=True)
+    db.add(user)
+    db.flush()
+    employee = Employee(user_id=user.id, employee_id="ACCR1", first_name="Ac", last_name="Crued",
+                        department="Eng", designation="Dev", joining_date=date(2020, 1, 1))
+    leave_type = LeaveType(name="Accrued", category="casual", default_balance=12)
+    db.add_all([employee, leave_type])
+    db.flush()
+    db.add(EmployeeLeaveBalance(employee_id=employee.id, leave_type_id=leave_type.id, year=year,
+                                allocated_minutes=12 * 480, available_minutes=12 * 480))
+    db.commit()
+
+    accruals, ledger = AccrualService(), LedgerService()
+    accruals.set_rule(db, leave_type.id, LeaveAccrualRuleUpdate(monthly_days=1.5, starts_on=date(year, 1, 1)))
+    accruals.run(db, through=date(year, 12, 1))
+    assert ledger.get_balance(db, employee.id, leave_type.id, year).allocated_minutes == 12 * 480
+
+    accruals.run(db, through=date(year + 1, 2, 1))
+    assert ledger.get_balance(db, employee.id, leave_type.id, year + 1).allocated_minutes == 2 * 720
+    db.close()
+    engine.dispose()
+
+
+def test_cron_schedule_day_fields():
+    """Restricting both day fields fires on either, as in cron; restricting one fires on that one only"""
+    from datetime import datetime
+    from app.scheduler import CronSchedule
+
+    either = CronSchedule("0 9 1 * 1")  # The 1st of the month or any Monday
+    first = either.next_after(datetime(2026, 10, 27, 12, 0))
+    assert first == datetime(2026, 11, 1, 9, 0)  # A Sunday
+    assert either.next_after(first) == datetime(2026, 11, 2, 9, 0)  # A Monday
+    assert CronSchedule("0 9 1 * *").next_after(first) == datetime(2026, 12, 1, 9, 0)
+    assert CronSchedule("0 9 * * 1").next_after(datetime(2026, 10, 27)) == datetime(2026, 11, 2, 9, 0)
+    assert CronSchedule("*/20 8 * * *").next_after(datetime(2026, 10, 27, 8, 40)) == datetime(2026, 10, 28, 8, 0)
+    for expression in ("0 9 * *", "0 24 * * *", "0 0 31 2 *"):
+        try:
+            CronSchedule(expression).next_after(datetime(2026, 1, 1))
+        except ValueError:
+            continue
+        raise AssertionError(f"{expression!r} was accepted")
+
+
+def test_scheduler_lock_lease_and_slot_claim(monkeypatch):
+    """The SQLite lease lock is exclusive until it expires, and a slot runs once however many workers race for it"""
+    import asyncio
+    import tempfile
+    from datetime import datetime, timedelta
+    from sqlalchemy import create_engine, update
+    from sqlalchemy.orm import sessionmaker
+    from app import scheduler
+    from app.database import Base
+    from app.models.job_run import JobRun, SchedulerLock
+
+    engine = create_engine(f"sqlite:///{tempfile.mkdtemp()}/scheduler.db")
+    Base.metadata.create_all(bind=engine)
+    session_factory = sessionmaker(bind=engine, autoflush=False)
+    monkeypatch.setattr(scheduler, "SessionLocal", session_factory)
+    monkeypatch.setattr(scheduler, "get_engine", lambda replica=False, tenant=None: engine)
+
+    holder, other = scheduler.JobLock("lease", 60), scheduler.JobLock("lease", 60)
+    assert holder.acquire()
+    assert not other.acquire()
+    with session_factory() as db:  # The holder died; its lease runs out
+        db.execute(update(SchedulerLock).values(locked_until=datetime.utcnow() - timedelta(seconds=1)))
+        db.commit()
+    assert other.acquire()
+    other.release()
+    assert holder.acquire()
+    holder.release()
+
+    runs = []
+    job = scheduler.ScheduledJob("counted", "* * * * *", lambda db: runs.append(1) or 7, jitter_seconds=0)
+    worker = scheduler.Scheduler([job], session_factory)
+    slot = datetime(2026, 10, 27, 9, 0)
+
+    async def race():
+        return await asyncio.gather(*(worker.run_job(job, slot) for _ in range(3)))
+
+    run_ids = [run_id for run_id in asyncio.run(race()) if run_id is not None]
+    assert len(run_ids) == 1 and runs == [1]
+    assert asyncio.run(worker.run_job(job, slot)) is None  # Lock free again, but the slot is taken
+    assert runs == [1]
+    with session_factory() as db:
+        run = db.get(JobRun, run_ids[0])
+        assert (run.status, run.rows_processed) == ("succeeded", 7)
+        assert db.get(SchedulerLock, "counted").locked_until.replace(tzinfo=None) <= datetime.utcnow()
+    engine.dispose()
+
+
+def test_job_queue_claim_and_stale_requeue():
+    """A queued job goes to one worker only; stale jobs are requeued until max_attempts, then failed"""
+    import tempfile
+    from datetime import datetime, timedelta
+    from sqlalchemy import create_engine, event, update
+    from sqlalchemy.orm import sessionmaker
+    from app.database import Base
+    from app.models.background_job import BackgroundJob, BackgroundJobStatus
+    from app.services.job_queue_service import JobQueueService
+
+    engine = create_engine(f"sqlite:///{tempfile.mkdtemp()}/jobs.db")
+    Base.metadata.create_all(bind=engine)
+    session_factory = sessionmaker(bind=engine, autoflush=False)
+    queue = JobQueueService()
+    queue.max_attempts = 2
+    first, second = session_factory(), session_factory()
+    job_id = queue.enqueue(first, "export", {}).id
+
+    # The second worker claims the job between the first worker's SELECT and its UPDATE
+    @event.listens_for(engine, "before_cursor_execute")
+    def interleave(conn, cursor, statement, *args):
+        if statement.startswith("UPDATE background_jobs") and not interleave.fired:
+            interleave.fired = True
+            assert queue.claim(second, "worker-b") == job_id
+    interleave.fired = False
+    assert queue.claim(first, "worker-a") is None
+    event.remove(engine, "before_cursor_execute", interleave)
+    assert queue.claim(first, "worker-a") is None  # Nothing queued
+
+    def go_stale():
+        first.execute(update(BackgroundJob).values(heartbeat_at=datetime.utcnow() - timedelta(hours=1)))
+        first.commit()
+
+    go_stale()
+    assert queue.requeue_stale(first) == 1
+    assert queue.claim(first, "worker-a") == job_id
+    queue.finish(second, job_id, "worker-b", {"late": True})  # Worker B lost the job; its result is dropped
+    go_stale()
+    assert queue.requeue_stale(first) == 0
+    job = first.get(BackgroundJob, job_id)
+    first.refresh(job)
+    assert (job.status, job.attempts, job.error) == (BackgroundJobStatus.FAILED.value, 2, "Worker stopped responding")
+    assert job.result is None
+    first.close()
+    second.close()
+    engine.dispose()
+
+
+def test_hr_digest_mails_requests_committed_out_of_id_order():
+    """A pending request whose id is below one already mailed still reaches HR in the next digest"""
+    from datetime import date
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import sessionmaker
+    from sqlalchemy.pool import StaticPool
+    from app.cache import user_cache
+    from app.database import Base
+    from app.models.user import UserRole
+    from app.models.leave_request import LeaveStatus
+    from app.services.hr_digest_service import HrDigestService
+
+    engine = create_engine("sqlite://", poolclass=StaticPool, connect_args={"check_same_thread": False})
+    Base.metadata.create_all(bind=engine)
+    db = sessionmaker(bind=engine, autoflush=False)()
+    hr = User(email="digest-hr@example.com", first_name="Hr", last_name="Digest", role=UserRole.HR, is_active=True)
+    user = User(email="digest@example.com", first_name="Di", last_name="Gest", role=UserRole.EMPLOYEE, is_active=True)
+    db.add_all([hr, user])
+    db.flush()
+    employee = Employee(user_id=user.id, employee_id="DIG1", first_name="Di", last_name="Gest",
+                        department="Eng", designation="Dev", joining_date=date(2020, 1, 1))
+    leave_type = LeaveType(name="Digested", category="casual", default_balance=12)
+    db.add_all([employee, leave_type])
+    db.flush()
+
+    def submit(request_id):
+        db.add(LeaveRequest(id=request_id, employee_id=employee.id, leave_type_id=leave_type.id,
+                            start_date=date(2026, 11, 2), end_date=date(2026, 11, 2), number_of_minutes=480,
+                            reason="Digest check", status=LeaveStatus.PENDING.value))
+        db.commit()
+
+    service = HrDigestService()
+    mailed = []
+
+    async def send(email, first_name, leave_requests):
+        mailed.append([row["id"] for row in leave_requests])
+        return True
+
+    service.email_service.send_hr_leave_digest_email = send
+    user_cache.clear()
+    submit(2)
+    assert service.send_digests(db) == 1
+    submit(1)  # Its id was assigned first, but it committed after 2 was mailed
+    assert service.send_digests(db) == 1
+    assert service.send_digests(db) == 0
+    assert mailed == [[2], [1]]
+    db.close()
+    engine.dispose()
+
+
+def test_holiday_calendar_assignments_and_company_holidays_are_unique():
+    """Department-only assignments and company-wide holidays cannot be duplicated, though their other column is NULL"""
+    from datetime import date
+    from sqlalchemy import create_engine
+    from sqlalchemy.exc import IntegrityError
+    from sqlalchemy.orm import sessionmaker
+    from sqlalchemy.pool import StaticPool
+    from app.database import Base
+    from app.models.holiday import Holiday
+    from app.models.holiday_calendar import HolidayCalendarAssignment
+    from app.models.user import UserRole
+    from app.schemas.holiday_calendar import HolidayCalendarCreate, HolidayCalendarAssignmentItem
+    from app.services.holiday_calendar_service import HolidayCalendarService
+
+    engine = create_engine("sqlite://", poolclass=StaticPool, connect_args={"check_same_thread": False})
+    Base.metadata.create_all(bind=engine)
+    db = sessionmaker(bind=engine, autoflush=False)()
+    hr = User(email="calendars@example.com", first_name="Cal", last_name="Endar", role=UserRole.HR, is_active=True)
+    db.add(hr)
+    db.commit()
+    service = HolidayCalendarService()
+    engineering = [HolidayCalendarAssignmentItem(department="Eng")]
+    first = service.create_calendar(db, HolidayCalendarCreate(name="First", assignments=engineering), hr)
+    second = service.create_calendar(db, HolidayCalendarCreate(name="Second"), hr)
+
+    for attempt in (lambda: service.create_calendar(db, HolidayCalendarCreate(name="Third", assignments=engineering), hr),
+                    lambda: service.set_assignments(db, second.id, engineering, hr),
+                    lambda: service.set_assignments(db, second.id, engineering * 2, hr)):
+        try:
+            attempt()
+        except ValueError:
+            continue
+        raise AssertionError("A department was assigned to two calendars")
+    service.set_assignments(db, first.id, engineering + [HolidayCalendarAssignmentItem(location="Pune")], hr)
+    assert service.resolve_calendar_id(db, "Eng", None) == first.id
+
+    db.add(HolidayCalendarAssignment(calendar_id=second.id, location="Pune"))
+    try:
+        db.commit()
+        raise AssertionError("The database accepted a duplicate location-only assignment")
+    except IntegrityError:
+        db.rollback()
+    db.add_all([Holiday(date=date(2026, 1, 1), name="New Year"), Holiday(date=date(2026, 1, 1), name="Again")])
+    try:
+        db.commit()
+        raise AssertionError("The database accepted two company-wide holidays on one date")
+    except IntegrityError:
+        db.rollback()
+    db.close()
+    engine.dispose()
+
+
+def test_holiday_edit_changes_feed_etag():
+    """Editing or deleting a holiday through the API evicts the calendar feeds that show it"""
+    from datetime import date
+    from fastapi.testclient import TestClient
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import sessionmaker
+    from sqlalchemy.pool import StaticPool
+    from app.api.deps import get_hr_or_super_admin
+    from app.cache import feed_cache, holiday_cache
+    from app.database import Base, get_db, get_read_db
+    from app.main import app
+    from app.models.holiday import Holiday
+    from app.models.user import UserRole
+    from app.services.container import get_calendar_feed_service
+
+    engine = create_engine("sqlite://", poolclass=StaticPool, connect_args={"check_same_thread": False})
+    Base.metadata.create_all(bind=engine)
+    session_factory = sessionmaker(bind=engine, autoflush=False)
+    db = session_factory()
+    hr = User(email="feeds@example.com", first_name="Fe", last_name="Eds", role=UserRole.HR, is_active=True)
+    holiday = Holiday(date=date(date.today().year, 12, 25), name="Winter Break", is_recurring=False)
+    db.add_all([hr, holiday])
+    db.commit()
+
+    def session():
+        with session_factory() as request_db:
+            yield request_db
+
+    app.dependency_overrides.update({get_db: session, get_read_db: session, get_hr_or_super_admin: lambda: hr})
+    feed_cache.clear()
+    holiday_cache.clear()
+    try:
+        client = TestClient(app, base_url="http://localhost")  # An allowed host
+        feed_url = "/api/v1/calendar-feeds" + get_calendar_feed_service().feed_path("company", "all")
+        before = client.get(feed_url)
+        assert before.status_code == 200 and b"Winter Break" in before.content
+        assert client.get(feed_url, headers={"If-None-Match": before.headers["etag"]}).status_code == 304
+
+        edited = client.put(f"/api/v1/holidays/{holiday.id}",
+                            json={"date": str(holiday.date), "name": "Year End Break", "is_recurring": False})
+        assert edited.status_code == 200 and edited.json()["name"] == "Year End Break"
+        after = client.get(feed_url, headers={"If-None-Match": before.headers["etag"]})
+        assert after.status_code == 200 and b"Year End Break" in after.content
+        assert after.headers["etag"] != before.headers["etag"]
+
+        assert client.delete(f"/api/v1/holidays/{holiday.id}").status_code == 204
+        assert client.delete(f"/api/v1/holidays/{holiday.id}").status_code == 404
+        gone = client.get(feed_url, headers={"If-None-Match": after.headers["etag"]})
+        assert gone.status_code == 200 and b"Year End Break" not in gone.content
+    finally:
+        app.dependency_overrides.clear()
+        db.close()
+        engine.dispose()
+
+
+def test_cache_fill_reads_primary_not_replica(monkeypatch):
+    """A cache miss on a replica-routed Session loads from the primary, so a lagging replica is never cached"""
+    import tempfile
+    from datetime import date
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import sessionmaker
+    import app.database as database
+    from app.cache import holiday_cache
+    from app.database import Base, RoutingSession
+    from app.models.holiday import Holiday
+    from app.services.holiday_calendar_service import HolidayCalendarService
+
+    with tempfile.TemporaryDirectory() as folder:
+        primary = create_engine(f"sqlite:///{folder}/primary.db")
+        replica = create_engine(f"sqlite:///{folder}/replica.db")
+        for bound, name in ((primary, "Fresh Holiday"), (replica, "Stale Holiday")):
+            Base.metadata.create_all(bind=bound)
+            with sessionmaker(bind=bound)() as seed:
+                seed.add(Holiday(date=date(2026, 3, 2), name=name, is_recurring=False))
+                seed.commit()
+        monkeypatch.setattr(database, "engine", primary)
+        monkeypatch.setattr(database, "replica_engine", replica)
+        monkeypatch.setattr(database, "SessionLocal",
+                            sessionmaker(class_=RoutingSession, autoflush=False, bind=primary))
+        holiday_cache.clear()
+        try:
+            with sessionmaker(class_=RoutingSession, autoflush=False, bind=replica)(replica=True) as read_db:
+                year = HolidayCalendarService().get_year(read_db, None, 2026)
+                assert [holiday["name"] for holiday in year.holidays] == ["Fresh Holiday"]
+                assert read_db.query(Holiday.name).scalar() == "Stale Holiday"  # The Session itself still reads the replica
+        finally:
+            holiday_cache.clear()
+            primary.dispose()
+            replica.dispose()
+
+
+def test_reads_route_to_replica_until_the_client_writes(monkeypatch):
+    """GETs read the replica, writes and a writer's following reads the primary; cache fills skip the replica"""
+    import tempfile
+    from fastapi.testclient import TestClient
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import sessionmaker
+    import app.database as database
+    from app.api.deps import get_hr_or_super_admin
+    from app.cache import leave_type_cache
+    from app.database import Base, RoutingSession, READ_PRIMARY_COOKIE
+    from app.main import app
+    from app.models.user import UserRole
+
+    with tempfile.TemporaryDirectory() as folder:
+        primary = create_engine(f"sqlite:///{folder}/primary.db")
+        replica = create_engine(f"sqlite:///{folder}/replica.db")
+        for bound, description in ((primary, "current"), (replica, "lagging")):
+            Base.metadata.create_all(bind=bound)
+            with sessionmaker(bind=bound)() as seed:
+                seed.add(LeaveType(name="Annual", description=description, default_balance=20))
+                seed.commit()
+        monkeypatch.setattr(database, "engine", primary)
+        monkeypatch.setattr(database, "replica_engine", replica)
+        monkeypatch.setattr(database, "SessionLocal", sessionmaker(class_=RoutingSession, autoflush=False,
+                                                                   bind=primary))
+        monkeypatch.setattr(database, "ReplicaSessionLocal", sessionmaker(class_=RoutingSession, autoflush=False,
+                                                                          bind=replica, replica=True))
+        monkeypatch.setattr(database, "_recent_writers", {})
+        hr = User(id=1, email="router@example.com", first_name="Ro", last_name="Uter", role=UserRole.HR,
+                  is_active=True)
+        app.dependency_overrides[get_hr_or_super_admin] = lambda: hr
+        leave_type_cache.clear()
+        try:
+            reader = TestClient(app, base_url="http://localhost")
+            assert reader.get("/api/v1/leave-types/1").json()["description"] == "lagging"
+            assert reader.get("/api/v1/leave-types").json()[0]["description"] == "current"  # Shared cache fill
+
+            writer = TestClient(app, base_url="http://localhost", headers={"Authorization": "Bearer writer"})
+            edited = writer.put("/api/v1/leave-types/1", json={"description": "edited"})
+            assert edited.status_code == 200 and READ_PRIMARY_COOKIE in edited.cookies
+            with primary.connect() as connection:
+                assert connection.exec_driver_sql("SELECT description FROM leave_types").scalar() == "edited"
+            with replica.connect() as connection:
+                assert connection.exec_driver_sql("SELECT description FROM leave_types").scalar() == "lagging"
+            assert writer.get("/api/v1/leave-types/1").json()["description"] == "edited"
+
+            cookie_only = TestClient(app, base_url="http://localhost")  # Another worker would only see the cookie
+            cookie_only.cookies.set(READ_PRIMARY_COOKIE, edited.cookies[READ_PRIMARY_COOKIE])
+            assert cookie_only.get("/api/v1/leave-types/1").json()["description"] == "edited"
+            assert reader.get("/api/v1/leave-types/1").json()["description"] == "lagging"
+        finally:
+            app.dependency_overrides.clear()
+            leave_type_cache.clear()
+            primary.dispose()
+            replica.dispose()
+
+
+def test_migration_converts_day_quantities_to_minutes(monkeypatch):
+    """Day-valued leave columns of an old database become integer minutes, once"""
+    from sqlalchemy import create_engine, inspect, text
+    from sqlalchemy.pool import StaticPool
+    import app.migrate as migrate
+
+    engine = create_engine("sqlite://", poolclass=StaticPool, connect_args={"check_same_thread": False})
+    with engine.begin() as connection:
+        connection.execute(text("CREATE TABLE leave_requests (id INTEGER PRIMARY KEY, number_of_days FLOAT NOT NULL)"))
+        connection.execute(text("CREATE TABLE employee_leave_balances (id INTEGER PRIMARY KEY, allocated_days FLOAT, "
+                                "used_days FLOAT, pending_days FLOAT, carried_forward_days FLOAT, "
+                                "available_balance FLOAT)"))
+        connection.execute(text("CREATE TABLE leave_accrual_rules (id INTEGER PRIMARY KEY, monthly_days FLOAT)"))
+        connection.execute(text("INSERT INTO leave_requests VALUES (1, 2), (2, 0.5), (3, 0.125)"))
+        connection.execute(text("INSERT INTO employee_leave_balances VALUES (1, 20, 1.5, 0.5, 2, 20)"))
+        connection.execute(text("INSERT INTO leave_accrual_rules VALUES (1, 1.75), (2, NULL)"))
+    monkeypatch.setattr(migrate, "get_engine", lambda: engine)
+    migrate.convert_leave_quantities()
+    migrate.convert_leave_quantities()
+
+    with engine.connect() as connection:
+        assert connection.execute(text("SELECT number_of_minutes FROM leave_requests ORDER BY id")).scalars().all() == \
+            [960, 240, 60]
+        assert tuple(connection.execute(text(
+            "SELECT allocated_minutes, used_minutes, pending_minutes, carried_forward_minutes, available_minutes "
+            "FROM employee_leave_balances")).one()) == (9600, 720, 240, 960, 9600)
+        assert connection.execute(text("SELECT monthly_minutes FROM leave_accrual_rules ORDER BY id")).scalars().all() \
+            == [840, None]
+    columns = {column["name"] for column in inspect(engine).get_columns("leave_requests")}
+    assert columns == {"id", "number_of_minutes"}
+    engine.dispose()
+
+
+def test_migration_adds_indexes_to_existing_tables(monkeypatch):
+    """Tables created before an index was declared get it from the migration"""
+    from sqlalchemy import create_engine, text
+    from sqlalchemy.pool import StaticPool
+    import app.migrate as migrate
+    from app.database import Base
+
+    engine = create_engine("sqlite://", poolclass=StaticPool, connect_args={"check_same_thread": False})
+    Base.metadata.create_all(bind=engine)
+    added = {"ix_leave_requests_employee_status", "ix_leave_request_audits_request", "ix_leave_request_audits_created_at"}
+    with engine.begin() as connection:
+        for name in added:
+            connection.execute(text(f"DROP INDEX {name}"))
+    monkeypatch.setattr(migrate, "get_engine", lambda: engine)
+    migrate.add_missing_indexes()
+    migrate.add_missing_indexes()
+    with engine.connect() as connection:
+        assert added <= migrate.index_names(connection, "leave_requests") | migrate.index_names(
+            connection, "leave_request_audits")
+    engine.dispose()
+
+
+def test_employee_move_or_rename_evicts_department_feeds():
+    """Changing an employee's department or name rebuilds the feeds of both departments"""
+    from datetime import date
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import sessionmaker
+    from sqlalchemy.pool import StaticPool
+    from app.cache import feed_cache
+    from app.database import Base
+    from app.models.user import UserRole
+    from app.schemas.employee import EmployeeUpdate
+    from app.services.container import get_calendar_feed_service, get_employee_service
+
+    engine = create_engine("sqlite://", poolclass=StaticPool, connect_args={"check_same_thread": False})
+    Base.metadata.create_all(bind=engine)
+    db = sessionmaker(bind=engine, autoflush=False)()
+    user = User(email="mover@example.com", first_name="Mo", last_name="Ver", role=UserRole.EMPLOYEE, is_active=True)
+    leave_type = LeaveType(name="Casual", default_balance=10)
+    db.add_all([user, leave_type])
+    db.flush()
+    employee = Employee(user_id=user.id, employee_id="E-MOVE", first_name="Mo", last_name="Ver", department="Eng",
+                        designation="Engineer", joining_date=date(2020, 1, 1))
+    db.add(employee)
+    db.flush()
+    db.add(LeaveRequest(employee_id=employee.id, leave_type_id=leave_type.id, start_date=date.today(),
+                        end_date=date.today(), number_of_minutes=480, reason="Trip", status="approved"))
+    db.commit()
+    feeds, employees = get_calendar_feed_service(), get_employee_service()
+    feed_cache.clear()
+    try:
+        assert b"Mo Ver" in feeds.get_feed(db, "department", "Eng")["body"]
+        assert b"Mo Ver" not in feeds.get_feed(db, "department", "Ops")["body"]
+
+        employees.update_employee(db, employee.id, EmployeeUpdate(department="Ops"))
+        assert feed_cache.get("feed:department:Eng") is None and feed_cache.get("feed:department:Ops") is None
+        assert b"Mo Ver" not in feeds.get_feed(db, "department", "Eng")["body"]
+        assert b"Mo Ver" in feeds.get_feed(db, "department", "Ops")["body"]
+
+        employees.update_employee(db, employee.id, EmployeeUpdate(last_name="Ved"))
+        assert b"Mo Ved" in feeds.get_feed(db, "department", "Ops")["body"]
+        assert feed_cache.get("feed:department:Eng") is not None  # Untouched by a rename in Ops
+    finally:
+        feed_cache.clear()
+        db.close()
+        engine.dispose()
+
+
+def test_row_endpoints_match_orm_payloads():
+    """List rows serialize exactly like the Pydantic models built from ORM objects that they replaced"""
+    import json
+    from datetime import date
+    from fastapi.encoders import jsonable_encoder
+    from app.api.responses import FastJSONResponse
+    from app.models.leave_ledger import BalanceMovementKind
+    from app.schemas.employee import EmployeeResponse
+    from app.schemas.leave import LeaveBalanceResponse, LeaveRequestResponse
+    from app.services.container import get_employee_service, get_leave_service, get_ledger_service
+
+    engine, db, org = _leave_test_db()
+    employee, year = org.reports[0], date.today().year
+    db.add_all([
+        LeaveRequest(employee_id=employee.id, leave_type_id=org.leave_type.id, start_date=date(year + 1, 3, 2),
+                     end_date=date(year + 1, 3, 3), number_of_minutes=960, reason="Moving house", status="approved",
+                     approved_by_id=org.hr.id, approved_at=datetime(year, 2, 1, 9, 30)),
+        LeaveRequest(employee_id=employee.id, leave_type_id=org.leave_type.id, start_date=date(year + 1, 4, 6),
+                     end_date=date(year + 1, 4, 6), duration_type="half_day", start_half="morning",
+                     number_of_minutes=240, reason="Dentist appointment"),
+    ])
+    get_ledger_service().record(db, employee.id, org.leave_type.id, year, BalanceMovementKind.RESERVE, 240)
+    db.commit()
+
+    def wire(content):
+        return json.loads(FastJSONResponse(content).body)
+
+    leave_rows = get_leave_service().get_leave_request_rows(db, org.hr)
+    assert wire(leave_rows) == jsonable_encoder(
+        [LeaveRequestResponse.from_orm(request) for request in db.query(LeaveRequest).order_by(LeaveRequest.id)])
+
+    employee_service = get_employee_service()
+    assert wire(employee_service.get_employee_rows(db)) == jsonable_encoder(
+        [EmployeeResponse.from_orm(row) for row in db.query(Employee).order_by(Employee.id)])
+
+    ledger = get_ledger_service()
+    expected = []
+    for row in db.query(EmployeeLeaveBalance).order_by(EmployeeLeaveBalance.employee_id):
+        balance = ledger.get_balance(db, row.employee_id, row.leave_type_id, row.year)
+        expected.append(LeaveBalanceResponse(id=row.id, leave_type_name=row.leave_type.name,
+                                             leave_type_category=row.leave_type.category,
+                                             **balance.dict(exclude={"ledger_position", "as_of"})))
+    balance_rows = employee_service.get_leave_balance_rows(db, year=year)
+    assert wire(balance_rows) == jsonable_encoder(expected)
+    assert balance_rows[1]["pending_minutes"] == 240  # The unfolded reservation is included
+    db.close()
+    engine.dispose()
+
+
+def test_bulk_decisions_apply_per_item(monkeypatch):
+    """A mixed batch decides what it can, reports the rest, and writes one movement and audit row per decision"""
+    from datetime import date
+    from fastapi.testclient import TestClient
+    from app.api.deps import get_hr_or_super_admin
+    from app.database import get_db
+    from app.main import app
+    from app.models.leave_ledger import BalanceMovementKind, LeaveBalanceMovement
+    from app.schemas.leave import LeaveBulkDecisionItem
+    from app.services.container import get_leave_service, get_ledger_service
+
+    engine, db, org = _leave_test_db()
+    service, ledger = get_leave_service(), get_ledger_service()
+    year, employee = date.today().year, org.reports[0]
+    requests = {}
+    for name, state in (("approve", "pending"), ("reject", "pending"), ("withdraw", "pending"),
+                        ("revoke", "approved"), ("closed", "rejected"), ("late", "pending")):
+        requests[name] = LeaveRequest(employee_id=employee.id, leave_type_id=org.leave_type.id, status=state,
+                                      start_date=date(year + 1, 2, 2), end_date=date(year + 1, 2, 2),
+                                      number_of_minutes=480, reason=f"Bulk decision {name}")
+        db.add(requests[name])
+        db.flush()
+        if state != "rejected":
+            ledger.record(db, employee.id, org.leave_type.id, year, BalanceMovementKind.RESERVE, 480,
+                          requests[name].id)
+        if state == "approved":
+            ledger.record(db, employee.id, org.leave_type.id, year, BalanceMovementKind.CONSUME, 480,
+                          requests[name].id)
+    db.commit()
+    ids = {name: request.id for name, request in requests.items()}
+    seeded = db.query(LeaveBalanceMovement).count()
+
+    results, notifications = service.bulk_decide_leave_requests(db, [
+        LeaveBulkDecisionItem(request_id=ids["approve"], decision="approve"),
+        LeaveBulkDecisionItem(request_id=ids["reject"], decision="reject", comments="Team offsite"),
+        LeaveBulkDecisionItem(request_id=ids["withdraw"], decision="cancel"),
+        LeaveBulkDecisionItem(request_id=ids["revoke"], decision="cancel"),
+        LeaveBulkDecisionItem(request_id=ids["closed"], decision="approve"),
+        LeaveBulkDecisionItem(request_id=987654, decision="approve"),
+    ], org.hr)
+    assert [(result.success, result.status) for result in results] == [
+        (True, "approved"), (True, "rejected"), (True, "cancelled"), (True, "cancelled"), (False, "rejected"),
+        (False, None)]
+    assert results[4].error == "Leave request cannot be approved in its current status"
+    assert results[5].error == "Leave request not found"
+    assert sorted(notification["status"] for notification in notifications) == ["approved", "rejected"]
+
+    db.expire_all()
+    assert {name: db.get(LeaveRequest, ids[name]).status for name in ids} == {
+        "approve": "approved", "reject": "rejected", "withdraw": "cancelled", "revoke": "cancelled",
+        "closed": "rejected", "late": "pending"}
+    decided = [ids[name] for name in ("approve", "reject", "withdraw", "revoke")]
+    movements = db.query(LeaveBalanceMovement.leave_request_id, LeaveBalanceMovement.kind) \
+        .filter(LeaveBalanceMovement.id > seeded).order_by(LeaveBalanceMovement.id).all()
+    assert [(request_id, BalanceMovementKind(kind)) for request_id, kind in movements] == [
+        (decided[0], BalanceMovementKind.CONSUME), (decided[1], BalanceMovementKind.RELEASE),
+        (decided[2], BalanceMovementKind.RELEASE), (decided[3], BalanceMovementKind.REFUND)]
+    audits = db.query(LeaveRequestAudit).order_by(LeaveRequestAudit.leave_request_id).all()
+    assert [(audit.leave_request_id, audit.old_status, audit.new_status) for audit in audits] == [
+        (decided[0], "pending", "approved"), (decided[1], "pending", "rejected"),
+        (decided[2], "pending", "cancelled"), (decided[3], "approved", "cancelled")]
+    assert {audit.performed_by_id for audit in audits} == {org.hr.id}
+    balance = ledger.get_balance(db, employee.id, org.leave_type.id, year)
+    assert (balance.used_minutes, balance.pending_minutes) == (480, 480)  # "approve" used, "late" pending
+
+    mailed = []
+
+    async def send_leave_decision_email(**notification):
+        mailed.append(notification["leave_request_id"])
+    monkeypatch.setattr(service.email_service, "send_leave_decision_email", send_leave_decision_email)
+    app.dependency_overrides.update({get_db: lambda: db, get_hr_or_super_admin: lambda: org.hr})
+    try:
+        client = TestClient(app, base_url="http://localhost")
+        response = client.post("/api/v1/leave-requests/bulk-decision", json={"items": [
+            {"request_id": ids["late"], "decision": "approve"},
+            {"request_id": ids["approve"], "decision": "reject", "comments": "Too late now"},
+        ]})
+        assert response.status_code == 200
+        body = response.json()
+        assert (body["processed"], body["succeeded"], body["failed"]) == (2, 1, 1)
+        assert mailed == [ids["late"]]
+        assert client.post("/api/v1/leave-requests/bulk-decision", json={"items": [
+            {"request_id": ids["late"], "decision": "reject"}]}).status_code == 422  # No reason
+    finally:
+        app.dependency_overrides.clear()
+        db.close()
+        engine.dispose()
+
+
+def test_audit_archive_round_trip_and_failed_run(monkeypatch):
+    """Archived audits leave the hot table, come back merged in order, and a failed run changes nothing"""
+    import tempfile
+    from datetime import timedelta
+    import app.services.audit_archive_service as archive_module
+    from app.models.audit_archive import AuditArchiveEntry, AuditArchiveSegment
+    from app.models.leave_audit import AuditAction
+    from app.services.audit_archive_service import AuditArchiveService
+
+    engine, db, org = _leave_test_db()
+    employee, now = org.reports[0], datetime.utcnow()
+    first, second = (LeaveRequest(employee_id=employee.id, leave_type_id=org.leave_type.id,
+                                  start_date=now.date(), end_date=now.date(), number_of_minutes=480,
+                                  reason=f"Archived request {number}") for number in (1, 2))
+    db.add_all([first, second])
+    db.flush()
+    history = [(first, AuditAction.CREATED, None, "pending", 400), (second, AuditAction.CREATED, None, "pending", 390),
+               (first, AuditAction.APPROVED, "pending", "approved", 380),
+               (first, AuditAction.CANCELLED, "approved", "cancelled", 2)]
+    db.add_all([LeaveRequestAudit(leave_request_id=request.id, action=action, old_status=old, new_status=new,
+                                  performed_by_id=org.hr.id, created_at=now - timedelta(days=age))
+                for request, action, old, new, age in history])
+    db.commit()
+
+    with tempfile.TemporaryDirectory() as folder:
+        service = AuditArchiveService(archive_dir=folder)
+
+        def fail(*args, **kwargs):
+            raise RuntimeError("Lost the database mid-run")
+        monkeypatch.setattr(archive_module, "delete", fail)
+        try:
+            service.archive(db, older_than_days=30)
+            raise AssertionError("The archive run did not fail")
+        except RuntimeError:
+            pass
+        assert os.listdir(folder) == []
+        assert db.query(LeaveRequestAudit).count() == 4
+        assert db.query(AuditArchiveSegment).count() == db.query(AuditArchiveEntry).count() == 0
+        monkeypatch.undo()
+
+        segment = service.archive(db, older_than_days=30)
+        assert segment.record_count == 3 and os.path.exists(os.path.join(folder, segment.path))
+        assert [audit.action for audit in db.query(LeaveRequestAudit)] == [AuditAction.CANCELLED]
+        assert service.archive(db, older_than_days=30) is None
+
+        logs = service.get_audit_logs(db, first.id)
+        assert [record["action"] for record in logs] == [AuditAction.CANCELLED, AuditAction.APPROVED,
+                                                         AuditAction.CREATED]
+        assert {record["performed_by_name"] for record in logs} == {"Hana Rao"}
+        assert [(record["leave_request_id"], record["new_status"]) for record in service.get_audit_logs(
+            db, second.id)] == [(second.id, "pending")]
+        assert len(service.get_archived_audits_in_range(db, first.id, second.id, AuditAction.CREATED)) == 2
+    db.close()
+    engine.dispose()
+
+
+def test_employee_search_pages_by_keyset(monkeypatch):
+    """Directory search prefix-matches every word and pages through (last name, first name, id) without gaps"""
+    from datetime import date
+    from fastapi.testclient import TestClient
+    from app.api.deps import get_hr_or_super_admin
+    from app.database import get_read_db
+    from app.main import app
+    from app.models.user import UserRole
+    from app.services.container import get_employee_service
+
+    engine, db, org = _leave_test_db()
+    for number, (first, last, department) in enumerate([("Ann", "Berg", "Eng"), ("Bo", "Berg", "Eng"),
+                                                        ("Cy", "Adams", "Eng"), ("Di", "Zeller", "Ops"),
+                                                        ("Ed", "Berg", "Engineering")], start=10):
+        user = User(email=f"{first.lower()}.{last.lower()}@example.com", first_name=first, last_name=last,
+                    role=UserRole.EMPLOYEE, is_active=True)
+        db.add(user)
+        db.flush()
+        db.add(Employee(user_id=user.id, employee_id=f"E{number:03d}", first_name=first, last_name=last,
+                        department=department, designation="Developer", joining_date=date(2021, 1, 1)))
+    db.commit()
+    service = get_employee_service()
+
+    def names(rows):
+        return [f"{row['first_name']} {row['last_name']}" for row in rows]
+
+    def every_page(**filters):
+        pages, cursor = [], None
+        while True:
+            rows, cursor = service.search_employees(db, limit=2, cursor=cursor, **filters)
+            pages.append(names(rows))
+            if cursor is None:
+                return pages
+
+    # "eng" prefix-matches Eng and Engineering; keyset pages never repeat or skip a row
+    assert every_page(q="eng") == [["Cy Adams", "Ann Berg"], ["Bo Berg", "Ed Berg"], ["Mia Grant", "Eli Stone"]]
+    assert every_page(q="ber develop") == [["Ann Berg", "Bo Berg"], ["Ed Berg"]]
+    assert every_page(q="berg", department="Eng") == [["Ann Berg", "Bo Berg"]]
+    assert every_page(q="ann.berg") == [["Ann Berg"]]  # Email words
+    assert names(service.search_employees(db, designation="Analyst")[0]) == ["Ola Berg"]
+    monkeypatch.setattr(service, "SEARCH_DENSE_MATCHES", 0)  # The index-walking plan returns the same pages
+    assert every_page(q="eng") == [["Cy Adams", "Ann Berg"], ["Bo Berg", "Ed Berg"], ["Mia Grant", "Eli Stone"]]
+
+    app.dependency_overrides.update({get_read_db: lambda: db, get_hr_or_super_admin: lambda: org.hr})
+    try:
+        client = TestClient(app, base_url="http://localhost")
+        page = client.get("/api/v1/users/employees/search", params={"q": "berg", "limit": 3}).json()
+        assert names(page["items"]) == ["Ann Berg", "Bo Berg", "Ed Berg"] and page["next_cursor"]
+        rest = client.get("/api/v1/users/employees/search",
+                          params={"q": "berg", "limit": 3, "cursor": page["next_cursor"]}).json()
+        assert names(rest["items"]) == ["Ola Berg"] and rest["next_cursor"] is None
+        assert client.get("/api/v1/users/employees/search", params={"cursor": "not-a-cursor"}).status_code == 400
+    finally:
+        app.dependency_overrides.clear()
+        db.close()
+        engine.dispose()
+
+
+def test_org_hierarchy_follows_manager_changes():
+    """Onboarding and manager changes keep the closure table equal to a rebuild from manager_id"""
+    from datetime import date
+    from app.models.org_hierarchy import EmployeeHierarchy
+    from app.models.user import UserRole
+    from app.schemas.employee import EmployeeUpdate
+    from app.services.container import get_employee_service, get_org_hierarchy_service
+
+    engine, db, org = _leave_test_db()
+    hierarchy, employees = get_org_hierarchy_service(), get_employee_service()
+    assert hierarchy.ensure_built(db) and not hierarchy.ensure_built(db)
+    mia, (eli, ola) = org.manager, org.reports
+    user = User(email="top@example.com", first_name="Tia", last_name="Top", role=UserRole.EMPLOYEE, is_active=True)
+    db.add(user)
+    db.flush()
+    top = Employee(user_id=user.id, employee_id="E100", first_name="Tia", last_name="Top", department="Eng",
+                   designation="Director", joining_date=date(2019, 1, 1))
+    db.add(top)
+    db.flush()
+    hierarchy.add_employee(db, top.id)
+    db.commit()
+
+    def links():
+        return {(row.ancestor_id, row.descendant_id, row.depth) for row in db.query(EmployeeHierarchy)}
+
+    def assert_matches_rebuild():
+        maintained = links()
+        hierarchy.rebuild(db)
+        db.commit()
+        assert links() == maintained
+
+    def team(manager):
+        return [(row["first_name"], row["depth"]) for row in hierarchy.get_team_rows(db, manager.id)]
+
+    employees.update_employee(db, mia.id, EmployeeUpdate(manager_id=top.id))
+    assert team(top) == [("Mia", 1), ("Ola", 2), ("Eli", 2)]  # By depth, then last name
+    assert_matches_rebuild()
+
+    employees.update_employee(db, eli.id, EmployeeUpdate(manager_id=ola.id))
+    assert team(top) == [("Mia", 1), ("Ola", 2), ("Eli", 3)] and team(ola) == [("Eli", 1)]
+    assert_matches_rebuild()
+
+    for cycle in ((mia.id, eli.id), (ola.id, ola.id)):
+        try:
+            employees.update_employee(db, cycle[0], EmployeeUpdate(manager_id=cycle[1]))
+            raise AssertionError("A reporting cycle was accepted")
+        except ValueError:
+            db.rollback()
+    assert team(top) == [("Mia", 1), ("Ola", 2), ("Eli", 3)]
+
+    employees.update_employee(db, mia.id, EmployeeUpdate(manager_id=None))
+    assert team(top) == [] and team(mia) == [("Ola", 1), ("Eli", 2)]
+    assert hierarchy.is_in_subtree(db, mia.id, eli.id) and not hierarchy.is_in_subtree(db, top.id, eli.id)
+    assert_matches_rebuild()
+    db.close()
+    engine.dispose()
+
+
+def test_compiled_policies_check_only_what_the_leave_type_needs():
+    """Policies compile per leave-type version and validate batches with a fixed number of queries"""
+    from datetime import date, timedelta
+    from sqlalchemy import event
+    from sqlalchemy.orm import sessionmaker
+    from app.cache import leave_type_cache, publish_invalidation
+    from app.schemas.leave import LeaveRequestCreate
+    from app.services.container import get_leave_policy_service
+
+    start = _next_working_day(1)
+    if start is None or (start + timedelta(days=12)).year != start.year:
+        logger.info("Compiled policy test skipped: too close to the end of the year")
+        return
+    engine, db, org = _leave_test_db()
+    strict = LeaveType(name="Strict", default_balance=5, allow_half_day=False, allow_hourly=False,
+                       max_consecutive_days=3, requires_documentation=True)
+    retired = LeaveType(name="Retired", default_balance=5, is_active=False)
+    db.add_all([strict, retired])
+    db.commit()
+    policies = get_leave_policy_service()
+    leave_type_cache.clear()
+
+    def request(leave_type, days=1, **fields):
+        return LeaveRequestCreate(leave_type_id=leave_type.id, start_date=start,
+                                  end_date=start + timedelta(days=days - 1), reason="Policy pipeline check",
+                                  **fields)
+
+    policy = policies.get_policy(strict)
+    assert len(policy.checks) == 5 and policies.get_policy(strict) is policy
+    assert len(policies.get_policy(org.leave_type).checks) == 3  # Hourly, consecutive days and year only
+    assert policy.violations(request(strict, days=5, duration_type="half_day")) == [
+        "Leave type 'Strict' does not support half-day leaves",
+        "Leave request cannot exceed 3 consecutive days for this leave type",
+        "Documentation is required for Strict leaves"]
+    assert policy.check(request(strict, documentation="Signed form")) is None
+
+    strict.allow_half_day, strict.updated_at = True, datetime.utcnow() + timedelta(seconds=1)
+    db.commit()
+    assert len(policies.get_policy(strict).checks) == 4  # A new version compiles anew
+    publish_invalidation(tags=["leave_types"])
+    assert leave_type_cache.get(f"policy:{strict.id}:{policies.policy_version(strict)}") is None
+
+    eli, ola = org.reports
+    mia = org.manager
+    db.add(LeaveRequest(employee_id=ola.id, leave_type_id=org.leave_type.id, start_date=start, end_date=start,
+                        number_of_minutes=480, reason="Already booked"))
+    mia.joining_date = date.today() - timedelta(days=10)
+    db.commit()
+
+    def count_statements(items):
+        statements = []
+
+        def count(*args):
+            statements.append(args[2])
+        event.listen(engine, "before_cursor_execute", count)
+        try:
+            with sessionmaker(bind=engine)() as fresh:  # Nothing memoized from earlier calls
+                return policies.validate_batch(fresh, items), len(statements)
+        finally:
+            event.remove(engine, "before_cursor_execute", count)
+
+    next_year = start.replace(year=start.year + 1) - timedelta(days=1)
+    errors, statements = count_statements([
+        (eli.id, request(org.leave_type)),
+        (eli.id, request(org.leave_type, days=2)),
+        (ola.id, request(org.leave_type)),
+        (mia.id, request(org.leave_type)),
+        (eli.id, request(retired)),
+        (987654, request(org.leave_type)),
+        (eli.id, LeaveRequestCreate(leave_type_id=org.leave_type.id, start_date=next_year, end_date=next_year,
+                                    reason="Policy pipeline check")),
+    ])
+    assert errors == [None, "You have overlapping leave requests for these dates",
+                      "You have overlapping leave requests for these dates",
+                      "Employees on probation cannot apply for leave", "Selected leave type is not available",
+                      "Employee record not found", "Leave requests can only be made for the current year"]
+    assert count_statements([(eli.id, request(org.leave_type))])[1] == statements
+    leave_type_cache.clear()
+    db.close()
+    engine.dispose()
+
+
+def test_leave_quote_prices_requests_without_writing():
+    """Quotes count working days around holidays, project the balance and list every violation"""
+    from datetime import date, timedelta
+    from fastapi.testclient import TestClient
+    from app.api.deps import get_employee_user
+    from app.cache import balance_cache, holiday_cache
+    from app.database import get_read_db
+    from app.main import app
+    from app.models.holiday import Holiday
+    from app.models.leave_ledger import BalanceMovementKind, LeaveBalanceMovement
+    from app.services.container import get_leave_service, get_ledger_service
+
+    monday = date.today() + timedelta(days=7 - date.today().weekday())
+    if (monday + timedelta(days=20)).year != date.today().year:
+        logger.info("Leave quote test skipped: too close to the end of the year")
+        return
+    engine, db, org = _leave_test_db()
+    eli = org.reports[0]
+    db.add(Holiday(date=monday + timedelta(days=2), name="Founders Day", is_recurring=False))
+    db.commit()
+    holiday_cache.clear()
+    balance_cache.clear()
+    app.dependency_overrides.update({get_read_db: lambda: db, get_employee_user: lambda: org.users[1]})
+    try:
+        client = TestClient(app, base_url="http://localhost")
+
+        def quote(start, end, **params):
+            response = client.get("/api/v1/leave-requests/quote", params={
+                "leave_type_id": org.leave_type.id, "start_date": str(start), "end_date": str(end), **params})
+            assert response.status_code == 200, response.text
+            return response.json()
+
+        week = quote(monday, monday + timedelta(days=6))
+        assert (week["calendar_days"], week["working_days"]) == (7, 4.0)
+        assert week["holidays"] == [str(monday + timedelta(days=2))]
+        assert (week["available_balance"], week["projected_balance"]) == (12.0, 8.0)
+        assert week["violations"] == [] and week["can_submit"]
+        assert quote(monday, monday, duration_type="half_day", start_half="morning")["projected_balance"] == 11.5
+
+        get_ledger_service().record(db, eli.id, org.leave_type.id, monday.year, BalanceMovementKind.RESERVE, 960)
+        db.commit()
+        get_leave_service()._publish_balance_change([eli.id])
+        assert quote(monday, monday + timedelta(days=6))["projected_balance"] == 6.0  # Cached balance evicted
+
+        refused = quote(monday, monday + timedelta(days=20), duration_type="hourly")
+        assert refused["working_days"] is None and not refused["can_submit"]
+        assert refused["violations"] == ["hours must be between 0 and 8 for hourly leaves",  # Field and policy errors
+                                         "Leave type 'Casual' does not support hourly leaves"]
+        too_long = quote(monday, monday + timedelta(days=20))
+        assert too_long["working_days"] == 14.0 and too_long["violations"] == ["Insufficient leave balance"]
+
+        requests, movements = db.query(LeaveRequest).count(), db.query(LeaveBalanceMovement).count()
+        quote(monday, monday)
+        assert (db.query(LeaveRequest).count(), db.query(LeaveBalanceMovement).count()) == (requests, movements)
+        assert client.get("/api/v1/leave-requests/quote", params={
+            "leave_type_id": 987654, "start_date": str(monday), "end_date": str(monday)}).status_code == 400
+    finally:
+        app.dependency_overrides.clear()
+        holiday_cache.clear()
+        balance_cache.clear()
+        db.close()
+        engine.dispose()
+
+
+def test_role_dashboards_are_composed_in_fixed_statements(monkeypatch):
+    """Employee and HR dashboards: contents, a statement count independent of data, and cache eviction"""
+    from datetime import date, timedelta
+    from fastapi.testclient import TestClient
+    from sqlalchemy import event
+    from app.api.deps import get_any_authenticated_user, get_hr_or_super_admin
+    from app.cache import dashboard_cache, holiday_cache, leave_type_cache, publish_invalidation
+    from app.database import get_read_db
+    from app.main import app
+    from app.models.holiday import Holiday
+    from app.services.container import get_dashboard_service
+
+    engine, db, org = _leave_test_db()
+    eli, ola = org.reports
+    today, now = date.today(), datetime.utcnow()
+    db.add_all([Holiday(date=today + timedelta(days=30), name="Harvest Day", is_recurring=False),
+                LeaveType(name="Retired", default_balance=1, is_active=False)])
+    for number in range(4):
+        db.add(LeaveRequest(employee_id=eli.id, leave_type_id=org.leave_type.id, start_date=today + timedelta(days=40),
+                            end_date=today + timedelta(days=40), number_of_minutes=480, reason=f"Request {number}",
+                            created_at=now - timedelta(days=10 - number)))
+    db.add(LeaveRequest(employee_id=ola.id, leave_type_id=org.leave_type.id, start_date=today, end_date=today,
+                        number_of_minutes=480, reason="Out today", status="approved", created_at=now))
+    db.commit()
+    for user in org.users + [org.hr]:
+        db.refresh(user)  # Loaded now, so the counts below are the dashboards' own statements
+    service = get_dashboard_service()
+    monkeypatch.setattr(service, "list_limit", 3)
+    for cache in (dashboard_cache, holiday_cache, leave_type_cache):
+        cache.clear()
+    statements = []
+    event.listen(engine, "before_cursor_execute", lambda *args: statements.append(args[2]))
+    current = {"user": org.users[1]}
+    app.dependency_overrides.update({get_read_db: lambda: db, get_any_authenticated_user: lambda: current["user"],
+                                     get_hr_or_super_admin: lambda: org.hr})
+    try:
+        client = TestClient(app, base_url="http://localhost")
+        mine = client.get("/api/v1/dashboard/employee").json()
+        assert mine["profile"]["email"] == "eli@example.com" and mine["employee"]["employee_id"] == "E002"
+        assert [row["reason"] for row in mine["recent_requests"]] == ["Request 3", "Request 2", "Request 1"]
+        assert [(row["leave_type_name"], row["available_balance"]) for row in mine["balances"]] == [("Casual", 12.0)]
+        assert [holiday["name"] for holiday in mine["upcoming_holidays"]] == ["Harvest Day"]
+        assert [leave_type["name"] for leave_type in mine["leave_types"]] == ["Casual"]
+        first_load = len(statements)
+
+        assert client.get("/api/v1/dashboard/employee").json() == mine and len(statements) == first_load  # Cached
+        current["user"] = org.users[2]
+        statements.clear()
+        theirs = client.get("/api/v1/dashboard/employee").json()
+        assert theirs["recent_requests"][0]["reason"] == "Out today"
+        one_request = len(statements)
+
+        publish_invalidation(tags=[f"balances:{eli.id}"])
+        current["user"] = org.users[1]
+        statements.clear()
+        assert client.get("/api/v1/dashboard/employee").json() == mine  # Evicted and rebuilt
+        assert len(statements) == one_request < first_load  # Four requests cost what one does; shared caches stay warm
+
+        current["user"] = org.hr
+        assert client.get("/api/v1/dashboard/employee").json()["employee"] is None
+
+        statements.clear()
+        hr = client.get("/api/v1/dashboard/hr").json()
+        assert len(statements) == 2  # One windowed select per list
+        assert hr["pending_count"] == 4 and [row["first_name"] for row in hr["oldest_pending"]] == ["Eli"] * 3
+        assert hr["oldest_pending"][0]["created_at"] < hr["oldest_pending"][1]["created_at"]
+        assert hr["out_today_count"] == 1 and hr["out_today"][0]["employee_code"] == "E003"
+    finally:
+        app.dependency_overrides.clear()
+        for cache in (dashboard_cache, holiday_cache, leave_type_cache):
+            cache.clear()
+        db.close()
+        engine.dispose()
+
+
+def test_fields_projection_selects_only_requested_columns():
+    """?fields= narrows both the select and the payload; unknown names are a 400"""
+    from datetime import date, timedelta
+    from fastapi.testclient import TestClient
+    from sqlalchemy import event
+    from app.api.deps import get_current_user, get_hr_or_super_admin
+    from app.database import get_read_db
+    from app.main import app
+
+    engine, db, org = _leave_test_db()
+    eli = org.reports[0]
+    db.add(LeaveRequest(employee_id=eli.id, leave_type_id=org.leave_type.id, start_date=date.today() + timedelta(days=9),
+                        end_date=date.today() + timedelta(days=9), number_of_minutes=480, reason="Private reason"))
+    db.commit()
+    statements = []
+    event.listen(engine, "before_cursor_execute", lambda *args: statements.append(args[2]))
+    current = {"user": org.hr}
+    app.dependency_overrides.update({get_read_db: lambda: db, get_current_user: lambda: current["user"],
+                                     get_hr_or_super_admin: lambda: org.hr})
+    try:
+        client = TestClient(app, base_url="http://localhost")
+
+        def keys(path, fields):
+            statements.clear()
+            response = client.get(path, params={"fields": fields})
+            assert response.status_code == 200, response.text
+            body = response.json()
+            rows = body["items"] if isinstance(body, dict) else body
+            assert rows
+            return [sorted(row) for row in rows]
+
+        assert keys("/api/v1/leave-requests", "start_date, status") == [["id", "start_date", "status"]]
+        assert not any("reason" in statement for statement in statements)
+        assert keys("/api/v1/leave-requests/pending", "status") == [["id", "status"]]
+        current["user"] = org.users[1]
+        assert keys("/api/v1/my-requests", "end_date") == [["end_date", "id"]]
+
+        assert keys("/api/v1/users/employees/list", "first_name")[0] == ["first_name", "id"]
+        assert not any("JOIN users" in statement for statement in statements)  # No user fields, no join
+        assert keys("/api/v1/users/employees/list", "first_name,user")[0] == ["first_name", "id", "user"]
+        assert keys("/api/v1/users/employees", "email")[0] == ["email", "id"]
+        assert keys("/api/v1/users/employees/search", "department") == [["department", "id"]] * 3
+
+        # Still Eli for their own requests, then HR for the rest
+        for path in ("/api/v1/my-requests", "/api/v1/leave-requests", "/api/v1/leave-requests/pending",
+                     "/api/v1/users/employees/list", "/api/v1/users/employees", "/api/v1/users/employees/search"):
+            response = client.get(path, params={"fields": "status,salary"})
+            current["user"] = org.hr
+            assert response.status_code == 400 and "salary" in response.json()["detail"], path
+    finally:
+        app.dependency_overrides.clear()
+        db.close()
+        engine.dispose()
+
+
 def main():
     """Main test function"""
     logger.info("Starting system tests...")
@@ -67,6 +1435,8 @@ def main():
         test_database()
     except Exception as e:
         logger.warning(f"Database test skipped: {e}")
+
+    test_create_leave_request_statement_count()
     
     logger.info("All tests completed!")
 